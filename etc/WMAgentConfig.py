@@ -97,6 +97,7 @@ config.JobStateMachine.couchurl = couchURL
 config.JobStateMachine.couchDBName = jobDumpDBName
 config.JobStateMachine.jobSummaryDBName = jobSummaryDBName
 config.JobStateMachine.summaryStatsDBName = summaryStatsDBName
+config.JobStateMachine.bulkTransitions = True
 
 config.section_("ACDC")
 config.ACDC.couchurl = "https://cmsweb.cern.ch/couchdb"
@@ -135,6 +136,8 @@ config.WorkQueueManager.queueParams = {}
 config.WorkQueueManager.queueParams["ParentQueueCouchUrl"] = "https://cmsweb.cern.ch/couchdb/workqueue"
 # this has to be unique for different work queue. This is just place holder 
 config.WorkQueueManager.queueParams["QueueURL"] = "http://%s:5984" % (config.Agent.hostName)
+# keep the available elements of the global queue in memory when pulling work
+config.WorkQueueManager.queueParams["AvailableWorkIndex"] = True
 
 config.component_("DBS3Upload")
 config.DBS3Upload.namespace = "WMComponent.DBS3Buffer.DBS3Upload"
@@ -254,6 +257,11 @@ config.JobArchiver.logLevel = globalLogLevel
 # disk as the JobCreator
 #config.JobArchiver.logDir = config.General.workDir + "/JobArchives"
 config.JobArchiver.numberOfJobsToCluster = 1000
+# Job caches are archived by a pool of threads, one tarball per cluster
+# and cycle.  Compression can be none, gzip, bz2 or xz.
+config.JobArchiver.archiveThreads = 4
+config.JobArchiver.archiveCompression = "gzip"
+config.JobArchiver.archiveCompressionLevel = 6
 
 config.component_("TaskArchiver")
 config.TaskArchiver.namespace = "WMComponent.TaskArchiver.TaskArchiver"
@@ -17,6 +17,9 @@ import shutil
 import tarfile
 import traceback
 import time
+import subprocess
+
+from multiprocessing.pool import ThreadPool
 
 from WMComponent.TaskArchiver.TaskArchiverPoller import uploadPublishWorkflow
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
@@ -29,6 +32,7 @@ from WMCore.DAOFactory        import DAOFactory
 from WMCore.WMBS.Fileset      import Fileset
 from WMCore.WMException       import WMException
 from WMCore.WMBS.Workflow     import Workflow
+from WMCore.DataStructs.JobPackageStore import getJobStorePath, deleteJobStore
 
 
 class JobArchiverPollerException(WMException):
@@ -38,6 +42,81 @@ class JobArchiverPollerException(WMException):
     The Exception handler for the job archiver.
     """
 
+TAR_SUFFIXES = {'none': '.tar', 'gzip': '.tar.gz', 'bz2': '.tar.bz2', 'xz': '.tar.xz'}
+
+def archiveJobCluster(work):
+    """
+    _archiveJobCluster_
+
+    Write the cache directories of a list of jobs into a single tarball in
+    logDir.  Each job is stored under Job_<id>/ in the tarball.  Runs in the
+    archiver thread pool so it only returns a summary and an error message
+    instead of raising, the cache directories are left for the caller to
+    remove.
+    """
+    logDir      = work['logDir']
+    jobs        = work['jobs']
+    compression = work['compression']
+    level       = work['compressionLevel']
+
+    result = {'jobs': 0, 'files': 0, 'bytesIn': 0, 'bytesOut': 0, 'error': None}
+    baseName = os.path.join(logDir, 'Jobs_%i-%i' % (jobs[0][0], jobs[-1][0]))
+    tarName = baseName + TAR_SUFFIXES[compression]
+    counter = 0
+    while os.path.exists(tarName):
+        counter += 1
+        tarName = '%s_%i%s' % (baseName, counter, TAR_SUFFIXES[compression])
+
+    compressor = None
+    try:
+        if compression == 'xz':
+            # The tarfile module can't write xz, pipe the stream through xz.
+            # Clusters are archived in parallel threads, an xz must not
+            # inherit the pipes of the others or they never see the end of
+            # their input.
+            output = open(tarName, 'wb')
+            compressor = subprocess.Popen(['xz', '-%i' % level, '-c'],
+                                          stdin = subprocess.PIPE, stdout = output,
+                                          close_fds = True)
+            output.close()
+            tarball = tarfile.open(fileobj = compressor.stdin, mode = 'w|')
+        elif compression == 'none':
+            tarball = tarfile.open(name = tarName, mode = 'w')
+        else:
+            tarball = tarfile.open(name = tarName, mode = 'w:%s' % compression.replace('gzip', 'gz'),
+                                   compresslevel = level)
+
+        for (jobID, cacheDir) in jobs:
+            for fileName in os.listdir(cacheDir):
+                fullFile = os.path.join(cacheDir, fileName)
+                try:
+                    tarball.add(name = fullFile,
+                                arcname = 'Job_%i/%s' % (jobID, fileName))
+                    if os.path.isfile(fullFile):
+                        result['files'] += 1
+                        result['bytesIn'] += os.path.getsize(fullFile)
+                except (IOError, OSError):
+                    logging.error('Cannot read %s, skipping' % fullFile)
+            result['jobs'] += 1
+        tarball.close()
+
+        if compressor != None:
+            compressor.stdin.close()
+            if compressor.wait() != 0:
+                raise IOError("xz exited with code %i" % compressor.returncode)
+        result['bytesOut'] = os.path.getsize(tarName)
+    except Exception as ex:
+        if compressor != None and compressor.poll() == None:
+            compressor.kill()
+        if os.path.exists(tarName):
+            os.remove(tarName)
+        msg =  "Exception while opening and adding to a tarfile\n"
+        msg += "Tarfile: %s\n" % tarName
+        msg += str(ex)
+        result['error'] = msg
+
+    return result
+
 class JobArchiverPoller(BaseWorkerThread):
     """
     Polls for Error Conditions, handles them
@@ -55,11 +134,24 @@ class JobArchiverPoller(BaseWorkerThread):
                                      logger = myThread.logger,
                                      dbinterface = myThread.dbi)
         self.loadAction = self.daoFactory(classname = "Jobs.LoadFromIDWithWorkflow")
+        self.cleanedOutAction = self.daoFactory(classname = "JobGroup.ListCleanedOut")
 
 
         # Variables
         self.numberOfJobsToCluster = getattr(self.config.JobArchiver,
                                              "numberOfJobsToCluster", 1000)
+        self.archiveThreads = getattr(self.config.JobArchiver,
+                                      "archiveThreads", 4)
+        self.compression = getattr(self.config.JobArchiver,
+                                   "archiveCompression", "bz2")
+        self.compressionLevel = getattr(self.config.JobArchiver,
+                                        "archiveCompressionLevel", 9)
+        if self.compression not in TAR_SUFFIXES:
+            msg = "Unknown archiveCompression %s, must be one of %s" % \
+                  (self.compression, sorted(TAR_SUFFIXES.keys()))
+            raise JobArchiverPollerException(msg)
+        self.archiveStats = {}
+        self.archivePool = None
 
         # initialize the alert framework (if available)
         self.initAlerts(compName = "JobArchiver")
@@ -117,7 +209,13 @@ class JobArchiverPoller(BaseWorkerThread):
         This function terminates the job after a final pass
         """
         logging.debug("terminating. doing one more pass before we die")
-        self.algorithm(params)
+        try:
+            self.algorithm(params)
+        finally:
+            if self.archivePool != None:
+                self.archivePool.close()
+                self.archivePool.join()
+                self.archivePool = None
         return
 
 
@@ -186,6 +284,30 @@ class JobArchiverPoller(BaseWorkerThread):
         self.changeState.propagate(killList, "cleanout", "killed")
         myThread.transaction.commit()
 
+        self.cleanJobStores(doneList)
+        return
+
+    def cleanJobStores(self, doneList):
+        """
+        _cleanJobStores_
+
+        Remove the job stores written by the JobCreator for the job groups
+        that have all their jobs cleaned out.
+        """
+        storePaths = {}
+        for job in doneList:
+            if job['cache_dir']:
+                storePaths[job['jobgroup']] = getJobStorePath(job['cache_dir'],
+                                                              job['jobgroup'])
+
+        for jobGroup in self.cleanedOutAction.execute(jobGroups = storePaths.keys()):
+            try:
+                if deleteJobStore(storePaths[jobGroup]):
+                    logging.debug("Removed job store %s" % storePaths[jobGroup])
+            except OSError as ex:
+                logging.error("Could not remove job store %s: %s" % (storePaths[jobGroup], str(ex)))
+        return
+
 
     def findFinishedJobs(self):
         """
@@ -237,40 +359,99 @@ class JobArchiverPoller(BaseWorkerThread):
 
         Upon workQueue realizing that a subscriptions is done, everything
         regarding those jobs is cleaned up.
-        """
 
+        The cache directories of the jobs are grouped by JobCluster and each
+        cluster is written to a single tarball by a pool of threads, the
+        work is in the compression libraries and the disk.  The pool is kept
+        for the lifetime of the poller.  Only the cache directories of the
+        clusters whose tarball was written are removed.
+        """
+        startTime = time.time()
+        clusters = {}
         for job in doneList:
-            #print "About to clean cache for job %i" % (job['id'])
-            self.cleanJobCache(job)
+            cacheDir = self.checkJobCache(job)
+            if cacheDir == None:
+                continue
+            logDir = self.getClusterLogDir(job)
+            clusters.setdefault(logDir, []).append((job['id'], cacheDir))
+
+        if len(clusters) == 0:
+            return
+
+        workList = []
+        for logDir in clusters.keys():
+            workList.append({'logDir': logDir,
+                             'jobs': sorted(clusters[logDir]),
+                             'compression': self.compression,
+                             'compressionLevel': self.compressionLevel})
+
+        if self.archiveThreads > 1 and len(workList) > 1:
+            if self.archivePool == None:
+                self.archivePool = ThreadPool(processes = self.archiveThreads)
+            results = self.archivePool.map(archiveJobCluster, workList)
+        else:
+            results = map(archiveJobCluster, workList)
+
+        stats = {'clusters': 0, 'jobs': 0, 'files': 0, 'bytesIn': 0, 'bytesOut': 0}
+        errors = []
+        for (work, result) in zip(workList, results):
+            if result['error']:
+                errors.append(result['error'])
+                continue
+            for (jobID, cacheDir) in work['jobs']:
+                shutil.rmtree(cacheDir, ignore_errors = True)
+            stats['clusters'] += 1
+            for key in ['jobs', 'files', 'bytesIn', 'bytesOut']:
+                stats[key] += result[key]
+        stats['seconds'] = time.time() - startTime
+        self.archiveStats = stats
+
+        logging.info("Archived %i jobs (%i files) in %i tarballs in %.1f seconds: "
+                     "%.1f jobs/s, %.2f MB/s read, %.2f MB/s written" % \
+                     (stats['jobs'], stats['files'], stats['clusters'], stats['seconds'],
+                      stats['jobs'] / max(stats['seconds'], 0.001),
+                      stats['bytesIn'] / max(stats['seconds'], 0.001) / 1048576,
+                      stats['bytesOut'] / max(stats['seconds'], 0.001) / 1048576))
+
+        if errors:
+            msg = "\n".join(errors)
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            raise JobArchiverPollerException(msg)
 
         return
 
-    def cleanJobCache(self, job):
+    def checkJobCache(self, job):
         """
-        _cleanJobCache_
+        _checkJobCache_
 
-        Clears out any files still sticking around in the jobCache,
-        tars up the contents and sends them off
+        Return the cache directory of a job if there is something in it to
+        archive.  Empty cache directories are removed.
         """
-
         cacheDir = job['cache_dir']
 
         if not cacheDir or not os.path.isdir(cacheDir):
             msg = "Could not find jobCacheDir %s" % (cacheDir)
             logging.error(msg)
             self.sendAlert(1, msg = msg)
-            return
+            return None
 
-        cacheDirList = os.listdir(cacheDir)
-
-        if cacheDirList == []:
+        if os.listdir(cacheDir) == []:
             os.rmdir(cacheDir)
-            return
+            return None
+
+        return cacheDir
+
+    def getClusterLogDir(self, job):
+        """
+        _getClusterLogDir_
 
-        # Now we need to set up a final destination
+        Make the directory the JobCluster of the job is archived to.
+        """
         try:
             # Label all directories by workflow
             # Workflow better have a first character
+            logDir = None
             workflow       = job['workflow']
             firstCharacter = workflow[0]
             jobFolder = 'JobCluster_%i' \
@@ -287,38 +468,16 @@ class JobArchiverPoller(BaseWorkerThread):
             self.sendAlert(6, msg = msg)
             raise JobArchiverPollerException(msg)
 
-        # Otherwise we have something in there
-        try:
-            tarName = 'Job_%i.tar.bz2' % (job['id'])
-            tarball = tarfile.open(name = os.path.join(logDir, tarName),
-                                   mode = 'w:bz2')
-            for fileName in cacheDirList:
-                fullFile = os.path.join(cacheDir, fileName)
-                try:
-                    tarball.add(name = fullFile,
-                                arcname = 'Job_%i/%s' %(job['id'], fileName))
-                except IOError:
-                    logging.error('Cannot read %s, skipping' % fullFile)
-            tarball.close()
-        except Exception as ex:
-            msg =  "Exception while opening and adding to a tarfile\n"
-            msg += "Tarfile: %s\n" % os.path.join(logDir, tarName)
-            msg += str(ex)
-            logging.error(msg)
-            self.sendAlert(6, msg = msg)
-            logging.debug("cacheDirList: %s" % (cacheDirList))
-            raise JobArchiverPollerException(msg)
+        return logDir
 
-        try:
-            shutil.rmtree('%s' % (cacheDir), ignore_errors=True)
-        except Exception as ex:
-            msg =  "Error while removing the old cache dir.\n"
-            msg += "CacheDir: %s\n" % cacheDir
-            msg += str(ex)
-            logging.error(msg)
-            self.sendAlert(6, msg = msg)
-            raise JobArchiverPollerException(msg)
+    def cleanJobCache(self, job):
+        """
+        _cleanJobCache_
 
+        Clears out any files still sticking around in the jobCache,
+        tars up the contents and sends them off
+        """
+        self.cleanWorkArea([job])
         return
 
 
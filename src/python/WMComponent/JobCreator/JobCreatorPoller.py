@@ -35,6 +35,7 @@ from WMCore.WMBS.Workflow                   import Workflow
 from WMCore.WMSpec.WMWorkload               import WMWorkload, WMWorkloadHelper
 from WMCore.Database.CMSCouch               import CouchServer
 from WMCore.FwkJobReport.Report             import Report
+from WMCore.DataStructs.JobPackageStore     import JobPackageStore, getJobStorePath
 
 
 def retrieveWMSpec(workflow = None, wmWorkloadURL = None):
@@ -105,11 +106,12 @@ def saveJob(job, workflow, sandbox, wmTask = None, jobNumber = 0,
             owner = None, ownerDN = None,
             ownerGroup = '', ownerRole = '',
             scramArch = None, swVersion = None, agentNumber = 0,
-            numberOfCores = 1):
+            numberOfCores = 1, jobStore = None):
     """
     _saveJob_
 
-    Actually do the mechanics of saving the job to a pickle file
+    Actually do the mechanics of saving the job, either to the job store of
+    its job group or to a pickle file in its cache directory.
     """
     if wmTask:
             # If we managed to load the task,
@@ -130,6 +132,10 @@ def saveJob(job, workflow, sandbox, wmTask = None, jobNumber = 0,
     job['scramArch'] = scramArch
     job['swVersion'] = swVersion
     job['numberOfCores'] = numberOfCores
+    if jobStore != None:
+        jobStore.append(job['id'], job)
+        return
+
     output = open(os.path.join(cacheDir, 'job.pkl'), 'w')
     cPickle.dump(job, output, cPickle.HIGHEST_PROTOCOL)
     output.close()
@@ -142,9 +148,11 @@ def creatorProcess(work, jobCacheDir):
     """
     _creatorProcess_
 
-    Creator work areas and pickle job objects
+    Creator work areas and save the job objects of the job group to its
+    job store
     """
     createWorkArea  = CreateWorkArea()
+    jobStore        = None
 
     try:
         wmbsJobGroup = work.get('jobGroup')
@@ -185,6 +193,11 @@ def creatorProcess(work, jobCacheDir):
                                    wmWorkload = wmWorkload,
                                    cache = False)
 
+        if len(wmbsJobGroup.jobs) > 0:
+            storePath = getJobStorePath(wmbsJobGroup.jobs[0]['cache_dir'],
+                                        wmbsJobGroup.id)
+            jobStore = JobPackageStore(storePath)
+
         for job in wmbsJobGroup.jobs:
             jobNumber += 1
             saveJob(job = job, workflow = workflow,
@@ -198,8 +211,11 @@ def creatorProcess(work, jobCacheDir):
                     scramArch = scramArch,
                     swVersion = swVersion,
                     agentNumber = agentNumber,
-                    numberOfCores = numberOfCores)
+                    numberOfCores = numberOfCores,
+                    jobStore = jobStore)
 
+        if jobStore != None:
+            jobStore.close()
     except Exception as ex:
         # Register as failure; move on
         msg =  "Exception in processing wmbsJobGroup %i\n" % wmbsJobGroup.id
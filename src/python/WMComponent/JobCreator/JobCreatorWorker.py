@@ -53,6 +53,7 @@ from WMCore.JobStateMachine.ChangeState                 import ChangeState
 from WMComponent.JobCreator.CreateWorkArea              import CreateWorkArea
 
 from WMCore.Agent.Configuration import Configuration
+from WMCore.DataStructs.JobPackageStore import JobPackageStore, getJobStorePath
 
 
 #pylint: disable=C0103
@@ -328,10 +329,18 @@ class JobCreatorWorker:
                                                     conn = myThread.transaction.conn)
 
 
-                    for job in wmbsJobGroup.jobs:
-                        jobNumber += 1
-                        self.saveJob(job = job, workflow = workflow,
-                                     wmTask = wmTask, jobNumber = jobNumber)
+                    if len(wmbsJobGroup.jobs) > 0:
+                        storePath = getJobStorePath(wmbsJobGroup.jobs[0]['cache_dir'],
+                                                    wmbsJobGroup.id)
+                        jobStore = JobPackageStore(storePath)
+                        try:
+                            for job in wmbsJobGroup.jobs:
+                                jobNumber += 1
+                                self.saveJob(job = job, workflow = workflow,
+                                             wmTask = wmTask, jobNumber = jobNumber,
+                                             jobStore = jobStore)
+                        finally:
+                            jobStore.close()
 
 
                     self.advanceJobGroup(wmbsJobGroup)
@@ -368,11 +377,12 @@ class JobCreatorWorker:
         return parameters
 
 
-    def saveJob(self, job, workflow, wmTask = None, jobNumber = 0):
+    def saveJob(self, job, workflow, wmTask = None, jobNumber = 0, jobStore = None):
         """
         _saveJob_
 
-        Actually do the mechanics of saving the job to a pickle file
+        Actually do the mechanics of saving the job, either to the job store of
+        its job group or to a pickle file in its cache directory.
         """
         priority = None
 
@@ -389,6 +399,10 @@ class JobCreatorWorker:
         job['counter']  = jobNumber
         cacheDir = job.getCache()
         job['cache_dir'] = cacheDir
+        if jobStore != None:
+            jobStore.append(job['id'], job)
+            return
+
         output = open(os.path.join(cacheDir, 'job.pkl'), 'w')
         cPickle.dump(job, output, cPickle.HIGHEST_PROTOCOL)
         output.flush()
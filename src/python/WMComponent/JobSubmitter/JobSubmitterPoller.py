@@ -10,6 +10,8 @@ _JobSubmitterPoller_t_
 Submit jobs for execution.
 """
 
+import time
+import heapq
 import random
 import logging
 import threading
@@ -24,6 +26,7 @@ from WMCore.JobStateMachine.ChangeState       import ChangeState
 from WMCore.WorkerThreads.BaseWorkerThread    import BaseWorkerThread
 from WMCore.ResourceControl.ResourceControl   import ResourceControl
 from WMCore.DataStructs.JobPackage            import JobPackage
+from WMCore.DataStructs.JobPackageStore       import JobPackageStore, getJobStorePath
 from WMCore.FwkJobReport.Report               import Report
 from WMCore.WMException                       import WMException
 from WMCore.BossAir.BossAirAPI                import BossAirAPI
@@ -54,6 +57,61 @@ class JobSubmitterPollerException(WMException):
     pass
 
 
+class WorkflowQueue(object):
+    """
+    _WorkflowQueue_
+
+    Priority queue of the workflows with jobs for a site and task type.
+    Entries are (-priority, timestamp, workflow) tuples, only the last entry
+    pushed for a workflow is valid.  Entries replaced by a newer push or
+    dropped with remove() stay in the heap and are skipped when they reach
+    the top.
+    """
+    def __init__(self, entries = None):
+        self.entries = {}
+        for entry in entries or []:
+            self.entries[entry[2]] = entry
+        self.heap = self.entries.values()
+        heapq.heapify(self.heap)
+        return
+
+    def push(self, entry):
+        """
+        _push_
+
+        Add a workflow to the queue or replace its entry.
+        """
+        self.entries[entry[2]] = entry
+        heapq.heappush(self.heap, entry)
+        return
+
+    def remove(self, workflow):
+        """
+        _remove_
+
+        Drop a workflow from the queue.
+        """
+        self.entries.pop(workflow, None)
+        return
+
+    def top(self):
+        """
+        _top_
+
+        Return the workflow with the highest priority, None if the queue is
+        empty.
+        """
+        while len(self.heap) > 0:
+            entry = self.heap[0]
+            if self.entries.get(entry[2]) is entry:
+                return entry[2]
+            heapq.heappop(self.heap)
+        return None
+
+    def __len__(self):
+        return len(self.entries)
+
+
 class JobSubmitterPoller(BaseWorkerThread):
     """
     _JobSubmitterPoller_
@@ -86,6 +144,7 @@ class JobSubmitterPoller(BaseWorkerThread):
         self.workflowPrios      = {}
         self.cachedJobIDs       = set()
         self.cachedJobs         = {}
+        self.workflowQueues     = {}
         self.jobDataCache       = {}
         self.jobsToPackage      = {}
         self.sandboxPackage     = {}
@@ -99,6 +158,16 @@ class JobSubmitterPoller(BaseWorkerThread):
         self.collSize           = getattr(self.config.JobSubmitter, 'collectionSize',
                                           self.packageSize * 1000)
 
+        # Incremental cache refresh: only jobs that changed state since the
+        # last refresh (minus an overlap to cover clock skew and slow
+        # transactions) are queried, with a full refresh every
+        # fullRefreshInterval seconds.
+        self.incrementalRefresh  = getattr(self.config.JobSubmitter, 'incrementalRefresh', False)
+        self.fullRefreshInterval = getattr(self.config.JobSubmitter, 'fullRefreshInterval', 3600)
+        self.refreshOverlap      = getattr(self.config.JobSubmitter, 'refreshOverlap', 300)
+        self.lastRefreshTime     = None
+        self.lastFullRefreshTime = None
+
         # initialize the alert framework (if available)
         self.initAlerts(compName = "JobSubmitter")
 
@@ -124,6 +193,7 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         # Now the DAOs
         self.listJobsAction = self.daoFactory(classname = "Jobs.ListForSubmitter")
+        self.listLeftStateAction = self.daoFactory(classname = "Jobs.ListLeftStateSince")
         self.setLocationAction = self.daoFactory(classname = "Jobs.SetLocation")
         self.locationAction = self.daoFactory(classname = "Locations.GetSiteInfo")
         self.setFWJRPathAction = self.daoFactory(classname = "Jobs.SetFWJRPath")
@@ -203,11 +273,28 @@ class JobSubmitterPoller(BaseWorkerThread):
                 os.makedirs(batchDir)
 
             batchPath = os.path.join(batchDir, "JobPackage.pkl")
-            jobPackage.save(batchPath)
+            self.saveJobPackage(jobPackage, batchPath)
             del self.jobsToPackage[loadedJob["workflow"]]
 
         return batchDir
 
+    def saveJobPackage(self, jobPackage, batchPath):
+        """
+        _saveJobPackage_
+
+        Write a job package out as a job store so that the job on the worker
+        node only has to load its own record.
+        """
+        if os.path.exists(batchPath):
+            os.remove(batchPath)
+
+        jobStore = JobPackageStore(batchPath, writeIndex = False)
+        for jobID in jobPackage.keys():
+            if jobID != 'directory':
+                jobStore.append(jobID, jobPackage[jobID])
+        jobStore.close()
+        return
+
     def flushJobPackages(self):
         """
         _flushJobPackages_
@@ -225,7 +312,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                 os.makedirs(batchDir)
 
             batchPath = os.path.join(batchDir, "JobPackage.pkl")
-            jobPackage.save(batchPath)
+            self.saveJobPackage(jobPackage, batchPath)
             del self.jobsToPackage[workflowName]
 
         return
@@ -239,6 +326,12 @@ class JobSubmitterPoller(BaseWorkerThread):
         don't, unpickle them and combine their site white and black list with
         the list of locations they can run at.  Add them to the cache.
 
+        In incremental mode only the jobs that entered the 'created' state
+        since the last refresh are queried and the jobs that left it since
+        then are evicted from the cache.  A full refresh is still done the
+        first time, after the cache is reset and every fullRefreshInterval
+        seconds.
+
         Each entry in the cache is a tuple with five items:
           - WMBS Job ID
           - Retry count
@@ -248,16 +341,35 @@ class JobSubmitterPoller(BaseWorkerThread):
         """
         badJobs = dict([(x, []) for x in range(61101,61105)])
         dbJobs = set()
+        jobStores = {}
 
         logging.info("Refreshing priority cache...")
         workflows = self.listWorkflows.execute()
         workflows = filter(lambda x: x['name'] in self.workflowPrios, workflows)
+        prioritiesChanged = False
         for workflow in workflows:
+            if self.workflowPrios[workflow['name']] != workflow['priority']:
+                prioritiesChanged = True
             self.workflowPrios[workflow['name']] = workflow['priority']
-
-        logging.info("Querying WMBS for jobs to be submitted...")
-        newJobs = self.listJobsAction.execute()
+        if prioritiesChanged:
+            self.rebuildWorkflowQueues()
+
+        refreshTime = int(time.time())
+        fullRefresh = (not self.incrementalRefresh or self.lastRefreshTime == None or
+                       refreshTime - self.lastFullRefreshTime >= self.fullRefreshInterval)
+        if fullRefresh:
+            logging.info("Querying WMBS for jobs to be submitted...")
+            newJobs = self.listJobsAction.execute()
+        else:
+            minStateTime = self.lastRefreshTime - self.refreshOverlap
+            logging.info("Querying WMBS for jobs created since %d..." % minStateTime)
+            newJobs = self.listJobsAction.execute(minStateTime = minStateTime)
+            leftJobs = self.listLeftStateAction.execute(state = "created",
+                                                        stateTime = minStateTime)
         logging.info("Found %s new jobs to be submitted." % len(newJobs))
+        # Go through the jobs one job group at a time so every job store is
+        # opened once
+        newJobs.sort(key = lambda x: x['jobgroup'])
 
         logging.info("Determining possible sites for new jobs...")
         jobCount = 0
@@ -271,23 +383,10 @@ class JobSubmitterPoller(BaseWorkerThread):
             if jobCount % 5000 == 0:
                 logging.info("Processed %d/%d new jobs." % (jobCount, len(newJobs)))
 
-            pickledJobPath = os.path.join(newJob["cache_dir"], "job.pkl")
-
-            if not os.path.isfile(pickledJobPath):
-                # Then we have a problem - there's no file
-                logging.error("Could not find pickled jobObject %s" % pickledJobPath)
+            loadedJob = self.loadJob(newJob, jobStores)
+            if loadedJob == None:
                 badJobs[61103].append(newJob)
                 continue
-            try:
-                jobHandle = open(pickledJobPath, "r")
-                loadedJob = cPickle.load(jobHandle)
-                jobHandle.close()
-            except Exception as ex:
-                msg =  "Error while loading pickled job object %s\n" % pickledJobPath
-                msg += str(ex)
-                logging.error(msg)
-                self.sendAlert(6, msg = msg)
-                raise JobSubmitterPollerException(msg)
 
             loadedJob['retry_count'] = newJob['retry_count']
 
@@ -369,26 +468,10 @@ class JobSubmitterPoller(BaseWorkerThread):
             batchDir = self.addJobsToPackage(loadedJob)
             self.cachedJobIDs.add(jobID)
 
+            workflowName = newJob['workflow']
             for possibleLocation in possibleLocations:
-                if possibleLocation not in self.cachedJobs:
-                    self.cachedJobs[possibleLocation] = {}
-                if newJob["type"] not in self.cachedJobs[possibleLocation]:
-                    self.cachedJobs[possibleLocation][newJob["type"]] = {}
-
-                locTypeCache = self.cachedJobs[possibleLocation][newJob["type"]]
-                workflowName = newJob['workflow']
-                timestamp    = newJob['timestamp']
-                prio         = newJob['task_priority']
-                if workflowName not in locTypeCache:
-                    locTypeCache[workflowName] = set()
-                if workflowName not in self.jobDataCache:
-                    self.jobDataCache[workflowName] = {}
-                if not workflowName in self.workflowTimestamps:
-                    self.workflowTimestamps[workflowName] = timestamp
-                if workflowName not in self.workflowPrios:
-                    self.workflowPrios[workflowName] = prio
-
-                locTypeCache[workflowName].add(jobID)
+                self.cacheJobForSite(possibleLocation, newJob["type"], workflowName,
+                                     jobID, newJob['timestamp'], newJob['task_priority'])
 
             # allow job baggage to override numberOfCores
             #       => used for repacking to get more slots/disk
@@ -424,6 +507,9 @@ class JobSubmitterPoller(BaseWorkerThread):
 
             self.jobDataCache[workflowName][jobID] = jobInfo
 
+        for jobStore in jobStores.values():
+            jobStore.close()
+
         # Register failures in submission
         for errorCode in badJobs:
             if badJobs[errorCode]:
@@ -435,26 +521,137 @@ class JobSubmitterPoller(BaseWorkerThread):
         logging.info("Done with refreshCache() loop, pruning killed jobs.")
 
         # We need to remove any jobs from the cache that were not returned in
-        # the last call to the database.
-        jobIDsToPurge = self.cachedJobIDs - dbJobs
-        self.cachedJobIDs -= jobIDsToPurge
+        # the last call to the database, or that left the created state
+        # since the last refresh.
+        if fullRefresh:
+            jobIDsToPurge = self.cachedJobIDs - dbJobs
+            self.lastFullRefreshTime = refreshTime
+        else:
+            jobIDsToPurge = (self.cachedJobIDs & set(leftJobs)) - dbJobs
+        self.lastRefreshTime = refreshTime
+        self.purgeJobs(jobIDsToPurge)
 
+        logging.info("Done pruning killed jobs, moving on to submit.")
+        return
+
+    def loadJob(self, newJob, jobStores):
+        """
+        _loadJob_
+
+        Load a job from the job store of its job group, falling back to the
+        job.pkl file in its cache directory for jobs created before job
+        stores were used.  The store of the current job group is kept open
+        in the jobStores dictionary keyed by path, it's closed when a job of
+        another group comes along.  Returns None if the job can't be found.
+        """
+        storePath = getJobStorePath(newJob["cache_dir"], newJob["jobgroup"])
+        pickledJobPath = os.path.join(newJob["cache_dir"], "job.pkl")
+        try:
+            if storePath not in jobStores and os.path.isfile(storePath):
+                for jobStore in jobStores.values():
+                    jobStore.close()
+                jobStores.clear()
+                jobStores[storePath] = JobPackageStore(storePath)
+            if storePath in jobStores and newJob["id"] in jobStores[storePath]:
+                return jobStores[storePath][newJob["id"]]
+
+            if not os.path.isfile(pickledJobPath):
+                # Then we have a problem - there's no file
+                logging.error("Could not find job %i in %s or %s" % (newJob["id"], storePath,
+                                                                      pickledJobPath))
+                return None
+
+            jobHandle = open(pickledJobPath, "r")
+            loadedJob = cPickle.load(jobHandle)
+            jobHandle.close()
+        except Exception as ex:
+            msg =  "Error while loading job object %i\n" % newJob["id"]
+            msg += str(ex)
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            raise JobSubmitterPollerException(msg)
+
+        return loadedJob
+
+    def purgeJobs(self, jobIDsToPurge):
+        """
+        _purgeJobs_
+
+        Remove jobs from the cache.  Workflows left without jobs are dropped
+        from the cache and from the priority queues.
+        """
         if len(jobIDsToPurge) == 0:
             return
 
+        self.cachedJobIDs -= jobIDsToPurge
         for siteName in self.cachedJobs.keys():
             for taskType in self.cachedJobs[siteName].keys():
-                for workflow in self.cachedJobs[siteName][taskType].keys():
-                    for cachedJobID in list(self.cachedJobs[siteName][taskType][workflow]):
-                        if cachedJobID in jobIDsToPurge:
-                            self.cachedJobs[siteName][taskType][workflow].remove(cachedJobID)
-                            try:
-                                del self.jobDataCache[workflow][cachedJobID]
-                            except KeyError:
-                                # Already gone
-                                pass
+                taskCache = self.cachedJobs[siteName][taskType]
+                for workflow in taskCache.keys():
+                    taskCache[workflow] -= jobIDsToPurge
+                    if len(taskCache[workflow]) == 0:
+                        del taskCache[workflow]
+                        self.workflowQueues[siteName][taskType].remove(workflow)
+        for workflow in self.jobDataCache.keys():
+            workflowCache = self.jobDataCache[workflow]
+            for jobID in jobIDsToPurge.intersection(workflowCache):
+                del workflowCache[jobID]
+        return
 
-        logging.info("Done pruning killed jobs, moving on to submit.")
+    def cacheJobForSite(self, siteName, taskType, workflowName, jobID, timestamp, prio):
+        """
+        _cacheJobForSite_
+
+        Add a job ID to the cache of jobs that can run at a site for the
+        given task type.  The first time a workflow shows up for a site and
+        task type it is also pushed onto the priority queue for them.
+        """
+        if siteName not in self.cachedJobs:
+            self.cachedJobs[siteName] = {}
+            self.workflowQueues[siteName] = {}
+        if taskType not in self.cachedJobs[siteName]:
+            self.cachedJobs[siteName][taskType] = {}
+            self.workflowQueues[siteName][taskType] = WorkflowQueue()
+
+        locTypeCache = self.cachedJobs[siteName][taskType]
+        if workflowName not in self.jobDataCache:
+            self.jobDataCache[workflowName] = {}
+        if not workflowName in self.workflowTimestamps:
+            self.workflowTimestamps[workflowName] = timestamp
+        if workflowName not in self.workflowPrios:
+            self.workflowPrios[workflowName] = prio
+        if workflowName not in locTypeCache:
+            locTypeCache[workflowName] = set()
+            self.workflowQueues[siteName][taskType].push(self.workflowQueueEntry(workflowName))
+
+        locTypeCache[workflowName].add(jobID)
+        return
+
+    def workflowQueueEntry(self, workflowName):
+        """
+        _workflowQueueEntry_
+
+        Entry for a workflow in the site/task type priority queues.  Higher
+        priorities go first, for the same priority the oldest workflow goes
+        first.
+        """
+        return (-self.workflowPrios[workflowName],
+                self.workflowTimestamps[workflowName],
+                workflowName)
+
+    def rebuildWorkflowQueues(self):
+        """
+        _rebuildWorkflowQueues_
+
+        Rebuild all the site/task type priority queues from the cache, this
+        needs to be done when workflow priorities change.
+        """
+        self.workflowQueues = {}
+        for siteName in self.cachedJobs.keys():
+            self.workflowQueues[siteName] = {}
+            for taskType in self.cachedJobs[siteName].keys():
+                entries = [self.workflowQueueEntry(x) for x in self.cachedJobs[siteName][taskType].keys()]
+                self.workflowQueues[siteName][taskType] = WorkflowQueue(entries)
         return
 
     def _handleSubmitFailedJobs(self, badJobs, exitCode):
@@ -525,7 +722,9 @@ class JobSubmitterPoller(BaseWorkerThread):
             logging.info("Draining or Aborted sites have changed, the cache will be rebuilt.")
             self.cachedJobIDs       = set()
             self.cachedJobs         = {}
+            self.workflowQueues     = {}
             self.jobDataCache       = {}
+            self.lastRefreshTime    = None
 
         #Sort the sites using the following criteria:
         #T1 sites go first, then T2, then T3
@@ -623,6 +822,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                     continue
 
                 taskCache = self.cachedJobs[siteName][taskType]
+                workflowQueue = self.workflowQueues[siteName][taskType]
 
                 # Calculate number of jobs we need
                 nJobsRequired = min(totalPendingSlots - totalPending, taskPendingSlots - taskPending)
@@ -634,25 +834,18 @@ class JobSubmitterPoller(BaseWorkerThread):
 
                     # Pull a job out of the cache for the task/site.  Verify that we
                     # haven't already used this job in this polling cycle.
+                    # Workflows are taken from the priority queue, sorted by
+                    # prio and timestamp on the subscription.
                     cachedJob = None
                     cachedJobWorkflow = None
 
-                    workflows = taskCache.keys()
-                    # Sorting by prio and timestamp on the subscription
-                    def sortingCmp(x, y):
-                        if (x not in self.workflowTimestamps) or (y not in self.workflowTimestamps):
-                            return -1
-                        if (x not in self.workflowPrios) or (y not in self.workflowPrios):
-                            return -1
-                        if self.workflowPrios[x] > self.workflowPrios[y]:
-                            return -1
-                        elif self.workflowPrios[x] == self.workflowPrios[y]:
-                            return cmp(self.workflowTimestamps[x], self.workflowTimestamps[y])
-                        else:
-                            return 1
-                    workflows.sort(cmp = sortingCmp)
-
-                    for workflow in workflows:
+                    while len(workflowQueue) > 0:
+                        workflow = workflowQueue.top()
+                        if workflow not in taskCache:
+                            # Workflow was already removed from the cache
+                            workflowQueue.remove(workflow)
+                            continue
+
                         # Run a while loop until you get a job
                         while len(taskCache[workflow]) > 0:
                             cachedJobID = taskCache[workflow].pop()
@@ -669,8 +862,9 @@ class JobSubmitterPoller(BaseWorkerThread):
                                 cachedJob = None
 
                         # Remove the entry in the cache for the workflow if it is empty.
-                        if len(self.cachedJobs[siteName][taskType][workflow]) == 0:
-                            del self.cachedJobs[siteName][taskType][workflow]
+                        if len(taskCache[workflow]) == 0:
+                            del taskCache[workflow]
+                            workflowQueue.remove(workflow)
                         if workflow in self.jobDataCache and len(self.jobDataCache[workflow].keys()) == 0:
                             del self.jobDataCache[workflow]
 
@@ -681,9 +875,11 @@ class JobSubmitterPoller(BaseWorkerThread):
                     # Check to see if we need to delete this site from the cache
                     if len(self.cachedJobs[siteName][taskType].keys()) == 0:
                         del self.cachedJobs[siteName][taskType]
+                        del self.workflowQueues[siteName][taskType]
                         breakLoop = True
                     if len(self.cachedJobs[siteName].keys()) == 0:
                         del self.cachedJobs[siteName]
+                        del self.workflowQueues[siteName]
                         breakLoop = True
 
                     if not cachedJob:
@@ -731,7 +927,7 @@ class JobSubmitterPoller(BaseWorkerThread):
                                'estimatedJobTime' : cachedJob[14],
                                'estimatedDiskUsage' : cachedJob[15],
                                'estimatedMemoryUsage' : cachedJob[16],
-                               'taskPriority' : self.workflowPrios[workflow],
+                               'taskPriority' : self.workflowPrios[cachedJobWorkflow],
                                'taskName' : cachedJob[17],
                                'numberOfCores' : cachedJob[19],
                                'taskID' : cachedJob[20],
@@ -39,6 +39,7 @@ class CleanCouchPoller(BaseWorkerThread):
         # set the connection for local couchDB call
         self.useReqMgrForCompletionCheck   = getattr(self.config.TaskArchiver, 'useReqMgrForCompletionCheck', True)
         self.archiveDelayHours   = getattr(self.config.TaskArchiver, 'archiveDelayHours', 0)
+        self.deletePageSize = getattr(self.config.TaskArchiver, 'deletePageSize', 500)
         self.wmstatsCouchDB = WMStatsWriter(self.config.TaskArchiver.localWMStatsURL, 
                                             "WMStatsAgent")
         
@@ -147,20 +148,26 @@ class CleanCouchPoller(BaseWorkerThread):
             except CouchNotFoundError as ex:
                 return {'status': 'warning', 'message': "%s: %s" % (workflowName, str(ex))}
         else:
+            # Page through the view deleting one page at a time, the couch
+            # queue is kept below its size so each commit result is kept
             options = {"startkey": [workflowName], "endkey": [workflowName, {}], "reduce": False}
+            committed = []
+            queued = 0
             try:
-                jobs = couchDB.loadView(db, view, options = options)['rows']
+                for j in couchDB.iterView(db, view, options = options, pageSize = self.deletePageSize):
+                    doc = {}
+                    doc["_id"]  = j['value']['id']
+                    doc["_rev"] = j['value']['rev']
+                    couchDB.queueDelete(doc)
+                    queued += 1
+                    if queued == self.deletePageSize:
+                        committed.extend(couchDB.commit())
+                        queued = 0
             except Exception as ex:
-                errorMsg = "Error on loading jobs for %s" % workflowName
+                errorMsg = "Error on deleting jobs for %s" % workflowName
                 logging.warning("%s/n%s" % (str(ex), errorMsg))
                 return {'status': 'error', 'message': errorMsg}
-            
-            for j in jobs:
-                doc = {}
-                doc["_id"]  = j['value']['id']
-                doc["_rev"] = j['value']['rev']
-                couchDB.queueDelete(doc)
-            committed = couchDB.commit()
+            committed.extend(couchDB.commit() or [])
         
         if committed:
             #create the error report
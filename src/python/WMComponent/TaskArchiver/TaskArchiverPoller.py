@@ -624,18 +624,18 @@ class TaskArchiverPoller(BaseWorkerThread):
         # Get a list of failed job IDs
         # Make sure you get it for ALL tasks in the spec
         for taskName in spec.listAllTaskPathNames():
-            failedTmp = self.jobsdatabase.loadView("JobDump", "failedJobsByWorkflowName",
+            failedTmp = self.jobsdatabase.iterView("JobDump", "failedJobsByWorkflowName",
                                                    options = {"startkey": [workflowName, taskName],
                                                               "endkey": [workflowName, taskName],
-                                                              "stale" : "update_after"})['rows']
+                                                              "stale" : "update_after"})
             for entry in failedTmp:
                 failedJobs.append(entry['value'])
 
-        retryData = self.jobsdatabase.loadView("JobDump", "retriesByTask",
+        retryData = self.jobsdatabase.iterView("JobDump", "retriesByTask",
                                                options = {'group_level': 3,
                                                           'startkey': [workflowName],
                                                           'endkey': [workflowName, {}],
-                                                          "stale" : "update_after"})['rows']
+                                                          "stale" : "update_after"})
         for row in retryData:
             taskName = row['key'][2]
             count    = str(row['key'][1])
@@ -837,12 +837,11 @@ class TaskArchiverPoller(BaseWorkerThread):
 
         The couch performance stuff is convoluted enough I think I want to handle it separately.
         """
-        perf = self.fwjrdatabase.loadView("FWJRDump", "performanceByWorkflowName",
+        failedJobs = self.getFailedJobs(workflowName)
+        perf = self.fwjrdatabase.iterView("FWJRDump", "performanceByWorkflowName",
                                           options = {"startkey": [workflowName],
                                                      "endkey": [workflowName],
-                                                     "stale" : "update_after"})['rows']
-                                                     
-        failedJobs = self.getFailedJobs(workflowName)
+                                                     "stale" : "update_after"})
 
         taskList   = {}
         finalTask  = {}
@@ -962,15 +961,13 @@ class TaskArchiverPoller(BaseWorkerThread):
 
     def getFailedJobs(self, workflowName):
         # We want ALL the jobs, and I'm sorry, CouchDB doesn't support wildcards, above-than-absurd values will do:
-        errorView = self.fwjrdatabase.loadView("FWJRDump", "errorsByWorkflowName",
+        errorView = self.fwjrdatabase.iterView("FWJRDump", "errorsByWorkflowName",
                                           options = {"startkey": [workflowName, 0, 0],
                                                      "endkey": [workflowName, 999999999, 999999],
-                                                     "stale" : "update_after"})['rows']
-        failedJobs = []
+                                                     "stale" : "update_after"})
+        failedJobs = set()
         for row in errorView:
-            jobId = row['value']['jobid']
-            if jobId not in failedJobs:
-                failedJobs.append(jobId)
+            failedJobs.add(row['value']['jobid'])
                 
         return failedJobs
 
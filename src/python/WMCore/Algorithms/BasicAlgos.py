@@ -7,49 +7,105 @@ Python implementations of basic Linux functionality
 
 """
 
+import multiprocessing
 import os
 import stat
+import struct
 import time
 import zlib
-import subprocess
 
-def calculateChecksums(filename):
+# Read buffer for the checksums, large reads keep the per-call overhead of
+# zlib negligible on multi-GB files
+CHECKSUM_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Bit-reversal of every byte value, see calculateChecksums()
+_REVERSED_BYTES = "".join([chr(int("{0:08b}".format(x)[::-1], 2)) for x in range(256)])
+
+
+def _reverse32(value):
+    """
+    _reverse32_
+
+    Reverse the bits of a 32 bit integer.
+    """
+    return struct.unpack("<I", struct.pack(">I", value).translate(_REVERSED_BYTES))[0]
+
+
+def _crc32Update(register, data):
+    """
+    _crc32Update_
+
+    Feed data to the bit-reversed register of a POSIX cksum CRC.
+    """
+    data = data.translate(_REVERSED_BYTES)
+    return (zlib.crc32(data, register ^ 0xffffffff) ^ 0xffffffff) & 0xffffffff
+
+
+def calculateChecksums(filename, bufferSize = CHECKSUM_BUFFER_SIZE):
     """
     _calculateChecksums_
 
     Get the adler32 and crc32 checksums of a file. Return None on error
 
-    Process line by line and adjust for known signed vs. unsigned issues
+    Process chunk by chunk and adjust for known signed vs. unsigned issues
       http://docs.python.org/library/zlib.html
 
     The cksum UNIX command line tool implements a CRC32 checksum that is
-    different than any of the python algorithms, therefore open cksum
-    in a subprocess and feed it the same chunks of data that are used
-    to calculate the adler32 checksum.
+    different than any of the python algorithms: it uses the same polynomial
+    as zlib.crc32 but without reflecting the bits, no initial inversion and
+    the length of the data appended to it.  Feeding zlib.crc32 the data with
+    the bits of every byte reversed runs the same register bit-reversed, so
+    both checksums are calculated in a single pass over the file.
 
     """
     adler32Checksum = 1 # adler32 of an empty string
-    cksumProcess = subprocess.Popen("cksum", stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+    crcRegister = 0
+    filesize = 0
 
-    # the lambda basically creates an iterator function with zero
-    # arguments that steps through the file in 4096 byte chunks
     with open(filename, 'rb') as f:
-        for chunk in iter((lambda:f.read(4096)),''):
+        for chunk in iter((lambda:f.read(bufferSize)),''):
             adler32Checksum = zlib.adler32(chunk, adler32Checksum)
-            cksumProcess.stdin.write(chunk)
+            crcRegister = _crc32Update(crcRegister, chunk)
+            filesize += len(chunk)
 
-    cksumProcess.stdin.close()
-    cksumProcess.wait()
+    # consistency check on the amount of data read
+    if filesize != os.stat(filename)[stat.ST_SIZE]:
+        raise RuntimeError("Something went wrong with the cksum calculation !")
 
-    cksumStdout = cksumProcess.stdout.read().split()
-    cksumProcess.stdout.close()
+    # cksum appends the length, least significant byte first
+    length = []
+    remainder = filesize
+    while remainder:
+        length.append(chr(remainder & 0xff))
+        remainder >>= 8
+    crcRegister = _crc32Update(crcRegister, "".join(length))
+    cksum = ~_reverse32(crcRegister) & 0xffffffff
 
-    # consistency check on the cksum output
-    filesize = os.stat(filename)[stat.ST_SIZE]
-    if len(cksumStdout) != 2 or int(cksumStdout[1]) != filesize:
-        raise RuntimeError("Something went wrong with the cksum calculation !")
+    return ("%x" % (adler32Checksum & 0xffffffff), "%s" % cksum)
 
-    return ("%x" % (adler32Checksum & 0xffffffff), "%s" % cksumStdout[0])
+
+def calculateChecksumsForFiles(filenames, processes = None):
+    """
+    _calculateChecksumsForFiles_
+
+    Calculate the checksums of several files at once in a pool of processes,
+    by default one per CPU.  Returns a dictionary of (adler32, cksum) tuples
+    keyed by file name.
+    """
+    filenames = list(filenames)
+    if processes == None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(filenames))
+    if processes < 2:
+        return dict([(x, calculateChecksums(x)) for x in filenames])
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        checksums = pool.map(calculateChecksums, filenames, 1)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(filenames, checksums))
 
 
 def tail(filename, nLines = 20):
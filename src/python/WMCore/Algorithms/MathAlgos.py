@@ -280,3 +280,16 @@ def calculateStdDevFromQ(Q, n):
     if not validateNumericInput(sigma): return 0.0
 
     return sigma
+
+def getPercentile(numList, percent):
+    """
+    _getPercentile_
+
+    Return the value below which percent percent of the list falls, using
+    the nearest rank.  Returns None for an empty list.
+    """
+    if not numList:
+        return None
+    sortedList = sorted(numList)
+    rank = int(math.ceil(percent / 100.0 * len(sortedList)))
+    return sortedList[max(rank, 1) - 1]
@@ -3,13 +3,39 @@ A basic action is a thing that will run a SQL statement
 
 A more complex one would be something that ran multiple SQL
 objects to produce a single output.
+
+The dialect of each engine and the DAO classes that have been imported are
+cached process wide, so creating a DAO is a couple of dictionary lookups
+after the first time.  Use DAOFactory.cacheStats() to see the hit and miss
+counts for the class cache.
 """
+
+import threading
+import weakref
+
 class DAOFactory(object):
-    def __init__(self, package='WMCore', logger=None, dbinterface=None, owner=""):
+    # Process wide caches shared by all the factories:
+    #   engine -> dialect name
+    #   (package, dialect, classname) -> DAO class
+    #   (package, dialect, classname, logger, dbinterface, owner) -> DAO
+    _dialectCache = weakref.WeakKeyDictionary()
+    _classCache = {}
+    _instanceCache = {}
+    _cacheStats = {"hits": 0, "misses": 0, "instanceHits": 0}
+    _cacheLock = threading.Lock()
+
+    def __init__(self, package='WMCore', logger=None, dbinterface=None, owner="",
+                 cacheInstances=False):
+        """
+        Set cacheInstances to True to get back the same DAO object every time
+        the same class is requested with the same logger, dbinterface and
+        owner.  Only do this for DAOs that don't keep any state between calls.
+        """
         self.package = package
         self.logger = logger
         self.dbinterface = dbinterface
         self.owner = owner
+        self.cacheInstances = cacheInstances
         #self.logger.debug("Instantiating DAOFactory for %s package" % self.package)
         from WMCore.Database.Dialects import MySQLDialect
         from WMCore.Database.Dialects import SQLiteDialect
@@ -18,29 +44,131 @@ class DAOFactory(object):
                     "MySQL" : MySQLDialect,
                     "SQLite" : SQLiteDialect}
 
-    def __call__(self, classname):
+    @classmethod
+    def cacheStats(cls):
         """
-        Somewhat fugly method to load generic SQL classes...
+        _cacheStats_
+
+        Return the number of DAO class lookups that were served from the
+        cache (hits) and that had to import the module (misses), the number
+        of DAO objects served from the instance cache and the sizes of the
+        caches.
         """
-        if not isinstance(self.dbinterface, str):
+        cls._cacheLock.acquire()
+        try:
+            stats = dict(cls._cacheStats)
+            stats["classes"] = len(cls._classCache)
+            stats["instances"] = len(cls._instanceCache)
+            stats["engines"] = len(cls._dialectCache)
+        finally:
+            cls._cacheLock.release()
+        return stats
 
-            dia = self.dbinterface.engine.dialect
-            #TODO: Make good
-            dialect = None
-            for i in self.dialects.keys():
-                if isinstance(dia, self.dialects[i]):
-                    dialect = i
-            if not dialect:
-                raise TypeError, "unknown connection type: %s" % dia
-        else:
-            dialect = 'CouchDB'
+    @classmethod
+    def clearCache(cls):
+        """
+        _clearCache_
+
+        Empty the process wide caches and reset the counters.
+        """
+        cls._cacheLock.acquire()
+        try:
+            cls._dialectCache.clear()
+            cls._classCache.clear()
+            cls._instanceCache.clear()
+            for key in cls._cacheStats.keys():
+                cls._cacheStats[key] = 0
+        finally:
+            cls._cacheLock.release()
+        return
+
+    def getDialect(self):
+        """
+        _getDialect_
+
+        Figure out which dialect the dbinterface's engine uses, this is only
+        done once per engine.
+        """
+        if isinstance(self.dbinterface, str):
+            return 'CouchDB'
+
+        engine = self.dbinterface.engine
+        dialect = self._dialectCache.get(engine, None)
+        if dialect:
+            return dialect
+
+        dia = engine.dialect
+        for i in self.dialects.keys():
+            if isinstance(dia, self.dialects[i]):
+                dialect = i
+        if not dialect:
+            raise TypeError, "unknown connection type: %s" % dia
+
+        self._cacheLock.acquire()
+        try:
+            self._dialectCache[engine] = dialect
+        finally:
+            self._cacheLock.release()
+        return dialect
 
+    def getClass(self, dialect, classname):
+        """
+        _getClass_
+
+        Return the DAO class for the given dialect, importing the module the
+        first time it is requested.
+        """
+        key = (self.package, dialect, classname)
+        self._cacheLock.acquire()
+        try:
+            daoClass = self._classCache.get(key, None)
+            if daoClass != None:
+                self._cacheStats["hits"] += 1
+                return daoClass
+            self._cacheStats["misses"] += 1
+        finally:
+            self._cacheLock.release()
 
         module = "%s.%s.%s" % (self.package, dialect, classname)
         #self.logger.debug("importing %s, %s" % (module, classname))
         module = __import__(module, globals(), locals(), [classname])#, -1)
-        instance = getattr(module, classname.split('.')[-1])
+        daoClass = getattr(module, classname.split('.')[-1])
+
+        self._cacheLock.acquire()
+        try:
+            self._classCache[key] = daoClass
+        finally:
+            self._cacheLock.release()
+        return daoClass
+
+    def __call__(self, classname):
+        """
+        Somewhat fugly method to load generic SQL classes...
+        """
+        dialect = self.getDialect()
+
+        if self.cacheInstances:
+            key = (self.package, dialect, classname, self.logger,
+                   self.dbinterface, self.owner)
+            self._cacheLock.acquire()
+            try:
+                dao = self._instanceCache.get(key, None)
+                if dao != None:
+                    self._cacheStats["instanceHits"] += 1
+                    return dao
+            finally:
+                self._cacheLock.release()
+
+        instance = self.getClass(dialect, classname)
         if self.owner:
-            return instance(self.logger, self.dbinterface, self.owner)
+            dao = instance(self.logger, self.dbinterface, self.owner)
         else:
-            return instance(self.logger, self.dbinterface)
+            dao = instance(self.logger, self.dbinterface)
+
+        if self.cacheInstances:
+            self._cacheLock.acquire()
+            try:
+                self._instanceCache.setdefault(key, dao)
+            finally:
+                self._cacheLock.release()
+        return dao
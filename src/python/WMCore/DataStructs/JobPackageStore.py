@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+"""
+_JobPackageStore_
+
+Append-only file for storing many job objects.
+
+The file starts with a short magic string followed by one record per job.
+Each record is a fixed size header with the job ID and the length of the
+payload, followed by the pickled job.  The offset of every record is kept in
+a separate index file of fixed size (id, offset, length) entries so that a
+single job can be loaded without reading the rest of the file.  If the index
+is missing or behind the data file it is completed by walking the record
+headers.
+"""
+
+import os
+import struct
+import cPickle
+
+MAGIC = "WMJPS001"
+RECORD_HEADER = struct.Struct("!qI")
+INDEX_ENTRY = struct.Struct("!qQI")
+
+
+def getJobStorePath(cacheDir, jobGroupID):
+    """
+    _getJobStorePath_
+
+    Return the path of the job store for a job group given the cache
+    directory of one of its jobs.  Job cache directories live in
+    <taskDir>/JobCollection_<group>_<n>/job_<id> and the store is kept in
+    the task directory.
+    """
+    taskDir = os.path.dirname(os.path.dirname(os.path.normpath(cacheDir)))
+    return os.path.join(taskDir, "JobGroup_%i.jobs" % int(jobGroupID))
+
+
+def isJobPackageStore(fileName):
+    """
+    _isJobPackageStore_
+
+    Check whether a file was written by a JobPackageStore.
+    """
+    try:
+        fileHandle = open(fileName, "rb")
+    except IOError:
+        return False
+    try:
+        return fileHandle.read(len(MAGIC)) == MAGIC
+    finally:
+        fileHandle.close()
+
+
+def deleteJobStore(fileName):
+    """
+    _deleteJobStore_
+
+    Remove the data and index files of a job store, returns True if there
+    was something to remove.
+    """
+    removed = False
+    for name in [fileName, fileName + ".idx"]:
+        if os.path.exists(name):
+            os.remove(name)
+            removed = True
+    return removed
+
+
+class JobPackageStore(object):
+    """
+    _JobPackageStore_
+
+    Jobs are appended with append() or extend() and loaded back by ID with
+    get() or []. File handles are kept open between calls, call close() when
+    done with the store.
+    """
+    def __init__(self, fileName, writeIndex = True):
+        self.fileName = fileName
+        self.indexName = fileName + ".idx"
+        self.writeIndex = writeIndex
+        self.index = None
+        self.indexedSize = len(MAGIC)
+        self.indexEntries = 0
+        self.unindexed = []
+        self.writeHandle = None
+        self.indexHandle = None
+        self.readHandle = None
+        return
+
+    def _openForAppend(self):
+        """
+        _openForAppend_
+
+        Open the data and index files for appending, writing the magic
+        string if the data file is new.
+        """
+        if self.writeHandle != None:
+            return
+
+        self.loadIndex()
+        self.writeHandle = open(self.fileName, "ab")
+        self.writeHandle.seek(0, os.SEEK_END)
+        if self.writeHandle.tell() == 0:
+            self.writeHandle.write(MAGIC)
+        elif self.writeHandle.tell() != self.indexedSize:
+            # Drop a partially written record left behind by a crash
+            self.writeHandle.truncate(self.indexedSize)
+            self.writeHandle.seek(self.indexedSize)
+
+        if self.writeIndex:
+            self.indexHandle = open(self.indexName, "ab")
+            self.indexHandle.truncate(self.indexEntries * INDEX_ENTRY.size)
+            for (jobID, offset, length) in self.unindexed:
+                self.indexHandle.write(INDEX_ENTRY.pack(jobID, offset, length))
+            self.unindexed = []
+        return
+
+    def append(self, jobID, job):
+        """
+        _append_
+
+        Append a job to the store and return the offset of its record.
+        """
+        self._openForAppend()
+
+        payload = cPickle.dumps(job, cPickle.HIGHEST_PROTOCOL)
+        offset = self.indexedSize
+        self.writeHandle.write(RECORD_HEADER.pack(jobID, len(payload)))
+        self.writeHandle.write(payload)
+        if self.indexHandle != None:
+            self.indexHandle.write(INDEX_ENTRY.pack(jobID, offset, len(payload)))
+
+        self.index[jobID] = (offset, len(payload))
+        self.indexedSize = offset + RECORD_HEADER.size + len(payload)
+        return offset
+
+    def extend(self, jobs):
+        """
+        _extend_
+
+        Append a list of jobs to the store, the jobs must have an ID.
+        """
+        for job in jobs:
+            self.append(job["id"], job)
+        return
+
+    def flush(self):
+        """
+        _flush_
+
+        Push everything that was appended out to disk.
+        """
+        for fileHandle in [self.writeHandle, self.indexHandle]:
+            if fileHandle != None:
+                fileHandle.flush()
+                os.fsync(fileHandle.fileno())
+        return
+
+    def close(self):
+        """
+        _close_
+
+        Flush and close all the open file handles.
+        """
+        self.flush()
+        for fileHandle in [self.writeHandle, self.indexHandle, self.readHandle]:
+            if fileHandle != None:
+                fileHandle.close()
+        self.writeHandle = None
+        self.indexHandle = None
+        self.readHandle = None
+        return
+
+    def loadIndex(self):
+        """
+        _loadIndex_
+
+        Load the offset index, completing it from the data file if needed.
+        """
+        if self.index != None:
+            return
+
+        self.index = {}
+        self.indexedSize = len(MAGIC)
+        self.indexEntries = 0
+        self.unindexed = []
+        if not os.path.exists(self.fileName) or os.path.getsize(self.fileName) == 0:
+            return
+
+        if os.path.exists(self.indexName):
+            indexHandle = open(self.indexName, "rb")
+            data = indexHandle.read()
+            indexHandle.close()
+            dataSize = os.path.getsize(self.fileName)
+            for start in xrange(0, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size):
+                (jobID, offset, length) = INDEX_ENTRY.unpack_from(data, start)
+                end = offset + RECORD_HEADER.size + length
+                if offset != self.indexedSize or end > dataSize:
+                    break
+                self.index[jobID] = (offset, length)
+                self.indexedSize = end
+                self.indexEntries += 1
+
+        self._scan()
+        return
+
+    def _scan(self):
+        """
+        _scan_
+
+        Walk the record headers past the end of the index, stopping at the
+        first incomplete record.
+        """
+        dataHandle = open(self.fileName, "rb")
+        try:
+            if dataHandle.read(len(MAGIC)) != MAGIC:
+                raise IOError("%s is not a job package store" % self.fileName)
+
+            dataSize = os.fstat(dataHandle.fileno()).st_size
+            offset = self.indexedSize
+            while offset + RECORD_HEADER.size <= dataSize:
+                dataHandle.seek(offset)
+                (jobID, length) = RECORD_HEADER.unpack(dataHandle.read(RECORD_HEADER.size))
+                end = offset + RECORD_HEADER.size + length
+                if end > dataSize:
+                    break
+                self.index[jobID] = (offset, length)
+                self.unindexed.append((jobID, offset, length))
+                offset = end
+            self.indexedSize = offset
+        finally:
+            dataHandle.close()
+        return
+
+    def readAt(self, offset):
+        """
+        _readAt_
+
+        Load the record at the given offset, returns a (jobID, job) tuple.
+        """
+        if self.writeHandle != None:
+            self.writeHandle.flush()
+        if self.readHandle == None:
+            self.readHandle = open(self.fileName, "rb")
+
+        self.readHandle.seek(offset)
+        (jobID, length) = RECORD_HEADER.unpack(self.readHandle.read(RECORD_HEADER.size))
+        return (jobID, cPickle.loads(self.readHandle.read(length)))
+
+    def get(self, jobID, default = None):
+        """
+        _get_
+
+        Load a job by ID.
+        """
+        self.loadIndex()
+        if jobID not in self.index:
+            return default
+        return self.readAt(self.index[jobID][0])[1]
+
+    def __getitem__(self, jobID):
+        self.loadIndex()
+        return self.readAt(self.index[jobID][0])[1]
+
+    def __contains__(self, jobID):
+        self.loadIndex()
+        return jobID in self.index
+
+    def __len__(self):
+        self.loadIndex()
+        return len(self.index)
+
+    def keys(self):
+        """
+        _keys_
+
+        Return the IDs of the jobs in the store.
+        """
+        self.loadIndex()
+        return self.index.keys()
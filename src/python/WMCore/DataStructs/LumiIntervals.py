@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+_LumiIntervals_
+
+Sorted interval engine for lumi section ranges.
+
+The ranges of a run are kept as a pair of arrays, (starts, ends), sorted by
+start with overlapping and adjacent ranges merged together.  Lookups are done
+with bisect and the set operations by walking both pairs of arrays at the same
+time, so nothing is ever expanded into individual lumis.
+"""
+
+import sys
+from array import array
+from bisect import bisect_right
+
+# A last lumi of zero means the range extends to the end of the run for
+# LumiList.contains().
+OPEN_END = sys.maxint
+
+
+def _newIntervals():
+    return (array('l'), array('l'))
+
+
+def _appendRange(intervals, first, last):
+    """
+    _appendRange_
+
+    Append a range to intervals, merging it with the last range if they
+    overlap or touch.  Ranges must be appended in order of their first lumi.
+    """
+    (starts, ends) = intervals
+    if len(ends) > 0 and first <= ends[-1] + 1:
+        if last > ends[-1]:
+            ends[-1] = last
+    else:
+        starts.append(first)
+        ends.append(last)
+    return
+
+
+def mergeRanges(ranges, openEnded = False):
+    """
+    _mergeRanges_
+
+    Turn a list of [first, last] lumi ranges in any order into a
+    (starts, ends) pair of sorted and merged arrays.  Ranges where last is
+    smaller than first are ignored unless openEnded is set and last is zero,
+    in which case the range extends to the end of the run.
+    """
+    cleanRanges = []
+    for (first, last) in ranges:
+        if openEnded and last == 0:
+            last = OPEN_END
+        if last >= first:
+            cleanRanges.append((first, last))
+    cleanRanges.sort()
+
+    intervals = _newIntervals()
+    for (first, last) in cleanRanges:
+        _appendRange(intervals, first, last)
+    return intervals
+
+
+def toRangeList(intervals):
+    """
+    _toRangeList_
+
+    Return the intervals as a list of [first, last] pairs.
+    """
+    return [[first, last] for (first, last) in zip(intervals[0], intervals[1])]
+
+
+def rangesContain(intervals, lumi):
+    """
+    _rangesContain_
+
+    Check whether a lumi is in any of the intervals.
+    """
+    index = bisect_right(intervals[0], lumi) - 1
+    return index >= 0 and lumi <= intervals[1][index]
+
+
+def filterLumis(intervals, lumis):
+    """
+    _filterLumis_
+
+    Return the lumis that are in the intervals, in the order they were given.
+    """
+    (starts, ends) = intervals
+    if len(starts) == 0:
+        return []
+
+    result = []
+    for lumi in lumis:
+        index = bisect_right(starts, lumi) - 1
+        if index >= 0 and lumi <= ends[index]:
+            result.append(lumi)
+    return result
+
+
+def unionRanges(a, b):
+    """
+    _unionRanges_
+
+    Return the intervals that are in either a or b.
+    """
+    result = _newIntervals()
+    i = j = 0
+    while i < len(a[0]) or j < len(b[0]):
+        if j >= len(b[0]) or (i < len(a[0]) and a[0][i] <= b[0][j]):
+            _appendRange(result, a[0][i], a[1][i])
+            i += 1
+        else:
+            _appendRange(result, b[0][j], b[1][j])
+            j += 1
+    return result
+
+
+def intersectRanges(a, b):
+    """
+    _intersectRanges_
+
+    Return the intervals that are in both a and b.
+    """
+    result = _newIntervals()
+    i = j = 0
+    while i < len(a[0]) and j < len(b[0]):
+        first = max(a[0][i], b[0][j])
+        last = min(a[1][i], b[1][j])
+        if first <= last:
+            _appendRange(result, first, last)
+        if a[1][i] < b[1][j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtractRanges(a, b):
+    """
+    _subtractRanges_
+
+    Return the intervals that are in a but not in b.
+    """
+    result = _newIntervals()
+    j = 0
+    for i in range(len(a[0])):
+        first = a[0][i]
+        last = a[1][i]
+        # Skip the ranges of b that end before this range starts
+        while j < len(b[0]) and b[1][j] < first:
+            j += 1
+        k = j
+        while k < len(b[0]) and b[0][k] <= last and first <= last:
+            if b[0][k] > first:
+                _appendRange(result, first, b[0][k] - 1)
+            first = max(first, b[1][k] + 1)
+            k += 1
+        if first <= last:
+            _appendRange(result, first, last)
+    return result
+
+
+class RunLumiIntervals(object):
+    """
+    _RunLumiIntervals_
+
+    Merged intervals for a dictionary of run -> list of [first, last] lumi
+    ranges.  The intervals of a run are only built the first time they are
+    needed and are rebuilt if the list of ranges for the run is replaced or
+    changes length.  Ranges that are modified in place are not noticed.
+    """
+    def __init__(self, runRanges, openEnded = False):
+        self.runRanges = runRanges
+        self.openEnded = openEnded
+        self.cache = {}
+
+    def get(self, run):
+        """
+        _get_
+
+        Return the (starts, ends) intervals for a run or None if the run is
+        not there.
+        """
+        ranges = self.runRanges.get(run, None)
+        if not ranges:
+            return None
+
+        cached = self.cache.get(run, None)
+        if cached and cached[0] is ranges and cached[1] == len(ranges):
+            return cached[2]
+
+        intervals = mergeRanges(ranges, self.openEnded)
+        self.cache[run] = (ranges, len(ranges), intervals)
+        return intervals
+
+    def contains(self, run, lumi):
+        """
+        _contains_
+
+        Check whether a run/lumi is in the intervals.
+        """
+        intervals = self.get(run)
+        if intervals == None:
+            return False
+        return rangesContain(intervals, lumi)
+
+    def filterLumis(self, run, lumis):
+        """
+        _filterLumis_
+
+        Return the lumis of a run that are in the intervals.
+        """
+        intervals = self.get(run)
+        if intervals == None:
+            return []
+        return filterLumis(intervals, lumis)
@@ -10,14 +10,19 @@ This class can also handle ranges of events as the structure is identical
 or could be subclassed renaming a function or two.
 
 This code began life in COMP/CRAB/python/LumiList.py
+
+The set operations and lookups are done on sorted intervals, see
+WMCore.DataStructs.LumiIntervals, and never expand ranges into lumis.
 """
 
 
-import copy
 import json
 import re
 import urllib2
 
+from WMCore.DataStructs.LumiIntervals import RunLumiIntervals, toRangeList
+from WMCore.DataStructs.LumiIntervals import unionRanges, intersectRanges, subtractRanges
+
 class LumiList(object):
     """
     Deal with lists of lumis in several different forms:
@@ -104,31 +109,29 @@ class LumiList(object):
                 if compactList[run]:
                     self.compactList[runString] = compactList[run]
 
+        self._initIntervals()
+
+
+    def _initIntervals(self):
+        """
+        Set up the interval caches for compactList.  The one used by contains()
+        treats a last lumi of 0 as the end of the run.
+        """
+        self._intervals = RunLumiIntervals(self.compactList)
+        self._openIntervals = RunLumiIntervals(self.compactList, openEnded = True)
+
 
     def __sub__(self, other): # Things from self not in other
         result = {}
-        for run in sorted(self.compactList.keys()):
-            alumis = sorted(self.compactList[run])
-            blumis = sorted(other.compactList.get(run, []))
-            alist = []                    # verified part
-            for alumi in alumis:
-                tmplist = [alumi[0], alumi[1]] # may be part
-                for blumi in blumis:
-                    if blumi[0] <= tmplist[0] and blumi[1] >= tmplist[1]: # blumi has all of alumi
-                        tmplist = []
-                        break # blumi is has all of alumi
-                    if blumi[0] > tmplist[0] and blumi[1] < tmplist[1]: # blumi is part of alumi
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] <= tmplist[0] and blumi[1] < tmplist[1] and blumi[1]>=tmplist[0]: # overlaps start
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] > tmplist[0] and blumi[1] >= tmplist[1] and blumi[0]<=tmplist[1]: # overlaps end
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = []
-                        break
-                if tmplist:
-                    alist.append(tmplist)
-            result[run] = alist
+        for run in self.compactList.keys():
+            alumis = self._intervals.get(run)
+            if alumis is None:
+                continue
+            blumis = other._intervals.get(run)
+            if blumis is None:
+                result[run] = toRangeList(alumis)
+            else:
+                result[run] = toRangeList(subtractRanges(alumis, blumis))
 
         return LumiList(compactList = result)
 
@@ -138,29 +141,11 @@ class LumiList(object):
         aruns = set(self.compactList.keys())
         bruns = set(other.compactList.keys())
         for run in aruns & bruns:
-            lumiList = []                    # List for this run
-            unique = []                    # List for this run
-            for alumi in self.compactList[run]:
-                for blumi in other.compactList[run]:
-                    if blumi[0] <= alumi[0] and blumi[1] >= alumi[1]: # blumi has all of alumi
-                        lumiList.append(alumi)
-                    if blumi[0] > alumi[0] and blumi[1] < alumi[1]: # blumi is part of alumi
-                        lumiList.append(blumi)
-                    elif blumi[0] <= alumi[0] and blumi[1] < alumi[1] and blumi[1] >= alumi[0]: # overlaps start
-                        lumiList.append([alumi[0], blumi[1]])
-                    elif blumi[0] > alumi[0] and blumi[1] >= alumi[1] and blumi[0] <= alumi[1]: # overlaps end
-                        lumiList.append([blumi[0], alumi[1]])
-
-
-            if lumiList:
-                unique = [lumiList[0]]
-            for pair in lumiList[1:]:
-                if pair[0] == unique[-1][1]+1:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                else:
-                    unique.append(copy.deepcopy(pair))
-
-            result[run] = unique
+            alumis = self._intervals.get(run)
+            blumis = other._intervals.get(run)
+            if alumis is None or blumis is None:
+                continue
+            result[run] = toRangeList(intersectRanges(alumis, blumis))
         return LumiList(compactList = result)
 
 
@@ -170,14 +155,16 @@ class LumiList(object):
         bruns = other.compactList.keys()
         runs = set(aruns + bruns)
         for run in runs:
-            overlap = sorted(self.compactList.get(run, []) + other.compactList.get(run, []))
-            unique = [overlap[0]]
-            for pair in overlap[1:]:
-                if pair[0] >= unique[-1][0] and pair[0] <= unique[-1][1]+1 and pair[1] > unique[-1][1]:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                elif pair[0] > unique[-1][1]:
-                    unique.append(copy.deepcopy(pair))
-            result[run] = unique
+            alumis = self._intervals.get(run)
+            blumis = other._intervals.get(run)
+            if alumis is None:
+                merged = blumis
+            elif blumis is None:
+                merged = alumis
+            else:
+                merged = unionRanges(alumis, blumis)
+            if merged is not None:
+                result[run] = toRangeList(merged)
         return LumiList(compactList = result)
 
 
@@ -197,11 +184,8 @@ class LumiList(object):
         """
         filteredList = []
         for (run, lumi) in lumiList:
-            runsInLumi = self.compactList.get(str(run), [[0, -1]])
-            for (first, last) in runsInLumi:
-                if lumi >= first and lumi <= last:
-                    filteredList.append((run, lumi))
-                    break
+            if self._intervals.contains(str(run), lumi):
+                filteredList.append((run, lumi))
         return filteredList
 
 
@@ -345,21 +329,12 @@ class LumiList(object):
                 run         = run[0]
             except:
                 raise RuntimeError, "Improper format for run '%s'" % run
-        lumiRangeList = self.compactList.get( str(run) )
-        if not lumiRangeList:
-            # the run isn't there, so no need to look any further
-            return False
-        for lumiRange in lumiRangeList:
-            # we want to make this as found if either the lumiSection
-            # is inside the range OR if the lumi section is greater
-            # than or equal to the lower bound of the lumi range and
-            # the upper bound is 0 (which means extends to the end of
-            # the run)
-            if lumiRange[0] <= lumiSection and \
-               (0 == lumiRange[1] or lumiSection <= lumiRange[1]):
-                # got it
-                return True
-        return False
+        # we want to make this as found if either the lumiSection
+        # is inside the range OR if the lumi section is greater
+        # than or equal to the lower bound of the lumi range and
+        # the upper bound is 0 (which means extends to the end of
+        # the run)
+        return self._openIntervals.contains(str(run), lumiSection)
 
 
     def __contains__ (self, runTuple):
@@ -13,6 +13,7 @@ job in two ways:
 import logging
 
 from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.LumiIntervals import RunLumiIntervals
 
 class Mask(dict):
     """
@@ -175,7 +176,7 @@ class Mask(dict):
             # ALWAYS TRUE
             return True
 
-        if not run in self['runAndLumis'].keys():
+        if not run in self['runAndLumis']:
             return False
 
         for pair in self['runAndLumis'][run]:
@@ -210,16 +211,10 @@ class Mask(dict):
         passedRuns = set([r.run for r in runs])
         filteredRuns = maskRuns.intersection(passedRuns)
 
+        maskIntervals = RunLumiIntervals(self["runAndLumis"])
         newRuns = set()
         for runNumber in filteredRuns:
-            maskLumis = set()
-            for pair in self["runAndLumis"][runNumber]:
-                if pair[0] == pair[1]:
-                    maskLumis.add(pair[0])
-                else:
-                    maskLumis = maskLumis.union(range(pair[0], pair[1] + 1, 1))
-
-            filteredLumis = set(runDict[runNumber].lumis).intersection(maskLumis)
+            filteredLumis = set(maskIntervals.filterLumis(runNumber, runDict[runNumber].lumis))
             if len(filteredLumis) > 0:
                 newRuns.add(Run(runNumber, *list(filteredLumis)))
 
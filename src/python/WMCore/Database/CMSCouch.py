@@ -463,8 +463,8 @@ class Database(CouchDBRequests):
         encodedOptions = {}
         for k,v in options.iteritems():
             # We can't encode the stale option, as it will be converted to '"ok"'
-            # which couch barfs on.
-            if k == "stale":
+            # which couch barfs on, the same goes for document ids.
+            if k in ["stale", "startkey_docid", "endkey_docid"]:
                 encodedOptions[k] = v
             else:
                 encodedOptions[k] = self.encode(v)
@@ -537,6 +537,65 @@ class Database(CouchDBRequests):
         else:
             return self.get('/%s/_all_docs' % self.name, encodedOptions)
 
+    def iterView(self, design, view, options = {}, keys = [], pageSize = 1000):
+        """
+        Iterate over the rows of a view, loading at most pageSize rows at a
+        time so that only one page of a large view is held in memory.  The
+        options are the same as for loadView, pages are requested with
+        startkey/startkey_docid.  If keys are given they are posted pageSize
+        keys at a time.
+        """
+        def loadPage(pageOptions, pageKeys):
+            return self.loadView(design, view, pageOptions, pageKeys)
+        return self._iterRows(loadPage, options, keys, pageSize)
+
+    def iterAllDocs(self, options = {}, keys = [], pageSize = 1000):
+        """
+        Iterate over the rows of _all_docs pageSize rows at a time, see
+        iterView.
+        """
+        def loadPage(pageOptions, pageKeys):
+            pageOptions = dict(pageOptions)
+            pageOptions.pop('startkey_docid', None)
+            return self.allDocs(pageOptions, pageKeys)
+        return self._iterRows(loadPage, options, keys, pageSize)
+
+    def _iterRows(self, loadPage, options, keys, pageSize):
+        """
+        Yield the rows returned by loadPage(options, keys) one page at a time
+        """
+        options = dict(options)
+        if len(keys):
+            for i in range(0, len(keys), pageSize):
+                for row in loadPage(options, keys[i:i + pageSize]).get('rows', []):
+                    yield row
+            return
+
+        if 'key' in options:
+            options['startkey'] = options['endkey'] = options.pop('key')
+        remaining = options.pop('limit', None)
+        while remaining == None or remaining > 0:
+            # ask for one extra row, it's where the next page starts
+            options['limit'] = pageSize + 1
+            if remaining != None:
+                options['limit'] = min(options['limit'], remaining + 1)
+            rows = loadPage(options, []).get('rows', [])
+            for row in rows[:options['limit'] - 1]:
+                yield row
+            if len(rows) < options['limit']:
+                return
+            if remaining != None:
+                remaining -= len(rows) - 1
+
+            nextRow = rows[-1]
+            options.pop('skip', None)
+            options['startkey'] = nextRow['key']
+            if 'id' in nextRow:
+                options['startkey_docid'] = nextRow['id']
+            else:
+                options.pop('startkey_docid', None)
+        return
+
     def info(self):
         """
         Return information about the databaes (size, number of documents etc).
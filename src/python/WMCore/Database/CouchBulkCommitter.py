@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+_CouchBulkCommitter_
+
+Write-behind buffer of documents for a CouchDB database.
+
+Documents are queued from any number of threads and posted to _bulk_docs
+when the buffer holds maxDocs documents, maxBytes of JSON or when its oldest
+document has waited maxAge seconds.  The age limit is only checked when a
+document is queued unless a background thread is started with start().
+Documents rejected with a conflict are passed to a resolveConflicts function
+which returns the documents to post again, see overwriteConflicts().
+"""
+
+import logging
+import threading
+import time
+
+from WMCore.Wrappers import JsonWrapper as json
+
+
+def overwriteConflicts(database, docs):
+    """
+    _overwriteConflicts_
+
+    Resolve conflicts by replacing the documents in the database with the
+    ones that were committed.  Documents that don't exist anymore are dropped.
+    """
+    ids = [doc['_id'] for doc in docs]
+    revisions = {}
+    for row in database.allDocs(keys = ids).get('rows', []):
+        if 'value' in row and not row['value'].get('deleted', False):
+            revisions[row['id']] = row['value']['rev']
+
+    retry = []
+    for doc in docs:
+        if doc['_id'] in revisions:
+            doc['_rev'] = revisions[doc['_id']]
+            retry.append(doc)
+        else:
+            logging.warning("Couldn't resolve conflict for missing document %s" % doc['_id'])
+    return retry
+
+
+class BulkCommitter(object):
+    """
+    _BulkCommitter_
+
+    Buffer documents for one database.  flush() posts the buffer and returns
+    the _bulk_docs results, close() stops the background thread and flushes
+    what's left.
+    """
+    def __init__(self, database, maxDocs = 1000, maxBytes = 8 * 1024 * 1024,
+                 maxAge = None, resolveConflicts = None, conflictRetries = 3):
+        self.database = database
+        self.maxDocs = maxDocs
+        self.maxBytes = maxBytes
+        self.maxAge = maxAge
+        self.resolveConflicts = resolveConflicts
+        self.conflictRetries = conflictRetries
+
+        self.docs = []
+        self.bytes = 0
+        self.oldest = None
+        # The buffer lock is only held to add or take documents, the flush
+        # lock serializes the posts since the database isn't thread safe
+        self.lock = threading.Lock()
+        self.flushLock = threading.Lock()
+        self.thread = None
+        self.stopEvent = threading.Event()
+        self.resetMetrics()
+        return
+
+    def resetMetrics(self):
+        """
+        _resetMetrics_
+
+        Zero the flush counters.
+        """
+        self.metrics = {"flushes": 0, "docs": 0, "bytes": 0, "conflicts": 0,
+                        "retried": 0, "failed": 0, "maxBatch": 0,
+                        "flushTime": 0.0, "maxFlushTime": 0.0}
+        return
+
+    def getMetrics(self):
+        """
+        _getMetrics_
+
+        Return the flush counters along with the average batch size and flush
+        latency.
+        """
+        metrics = dict(self.metrics)
+        if metrics["flushes"]:
+            metrics["averageBatch"] = float(metrics["docs"]) / metrics["flushes"]
+            metrics["averageFlushTime"] = metrics["flushTime"] / metrics["flushes"]
+        else:
+            metrics["averageBatch"] = 0.0
+            metrics["averageFlushTime"] = 0.0
+        metrics["queued"] = len(self.docs)
+        return metrics
+
+    def queue(self, doc, timestamp = False):
+        """
+        _queue_
+
+        Add a document to the buffer, flushing it if it's full.  If timestamp
+        is set the document is timestamped like Database.queue() does.
+        """
+        if timestamp:
+            self.database.timestamp(doc, timestamp)
+        size = len(json.dumps(doc))
+
+        self.lock.acquire()
+        try:
+            self.docs.append(doc)
+            self.bytes += size
+            if self.oldest == None:
+                self.oldest = time.time()
+            full = self._full()
+        finally:
+            self.lock.release()
+
+        if full:
+            return self.flush()
+        return []
+
+    def _full(self):
+        """
+        _full_
+
+        Check the thresholds, the buffer lock must be held.
+        """
+        if not self.docs:
+            return False
+        if len(self.docs) >= self.maxDocs or self.bytes >= self.maxBytes:
+            return True
+        if self.maxAge != None and time.time() - self.oldest >= self.maxAge:
+            return True
+        return False
+
+    def flush(self):
+        """
+        _flush_
+
+        Post everything in the buffer, returns the _bulk_docs results.  If the
+        post fails the documents are put back in the buffer and the error is
+        raised.
+        """
+        self.flushLock.acquire()
+        try:
+            self.lock.acquire()
+            try:
+                (docs, size) = (self.docs, self.bytes)
+                self.docs = []
+                self.bytes = 0
+                self.oldest = None
+            finally:
+                self.lock.release()
+            if not docs:
+                return []
+
+            startTime = time.time()
+            try:
+                results = self._post(docs)
+            except Exception:
+                self.lock.acquire()
+                try:
+                    self.docs[0:0] = docs
+                    self.bytes += size
+                    self.oldest = startTime
+                finally:
+                    self.lock.release()
+                raise
+
+            flushTime = time.time() - startTime
+            self.metrics["flushes"] += 1
+            self.metrics["docs"] += len(docs)
+            self.metrics["bytes"] += size
+            self.metrics["maxBatch"] = max(self.metrics["maxBatch"], len(docs))
+            self.metrics["flushTime"] += flushTime
+            self.metrics["maxFlushTime"] = max(self.metrics["maxFlushTime"], flushTime)
+            return results
+        finally:
+            self.flushLock.release()
+
+    def _post(self, docs):
+        """
+        _post_
+
+        Post the documents to _bulk_docs, retrying the conflicting ones.
+        Returns one result per document in the order they were queued.
+        """
+        uri = '/%s/_bulk_docs/' % self.database.name
+        results = self.database.post(uri, {'docs': docs})
+
+        pending = range(len(docs))
+        for attempt in range(self.conflictRetries + 1):
+            conflicts = [i for i in pending if results[i].get('error', None) == 'conflict']
+            self.metrics["conflicts"] += len(conflicts)
+            if not conflicts or self.resolveConflicts == None or attempt == self.conflictRetries:
+                break
+
+            retry = self.resolveConflicts(self.database, [docs[i] for i in conflicts])
+            retryIds = set([doc['_id'] for doc in retry])
+            pending = [i for i in conflicts if docs[i]['_id'] in retryIds]
+            if not pending:
+                break
+            self.metrics["retried"] += len(pending)
+            retryResults = self.database.post(uri, {'docs': [docs[i] for i in pending]})
+            for (i, result) in zip(pending, retryResults):
+                results[i] = result
+
+        self.metrics["failed"] += len([x for x in results if 'error' in x])
+        return results
+
+    def start(self, interval = 1):
+        """
+        _start_
+
+        Start a thread flushing the buffer once it's too old, full buffers are
+        flushed by the thread that fills them.
+        """
+        if self.thread != None:
+            return
+        self.stopEvent.clear()
+        self.thread = threading.Thread(target = self._flushOld, args = (interval,))
+        self.thread.setDaemon(True)
+        self.thread.start()
+        return
+
+    def _flushOld(self, interval):
+        """
+        _flushOld_
+
+        Background loop of start().
+        """
+        while not self.stopEvent.isSet():
+            self.stopEvent.wait(interval)
+            self.lock.acquire()
+            try:
+                full = self._full()
+            finally:
+                self.lock.release()
+            if full:
+                try:
+                    self.flush()
+                except Exception as ex:
+                    logging.error("Failed to flush documents to %s: %s" % (self.database.name, str(ex)))
+        return
+
+    def close(self):
+        """
+        _close_
+
+        Stop the background thread and flush the buffer.
+        """
+        if self.thread != None:
+            self.stopEvent.set()
+            self.thread.join()
+            self.thread = None
+        return self.flush()
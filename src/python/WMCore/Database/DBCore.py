@@ -9,11 +9,22 @@ Core Database APIs
 
 
 
+import re
+
 from WMCore.DataStructs.WMObject import WMObject
-from WMCore.Database.ResultSet import ResultSet
+from WMCore.Database.ResultSet import ResultSet, StreamingResultSet
 from copy import copy
 import WMCore.WMLogging
 
+# Anything in a select that makes the rows returned for one set of binds
+# depend on the rows matched by another set of binds, or that can put the
+# bind outside of a plain top level condition of the WHERE clause.  Selects
+# containing one of these can't be merged into a single IN list query.
+_bulkSelectBlockers = re.compile(r"\b(group\s+by|order\s+by|distinct|union|"
+                                 r"having|rownum|limit|count|sum|min|max|avg|"
+                                 r"or|not|case)\b",
+                                 re.IGNORECASE)
+
 class DBInterface(WMObject):
     """
     Base class for doing SQL operations using a SQLAlchemy engine, or
@@ -37,6 +48,7 @@ class DBInterface(WMObject):
         self.logger.info ("Instantiating base WM DBInterface")
         self.engine = engine
         self.maxBindsPerQuery = 500
+        self.streamingBatchSize = 1000
 
     def buildbinds(self, sequence, thename, therest=[{}]):
         """
@@ -53,7 +65,7 @@ class DBInterface(WMObject):
         return binds
 
     def executebinds(self, s=None, b=None, connection=None,
-                     returnCursor=False):
+                     returnCursor=False, streaming=False):
         """
         _executebinds_
 
@@ -67,13 +79,112 @@ class DBInterface(WMObject):
         if returnCursor:
             return resultProxy
 
-        result = ResultSet()
+        result = self.makeresultset(streaming)
         result.add(resultProxy)
-        resultProxy.close()
+        if not streaming:
+            resultProxy.close()
         return result
 
+    def buildbulkselect(self, s, b):
+        """
+        _buildbulkselect_
+
+        Try to rewrite a select that is run once for each of the bind
+        dictionaries in b into a single select that uses an IN list:
+
+        SELECT id FROM wmbs_file_details WHERE lfn = :lfn
+
+        with binds [{'lfn': 'a'}, {'lfn': 'b'}] becomes:
+
+        SELECT id FROM wmbs_file_details WHERE lfn IN (:lfn_0, :lfn_1)
+
+        with binds {'lfn_0': 'a', 'lfn_1': 'b'}.  Only the simplest selects
+        are rewritten: exactly one bind variable must vary, its values must
+        be unique and it must be used once, in a col = :bind condition of
+        the WHERE clause that is only combined with the other conditions by
+        AND.  Statements with subqueries, aggregates, ordering, OR, NOT or
+        CASE are left alone, as are comparisons other than =.
+
+        The merged query does not return the rows in the order of the binds,
+        which is why DAOs have to ask for the rewrite, see processData().
+
+        Returns a tuple of the new sql and binds or None if the statement
+        can't be rewritten.
+        """
+        if len(b) < 2 or not isinstance(b[0], dict):
+            return None
+
+        if len(re.findall(r"\bselect\b", s, re.IGNORECASE)) != 1:
+            return None
+        if _bulkSelectBlockers.search(s):
+            return None
+
+        bindNames = b[0].keys()
+        varyingNames = []
+        for bindName in bindNames:
+            firstValue = b[0][bindName]
+            for bind in b:
+                if len(bind) != len(bindNames) or bindName not in bind:
+                    return None
+                if bind[bindName] != firstValue:
+                    varyingNames.append(bindName)
+                    break
+
+        if len(varyingNames) != 1:
+            return None
+        bindName = varyingNames[0]
+
+        # only a plain equality, not the = of >=, <= or !=
+        bindRegex = re.compile(r"(?<=[\w.\s])=\s*:%s\b" % re.escape(bindName),
+                               re.IGNORECASE)
+        if len(bindRegex.findall(s)) != 1:
+            return None
+        if len(re.findall(r":%s\b" % re.escape(bindName), s, re.IGNORECASE)) != 1:
+            return None
+
+        # in the WHERE clause, not in the ON condition of a join
+        where = re.search(r"\bwhere\b", s, re.IGNORECASE)
+        if where == None or bindRegex.search(s).start() < where.end():
+            return None
+
+        values = [bind[bindName] for bind in b]
+        if len(set(values)) != len(values):
+            return None
+
+        newBind = copy(b[0])
+        del newBind[bindName]
+        inList = []
+        for index, value in enumerate(values):
+            inName = "%s_%d" % (bindName, index)
+            if inName in newBind:
+                return None
+            newBind[inName] = value
+            inList.append(":%s" % inName)
+
+        newSQL = bindRegex.sub(lambda x: "IN (%s)" % ", ".join(inList), s)
+        return (newSQL, newBind)
+
+    def executebulkselect(self, s=None, b=None, connection=None,
+                          returnCursor=False, streaming=False):
+        """
+        _executebulkselect_
+
+        Run a select for a list of binds as a single IN list query if the
+        statement can be rewritten, see buildbulkselect().  Returns None if
+        the statement can't be rewritten, otherwise a list containing either
+        the cursor or the ResultSet.
+        """
+        bulk = self.buildbulkselect(s, b)
+        if bulk == None:
+            return None
+
+        return self.makelist(self.executebinds(bulk[0], bulk[1],
+                                               connection=connection,
+                                               returnCursor=returnCursor,
+                                               streaming=streaming))
+
     def executemanybinds(self, s=None, b=None, connection=None,
-                         returnCursor=False):
+                         returnCursor=False, streaming=False, bulkSelect=False):
         """
         _executemanybinds_
         b is a list of dictionaries for the binds, e.g.:
@@ -83,9 +194,10 @@ class DBInterface(WMObject):
 
         see: http://www.gingerandjohn.com/archives/2004/02/26/cx_oracle-executemany-example/
 
-        Can't executemany() selects - so do each combination of binds here instead.
-        This will return a list of sqlalchemy.engine.base.ResultProxy object's
-        one for each set of binds.
+        Can't executemany() selects - so either merge the binds into a single
+        IN list query if bulkSelect is set (see buildbulkselect()) or do each
+        combination of binds here instead.  This will return a list of
+        sqlalchemy.engine.base.ResultProxy object's one for each query run.
 
         returns a list of sqlalchemy.engine.base.ResultProxy objects
         """
@@ -95,16 +207,24 @@ class DBInterface(WMObject):
             """
             Trying to select many
             """
+            if bulkSelect:
+                result = self.executebulkselect(s, b, connection=connection,
+                                                returnCursor=returnCursor,
+                                                streaming=streaming)
+                if result != None:
+                    return result
+
             if returnCursor:
                 result = []
                 for bind in b:
                     result.append(connection.execute(s, bind))
             else:
-                result = ResultSet()
+                result = self.makeresultset(streaming)
                 for bind in b:
                     resultproxy = connection.execute(s, bind)
                     result.add(resultproxy)
-                    resultproxy.close()
+                    if not streaming:
+                        resultproxy.close()
 
             return self.makelist(result)
 
@@ -114,21 +234,64 @@ class DBInterface(WMObject):
         result = connection.execute(s, b)
         return self.makelist(result)
 
+    def makeresultset(self, streaming=False):
+        """
+        _makeresultset_
+
+        Return an empty ResultSet to hold the rows of a query.  A streaming
+        ResultSet keeps the result proxies open and reads the rows in batches
+        while they are iterated over, which is much lighter for big selects
+        but hands the rows back as tuples, and only once.
+        """
+        if streaming:
+            return StreamingResultSet(batchSize=self.streamingBatchSize)
+        return ResultSet()
+
     def connection(self):
         """
         Return a connection to the engine (from the connection pool)
         """
         return self.engine.connect()
 
+    def releaseconnection(self, result, connection):
+        """
+        _releaseconnection_
+
+        Have the StreamingResultSets in result close the connection once
+        they have all been read or closed, they still need it after
+        processData() returns.  Returns False if there is no such set.
+        """
+        streamSets = [x for x in result if isinstance(x, StreamingResultSet) and \
+                      len(x.resultproxies) > 0]
+        if len(streamSets) == 0:
+            return False
+
+        pending = [len(streamSets)]
+        def release():
+            pending[0] -= 1
+            if pending[0] == 0:
+                connection.close() # Return connection to the pool
+        for streamSet in streamSets:
+            streamSet.release = release
+        return True
+
 
     def processData(self, sqlstmt, binds={}, conn=None,
-                    transaction=False, returnCursor=False):
+                    transaction=False, returnCursor=False, streaming=False,
+                    bulkSelect=False):
         """
         set conn if you already have an active connection to reuse
         set transaction = True if you already have an active transaction
+        set streaming = True to get back StreamingResultSets, which read the
+        rows of big selects from the cursor while they are iterated over,
+        a connection opened here is closed once they are done
+        set bulkSelect = True to let a select run for a list of binds be
+        merged into IN list queries, only for DAOs that don't depend on the
+        order of the rows (see buildbulkselect())
 
         """
         connection = None
+        released = False
         try:
             if not conn:
                 connection = self.connection()
@@ -147,7 +310,8 @@ class DBInterface(WMObject):
 
                 for i in sqlstmt:
                     r = self.executebinds(i, connection=connection,
-                                          returnCursor=returnCursor)
+                                          returnCursor=returnCursor,
+                                          streaming=streaming)
                     result.append(r)
 
                 if not transaction:
@@ -159,12 +323,16 @@ class DBInterface(WMObject):
                 while(len(binds) > self.maxBindsPerQuery):
                     result.extend(self.processData(sqlstmt, binds[:self.maxBindsPerQuery],
                                                    conn=connection, transaction=True,
-                                                   returnCursor=returnCursor))
+                                                   returnCursor=returnCursor,
+                                                   streaming=streaming,
+                                                   bulkSelect=bulkSelect))
                     binds = binds[self.maxBindsPerQuery:]
 
                 for i in sqlstmt:
                     result.extend(self.executemanybinds(i, binds, connection=connection,
-                                                        returnCursor=returnCursor))
+                                                        returnCursor=returnCursor,
+                                                        streaming=streaming,
+                                                        bulkSelect=bulkSelect))
                 if not transaction:
                     trans.commit()
             elif len(binds) == len(sqlstmt):
@@ -176,7 +344,8 @@ class DBInterface(WMObject):
                     b = binds[i]
 
                     r = self.executebinds(s, b, connection=connection,
-                                          returnCursor=returnCursor)
+                                          returnCursor=returnCursor,
+                                          streaming=streaming)
                     result.append(r)
 
                 if not transaction:
@@ -198,7 +367,10 @@ class DBInterface(WMObject):
                                            (type(sqlstmt), type(binds), type(connection), type(transaction)))
                 raise Exception, """DBInterface.processData Nothing executed, problem with your arguments
                 Probably mismatched sizes for sql (%i) and binds (%i)""" % (len(sqlstmt), len(binds))
+
+            if streaming and not conn:
+                released = self.releaseconnection(result, connection)
         finally:
-            if not conn and connection != None:
+            if not conn and connection != None and not released:
                 connection.close() # Return connection to the pool
         return result
@@ -38,17 +38,21 @@ class DBFormatter(WMObject):
         t = datetime.datetime.now()
         return self.convertdatetime(t)
 
+    def iterrows(self, result):
+        """
+        Iterate over the rows of a ResultSet without copying them, or over
+        the fetched rows of any other result like a plain ResultProxy.
+        """
+        return getattr(result, 'iterrows', result.fetchall)()
+
     def format(self, result):
         """
         Some standard formatting, put all records into a list
         """
         out = []
         for r in result:
-            for i in r.fetchall():
-                row = []
-                for j in i:
-                    row.append(j)
-                out.append(row)
+            for i in self.iterrows(r):
+                out.append(list(i))
             r.close()
         return out
 
@@ -68,17 +72,21 @@ class DBFormatter(WMObject):
         """
         dictOut = []
         for r in result:
-            descriptions = r.keys
-            for i in r.fetchall():
+            # WARNING: Oracle returns table names in CAP!
+            keys = r.keys
+            if callable(keys):
+                # a plain ResultProxy
+                keys = keys()
+            descriptions = [str(x.lower()) for x in keys]
+            for i in self.iterrows(r):
                 #WARNING: this can generate errors for some stupid reason
                 # in both oracle and mysql.
                 entry = {}
-                for index in xrange(0,len(descriptions)):
-                    # WARNING: Oracle returns table names in CAP!
+                for index, description in enumerate(descriptions):
                     if type(i[index]) == unicode:
-                        entry[str(descriptions[index].lower())] = str(i[index])
+                        entry[description] = str(i[index])
                     else:
-                        entry[str(descriptions[index].lower())] = i[index]
+                        entry[description] = i[index]
 
                 dictOut.append(entry)
 
@@ -95,10 +103,11 @@ class DBFormatter(WMObject):
 
         r = result[0]
         description = map(lambda x: str(x).lower(), r.keys)
-        if len(r.data) < 1:
+        row = r.fetchone()
+        if len(row) < 1:
             return {}
 
-        return dict(zip(description, r.fetchone()))
+        return dict(zip(description, row))
 
 
     def formatCursor(self, cursor, size=10):
@@ -116,7 +116,7 @@ class MySQLInterface(DBInterface):
         return (updatedSQL, mySQLBindVarsList)
 
     def executebinds(self, s = None, b = None, connection = None,
-                     returnCursor = False):
+                     returnCursor = False, streaming = False):
         """
         _executebinds_
 
@@ -124,17 +124,27 @@ class MySQLInterface(DBInterface):
         Transform the bind variables into the format that MySQL expects.
         """
         s, b = self.substitute(s, b)
-        return DBInterface.executebinds(self, s, b, connection, returnCursor)
+        return DBInterface.executebinds(self, s, b, connection, returnCursor,
+                                        streaming)
 
     def executemanybinds(self, s = None, b = None, connection = None,
-                         returnCursor = False):
+                         returnCursor = False, streaming = False, bulkSelect = False):
         """
         _executemanybinds_
 
         Execute a SQL statement that has multiple sets of bind variables.
         Transform the bind variables into the format that MySQL expects.
+        Selects that can be merged into a single IN list query are rewritten
+        before the bind variables are substituted if bulkSelect is set.
         """
+        if bulkSelect and s.strip().lower().startswith("select"):
+            result = self.executebulkselect(s.strip(), b, connection = connection,
+                                            returnCursor = returnCursor,
+                                            streaming = streaming)
+            if result != None:
+                return result
+
         newsql, binds = self.substitute(s, b)
 
         return DBInterface.executemanybinds(self, newsql, binds, connection,
-                                            returnCursor)
+                                            returnCursor, streaming)
@@ -4,6 +4,10 @@ _ResultSet_
 A class to read in a SQLAlchemy result proxy and hold the data, such that the
 SQLAlchemy result sets (aka cursors) can be closed. Make this class look as much
 like the SQLAlchemy class to minimise the impact of adding this class.
+
+StreamingResultSet keeps the result proxies open instead and reads their rows
+in batches while they are iterated over, so that big selects are never held in
+memory as a whole.
 """
 
 
@@ -28,6 +32,9 @@ class ResultSet:
     def fetchall(self):
         return self.data
 
+    def iterrows(self):
+        return iter(self.data)
+
     def add(self, resultproxy):
 
         myThread = threading.currentThread()
@@ -41,3 +48,64 @@ class ResultSet:
                 self.data.append(r)
 
         return
+
+class StreamingResultSet(object):
+    """
+    _StreamingResultSet_
+
+    Lazy ResultSet.  The result proxies are kept open and iterrows() pulls
+    their rows batchSize at a time with fetchmany(), handing out every row
+    as a tuple, so a big select is never held in memory as a whole.  The
+    column names are stored once in keys.  The rows can only be read once,
+    the result proxies are closed once they have all been read or close()
+    is called.  release is called then as well, DBInterface uses it to give
+    the connection back when the set outlives processData().
+    """
+    def __init__(self, batchSize = 1000):
+        self.keys = []
+        self.batchSize = batchSize
+        self.resultproxies = []
+        self.release = None
+
+    def close(self):
+        for resultproxy in self.resultproxies:
+            resultproxy.close()
+        self.resultproxies = []
+        if self.release != None:
+            release = self.release
+            self.release = None
+            release()
+        return
+
+    def fetchone(self):
+        while len(self.resultproxies) > 0:
+            row = self.resultproxies[0].fetchone()
+            if row != None:
+                return tuple(row)
+            self.resultproxies.pop(0).close()
+        self.close()
+        return []
+
+    def fetchall(self):
+        return list(self.iterrows())
+
+    def iterrows(self):
+        try:
+            while len(self.resultproxies) > 0:
+                rows = self.resultproxies[0].fetchmany(self.batchSize)
+                if not rows:
+                    self.resultproxies.pop(0).close()
+                    continue
+                for row in rows:
+                    yield tuple(row)
+        finally:
+            self.close()
+
+    def add(self, resultproxy):
+        if resultproxy.closed:
+            return
+
+        if len(self.keys) == 0:
+            self.keys.extend(resultproxy.keys())
+        self.resultproxies.append(resultproxy)
+        return
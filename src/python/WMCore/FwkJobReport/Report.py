@@ -145,7 +145,7 @@ class Report:
         Read in the FrameworkJobReport XML file produced
         by cmsRun and pull the information from it into this object
         """
-        from WMCore.FwkJobReport.XMLParser import xmlToJobReport
+        from WMCore.FwkJobReport.StreamingParser import xmlToJobReport
         try:
             xmlToJobReport(self, xmlfile)
         except Exception as ex:
@@ -1350,64 +1350,98 @@ class Report:
             f.inputPath = inputPath
         return
 
-    def setStepRSS(self, stepName, min, max, average):
+    def setPerformanceSummary(self, stepName, sectionName, min, max, average,
+                              percentiles = None):
+        """
+        _setPerformanceSummary_
+
+        Set the min, max, average and optional percentiles, given as a
+        dictionary like {'p50': value}, of a performance section
+        """
+
+        reportStep = self.retrieveStep(stepName)
+        reportStep.performance.section_(sectionName)
+        section = getattr(reportStep.performance, sectionName)
+        section.min     = min
+        section.max     = max
+        section.average = average
+        for key, value in (percentiles or {}).items():
+            setattr(section, key, value)
+
+        return
+
+    def setStepRSS(self, stepName, min, max, average, percentiles = None):
         """
         _setStepRSS_
 
         Set the Performance RSS information
         """
 
-        reportStep = self.retrieveStep(stepName)
-        reportStep.performance.section_('RSSMemory')
-        reportStep.performance.RSSMemory.min     = min
-        reportStep.performance.RSSMemory.max     = max
-        reportStep.performance.RSSMemory.average = average
+        self.setPerformanceSummary(stepName, 'RSSMemory', min, max, average,
+                                   percentiles)
+
+        return
+
+    def setStepPSS(self, stepName, min, max, average, percentiles = None):
+        """
+        _setStepPSS_
+
+        Set the Performance PSS information
+        """
+
+        self.setPerformanceSummary(stepName, 'PSSMemory', min, max, average,
+                                   percentiles)
 
         return
 
-    def setStepPMEM(self, stepName, min, max, average):
+    def setStepPMEM(self, stepName, min, max, average, percentiles = None):
         """
         _setStepPMEM_
 
         Set the Performance PMEM information
         """
 
-        reportStep = self.retrieveStep(stepName)
-        reportStep.performance.section_('PhysicalMemory')
-        reportStep.performance.PhysicalMemory.min     = min
-        reportStep.performance.PhysicalMemory.max     = max
-        reportStep.performance.PhysicalMemory.average = average
+        self.setPerformanceSummary(stepName, 'PhysicalMemory', min, max, average,
+                                   percentiles)
 
         return
 
-    def setStepPCPU(self, stepName, min, max, average):
+    def setStepPCPU(self, stepName, min, max, average, percentiles = None):
         """
         _setStepPCPU_
 
         Set the Performance PCPU information
         """
 
-        reportStep = self.retrieveStep(stepName)
-        reportStep.performance.section_('PercentCPU')
-        reportStep.performance.PercentCPU.min     = min
-        reportStep.performance.PercentCPU.max     = max
-        reportStep.performance.PercentCPU.average = average
+        self.setPerformanceSummary(stepName, 'PercentCPU', min, max, average,
+                                   percentiles)
 
         return
 
 
-    def setStepVSize(self, stepName, min, max, average):
+    def setStepVSize(self, stepName, min, max, average, percentiles = None):
         """
         _setStepVSize_
 
-        Set the Performance PCPU information
+        Set the Performance VSize information
+        """
+
+        self.setPerformanceSummary(stepName, 'VSizeMemory', min, max, average,
+                                   percentiles)
+
+        return
+
+    def setStepIO(self, stepName, readBytes, writeBytes):
+        """
+        _setStepIO_
+
+        Set the bytes read from and written to storage by the step processes
         """
 
         reportStep = self.retrieveStep(stepName)
-        reportStep.performance.section_('VSizeMemory')
-        reportStep.performance.VSizeMemory.min     = min
-        reportStep.performance.VSizeMemory.max     = max
-        reportStep.performance.VSizeMemory.average = average
+        reportStep.performance.section_('ProcessIO')
+        reportStep.performance.ProcessIO.readBytes  = readBytes
+        reportStep.performance.ProcessIO.writeBytes = writeBytes
 
         return
 
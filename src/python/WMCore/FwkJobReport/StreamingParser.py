@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+_StreamingParser_
+
+Read the raw XML output from the cmsRun executable with iterparse.
+
+The report is read one top level element at a time into a flat
+FwkReportRecord, each element is dropped from the tree as soon as it has
+been handled.  recordToReport() then fills a Report instance with the same
+information as XMLParser.xmlToJobReport() does.
+"""
+
+from array import array
+
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+
+from WMCore.FwkJobReport import Report
+from WMCore.FwkJobReport.XMLParser import addStorageStatistics, goodMemoryStatistics
+
+
+class FileRecord(object):
+    """
+    _FileRecord_
+
+    An input or output file from the report.  attrs holds the text of the
+    simple child elements, runs is a list of (run, lumis) tuples where lumis
+    is an array and inputs is a list of (lfn, pfn) tuples.
+    """
+    __slots__ = ["moduleLabel", "attrs", "runs", "inputs"]
+
+    def __init__(self):
+        self.moduleLabel = None
+        self.attrs = {}
+        self.runs = []
+        self.inputs = []
+
+
+class FwkReportRecord(object):
+    """
+    _FwkReportRecord_
+
+    Everything that is read from a framework job report:
+      parameters    - (name, text) for the elements that aren't handled below
+      inputFiles    - FileRecord for each InputFile
+      outputFiles   - FileRecord for each File
+      analysisFiles - (fileName, attributes) for each AnalysisFile
+      errors        - (exitStatus, type, details) for each FrameworkError
+      skippedFiles  - (lfn, pfn) for each SkippedFile
+      fallbackFiles - (lfn, pfn) for each FallbackAttempt
+      skippedEvents - (run, event) for each SkippedEvent
+      performance   - (metric, [(name, value)...]) for each summary in the
+                      PerformanceReport, None if there is no PerformanceReport
+    """
+    __slots__ = ["parameters", "inputFiles", "outputFiles", "analysisFiles",
+                 "errors", "skippedFiles", "fallbackFiles", "skippedEvents",
+                 "performance"]
+
+    def __init__(self):
+        self.parameters = []
+        self.inputFiles = []
+        self.outputFiles = []
+        self.analysisFiles = []
+        self.errors = []
+        self.skippedFiles = []
+        self.fallbackFiles = []
+        self.skippedEvents = []
+        self.performance = None
+
+
+def _str(value):
+    """
+    _str_
+
+    Elements and attributes come back as unicode if they aren't ASCII,
+    keep them as UTF-8 encoded strings like the expat based parser does.
+    """
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return value
+
+
+def _text(elem):
+    """
+    _text_
+
+    The stripped text of an element.  Like the expat based parser only the
+    text after the last child is kept for elements that have children.
+    """
+    if len(elem):
+        text = elem[-1].tail
+    else:
+        text = elem.text
+    if not text:
+        return ""
+    return _str(text).strip()
+
+
+def _attrs(elem):
+    return dict([(str(k), _str(v)) for (k, v) in elem.attrib.items()])
+
+
+def _readFile(elem, withInputs):
+    """
+    _readFile_
+
+    Read a File or InputFile element.
+    """
+    fileRecord = FileRecord()
+    for subelem in elem:
+        tag = subelem.tag
+        if tag == "Runs":
+            for runElem in subelem:
+                if runElem.tag != "Run":
+                    continue
+                runID = runElem.get("ID", None)
+                if runID == None:
+                    continue
+                lumis = array('l', [int(x.get("ID")) for x in runElem if "ID" in x.attrib])
+                fileRecord.runs.append((_str(runID), lumis))
+        elif tag == "Branches":
+            continue
+        elif tag == "Inputs" and withInputs:
+            for inputElem in subelem:
+                data = dict([(x.tag, _text(x)) for x in inputElem])
+                fileRecord.inputs.append((data["LFN"], data["PFN"]))
+        else:
+            fileRecord.attrs[tag] = _text(subelem)
+
+    fileRecord.moduleLabel = fileRecord.attrs["ModuleLabel"]
+    return fileRecord
+
+
+def _readElement(record, elem):
+    """
+    _readElement_
+
+    Add a child element of FrameworkJobReport to the record.
+    """
+    tag = elem.tag
+    if tag == "File":
+        record.outputFiles.append(_readFile(elem, True))
+    elif tag == "InputFile":
+        record.inputFiles.append(_readFile(elem, False))
+    elif tag == "AnalysisFile":
+        fileName = None
+        attrs = {}
+        for subelem in elem:
+            if subelem.tag == "FileName":
+                fileName = _text(subelem)
+            else:
+                attrs[subelem.tag] = _str(subelem.get("Value", None))
+        record.analysisFiles.append((fileName, attrs))
+    elif tag == "PerformanceReport":
+        if record.performance == None:
+            record.performance = []
+        for subelem in elem:
+            metrics = [(_str(x.get("Name")), _str(x.get("Value"))) for x in subelem]
+            record.performance.append((_str(subelem.get("Metric", None)), metrics))
+    elif tag == "FrameworkError":
+        record.errors.append((_str(elem.get("ExitStatus", 8001)),
+                              _str(elem.get("Type", "CMSException")),
+                              _text(elem)))
+    elif tag == "SkippedFile":
+        record.skippedFiles.append((_str(elem.get("Lfn", None)), _str(elem.get("Pfn", None))))
+    elif tag == "FallbackAttempt":
+        record.fallbackFiles.append((_str(elem.get("Lfn", None)), _str(elem.get("Pfn", None))))
+    elif tag == "SkippedEvent":
+        run = elem.get("Run", None)
+        event = elem.get("Event", None)
+        if run != None and event != None:
+            record.skippedEvents.append((_str(run), _str(event)))
+    else:
+        record.parameters.append((str(tag), _text(elem)))
+    return
+
+
+def parseReport(xmlFile):
+    """
+    _parseReport_
+
+    Parse a framework job report XML file into a FwkReportRecord.
+    """
+    record = FwkReportRecord()
+    depth = 0
+    root = None
+    for (event, elem) in iterparse(xmlFile, events = ("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            if root.tag == "FrameworkJobReport":
+                _readElement(record, elem)
+            root.remove(elem)
+
+    return record
+
+
+def recordToReport(record, report):
+    """
+    _recordToReport_
+
+    Insert the information from a FwkReportRecord into a Report instance.
+    """
+    for fileRecord in record.outputFiles:
+        report.addOutputModule(fileRecord.moduleLabel)
+        fileRef = report.addOutputFile(fileRecord.moduleLabel)
+        _addRunsToFile(fileRef, fileRecord)
+        for (lfn, pfn) in fileRecord.inputs:
+            Report.addInputToFile(fileRef, lfn, pfn)
+        fileAttrs = fileRecord.attrs
+        Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                   pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                   module_label = fileAttrs["ModuleLabel"],
+                                   guid = fileAttrs["GUID"],
+                                   ouput_module_class = fileAttrs["OutputModuleClass"],
+                                   events = int(fileAttrs["TotalEvents"]),
+                                   branch_hash = fileAttrs["BranchHash"])
+
+    for fileRecord in record.inputFiles:
+        report.addInputSource(fileRecord.moduleLabel)
+        fileRef = report.addInputFile(fileRecord.moduleLabel)
+        _addRunsToFile(fileRef, fileRecord)
+        fileAttrs = fileRecord.attrs
+        Report.addAttributesToFile(fileRef, lfn = fileAttrs["LFN"],
+                                   pfn = fileAttrs["PFN"], catalog = fileAttrs["Catalog"],
+                                   module_label = fileAttrs["ModuleLabel"],
+                                   guid = fileAttrs["GUID"], input_type = fileAttrs["InputType"],
+                                   input_source_class = fileAttrs["InputSourceClass"],
+                                   events = int(fileAttrs["EventsRead"]))
+
+    for (fileName, attrs) in record.analysisFiles:
+        report.addAnalysisFile(fileName, **attrs)
+
+    for (exitStatus, errorType, details) in record.errors:
+        # There should be atmost one step in the report at this point in time.
+        if len(report.listSteps()) == 0:
+            report.addError("unknownStep", exitStatus, errorType, details)
+        else:
+            report.addError(report.listSteps()[0], exitStatus, errorType, details)
+
+    for (lfn, pfn) in record.skippedFiles:
+        report.addSkippedFile(lfn, pfn)
+    for (lfn, pfn) in record.fallbackFiles:
+        report.addFallbackFile(lfn, pfn)
+    for (run, event) in record.skippedEvents:
+        report.addSkippedEvent(run, event)
+
+    if record.performance != None:
+        _addPerformance(report.report.performance, record.performance)
+
+    for (name, text) in record.parameters:
+        setattr(report.report.parameters, name, text)
+    return
+
+
+def _addRunsToFile(fileRef, fileRecord):
+    """
+    _addRunsToFile_
+
+    Add the run and lumi information of a file record to a file section.
+    """
+    for (run, lumis) in fileRecord.runs:
+        setattr(fileRef.runs, str(run), lumis.tolist())
+    return
+
+
+def _addPerformance(perfRep, performance):
+    """
+    _addPerformance_
+
+    Add the performance summaries to the performance section of the report.
+    """
+    perfRep.section_("summaries")
+    perfRep.section_("cpu")
+    perfRep.section_("memory")
+    perfRep.section_("storage")
+    for (metric, values) in performance:
+        if metric == "Timing":
+            for (name, value) in values:
+                setattr(perfRep.cpu, name, value)
+        elif metric == "SystemMemory" or metric == "ApplicationMemory":
+            for (name, value) in values:
+                if name == 'LargestRssEvent-h-PSS':
+                    setattr(perfRep.memory, 'PeakValuePss', value)
+                elif name in goodMemoryStatistics:
+                    setattr(perfRep.memory, name, value)
+        elif metric == "StorageStatistics":
+            addStorageStatistics(perfRep.storage, values)
+        elif metric != None:
+            if not hasattr(perfRep.summaries, metric):
+                perfRep.summaries.section_(metric)
+            summRep = getattr(perfRep.summaries, metric)
+            for (name, value) in values:
+                setattr(summRep, name, value)
+    return
+
+
+def xmlToJobReport(reportInstance, xmlFile):
+    """
+    _xmlToJobReport_
+
+    parse the XML file and insert the information into the
+    Report instance provided
+
+    """
+    recordToReport(parseReport(xmlFile), reportInstance)
+    return
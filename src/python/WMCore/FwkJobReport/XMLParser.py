@@ -348,6 +348,9 @@ def perfCPUHandler():
         for subnode in node.children:
             setattr(report, subnode.attrs['Name'], subnode.attrs['Value'])
 
+# Make a list of memory performance info we actually want
+goodMemoryStatistics = ['PeakValueRss', 'PeakValueVsize', 'LargestRssEvent-h-PSS']
+
 @coroutine
 def perfMemHandler():
     """
@@ -355,13 +358,10 @@ def perfMemHandler():
 
     Pack memory performance reports into the report
     """
-    # Make a list of performance info we actually want
-    goodStatistics = ['PeakValueRss', 'PeakValueVsize', 'LargestRssEvent-h-PSS']
-
     while True:
         report, node = (yield)
         for prop in node.children:
-            if prop.attrs['Name'] in goodStatistics:
+            if prop.attrs['Name'] in goodMemoryStatistics:
                 if prop.attrs['Name'] == 'LargestRssEvent-h-PSS':
                     # need to remove - chars from name as it buggers up downtstream code
                     setattr(report, 'PeakValuePss', prop.attrs['Value'])
@@ -374,6 +374,21 @@ def checkRegEx(regexp, candidate):
     return True
 
 
+# Make a list of storage statistics we actually want
+goodStorageStatistics = ['Timing-([a-z]{4})-read(v?)-totalMegabytes',
+                         'Timing-([a-z]{4})-write(v?)-totalMegabytes',
+                         'Timing-([a-z]{4})-read(v?)-totalMsecs',
+                         'Timing-([a-z]{4})-read(v?)-numOperations',
+                         'Timing-([a-z]{4})-write(v?)-numOperations',
+                         'Timing-([a-z]{4})-read(v?)-maxMsecs',
+                         'Timing-tstoragefile-readActual-numOperations',
+                         'Timing-tstoragefile-read-numOperations',
+                         'Timing-tstoragefile-readViaCache-numSuccessfulOperations',
+                         'Timing-tstoragefile-read-numOperations',
+                         'Timing-tstoragefile-read-totalMsecs',
+                         'Timing-tstoragefile-write-totalMsecs',
+                         ]
+
 @coroutine
 def perfStoreHandler():
     """
@@ -381,105 +396,91 @@ def perfStoreHandler():
 
     Handle the information from the Storage report
     """
-
-    # Make a list of performance info we actually want
-    goodStatistics = ['Timing-([a-z]{4})-read(v?)-totalMegabytes',
-                      'Timing-([a-z]{4})-write(v?)-totalMegabytes',
-                      'Timing-([a-z]{4})-read(v?)-totalMsecs',
-                      'Timing-([a-z]{4})-read(v?)-numOperations',
-                      'Timing-([a-z]{4})-write(v?)-numOperations',
-                      'Timing-([a-z]{4})-read(v?)-maxMsecs',
-                      'Timing-tstoragefile-readActual-numOperations',
-                      'Timing-tstoragefile-read-numOperations',
-                      'Timing-tstoragefile-readViaCache-numSuccessfulOperations',
-                      'Timing-tstoragefile-read-numOperations',
-                      'Timing-tstoragefile-read-totalMsecs',
-                      'Timing-tstoragefile-write-totalMsecs',
-                      ]
-
     while True:
         report, node = (yield)
-        logging.debug("Preparing to parse storage statistics")
-        storageValues = {}
-        for prop in node.children:
-            name = prop.attrs['Name']
-            for statName in goodStatistics:
-                if checkRegEx(statName, name):
-                    storageValues[name] = float(prop.attrs['Value'])
-                    #setattr(report, name, prop.attrs['Value'])
-
-        writeMethod = None
-        readMethod  = None
-        # Figure out read method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-read(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    readMethod = key.split('-')[1]
-                    break
-        # Figure out the write method
-        for key in storageValues.keys():
-            if checkRegEx('Timing-([a-z]{4})-write(v?)-numOperations', key):
-                if storageValues[key] != 0.0:
-                    # This is the reader
-                    writeMethod = key.split('-')[1]
-                    break
-
-        # Then assemble the information
-        # Calculate the values
-        logging.debug("ReadMethod: %s" % readMethod)
-        logging.debug("WriteMethod: %s" % writeMethod)
-        try:
-            readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
-            readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
-                           + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
-            totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
-                          + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
-            readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
-                              storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
-            readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
-                          storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
-            readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
-            writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
-            writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
-                          + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
-
-            if readMSecs > 0:
-                readMBSec = readTotalMB/readMSecs
-            else:
-                readMBSec = 0
-            if totalReads > 0:
-                readAveragekB = 1024* readTotalMB/totalReads
-            else:
-                readAveragekB = 0
-
-
-            # Attach them to the report
-            setattr(report, 'readTotalMB', readTotalMB)
-            setattr(report, 'readMBSec', readMBSec)
-            setattr(report, 'readAveragekB', readAveragekB)
-            setattr(report, 'readMaxMSec', readMaxMSec)
-            setattr(report, 'readPercentageOps', readPercOps)
-            setattr(report, 'readTotalSecs', readTotalT)
-            setattr(report, 'readNumOps', readNOps)
-            setattr(report, 'writeTotalSecs', writeTime)
-            setattr(report, 'writeTotalMB', writeTotMB)
-            setattr(report, 'readCachePercentageOps', readCachOps)
-        except ZeroDivisionError:
-            logging.error("Tried to divide by zero doing storage statistics report parsing.")
-            logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
-            logging.error("Not adding any storage performance info to report.")
-
-
-
-
-
+        addStorageStatistics(report, [(prop.attrs['Name'], prop.attrs['Value'])
+                                      for prop in node.children])
 
+def addStorageStatistics(report, properties):
+    """
+    _addStorageStatistics_
 
+    Summarize the (name, value) pairs of the StorageStatistics performance
+    report and attach the results to the storage section of the report.
+    """
+    logging.debug("Preparing to parse storage statistics")
+    storageValues = {}
+    for (name, value) in properties:
+        for statName in goodStorageStatistics:
+            if checkRegEx(statName, name):
+                storageValues[name] = float(value)
+
+    writeMethod = None
+    readMethod  = None
+    # Figure out read method
+    for key in storageValues.keys():
+        if checkRegEx('Timing-([a-z]{4})-read(v?)-numOperations', key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                readMethod = key.split('-')[1]
+                break
+    # Figure out the write method
+    for key in storageValues.keys():
+        if checkRegEx('Timing-([a-z]{4})-write(v?)-numOperations', key):
+            if storageValues[key] != 0.0:
+                # This is the reader
+                writeMethod = key.split('-')[1]
+                break
+
+    # Then assemble the information
+    # Calculate the values
+    logging.debug("ReadMethod: %s" % readMethod)
+    logging.debug("WriteMethod: %s" % writeMethod)
+    try:
+        readTotalMB = storageValues.get("Timing-%s-read-totalMegabytes" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-totalMegabytes" % readMethod, 0)
+        readMSecs   = (storageValues.get("Timing-%s-read-totalMsecs" % readMethod, 0)\
+                       + storageValues.get("Timing-%s-readv-totalMsecs" % readMethod, 0))
+        totalReads  = storageValues.get("Timing-%s-read-numOperations" % readMethod, 0) \
+                      + storageValues.get("Timing-%s-readv-numOperations" % readMethod, 0)
+        readMaxMSec = max(storageValues.get("Timing-%s-read-maxMsecs" % readMethod, 0),
+                          storageValues.get("Timing-%s-readv-maxMsecs" % readMethod, 0))
+        readPercOps = storageValues.get("Timing-tstoragefile-readActual-numOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readCachOps = storageValues.get("Timing-tstoragefile-readViaCache-numSuccessfulOperations", 0)/\
+                      storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        readTotalT  = 1000 * storageValues.get("Timing-tstoragefile-read-totalMSecs", 0)
+        readNOps    = storageValues.get("Timing-tstoragefile-read-numOperations", 0)
+        writeTime   = storageValues.get("Timing-tstoragefile-write-totalMsecs", 0) * 1000
+        writeTotMB  = storageValues.get("Timing-%s-write-totalMegabytes" % writeMethod, 0) \
+                      + storageValues.get("Timing-%s-writev-totalMegabytes" % writeMethod, 0)
+
+        if readMSecs > 0:
+            readMBSec = readTotalMB/readMSecs
+        else:
+            readMBSec = 0
+        if totalReads > 0:
+            readAveragekB = 1024* readTotalMB/totalReads
+        else:
+            readAveragekB = 0
+
+
+        # Attach them to the report
+        setattr(report, 'readTotalMB', readTotalMB)
+        setattr(report, 'readMBSec', readMBSec)
+        setattr(report, 'readAveragekB', readAveragekB)
+        setattr(report, 'readMaxMSec', readMaxMSec)
+        setattr(report, 'readPercentageOps', readPercOps)
+        setattr(report, 'readTotalSecs', readTotalT)
+        setattr(report, 'readNumOps', readNOps)
+        setattr(report, 'writeTotalSecs', writeTime)
+        setattr(report, 'writeTotalMB', writeTotMB)
+        setattr(report, 'readCachePercentageOps', readCachOps)
+    except ZeroDivisionError:
+        logging.error("Tried to divide by zero doing storage statistics report parsing.")
+        logging.error("Either you aren't reading and writing data, or you aren't reporting it.")
+        logging.error("Not adding any storage performance info to report.")
+    return
 
 
 def xmlToJobReport(reportInstance, xmlFile):
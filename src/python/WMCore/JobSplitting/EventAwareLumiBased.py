@@ -19,7 +19,7 @@ import math
 
 from WMCore.DataStructs.Run         import Run
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.JobSplitting.LumiBased  import isGoodLumi, isGoodRun
+from WMCore.JobSplitting.LumiBased  import LumiWhitelist
 from WMCore.WMBS.File               import File
 from WMCore.WMSpec.WMTask           import buildLumiMask
 
@@ -92,6 +92,8 @@ class EventAwareLumiBased(JobFactory):
                     logging.error(msg)
                     return
 
+        lumiWhitelist = LumiWhitelist(goodRunList)
+
         lDict = self.sortByLocation()
         locationDict = {}
 
@@ -184,7 +186,7 @@ class EventAwareLumiBased(JobFactory):
                     lumisPerJob = max(lumisInJob + lumisAllowed, 1)
 
                 for run in f['runs']:
-                    if not isGoodRun(goodRunList = goodRunList, run = run.run):
+                    if not lumiWhitelist.isGoodRun(run.run):
                         # Then skip this one
                         continue
                     if len(runWhitelist) > 0 and not run.run in runWhitelist:
@@ -197,8 +199,9 @@ class EventAwareLumiBased(JobFactory):
                         stopJob = True
 
                     # Now loop over the lumis
+                    goodLumis = lumiWhitelist.goodLumis(run.run, run.lumis)
                     for lumi in run:
-                        if not isGoodLumi(goodRunList, run = run.run, lumi = lumi):
+                        if not lumi in goodLumis:
                             # Kill the chain of good lumis
                             # Skip this lumi
                             if firstLumi != None and firstLumi != lumi:
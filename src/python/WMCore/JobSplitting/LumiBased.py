@@ -16,6 +16,7 @@ import threading
 import traceback
 
 from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.LumiIntervals import RunLumiIntervals
 
 from WMCore.JobSplitting.JobFactory import JobFactory
 from WMCore.WMBS.File               import File
@@ -53,12 +54,61 @@ def isGoodRun(goodRunList, run):
     if goodRunList == None or goodRunList == {}:
         return True
 
-    if str(run) in goodRunList.keys():
+    if str(run) in goodRunList:
         # @e can find a run
         return True
 
     return False
 
+class LumiWhitelist(object):
+    """
+    _LumiWhitelist_
+
+    Precompiled version of a goodRunList, i.e. {'run': [[firstLumi, lastLumi], ...]},
+    built once per splitting call.  The lumi ranges of each run are sorted and
+    merged so that all the lumis of a run in a file can be checked at once.
+    An empty or missing goodRunList accepts everything.
+    """
+    def __init__(self, goodRunList):
+        self.acceptAll = not goodRunList
+        runRanges = {}
+        for run, lumiRanges in (goodRunList or {}).items():
+            validRanges = []
+            for lumiRange in lumiRanges:
+                # For each run range, which should have 2 elements
+                if not len(lumiRange) == 2:
+                    logging.error("Invalid run range!  Failing the lumis in it!")
+                    continue
+                validRanges.append(lumiRange)
+            runRanges[int(run)] = validRanges
+        self.intervals = RunLumiIntervals(runRanges)
+
+    def isGoodRun(self, run):
+        """
+        _isGoodRun_
+
+        Tell if this is a good run
+        """
+        return self.acceptAll or int(run) in self.intervals.runRanges
+
+    def isGoodLumi(self, run, lumi):
+        """
+        _isGoodLumi_
+
+        Tell if this is a good run/lumi combination
+        """
+        return self.acceptAll or self.intervals.contains(int(run), lumi)
+
+    def goodLumis(self, run, lumis):
+        """
+        _goodLumis_
+
+        Return the set of lumis of a run that are good
+        """
+        if self.acceptAll:
+            return set(lumis)
+        return set(self.intervals.filterLumis(int(run), lumis))
+
 class LumiChecker:
     """ Simple utility class that helps correcting dataset that have lumis split across jobs:
 
@@ -202,6 +252,8 @@ class LumiBased(JobFactory):
                     logging.error(msg)
                     return
 
+        lumiWhitelist = LumiWhitelist(goodRunList)
+
         lDict = self.sortByLocation()
         locationDict = {}
 
@@ -271,7 +323,7 @@ class LumiBased(JobFactory):
                     stopJob = True
 
                 for run in f['runs']:
-                    if not isGoodRun(goodRunList = goodRunList, run = run.run):
+                    if not lumiWhitelist.isGoodRun(run.run):
                         # Then skip this one
                         continue
                     if len(runWhitelist) > 0 and not run.run in runWhitelist:
@@ -284,8 +336,9 @@ class LumiBased(JobFactory):
                         stopJob = True
 
                     # Now loop over the lumis
+                    goodLumis = lumiWhitelist.goodLumis(run.run, run.lumis)
                     for lumi in run:
-                        if (not isGoodLumi(goodRunList, run = run.run, lumi = lumi)
+                        if (not lumi in goodLumis
                                 or self.lumiChecker.isSplitLumi(run.run, lumi, f)): # splitLumi checks if the lumi is split across jobs
                             # Kill the chain of good lumis
                             # Skip this lumi
@@ -11,7 +11,8 @@ import traceback
 import re
 
 from WMCore.Database.CMSCouch import CouchServer
-from WMCore.Database.CMSCouch import CouchNotFoundError, CouchError
+from WMCore.Database.CMSCouch import CouchNotFoundError
+from WMCore.Database.CouchBulkCommitter import BulkCommitter, overwriteConflicts
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.JobStateMachine.Transitions import Transitions
 from WMCore.Services.Dashboard.DashboardReporter import DashboardReporter
@@ -21,41 +22,59 @@ from WMCore.JobStateMachine.SummaryDB import updateSummaryDB
 
 CMSSTEP = re.compile(r'^cmsRun[0-9]+$')
 
-def discardConflictingDocument(couchDbInstance, data, result):
+def getJobLocation(job, newstate):
     """
-    _discardConflictingDocument_
+    _getJobLocation_
 
-    This should be passed to the queue and commit calls of CMSCouch
-    in order to tell it what to do with conflicting documents.
-    In this case we trash the old one and replace with what we were
-    trying to commit, this is available in the data argument.
-    And the result tells us the id of the conflicting document
+    The location recorded with a state transition, only jobs going to
+    executing are recorded at their site.
     """
+    if newstate == "executing" and job.get("site_cms_name", None):
+        return job["site_cms_name"]
+    return "Agent"
 
-    conflictingId = result["id"]
+def getMonitorState(newstate):
+    """
+    _getMonitorState_
 
-    try:
-        if not couchDbInstance.documentExists(conflictingId):
-            # It doesn't exist, this is odd
-            # Don't try again
-            return result
+    Map retrydone state to jobfailed state for monitoring.
+    """
+    if newstate == "retrydone":
+        return "jobfailed"
+    return newstate
 
-        # Get the revision to override
-        originalDocRev = couchDbInstance.document(conflictingId)["_rev"]
+def addStateTransition(docID, doc, transition):
+    """
+    _addStateTransition_
+
+    Add a state transition to a job document, this is what the
+    stateTransition update handler in JobDump does.
+    """
+    if doc == None:
+        doc = {"_id": docID, "states": {}}
 
-        # Look for the data to be commited
-        retval = result
-        for doc in data["docs"]:
-            if doc["_id"] == conflictingId:
-                doc["_rev"] = originalDocRev
-                retval = couchDbInstance.commitOne(doc)
-                break
+    maxKey = 0
+    for key in doc["states"].keys():
+        maxKey = max(maxKey, int(key))
+    doc["states"][str(maxKey + 1)] = transition
+    return doc
+
+def addSummaryTransition(docID, doc, transition):
+    """
+    _addSummaryTransition_
+
+    Update the state and state history of a job summary, this is what the
+    jobSummaryState and jobStateTransition update handlers in WMStatsAgent
+    do.  Missing job summaries are skipped.
+    """
+    if doc == None:
+        logging.debug("No job summary for job %s, not updating it" % docID)
+        return None
 
-        return retval
-    except CouchError as ex:
-        logging.error("Couldn't resolve conflict when updating document with id %s" % result["id"])
-        logging.error("Error: %s" % str(ex))
-        return result
+    doc["state"] = transition["newstate"]
+    doc["timestamp"] = transition["timestamp"]
+    doc.setdefault("state_history", []).append(transition)
+    return doc
 
 
 class ChangeState(WMObject, WMConnectionBase):
@@ -89,6 +108,12 @@ class ChangeState(WMObject, WMConnectionBase):
         self.updateLocationDAO = self.daofactory("Jobs.UpdateLocation")
 
         self.maxUploadedInputFiles = getattr(self.config.JobStateMachine, 'maxFWJRInputFiles', 1000)
+
+        # Record state transitions of existing documents with _all_docs and
+        # _bulk_docs instead of one update handler request per job
+        self.bulkTransitions = getattr(self.config.JobStateMachine, 'bulkTransitions', False)
+        self.bulkTransitionSize = getattr(self.config.JobStateMachine, 'bulkTransitionSize', 1000)
+        self.bulkTransitionRetries = getattr(self.config.JobStateMachine, 'bulkTransitionRetries', 3)
         return
 
     def _connectDatabases(self):
@@ -98,6 +123,7 @@ class ChangeState(WMObject, WMConnectionBase):
         if not hasattr(self, 'jobsdatabase') or self.jobsdatabase is None:
             try:
                 self.jobsdatabase = self.couchdb.connectDatabase("%s/jobs" % self.dbname, size = 250)
+                self.jobsCommitter = self._makeCommitter(self.jobsdatabase, overwriteConflicts)
             except Exception as ex:
                 logging.error("Error connecting to couch db '%s/jobs': %s" % (self.dbname, str(ex)))
                 self.jobsdatabase = None
@@ -106,6 +132,7 @@ class ChangeState(WMObject, WMConnectionBase):
         if not hasattr(self, 'fwjrdatabase') or self.fwjrdatabase is None:
             try:
                 self.fwjrdatabase = self.couchdb.connectDatabase("%s/fwjrs" % self.dbname, size = 250)
+                self.fwjrCommitter = self._makeCommitter(self.fwjrdatabase, overwriteConflicts)
             except Exception as ex:
                 logging.error("Error connecting to couch db '%s/fwjrs': %s" % (self.dbname, str(ex)))
                 self.fwjrdatabase = None
@@ -115,6 +142,7 @@ class ChangeState(WMObject, WMConnectionBase):
             dbname = getattr(self.config.JobStateMachine, 'jobSummaryDBName')
             try:
                 self.jsumdatabase = self.couchdb.connectDatabase(dbname, size = 250 )
+                self.jsumCommitter = self._makeCommitter(self.jsumdatabase)
             except Exception as ex:
                 logging.error("Error connecting to couch db '%s': %s" % (dbname, str(ex)))
                 self.jsumdatabase = None
@@ -130,6 +158,17 @@ class ChangeState(WMObject, WMConnectionBase):
                 return False
 
         return True
+
+    def _makeCommitter(self, database, resolveConflicts = None):
+        """
+        _makeCommitter_
+
+        Buffer the documents written to a database, they are posted in batches
+        of at most 250 documents or maxCommitBytes of JSON.
+        """
+        maxBytes = getattr(self.config.JobStateMachine, 'maxCommitBytes', 8 * 1024 * 1024)
+        return BulkCommitter(database, maxDocs = 250, maxBytes = maxBytes,
+                             resolveConflicts = resolveConflicts)
     
     def propagate(self, jobs, newstate, oldstate, updatesummary = False):
         """
@@ -198,19 +237,15 @@ class ChangeState(WMObject, WMConnectionBase):
         timestamp = int(time.time())
         couchRecordsToUpdate = []
 
-        for job in jobs:
-            couchDocID = job.get("couch_record", None)
+        if newstate == "new":
+            oldstate = "none"
 
-            if newstate == "new":
-                oldstate = "none"
+        if self.bulkTransitions:
+            self.recordTransitionsInBulk(jobs, newstate, oldstate, timestamp, updatesummary)
 
-            if job.get("site_cms_name", None):
-                if newstate == "executing":
-                    jobLocation = job["site_cms_name"]
-                else:
-                    jobLocation = "Agent"
-            else:
-                jobLocation = "Agent"
+        for job in jobs:
+            couchDocID = job.get("couch_record", None)
+            jobLocation = getJobLocation(job, newstate)
 
             if couchDocID == None:
                 jobDocument = {}
@@ -259,8 +294,8 @@ class ChangeState(WMObject, WMConnectionBase):
 
                 couchRecordsToUpdate.append({"jobid": job["id"],
                                              "couchid": jobDocument["_id"]})
-                self.jobsdatabase.queue(jobDocument, callback = discardConflictingDocument)
-            else:
+                self.jobsCommitter.queue(jobDocument)
+            elif not self.bulkTransitions:
                 # We send a PUT request to the stateTransition update handler.
                 # Couch expects the parameters to be passed as arguments to in
                 # the URI while the Requests class will only encode arguments
@@ -276,14 +311,10 @@ class ChangeState(WMObject, WMConnectionBase):
 
             # updating the status of the summary doc only when it is explicitely requested
             # doc is already in couch
-            if updatesummary:
+            if updatesummary and not self.bulkTransitions:
                 jobSummaryId = job["name"]
                 updateUri = "/" + self.jsumdatabase.name + "/_design/WMStatsAgent/_update/jobSummaryState/" + jobSummaryId
-                # map retrydone state to jobfailed state for monitoring
-                if newstate == "retrydone":
-                    monitorState = "jobfailed"
-                else:
-                    monitorState = newstate
+                monitorState = getMonitorState(newstate)
                 updateUri += "?newstate=%s&timestamp=%s" % (monitorState, timestamp)
                 self.jsumdatabase.makeRequest(uri = updateUri, type = "PUT", decode = False)
                 logging.debug("Updated job summary status for job %s" % jobSummaryId)
@@ -316,7 +347,7 @@ class ChangeState(WMObject, WMConnectionBase):
                                 "retrycount": job["retry_count"],
                                 "fwjr": job["fwjr"].__to_json__(None),
                                 "type": "fwjr"}
-                self.fwjrdatabase.queue(fwjrDocument, timestamp = True, callback = discardConflictingDocument)
+                self.fwjrCommitter.queue(fwjrDocument, timestamp = True)
                 updateSummaryDB(self.statsumdatabase, job)
 
                 #TODO: can add config switch to swich on and off
@@ -398,16 +429,90 @@ class ChangeState(WMObject, WMConnectionBase):
                                 jobSummary[prop] = jobSummary[prop] if jobSummary[prop] else currentJobDoc.get(prop, [])
                         except CouchNotFoundError:
                             pass
-                    self.jsumdatabase.queue(jobSummary, timestamp = True)
+                    self.jsumCommitter.queue(jobSummary, timestamp = True)
 
         if len(couchRecordsToUpdate) > 0:
             self.setCouchDAO.execute(bulkList = couchRecordsToUpdate,
                                      conn = self.getDBConn(),
                                      transaction = self.existingTransaction())
 
-        self.jobsdatabase.commit(callback = discardConflictingDocument)
-        self.fwjrdatabase.commit(callback = discardConflictingDocument)
-        self.jsumdatabase.commit()
+        self.jobsCommitter.flush()
+        self.fwjrCommitter.flush()
+        self.jsumCommitter.flush()
+        return
+
+    def recordTransitionsInBulk(self, jobs, newstate, oldstate, timestamp, updatesummary = False):
+        """
+        _recordTransitionsInBulk_
+
+        Append the state transition to the couch documents of the jobs that
+        already have one, and to their job summaries if updatesummary is set.
+        This does the same as the stateTransition, jobSummaryState and
+        jobStateTransition update handlers but with one _all_docs and one
+        _bulk_docs request per chunk of documents.
+        """
+        jobTransitions = {}
+        summaryTransitions = {}
+        monitorState = getMonitorState(newstate)
+
+        for job in jobs:
+            if job.get("couch_record", None) != None:
+                jobTransitions[job["couch_record"]] = {"oldstate": oldstate,
+                                                       "newstate": newstate,
+                                                       "location": getJobLocation(job, newstate),
+                                                       "timestamp": timestamp}
+            if updatesummary:
+                summaryTransitions[job["name"]] = {"oldstate": oldstate,
+                                                   "newstate": monitorState,
+                                                   "location": job["location"],
+                                                   "timestamp": timestamp}
+
+        self.bulkUpdateDocuments(self.jobsdatabase, jobTransitions, addStateTransition)
+        self.bulkUpdateDocuments(self.jsumdatabase, summaryTransitions, addSummaryTransition)
+        return
+
+    def bulkUpdateDocuments(self, database, updates, updateFunc):
+        """
+        _bulkUpdateDocuments_
+
+        Apply updates to documents in chunks.  updates is a dictionary of
+        document ID to the update for the document, for every chunk the
+        current documents are fetched with _all_docs, updateFunc(docID, doc,
+        update) is called for each of them and the result is written back with
+        _bulk_docs.  updateFunc gets None for documents that don't exist and
+        can return None to skip a document.  Documents that conflict because
+        they were modified in the meantime are fetched and updated again.
+        """
+        docIDs = updates.keys()
+        for start in range(0, len(docIDs), self.bulkTransitionSize):
+            pending = docIDs[start:start + self.bulkTransitionSize]
+
+            for attempt in range(self.bulkTransitionRetries + 1):
+                rows = database.allDocs(options = {"include_docs": True},
+                                        keys = pending)["rows"]
+                docs = []
+                for row in rows:
+                    doc = updateFunc(row["key"], row.get("doc", None), updates[row["key"]])
+                    if doc != None:
+                        docs.append(doc)
+                if len(docs) == 0:
+                    break
+
+                results = database.post("/%s/_bulk_docs/" % database.name, {"docs": docs})
+                pending = []
+                for result in results:
+                    if result.get("error", None) == "conflict":
+                        pending.append(result["id"])
+                    elif "error" in result:
+                        logging.error("Error updating document %s in %s: %s" % (result["id"],
+                                                                              database.name,
+                                                                              result.get("reason", result["error"])))
+                if len(pending) == 0:
+                    break
+                logging.debug("Retrying %i conflicting documents in %s" % (len(pending), database.name))
+            else:
+                logging.error("Could not update %i documents in %s because of conflicts: %s" % \
+                              (len(pending), database.name, pending))
         return
 
     def persist(self, jobs, newstate, oldstate):
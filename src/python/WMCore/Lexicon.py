@@ -237,6 +237,23 @@ def hnName(candidate):
     return check(validName, candidate)
 
 
+LFN_RE = [
+    '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root',
+    '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root',
+    '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s/%(counter)s/%(root)s' % lfnParts,
+    '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts,
+    # tier0
+    '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts,
+    # old style tier0
+    '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts,
+    '/store/mc/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root',
+    '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}',
+    #This is for future lhe LFN structure. Need to be tested.
+    '/store/lhe/%(primDS)s/%(secondary)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts,
+    '/store/results/%(physics_group)s/%(primDS)s/%(secondary)s/%(primDS)s/%(tier)s/%(secondary)s/%(counter)s/%(root)s' % lfnParts,
+    "%s/%s" % (STORE_RESULTS_LFN, '%(counter)s/%(root)s' % lfnParts)
+    ]
+
 def lfn(candidate):
     """
     Should be of the following form:
@@ -249,105 +266,23 @@ def lfn(candidate):
 
     Add for LHE files: /data/lhe/...
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}/([0-9]+)/([a-zA-Z0-9\-_]+).root'
-    regexp3 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s/%(counter)s/%(root)s' % lfnParts
-    regexp4 = '/store/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/(%(subdir)s/)+%(root)s' % lfnParts
-
-    oldStyleTier0LFN = '/store/data/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s/%(root)s' % lfnParts
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s(/%(counter)s)?/%(root)s' % lfnParts
-
-    storeMcLFN = '/store/mc/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)(/([a-zA-Z0-9\-_]+))*/([a-zA-Z0-9\-_]+).root'
-
-    storeResults2LFN = '/store/results/%(physics_group)s/%(primDS)s/%(secondary)s/%(primDS)s/%(tier)s/%(secondary)s/%(counter)s/%(root)s' % lfnParts
-
-    storeResultRootPart = '%(counter)s/%(root)s' % lfnParts
-    storeResultsLFN = "%s/%s" % (STORE_RESULTS_LFN, storeResultRootPart)
-
-    lheLFN1 = '/store/lhe/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}'
-    #This is for future lhe LFN structure. Need to be tested.
-    lheLFN2= '/store/lhe/%(primDS)s/%(secondary)s/([0-9]+)/([a-zA-Z0-9\-_]+).lhe(.xz){0,1}' % lfnParts
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp4, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(oldStyleTier0LFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(storeMcLFN, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(lheLFN1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(lheLFN2, candidate)
-    except AssertionError:
-        pass
+    return checkAny(LFN_RE, candidate)
 
-    try:
-        return check(storeResults2LFN, candidate)
-    except AssertionError:
-        return check(storeResultsLFN, candidate)
+LFN_BASE_RE = [
+    '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)',
+    '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}',
+    '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s' % lfnParts,
+    # tier0
+    '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts,
+    STORE_RESULTS_LFN
+    ]
 
 def lfnBase(candidate):
     """
     As lfn above, but for doing the lfnBase
     i.e., for use in spec generation and parsing
     """
-    regexp1 = '/([a-z]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)'
-    regexp2 = '/([a-z]+)/([a-z0-9]+)/([a-z0-9]+)/([a-zA-Z0-9\-_]+)/([a-zA-Z0-9\-_]+)/([A-Z\-_]+)/([a-zA-Z0-9\-_]+)((/[0-9]+){3}){0,1}'
-    regexp3 = '/(store)/(temp/)*(user|group)/(%(hnName)s|%(physics_group)s)/%(primDS)s/%(secondary)s/%(version)s' % lfnParts
-
-    tier0LFN = '/store/(backfill/[0-9]/){0,1}(t0temp/|unmerged/){0,1}(data|express|hidata)/%(era)s/%(primDS)s/%(tier)s/%(version)s/%(counter)s/%(counter)s/%(counter)s' % lfnParts
-
-    try:
-        return check(regexp1, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp2, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(regexp3, candidate)
-    except AssertionError:
-        pass
-
-    try:
-        return check(tier0LFN, candidate)
-    except AssertionError:
-        return check(STORE_RESULTS_LFN, candidate)
+    return checkAny(LFN_BASE_RE, candidate)
 
 def userLfn(candidate):
     """
@@ -388,14 +323,59 @@ def validateUrl(candidate):
     regex_url = r'%s(%s|%s|%s|%s)%s%s' % (protocol, domain, localhost, ipv4, ipv6, port, path)
     return check(regex_url, candidate)
 
+_compiledRegexps = {}
+
+def compiledRegexp(regexp):
+    """
+    _compiledRegexp_
+
+    Return the compiled regexp from the registry, the re module only caches
+    100 patterns and drops them all once it's full.
+    """
+    compiled = _compiledRegexps.get(regexp, None)
+    if compiled == None:
+        compiled = re.compile(regexp)
+        _compiledRegexps[regexp] = compiled
+    return compiled
+
 def check(regexp, candidate, maxLength = None):
     if maxLength != None:
         assert len(candidate) <= maxLength, \
             "%s is longer then max length (%s) allowed" % (candidate, maxLength)
-    assert re.compile(regexp).match(candidate) != None , \
+    assert compiledRegexp(regexp).match(candidate) != None , \
               "'%s' does not match regular expression %s" % (candidate, regexp)
     return True
 
+def checkAny(regexps, candidate):
+    """
+    _checkAny_
+
+    Check the candidate against each regexp in turn until one matches,
+    failing like check() on the last one if none does.
+    """
+    for regexp in regexps[:-1]:
+        if compiledRegexp(regexp).match(candidate) != None:
+            return True
+    return check(regexps[-1], candidate)
+
+def validateMany(kind, candidates):
+    """
+    _validateMany_
+
+    Validate many candidates with the validator registered for kind in
+    VALIDATORS, i.e. the function of this module with that name.  Returns
+    a dictionary of the error messages of the invalid candidates, keyed by
+    candidate.
+    """
+    validator = VALIDATORS[kind]
+    failures = {}
+    for candidate in candidates:
+        try:
+            validator(candidate)
+        except AssertionError as ex:
+            failures[candidate] = str(ex)
+    return failures
+
 
 def parseLFN(candidate):
     """
@@ -582,3 +562,13 @@ def slicedIterator(sourceList, sliceSize):
         end = start + sliceSize
         yield sourceList[start: end]
         start = end
+
+VALIDATORS = {}
+for _name in ['DBSUser', 'searchblock', 'searchdataset', 'searchstr', 'namestr',
+              'sitetier', 'jobrange', 'cmsname', 'countrycode', 'block', 'identifier',
+              'globalTag', 'dataset', 'procdataset', 'publishdatasetname',
+              'userprocdataset', 'procversion', 'procstring', 'acqname', 'primdataset',
+              'hnName', 'lfn', 'lfnBase', 'userLfn', 'userLfnBase', 'cmsswversion',
+              'couchurl', 'requestName', 'validateUrl', 'primaryDatasetType']:
+    VALIDATORS[_name] = globals()[_name]
+del _name
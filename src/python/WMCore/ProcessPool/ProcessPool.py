@@ -15,6 +15,10 @@ import os
 import threading
 import traceback
 import cPickle
+import struct
+import tempfile
+import time
+from collections import deque
 
 from logging.handlers import RotatingFileHandler
 
@@ -36,6 +40,132 @@ class ProcessPoolException(WMException):
     Raise some exceptions
     """
 
+class JSONSerializer(object):
+    """
+    _JSONSerializer_
+
+    Encode work with the Services.Requests JSONizer, which handles
+    __to_json__ calls.
+    """
+    name = "json"
+
+    def __init__(self):
+        self.jsonHandler = JSONRequests()
+
+    def encode(self, data):
+        return self.jsonHandler.encode(data)
+
+    def decode(self, data):
+        return self.jsonHandler.decode(data)
+
+
+class PickleSerializer(object):
+    """
+    _PickleSerializer_
+
+    Encode work with cPickle, objects like Reports are sent as they are
+    instead of being thunked to and from JSON.
+    """
+    name = "pickle"
+
+    def encode(self, data):
+        return cPickle.dumps(data, 2)
+
+    def decode(self, data):
+        return cPickle.loads(data)
+
+
+serializers = {"json": JSONSerializer,
+               "pickle": PickleSerializer}
+
+def getSerializer(name):
+    """
+    _getSerializer_
+
+    Create a serializer by name.
+    """
+    if name not in serializers:
+        msg = "Unknown ProcessPool serializer %s, must be one of %s" % (name, serializers.keys())
+        raise ProcessPoolException(msg)
+    return serializers[name]()
+
+
+# Every message is a header frame followed by one frame per item.  Item frames
+# start with a single byte telling whether the rest is the encoded item or the
+# path of a file holding the encoded item.
+MESSAGE_HEADER = struct.Struct("!Id")
+INLINE_ITEM = "I"
+FILE_ITEM = "F"
+
+def packMessage(serializer, items, fileDir = None, fileThreshold = None):
+    """
+    _packMessage_
+
+    Encode a list of items into the frames of a multipart message.  Items
+    that encode to more than fileThreshold bytes are written to a file in
+    fileDir and only the path is sent.
+    """
+    frames = [MESSAGE_HEADER.pack(len(items), time.time())]
+    for item in items:
+        encodedItem = serializer.encode(item)
+        if fileThreshold != None and len(encodedItem) > fileThreshold:
+            (fd, fileName) = tempfile.mkstemp(prefix = "payload.", dir = fileDir)
+            payloadFile = os.fdopen(fd, "wb")
+            payloadFile.write(encodedItem)
+            payloadFile.close()
+            frames.append(FILE_ITEM + fileName)
+        else:
+            frames.append(INLINE_ITEM + encodedItem)
+    return frames
+
+def unpackMessage(serializer, frames):
+    """
+    _unpackMessage_
+
+    Decode the frames of a multipart message, returns the list of items,
+    the time the message was sent and the number of bytes the items took
+    up.  Files holding items are removed once they are read.
+    """
+    (nItems, sentTime) = MESSAGE_HEADER.unpack(frames[0])
+    if nItems != len(frames) - 1:
+        msg = "ProcessPool message should have %i items but has %i" % (nItems, len(frames) - 1)
+        raise ProcessPoolException(msg)
+
+    items = []
+    size = len(frames[0])
+    for frame in frames[1:]:
+        if frame[0] == FILE_ITEM:
+            payloadFile = open(frame[1:], "rb")
+            encodedItem = payloadFile.read()
+            payloadFile.close()
+            os.remove(frame[1:])
+        else:
+            encodedItem = frame[1:]
+        size += len(encodedItem)
+        items.append(serializer.decode(encodedItem))
+    return (items, sentTime, size)
+
+
+def getProcessRSS(pid):
+    """
+    _getProcessRSS_
+
+    Return the resident set size of a process in bytes, 0 if it can't be
+    read.
+    """
+    try:
+        statusFile = open("/proc/%i/status" % pid)
+        try:
+            for line in statusFile:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        finally:
+            statusFile.close()
+    except (IOError, ValueError):
+        pass
+    return 0
+
+
 class ProcessPoolWorker:
     """
     _ProcessPoolWorker_
@@ -63,7 +193,10 @@ class ProcessPoolWorker:
 class ProcessPool:
     def __init__(self, slaveClassName, totalSlaves, componentDir,
                  config, namespace = 'WMComponent', inPort = '5555',
-                 outPort = '5558'):
+                 outPort = '5558', serializer = 'json', batchSize = 1,
+                 fileThreshold = None, maxSlaves = None, maxWallTime = None,
+                 maxRSS = None, idleTime = 300, maxRestarts = 10,
+                 restartWindow = 300):
         """
         __init__
 
@@ -77,13 +210,52 @@ class ProcessPool:
         parameters.  It is not passed to the slave class.  The slaveInit
         parameter will be serialized and passed to the slave class's
         constructor.
+
+        Work is encoded with the named serializer, 'json' or 'pickle', and
+        sent to the slaves batchSize items per message.  Results larger than
+        fileThreshold bytes are passed back through files in the component
+        directory instead of through the socket.
+
+        Slaves ask for a batch of work whenever they are free, so a slow batch
+        only holds up the slave working on it.  A slave that has been working
+        on a batch for more than maxWallTime seconds or that uses more than
+        maxRSS bytes of memory is killed and replaced, its batch is given to
+        another slave.  While there is work waiting more slaves are started,
+        up to maxSlaves, and slaves that have been idle for idleTime seconds
+        are stopped until totalSlaves are left.
+
+        Slaves are replaced at most maxRestarts times in restartWindow
+        seconds, after that the pool is shut down and a ProcessPoolException
+        raised, so that slaves that can't start don't get restarted forever.
+
+        Every batch carries an ID that the slave sends back with its results.
+        A batch stays outstanding until its results come in, only
+        outstanding batches are given to another slave and results for a
+        batch that isn't outstanding anymore are dropped.
         """
         self.enqueueIndex = 0
         self.dequeueIndex = 0
         self.runningWork  = 0
-
-        #Use the Services.Requests JSONizer, which handles __to_json__ calls
-        self.jsonHandler = JSONRequests()
+        self.completed    = []
+        self.backlog      = deque()
+        self.outstanding  = {}
+        self.nextBatchID  = 0
+        self.slaves       = {}
+        self.lastCheck    = 0
+
+        self.maxSlaves   = max(totalSlaves, maxSlaves or totalSlaves)
+        self.maxWallTime = maxWallTime
+        self.maxRSS      = maxRSS
+        self.idleTime    = idleTime
+        self.maxRetries  = 1
+        self.maxRestarts   = maxRestarts
+        self.restartWindow = restartWindow
+        self.restartTimes  = deque()
+
+        self.serializer    = getSerializer(serializer)
+        self.batchSize     = max(1, batchSize)
+        self.fileThreshold = fileThreshold
+        self.resetMetrics()
 
         # heartbeat should be registered at this point
         if getattr(config.Agent, "useHeartbeat", True):
@@ -102,7 +274,6 @@ class ProcessPool:
         else:
             self.versionString = "python2.6"
 
-        self.workers   = []
         self.nSlaves   = totalSlaves
         self.namespace = namespace
         self.inPort    = inPort
@@ -119,22 +290,23 @@ class ProcessPool:
         cPickle.dump(config, f)
         f.close()
 
-        # Set up ZMQ
+        # Set up ZMQ, slaves ask for work and receive it on the ROUTER socket
+        # and send their results, prefixed with their identity and the ID of
+        # the batch, to the PULL socket
         try:
             context = zmq.Context()
-            self.sender = context.socket(zmq.PUSH)
+            self.sender = context.socket(zmq.ROUTER)
             self.sender.bind("tcp://*:%s" % inPort)
             self.sink = context.socket(zmq.PULL)
             self.sink.bind("tcp://*:%s" % outPort)
         except zmq.ZMQError:
             # Try this again in a moment to see
             # if it's just being held by something pre-existing
-            import time
             time.sleep(1)
             logging.error("Blocked socket on startup: Attempting sleep to give it time to clear.")
             try:
                 context = zmq.Context()
-                self.sender = context.socket(zmq.PUSH)
+                self.sender = context.socket(zmq.ROUTER)
                 self.sender.bind("tcp://*:%s" % inPort)
                 self.sink = context.socket(zmq.PULL)
                 self.sink.bind("tcp://*:%s" % outPort)
@@ -146,6 +318,10 @@ class ProcessPool:
                 print traceback.format_exc()
                 raise ProcessPoolException(msg)
 
+        self.poller = zmq.Poller()
+        self.poller.register(self.sender, zmq.POLLIN)
+        self.poller.register(self.sink, zmq.POLLIN)
+
         # Now actually create the slaves
         self.createSlaves()
 
@@ -153,39 +329,67 @@ class ProcessPool:
         return
 
 
-    def createSlaves(self):
+    def createSlaves(self, totalSlaves = None):
         """
         _createSlaves_
 
         Create the slaves by using the values from __init__()
         Moving it into a separate function allows us to restart
-        all of them.
+        all of them.  By default nSlaves slaves are created.
         """
-
-        totalSlaves    = self.nSlaves
-        slaveClassName = self.slaveClassName
-        config         = self.config
-        namespace      = self.namespace
-        inPort         = self.inPort
-        outPort        = self.outPort
-
-        slaveArgs = [self.versionString, __file__, self.slaveClassName, inPort,
-                     outPort, self.configPath, self.componentDir, self.namespace]
+        if totalSlaves == None:
+            totalSlaves = self.nSlaves
 
         count = 0
         while totalSlaves > 0:
-            #For each worker you want create a slave process
-            #That process calls this code (WMCore.ProcessPool) and opens
-            #A process pool that loads the designated class
-            slaveProcess = subprocess.Popen(slaveArgs, stdin = subprocess.PIPE,
-                                            stdout = subprocess.PIPE)
-            self.workers.append(slaveProcess)
+            slaveProcess = self.startSlaveProcess()
+            # The slaves identify themselves on the socket with their PID
+            self.slaves[str(slaveProcess.pid)] = {"process": slaveProcess,
+                                                  "ready": False,
+                                                  "work": None,
+                                                  "dispatchTime": None,
+                                                  "idleSince": time.time()}
             totalSlaves -= 1
             count += 1
 
 
         return
 
+    def startSlaveProcess(self):
+        """
+        _startSlaveProcess_
+
+        Start a slave process.  That process calls this code
+        (WMCore.ProcessPool) and opens a process pool that loads the
+        designated class.
+        """
+        slaveArgs = [self.versionString, __file__, self.slaveClassName, self.inPort,
+                     self.outPort, self.configPath, self.componentDir, self.namespace,
+                     self.serializer.name, str(self.fileThreshold)]
+        return subprocess.Popen(slaveArgs, stdin = subprocess.PIPE,
+                                stdout = subprocess.PIPE)
+
+    def stopSlave(self, identity, kill = False):
+        """
+        _stopSlave_
+
+        Remove a slave from the pool.  Idle slaves are sent a STOP command,
+        busy ones are killed.  Returns the batch the slave was working on.
+        """
+        slave = self.slaves.pop(identity)
+        process = slave["process"]
+        if kill or not slave["ready"]:
+            try:
+                process.kill()
+                process.wait()
+            except OSError:
+                # Already gone
+                pass
+        else:
+            frames = [identity, ""] + packMessage(self.serializer, ['STOP'])
+            self.sender.send_multipart(frames)
+        return slave["work"]
+
     def _subProcessName(self, slaveClassName, sequence):
         """ subProcessName for heartbeat
             could change to use process ID as a suffix
@@ -208,14 +412,16 @@ class ProcessPool:
 
         Close shuts down all the active systems by:
 
-        a) Sending STOP commands for all workers
+        a) Sending STOP commands for all idle workers
         b) Closing the pipes
         c) Shutting down the workers themselves
         """
-        for i in range(self.nSlaves):
+        processes = [x["process"] for x in self.slaves.values()]
+        for (identity, slave) in self.slaves.items():
+            if not slave["ready"]:
+                continue
             try:
-                encodedWork = self.jsonHandler.encode('STOP')
-                self.sender.send(encodedWork)
+                self.sender.send_multipart([identity, ""] + packMessage(self.serializer, ['STOP']))
             except Exception as ex:
                 # Might be already failed.  Nothing you can
                 # really do about that.
@@ -223,7 +429,7 @@ class ProcessPool:
                 pass
 
         try:
-            self.sender.close()
+            self.sender.close(linger = 1000)
         except:
             # We can't really do anything if we fail
             pass
@@ -233,19 +439,21 @@ class ProcessPool:
             # We can't do anything if we fail
             pass
 
-        # Now close the workers by hand
-        for worker in self.workers:
+        # Give the idle workers a moment to exit and terminate the others
+        deadline = time.time() + 1
+        for worker in processes:
+            while worker.poll() == None and time.time() < deadline:
+                time.sleep(0.05)
+            if worker.poll() != None:
+                continue
             try:
-                worker.join()
+                worker.terminate()
+                worker.wait()
             except Exception as ex:
-                try:
-                    worker.terminate()
-                except Exception as ex2:
-                    logging.error("Failure to join or terminate process")
-                    logging.error(str(ex))
-                    logging.error(str(ex2))
-                    continue
-        self.workers = []
+                logging.error("Failure to terminate process")
+                logging.error(str(ex))
+                continue
+        self.slaves = {}
         return
 
     def enqueue(self, work, list = False):
@@ -253,29 +461,164 @@ class ProcessPool:
         __enqeue__
 
         Assign work to the workers processes.  The work parameters must be a
-        list where each item in the list can be serialized into JSON.
+        list where each item in the list can be encoded by the serializer.
 
         If list is True, the entire list is sent as one piece of work
         """
-        if len(self.workers) < 1:
+        if len(self.slaves) < 1:
             # Someone's shut down the system
             msg = "Attempting to send work after system failure and shutdown!\n"
             logging.error(msg)
             raise ProcessPoolException(msg)
 
-        if not list:
-            for w in work:
-                encodedWork = self.jsonHandler.encode(w)
-                self.sender.send(encodedWork)
-                self.runningWork += 1
-        else:
-            encodedWork = self.jsonHandler.encode(work)
-            self.sender.send(encodedWork)
-            self.runningWork += 1
+        if list:
+            work = [work]
 
+        for start in range(0, len(work), self.batchSize):
+            batch = {"id": self.nextBatchID, "items": work[start:start + self.batchSize],
+                     "retries": 0}
+            self.nextBatchID += 1
+            self.outstanding[batch["id"]] = batch
+            self.backlog.append(batch)
+            self.runningWork += len(batch["items"])
+
+        self.dispatch()
         return
 
+    def receiveRequests(self):
+        """
+        _receiveRequests_
 
+        Read the requests for work that the slaves sent.  A slave asks for
+        work when it starts and after it has sent the results of a batch.
+        """
+        while self.sender.poll(0):
+            frames = self.sender.recv_multipart()
+            slave = self.slaves.get(frames[0], None)
+            if slave == None:
+                # A slave that has been stopped
+                continue
+            slave["ready"] = True
+            slave["work"] = None
+            slave["dispatchTime"] = None
+            slave["idleSince"] = time.time()
+        return
+
+    def dispatch(self):
+        """
+        _dispatch_
+
+        Hand batches from the backlog to the slaves that asked for work and
+        adjust the number of slaves to the backlog.
+        """
+        self.receiveRequests()
+        for (identity, slave) in self.slaves.items():
+            # a batch put back in the backlog may have been done since
+            while len(self.backlog) > 0 and self.backlog[0]["id"] not in self.outstanding:
+                self.backlog.popleft()
+            if len(self.backlog) == 0:
+                break
+            if not slave["ready"]:
+                continue
+
+            batch = self.backlog.popleft()
+            frames = packMessage(self.serializer, batch["items"])
+            self.sender.send_multipart([identity, str(batch["id"])] + frames, copy = False)
+            self.metrics["messagesSent"] += 1
+            self.metrics["bytesSent"] += sum([len(x) for x in frames])
+            slave["ready"] = False
+            slave["work"] = batch
+            slave["dispatchTime"] = time.time()
+
+        self.scaleSlaves()
+        return
+
+    def scaleSlaves(self):
+        """
+        _scaleSlaves_
+
+        Start slaves while there are more batches waiting than slaves that
+        are starting, up to maxSlaves.  Stop slaves that have been idle for
+        idleTime seconds while the backlog is empty, down to nSlaves.
+        """
+        if len(self.backlog) > 0:
+            starting = len([x for x in self.slaves.values() if not x["ready"] and x["work"] == None])
+            newSlaves = min(len(self.backlog) - starting, self.maxSlaves - len(self.slaves))
+            if newSlaves > 0:
+                logging.info("Starting %i slaves for %i waiting batches" % (newSlaves, len(self.backlog)))
+                self.createSlaves(newSlaves)
+            return
+
+        now = time.time()
+        for (identity, slave) in self.slaves.items():
+            if len(self.slaves) <= self.nSlaves:
+                break
+            if slave["ready"] and now - slave["idleSince"] > self.idleTime:
+                logging.info("Stopping idle slave %s" % identity)
+                self.stopSlave(identity)
+        return
+
+    def checkSlaves(self):
+        """
+        _checkSlaves_
+
+        Replace slaves that died or went over the wall time or memory budget.
+        The batch they were working on is put back at the front of the
+        backlog if its results haven't come in, unless it was already retried
+        maxRetries times, then it is dropped and a ProcessPoolException
+        raised.  If slaves had to be replaced more than maxRestarts times in
+        restartWindow seconds the pool is shut down.
+        """
+        now = time.time()
+        if now - self.lastCheck < 1:
+            return
+        self.lastCheck = now
+
+        # a slave may have sent its results just before it went away
+        while self.sink.poll(0):
+            self.receiveResults(self.sink.recv_multipart())
+
+        for (identity, slave) in self.slaves.items():
+            process = slave["process"]
+            if process.poll() != None:
+                reason = "exited with code %s" % process.returncode
+            elif slave["work"] != None and self.maxWallTime != None and \
+                     now - slave["dispatchTime"] > self.maxWallTime:
+                reason = "has been working for more than %s seconds" % self.maxWallTime
+            elif self.maxRSS != None and getProcessRSS(process.pid) > self.maxRSS:
+                reason = "uses more than %s bytes of memory" % self.maxRSS
+            else:
+                continue
+
+            logging.error("ProcessPool slave %s %s, replacing it" % (identity, reason))
+            batch = self.stopSlave(identity, kill = True)
+            self.metrics["slaveRestarts"] += 1
+
+            self.restartTimes.append(now)
+            while now - self.restartTimes[0] > self.restartWindow:
+                self.restartTimes.popleft()
+            if len(self.restartTimes) > self.maxRestarts:
+                msg = "ProcessPool slaves were restarted %i times in %s seconds, " \
+                      % (len(self.restartTimes), self.restartWindow)
+                msg += "giving up: slave %s %s" % (identity, reason)
+                logging.error(msg)
+                self.close()
+                raise ProcessPoolException(msg)
+
+            self.createSlaves(1)
+            if batch == None or batch["id"] not in self.outstanding:
+                continue
+            if batch["retries"] >= self.maxRetries:
+                # nobody is going to send these results
+                del self.outstanding[batch["id"]]
+                self.runningWork -= len(batch["items"])
+                msg = "Giving up on work after %i retries: slave %s %s" % (batch["retries"],
+                                                                           identity, reason)
+                logging.error(msg)
+                raise ProcessPoolException(msg)
+            batch["retries"] += 1
+            self.backlog.appendleft(batch)
+        return
 
     def dequeue(self, totalItems = 1):
         """
@@ -293,19 +636,22 @@ class ProcessPool:
             raise ProcessPoolException(msg)
 
         while totalItems > 0:
-            try:
-                output = self.sink.recv()
-                decode = self.jsonHandler.decode(output)
-                if type(decode) == type({}) and decode.get('type', None) == 'ERROR':
-                    # Then we had some kind of error
-                    msg = decode.get('msg', 'Unknown Error in ProcessPool')
-                    logging.error("Received Error Message from ProcessPool Slave")
-                    logging.error(msg)
-                    self.close()
-                    raise ProcessPoolException(msg)
-                completedWork.append(decode)
+            if len(self.completed) > 0:
+                completedWork.append(self.completed.pop(0))
                 self.runningWork -= 1
                 totalItems -= 1
+                continue
+
+            try:
+                self.dispatch()
+                self.checkSlaves()
+                events = dict(self.poller.poll(1000))
+                if self.sink not in events:
+                    continue
+
+                self.receiveResults(self.sink.recv_multipart())
+            except ProcessPoolException:
+                raise
             except Exception as ex:
                 msg =  "Exception while getting slave outputin ProcessPool.\n"
                 msg += str(ex)
@@ -314,15 +660,98 @@ class ProcessPool:
 
         return completedWork
 
+    def receiveResults(self, frames):
+        """
+        _receiveResults_
+
+        Handle a results message.  Results start with the identity of the
+        slave and the ID of the batch, the batch is done even if the slave
+        hasn't asked for more work yet.
+        """
+        (identity, batchID) = frames[:2]
+        slave = self.slaves.get(identity, None)
+        if slave != None and slave["work"] != None and str(slave["work"]["id"]) == batchID:
+            slave["work"] = None
+        (items, sentTime, size) = unpackMessage(self.serializer, frames[2:])
+        self.recordMessage(sentTime, size)
+
+        if self.outstanding.pop(int(batchID), None) == None:
+            logging.warning("Dropping results of batch %s from slave %s, they were already received" \
+                            % (batchID, identity))
+            return
+
+        for decode in items:
+            if type(decode) == type({}) and decode.get('type', None) == 'ERROR':
+                # Then we had some kind of error
+                msg = decode.get('msg', 'Unknown Error in ProcessPool')
+                logging.error("Received Error Message from ProcessPool Slave")
+                logging.error(msg)
+                self.close()
+                raise ProcessPoolException(msg)
+        self.completed.extend(items)
+        return
+
+    def resetMetrics(self):
+        """
+        _resetMetrics_
+
+        Zero the message counters.
+        """
+        self.metrics = {"messagesSent": 0, "bytesSent": 0,
+                        "messagesReceived": 0, "bytesReceived": 0,
+                        "totalLatency": 0.0, "maxLatency": 0.0,
+                        "slaveRestarts": 0}
+        return
+
+    def recordMessage(self, sentTime, size):
+        """
+        _recordMessage_
+
+        Account for a message received from a slave.  The latency is the time
+        between the slave sending the message and it being decoded here.
+        """
+        latency = max(0.0, time.time() - sentTime)
+        self.metrics["messagesReceived"] += 1
+        self.metrics["bytesReceived"] += size
+        self.metrics["totalLatency"] += latency
+        self.metrics["maxLatency"] = max(self.metrics["maxLatency"], latency)
+        return
+
+    def getMetrics(self):
+        """
+        _getMetrics_
+
+        Return the message counters along with the average latency and size
+        of the messages received from the slaves, the number of batches
+        waiting to be dispatched and the number of items each slave is
+        working on.
+        """
+        metrics = dict(self.metrics)
+        metrics["backlog"] = len(self.backlog)
+        metrics["inFlight"] = {}
+        for (identity, slave) in self.slaves.items():
+            if slave["work"] == None:
+                metrics["inFlight"][identity] = 0
+            else:
+                metrics["inFlight"][identity] = len(slave["work"]["items"])
+        received = max(1, metrics["messagesReceived"])
+        metrics["averageLatency"] = metrics["totalLatency"] / received
+        metrics["averageSize"] = metrics["bytesReceived"] / received
+        return metrics
+
 
     def restart(self):
         """
         _restart_
 
-        Delete everything and restart all pools
+        Replace all the slaves, the batches they were working on are put back
+        at the front of the backlog.
         """
+        for identity in self.slaves.keys():
+            batch = self.stopSlave(identity, kill = True)
+            if batch != None and batch["id"] in self.outstanding:
+                self.backlog.appendleft(batch)
 
-        self.close()
         self.createSlaves()
         return
 
@@ -375,7 +804,8 @@ if __name__ == "__main__":
     in through stdin as a JSON object.
 
     Input variables:
-    className, input port, output port, path to pickled config, component dir, namespace
+    className, input port, output port, path to pickled config, component dir, namespace,
+    serializer, file threshold
     """
 
     # Get variables passed in
@@ -385,13 +815,21 @@ if __name__ == "__main__":
     configPath     = sys.argv[4]
     componentDir   = sys.argv[5]
     namespace      = sys.argv[6]
+    serializerName = sys.argv[7]
+    fileThreshold  = sys.argv[8]
+    if fileThreshold == "None":
+        fileThreshold = None
+    else:
+        fileThreshold = int(fileThreshold)
 
     # Set up logging
     setupLogging(componentDir)
 
     # Build ZMQ link
     context = zmq.Context()
-    receiver = context.socket(zmq.PULL)
+    identity = str(os.getpid())
+    receiver = context.socket(zmq.DEALER)
+    receiver.setsockopt(zmq.IDENTITY, identity)
     receiver.connect("tcp://localhost:%s" % inPort)
 
     sender = context.socket(zmq.PUSH)
@@ -412,60 +850,73 @@ if __name__ == "__main__":
     wmInit = WMInit()
     setupDB(config, wmInit)
 
-    # Create JSON handler
-    jsonHandler = JSONRequests()
+    serializer = getSerializer(serializerName)
 
     wmFactory = WMFactory(name = "slaveFactory", namespace = namespace)
     slaveClass = wmFactory.loadObject(classname = slaveClassName, args = config)
 
     logging.info("Have slave class")
 
-    while(True):
-        encodedInput = receiver.recv()
+    # Ask for the first batch of work
+    receiver.send_multipart(packMessage(serializer, []))
 
+    running = True
+    while running:
         try:
-            input = jsonHandler.decode(encodedInput)
+            frames = receiver.recv_multipart()
+            batchID = frames[0]
+            (inputs, sentTime, size) = unpackMessage(serializer, frames[1:])
         except Exception as ex:
             logging.error("Error decoding: %s" % str(ex))
             break
 
-        if input == "STOP":
-            break
-
-        try:
-            logging.error(input)
-            output = slaveClass(input)
-        except Exception as ex:
-            crashMessage = "Slave process crashed with exception: " + str(ex)
-            crashMessage += "\nStacktrace:\n"
-
-            stackTrace = traceback.format_tb(sys.exc_info()[2], None)
-            for stackFrame in stackTrace:
-                crashMessage += stackFrame
+        outputs = []
+        for input in inputs:
+            if input == "STOP":
+                running = False
+                break
 
-            logging.error(crashMessage)
             try:
-                output        = {'type': 'ERROR', 'msg': crashMessage}
-                encodedOutput = jsonHandler.encode(output)
-                sender.send(encodedOutput)
-                logging.error("Sent error message and now breaking")
-                break
+                logging.error(input)
+                output = slaveClass(input)
             except Exception as ex:
-                logging.error("Failed to send error message")
-                logging.error(str(ex))
-                del jsonHandler
-                sys.exit(1)
-
-        if output != None:
-            if type(output) == list:
-                for item in output:
-                    encodedOutput = jsonHandler.encode(item)
-                    sender.send(encodedOutput)
-            else:
-                encodedOutput = jsonHandler.encode(output)
-                sender.send(encodedOutput)
+                crashMessage = "Slave process crashed with exception: " + str(ex)
+                crashMessage += "\nStacktrace:\n"
+
+                stackTrace = traceback.format_tb(sys.exc_info()[2], None)
+                for stackFrame in stackTrace:
+                    crashMessage += stackFrame
+
+                logging.error(crashMessage)
+                try:
+                    outputs.append({'type': 'ERROR', 'msg': crashMessage})
+                    sender.send_multipart([identity, batchID] + packMessage(serializer, outputs,
+                                                                            componentDir, fileThreshold))
+                    logging.error("Sent error message and now breaking")
+                    outputs = None
+                    running = False
+                    break
+                except Exception as ex:
+                    logging.error("Failed to send error message")
+                    logging.error(str(ex))
+                    sys.exit(1)
+
+            if output != None:
+                if type(output) == list:
+                    outputs.extend(output)
+                else:
+                    outputs.append(output)
+
+        if batchID and outputs != None:
+            # Results are sent even if there are none, they tell the pool
+            # that the batch is done
+            sender.send_multipart([identity, batchID] + packMessage(serializer, outputs,
+                                                                    componentDir, fileThreshold),
+                                  copy = False)
+        if running:
+            # Ask for more work
+            receiver.send_multipart(packMessage(serializer, []))
 
 
     logging.info("Process with PID %s finished" %(os.getpid()))
-    del jsonHandler
     sys.exit(0)
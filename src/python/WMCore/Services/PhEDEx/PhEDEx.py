@@ -31,6 +31,9 @@ class PhEDEx(Service):
             dict['endpoint'] = "https://cmsweb.cern.ch/phedex/datasvc/%s/prod/" % self.responseType
 
         dict.setdefault('cacheduration', 0)
+        # only used for the node map
+        dict.setdefault('memorycachettl', 3600)
+        dict.setdefault('memorycachestale', 3600)
         Service.__init__(self, dict)
 
     def _getResult(self, callname, clearCache = False,
@@ -169,6 +172,44 @@ class PhEDEx(Service):
         callname = 'blockreplicas'
         return self._getResult(callname, args = kwargs)
 
+    def getReplicaInfoForBlocksInChunks(self, chunkSize = 100, maxInFlight = 5, **kwargs):
+        """
+        _getReplicaInfoForBlocksInChunks_
+
+        Get replicas for a long list of blocks, or datasets, split into queries
+        of at most chunkSize items.  The queries are made concurrently with at
+        most maxInFlight of them outstanding, their responses aren't cached.
+        Other kwargs are passed to every query, see getReplicaInfoForBlocks().
+
+        Returns a list of (items, result) tuples, one for each query, where
+        result is the decoded response or the exception the query raised.
+        """
+        if 'dataset' in kwargs:
+            field = 'dataset'
+        else:
+            field = 'block'
+        items = kwargs.pop(field)
+        if type(items) != list:
+            items = [items]
+
+        chunks = [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+        requests = []
+        for chunk in chunks:
+            args = dict(kwargs)
+            args[field] = chunk
+            requests.append({'uri': 'blockreplicas', 'verb': 'POST', 'data': args})
+        results = self['requests'].makeRequests(requests, maxInFlight)
+
+        replicaInfo = []
+        for (chunk, result) in zip(chunks, results):
+            if not isinstance(result, Exception):
+                try:
+                    result = JsonWrapper.loads(result[0])
+                except Exception as ex:
+                    result = ex
+            replicaInfo.append((chunk, result))
+        return replicaInfo
+
     def getReplicaInfoForFiles(self, **args):
         """
         _getReplicaInfoForFiles_
@@ -306,7 +347,10 @@ class PhEDEx(Service):
           technology - Node technology, e.g. 'Castor'
           id         - Node id
         """
-        return self._getResult("nodes", args = None)
+        if self.responseType != "json":
+            return self._getResult("nodes", args = None)
+        return self.getCachedData("nodes", "nodes", None, parser = JsonWrapper.loads,
+                                  verb = "POST")
 
 
     def getBestNodeName(self, se, nodeNameMap=None):
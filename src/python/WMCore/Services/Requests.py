@@ -21,6 +21,9 @@ import tempfile
 import shutil
 import stat
 import sys
+import copy
+import threading
+import Queue
 
 try:
     import cStringIO as StringIO
@@ -99,6 +102,11 @@ class Requests(dict):
         # and then get the URL opener
         self.setdefault("conn", self._getURLOpener())
 
+        # copies of this object used by makeRequests, each with its own
+        # connection to the host
+        self.requesterPool = []
+        self.requesterLock = threading.Lock()
+
 
     def get(self, uri=None, data={}, incoming_headers={},
                encode = True, decode=True, contentType=None):
@@ -145,6 +153,96 @@ class Requests(dict):
                          encoder, decoder, contentType)
         return result
 
+    def makeRequests(self, requests, maxInFlight = 5, timeout = None):
+        """
+        _makeRequests_
+
+        Make several requests concurrently with at most maxInFlight of them
+        outstanding.  Each request is a dictionary of makeRequest() arguments
+        (uri, data, verb, incoming_headers, encoder, decoder, contentType).
+        Every concurrent request goes through its own connection which is kept
+        open and reused by later requests.  If timeout is set it is used
+        instead of the timeout of this object for each request.
+
+        Returns a list with, for each request in order, either the tuple
+        makeRequest() returns or the exception it raised.
+        """
+        results = [None] * len(requests)
+        if len(requests) == 0:
+            return results
+
+        work = Queue.Queue()
+        for item in enumerate(requests):
+            work.put(item)
+
+        def worker(requester):
+            """
+            Make requests until there are none left.
+            """
+            while True:
+                try:
+                    (index, request) = work.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[index] = requester.makeRequest(**request)
+                except Exception as ex:
+                    results[index] = ex
+
+        requesters = [self.getRequester(timeout) for i in range(min(maxInFlight, len(requests)))]
+        threads = []
+        for requester in requesters:
+            thread = threading.Thread(target = worker, args = (requester,))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        self.requesterLock.acquire()
+        try:
+            self.requesterPool.extend(requesters)
+        finally:
+            self.requesterLock.release()
+        return results
+
+    def getRequester(self, timeout = None):
+        """
+        _getRequester_
+
+        Take a copy of this object with its own connection out of the pool,
+        or make a new one, and set its timeout.
+        """
+        self.requesterLock.acquire()
+        try:
+            if len(self.requesterPool) > 0:
+                requester = self.requesterPool.pop()
+            else:
+                requester = None
+        finally:
+            self.requesterLock.release()
+
+        if requester == None:
+            requester = copy.copy(self)
+            requester.requesterPool = []
+            requester.requesterLock = threading.Lock()
+            if self.pycurl:
+                requester.reqmgr = RequestHandler()
+            else:
+                requester['conn'] = self._getURLOpener()
+
+        if timeout == None:
+            timeout = self['timeout']
+        requester['timeout'] = timeout
+        if self.pycurl:
+            requester.reqmgr.timeout = timeout
+        else:
+            requester['conn'].timeout = timeout
+            for conn in requester['conn'].connections.values():
+                conn.timeout = timeout
+                if getattr(conn, 'sock', None) != None:
+                    conn.sock.settimeout(timeout)
+        return requester
+
     def makeRequest_pycurl(self, uri=None, params={}, verb='GET',
             incoming_headers={}, encoder=True, decoder=True, contentType=None):
         """
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+_ResponseCache_
+
+Process wide in-memory cache of decoded service responses.
+
+Entries are kept in least recently used order and the oldest ones are evicted
+once the cache is full.  Each lookup passes the time to live of its service so
+the same cache can hold the responses of several endpoints.  An entry past its
+time to live but still within the stale time is returned as stale so that the
+caller can use it while it refreshes the entry.  All the methods are safe to
+call from several threads.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+
+class ResponseCache(object):
+    """
+    _ResponseCache_
+
+    LRU cache of (value, time stored) entries.
+    """
+    def __init__(self, maxSize = 1000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.resetStats()
+        return
+
+    def resetStats(self):
+        """
+        _resetStats_
+
+        Zero the hit, miss and eviction counters.
+        """
+        self.lock.acquire()
+        try:
+            self.stats = {"hits": 0, "staleHits": 0, "misses": 0, "evictions": 0}
+        finally:
+            self.lock.release()
+        return
+
+    def getStats(self):
+        """
+        _getStats_
+
+        Return the counters along with the number of entries in the cache.
+        """
+        self.lock.acquire()
+        try:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        finally:
+            self.lock.release()
+        return stats
+
+    def get(self, key, ttl, staleTime = 0):
+        """
+        _get_
+
+        Look up an entry, returns a (value, status) tuple where status is HIT
+        if the entry is younger than ttl seconds, STALE if it is younger than
+        ttl + staleTime seconds and MISS otherwise.  The value is None for a
+        MISS.
+        """
+        self.lock.acquire()
+        try:
+            entry = self.entries.pop(key, None)
+            if entry == None:
+                self.stats["misses"] += 1
+                return (None, MISS)
+
+            # Put it back as the most recently used entry
+            self.entries[key] = entry
+            (value, storedTime) = entry
+            age = time.time() - storedTime
+            if age < ttl:
+                self.stats["hits"] += 1
+                return (value, HIT)
+            if age < ttl + staleTime:
+                self.stats["staleHits"] += 1
+                return (value, STALE)
+
+            self.stats["misses"] += 1
+            return (None, MISS)
+        finally:
+            self.lock.release()
+
+    def put(self, key, value):
+        """
+        _put_
+
+        Store a value, evicting the least recently used entries if the
+        cache is full.
+        """
+        self.lock.acquire()
+        try:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, time.time())
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last = False)
+                self.stats["evictions"] += 1
+        finally:
+            self.lock.release()
+        return
+
+    def invalidate(self, key):
+        """
+        _invalidate_
+
+        Drop an entry from the cache.
+        """
+        self.lock.acquire()
+        try:
+            self.entries.pop(key, None)
+        finally:
+            self.lock.release()
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Drop all the entries.
+        """
+        self.lock.acquire()
+        try:
+            self.entries.clear()
+        finally:
+            self.lock.release()
+        return
+
+    def startRefresh(self, key):
+        """
+        _startRefresh_
+
+        Claim the refresh of a stale entry.  Returns False if another thread
+        is already refreshing it.
+        """
+        self.lock.acquire()
+        try:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+        finally:
+            self.lock.release()
+
+    def finishRefresh(self, key):
+        """
+        _finishRefresh_
+
+        Release the claim on the refresh of an entry.
+        """
+        self.lock.acquire()
+        try:
+            self.refreshing.discard(key)
+        finally:
+            self.lock.release()
+        return
+
+
+# The cache shared by all the services in this process
+responseCache = ResponseCache()
@@ -79,6 +79,7 @@ import os
 import time
 import types
 import logging
+import threading
 try:
     from cStringIO import cStringIO as StringIO
 except ImportError:
@@ -91,6 +92,7 @@ from httplib2 import HttpLib2Error
 from urlparse import urlparse
 
 from WMCore.Services.Requests import Requests, JSONRequests
+from WMCore.Services.ResponseCache import responseCache, HIT, STALE
 from WMCore.WMException import WMException
 from WMCore.Wrappers import JsonWrapper as json
 
@@ -238,6 +240,74 @@ class Service(dict):
         else:
             return cachefile
 
+    def getCachedData(self, cachefile, url = '', inputdata = {}, parser = None,
+                      verb = 'GET', contentType = None, incoming_headers = {},
+                      clearCache = False):
+        """
+        _getCachedData_
+
+        Return the response to a query decoded by parser, json.loads by
+        default.  Decoded responses are kept in the process wide memory cache
+        for memorycachettl seconds, by default the cache duration, in front of
+        refreshCache().  For a further memorycachestale seconds the old
+        response is returned while it is refreshed in the background.  The
+        returned objects are shared and must not be modified.
+        """
+        verb = self._verbCheck(verb)
+        if parser == None:
+            parser = json.loads
+        key = (self['endpoint'], url, verb, cachefile,
+               self._makeHash(inputdata or self['inputdata'], 0))
+        ttl = self.get('memorycachettl', self['cacheduration'] * 3600)
+        staleTime = self.get('memorycachestale', 0)
+
+        if clearCache:
+            responseCache.invalidate(key)
+            self.clearCache(cachefile, inputdata, verb = verb)
+        else:
+            (value, status) = responseCache.get(key, ttl, staleTime)
+            if status == HIT:
+                return value
+            if status == STALE:
+                if responseCache.startRefresh(key):
+                    query = {'cachefile': cachefile, 'url': url, 'inputdata': inputdata,
+                             'verb': verb, 'contentType': contentType,
+                             'incoming_headers': incoming_headers}
+                    refresher = threading.Thread(target = self._refreshCachedData,
+                                                 args = (key, query, parser))
+                    refresher.setDaemon(True)
+                    refresher.start()
+                return value
+
+        f = self.refreshCache(cachefile, url, inputdata, verb = verb,
+                              contentType = contentType,
+                              incoming_headers = incoming_headers)
+        value = parser(f.read())
+        f.close()
+        responseCache.put(key, value)
+        return value
+
+    def _refreshCachedData(self, key, query, parser):
+        """
+        _refreshCachedData_
+
+        Refresh a stale entry of the memory cache.  This runs in its own
+        thread so the request goes through refreshCaches(), which doesn't
+        share the connection of this service.
+        """
+        try:
+            try:
+                f = self.refreshCaches([query], maxInFlight = 1)[0]
+                value = parser(f.read())
+                f.close()
+                responseCache.put(key, value)
+            except Exception as ex:
+                self['logger'].warning("Failed to refresh %s%s: %s" % (self['endpoint'],
+                                                                       query['url'], str(ex)))
+        finally:
+            responseCache.finishRefresh(key)
+        return
+
     def clearCache(self, cachefile, inputdata = {}, verb = 'GET'):
         """
         Delete the cache file and the httplib2 cache.
@@ -273,86 +343,160 @@ class Service(dict):
                 inputdata = self["inputdata"]
             self['logger'].debug('getData: \n\turl: %s\n\tdata: %s' % \
                                  (url, inputdata))
-            data, status, reason, from_cache = self["requests"].makeRequest(uri = url,
-                                                    verb = verb,
-                                                    data = inputdata,
-                                                    incoming_headers = incoming_headers,
-                                                    encoder = encoder,
-                                                    decoder = decoder,
-                                                    contentType = contentType)
-            if from_cache:
-                # If it's coming from the cache we don't need to write it to the
-                # second cache, or do we?
-                self['logger'].debug('Data is from the cache')
+            result = self["requests"].makeRequest(uri = url,
+                                                  verb = verb,
+                                                  data = inputdata,
+                                                  incoming_headers = incoming_headers,
+                                                  encoder = encoder,
+                                                  decoder = decoder,
+                                                  contentType = contentType)
+            self._writeCache(cachefile, result)
+
+        except (IOError, HttpLib2Error, HTTPException) as he:
+            self._handleFailure(he, cachefile, url, force_refresh)
+
+    def refreshCaches(self, queries, openfile = True, maxInFlight = 5, timeout = None):
+        """
+        _refreshCaches_
+
+        refreshCache() for several queries at once.  Each query is a dictionary
+        of refreshCache() arguments (cachefile, url, inputdata, encoder,
+        decoder, verb, contentType, incoming_headers).  The expired caches are
+        refreshed with at most maxInFlight concurrent requests, each waiting
+        at most timeout seconds if it's set.  Returns the cache files in the
+        order of the queries, raising the first error refreshCache() would have
+        raised once all the requests are done.
+        """
+        cachefiles = []
+        requests = []
+        refreshed = []
+        for query in queries:
+            verb = self._verbCheck(query.get('verb', 'GET'))
+            inputdata = query.get('inputdata', {})
+            cachefile = self.cacheFileName(query.get('cachefile', None), verb, inputdata)
+            cachefiles.append(cachefile)
+            if not cache_expired(cachefile):
+                continue
+
+            if not inputdata:
+                inputdata = self["inputdata"]
+            requests.append({'uri': query.get('url', ''),
+                             'verb': verb,
+                             'data': inputdata,
+                             'incoming_headers': query.get('incoming_headers', {}),
+                             'encoder': query.get('encoder', True),
+                             'decoder': query.get('decoder', True),
+                             'contentType': query.get('contentType', None)})
+            refreshed.append(cachefile)
+
+        results = self["requests"].makeRequests(requests, maxInFlight, timeout)
+
+        error = None
+        for (cachefile, request, result) in zip(refreshed, requests, results):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                self._writeCache(cachefile, result)
+            except (IOError, HttpLib2Error, HTTPException) as he:
+                try:
+                    self._handleFailure(he, cachefile, request['uri'])
+                except Exception as ex:
+                    error = error or ex
+            except Exception as ex:
+                error = error or ex
+        if error != None:
+            raise error
+
+        if openfile:
+            return [x if isfile(x) else open(x, 'r') for x in cachefiles]
+        return cachefiles
+
+    def _writeCache(self, cachefile, result):
+        """
+        _writeCache_
+
+        Write the data from a makeRequest() result to the cache file.
+        """
+        data, status, reason, from_cache = result
+        if from_cache:
+            # If it's coming from the cache we don't need to write it to the
+            # second cache, or do we?
+            self['logger'].debug('Data is from the cache')
+        else:
+            # Don't need to prepend the cachepath, the methods calling
+            # getData have done that for us
+            if isfile(cachefile):
+                cachefile.write(str(data))
+                cachefile.seek (0, 0) # return to beginning of file
             else:
-                # Don't need to prepend the cachepath, the methods calling
-                # getData have done that for us
-                if isfile(cachefile):
-                    cachefile.write(str(data))
-                    cachefile.seek (0, 0) # return to beginning of file
+                f = open(cachefile, 'w')
+                if isinstance(data, dict) or isinstance(data, list):
+                    f.write(json.dumps(data))
                 else:
-                    f = open(cachefile, 'w')
-                    if isinstance(data, dict) or isinstance(data, list):
-                        f.write(json.dumps(data))
-                    else:
-                        f.write(str(data))
-                    f.close()
+                    f.write(str(data))
+                f.close()
+        return
 
+    def _handleFailure(self, he, cachefile, url, force_refresh = False):
+        """
+        _handleFailure_
 
-        except (IOError, HttpLib2Error, HTTPException) as he:
-            #
-            # Overly complicated exception handling. This is due to a request
-            # from *Ops that it is very clear that data is is being returned
-            # from a cachefile, and that cachefiles can be good/stale/dead.
-            #
-            if force_refresh or isfile(cachefile) or not os.path.exists(cachefile):
-                msg = 'The cachefile %s does not exist and the service at %s'
-                msg = msg % (cachefile, self["requests"]['host'] + url)
+        Decide whether a failed request can be served from the existing cache
+        file, raise the error if it can't.
+        """
+        #
+        # Overly complicated exception handling. This is due to a request
+        # from *Ops that it is very clear that data is is being returned
+        # from a cachefile, and that cachefiles can be good/stale/dead.
+        #
+        if force_refresh or isfile(cachefile) or not os.path.exists(cachefile):
+            msg = 'The cachefile %s does not exist and the service at %s'
+            msg = msg % (cachefile, self["requests"]['host'] + url)
+            if hasattr(he, 'status') and hasattr(he, 'reason'):
+                msg += ' is unavailable - it returned %s because %s\n' % (he.status,
+                                                                          he.reason)
+                if hasattr(he, 'result'):
+                    msg += ' with result: %s\n' % he.result
+            else:
+                msg += ' raised a %s when accessed' % he.__repr__()
+            self['logger'].warning(msg)
+            raise he
+        else:
+            cache_dead = cache_expired(cachefile, delta =  self.get('maxcachereuse', 24))
+            if self.get('usestalecache', False) and not cache_dead:
+                # If usestalecache is set the previous version of the cache
+                # file should be returned, with a suitable message in the
+                # log, but no exception raised
+                self['logger'].warning('Returning stale cache data from %s' % cachefile)
                 if hasattr(he, 'status') and hasattr(he, 'reason'):
-                    msg += ' is unavailable - it returned %s because %s\n' % (he.status,
-                                                                              he.reason)
-                    if hasattr(he, 'result'):
-                        msg += ' with result: %s\n' % he.result
+                    self['logger'].info('%s returned %s because %s' % (he.url,
+                                                                       he.status,
+                                                                       he.reason))
                 else:
-                    msg += ' raised a %s when accessed' % he.__repr__()
-                self['logger'].warning(msg)
-                raise he
+                    self['logger'].info('%s raised a %s when accessed' % (url, he.__repr__()))
             else:
-                cache_dead = cache_expired(cachefile, delta =  self.get('maxcachereuse', 24))
-                if self.get('usestalecache', False) and not cache_dead:
-                    # If usestalecache is set the previous version of the cache
-                    # file should be returned, with a suitable message in the
-                    # log, but no exception raised
-                    self['logger'].warning('Returning stale cache data from %s' % cachefile)
+                if cache_dead:
+                    msg = 'The cachefile %s is dead (%s hours older than cache '
+                    msg += 'duration), and the service at %s'
+                    msg = msg % (cachefile, self.get('maxcachereuse', 24), url)
                     if hasattr(he, 'status') and hasattr(he, 'reason'):
-                        self['logger'].info('%s returned %s because %s' % (he.url,
-                                                                           he.status,
-                                                                           he.reason))
+                        msg += ' is unavailable - it returned %s because %s'
+                        msg += msg % (he.status, he.reason)
                     else:
-                        self['logger'].info('%s raised a %s when accessed' % (url, he.__repr__()))
-                else:
-                    if cache_dead:
-                        msg = 'The cachefile %s is dead (%s hours older than cache '
-                        msg += 'duration), and the service at %s'
-                        msg = msg % (cachefile, self.get('maxcachereuse', 24), url)
-                        if hasattr(he, 'status') and hasattr(he, 'reason'):
-                            msg += ' is unavailable - it returned %s because %s'
-                            msg += msg % (he.status, he.reason)
-                        else:
-                            msg += ' raised a %s when accessed' % he.__repr__()
-                        self['logger'].warning(msg)
-                    elif self.get('usestalecache', False) == False:
-                        # Cache is not dead but Service is configured to not
-                        # return stale data.
-                        msg = 'The cachefile %s is stale and the service at %s'
-                        msg = msg % (cachefile, url)
-                        if hasattr(he, 'status') and hasattr(he, 'reason'):
-                            msg += ' is unavailable - it returned %s because %s'
-                            msg += 'Status: %s \nReason: %s' % (he.status, he.reason)
-                        else:
-                            msg += ' raised a %s when accessed' % he.__repr__()
-                        self['logger'].warning(msg)
-                    raise he
+                        msg += ' raised a %s when accessed' % he.__repr__()
+                    self['logger'].warning(msg)
+                elif self.get('usestalecache', False) == False:
+                    # Cache is not dead but Service is configured to not
+                    # return stale data.
+                    msg = 'The cachefile %s is stale and the service at %s'
+                    msg = msg % (cachefile, url)
+                    if hasattr(he, 'status') and hasattr(he, 'reason'):
+                        msg += ' is unavailable - it returned %s because %s'
+                        msg += 'Status: %s \nReason: %s' % (he.status, he.reason)
+                    else:
+                        msg += ' raised a %s when accessed' % he.__repr__()
+                    self['logger'].warning(msg)
+                raise he
 
     def _verbCheck(self, verb='GET'):
         if verb.upper() in self.supportVerbList:
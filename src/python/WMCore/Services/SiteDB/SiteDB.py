@@ -35,6 +35,7 @@ class SiteDBJSON(Service):
     def __init__(self, config={}):
         config = dict(config)
         config['endpoint'] = "https://cmsweb.cern.ch/sitedb/data/prod/"
+        config.setdefault('memorycachestale', 1800)
         Service.__init__(self, config)
 
     def getJSON(self, callname, file = 'result.json', clearCache = False, verb = 'GET', data={}):
@@ -46,28 +47,22 @@ class SiteDBJSON(Service):
 
         TODO: Probably want to move this up into Service
         """
-        result = ''
-        if clearCache:
-            self.clearCache(cachefile=file, inputdata=data, verb = verb)
         try:
             #Set content_type and accept_type to application/json to get json returned from siteDB.
             #Default is text/html which will return xml instead
             #Add accept-encoding to gzip,identity to overwrite httplib default gzip,deflate,
             #which is not working properly with cmsweb
-            f = self.refreshCache(cachefile=file, url=callname, inputdata=data,
-                                  verb = verb, contentType='application/json',
-                                  incoming_headers={'Accept' : 'application/json',
-                                                    'accept-encoding' : 'gzip,identity'})
-            result = f.read()
-            f.close()
+            #The unflattened results are kept in memory, see Service.getCachedData
+            return self.getCachedData(file, url=callname, inputdata=data,
+                                      parser = lambda x: unflattenJSON(json.loads(x)),
+                                      verb = verb, contentType='application/json',
+                                      incoming_headers={'Accept' : 'application/json',
+                                                        'accept-encoding' : 'gzip,identity'},
+                                      clearCache = clearCache)
         except IOError:
             raise RuntimeError("URL not available: %s" % callname )
-        try:
-            results = json.loads(result)
-            results = unflattenJSON(results)
-            return results
         except SyntaxError:
-            self.clearCache(file, args, verb = verb)
+            self.clearCache(file, data, verb = verb)
             raise SyntaxError("Problem parsing data. Cachefile cleared. Retrying may work")
 
     def _people(self, username=None, clearCache=False):
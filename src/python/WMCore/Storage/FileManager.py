@@ -19,11 +19,22 @@ from WMCore.Storage.StageOutError import StageOutInitError
 from WMCore.Storage.DeleteMgr import DeleteMgr
 from WMCore.Storage.Registry import retrieveStageOutImpl, RegistryError
 from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig
+from WMCore.Storage.StageOutPool import StageOutPool, siteLimits
 
 import WMCore.Storage.Backends
 import WMCore.Storage.Plugins
+import threading
 import time
 
+class TransferState(threading.local):
+    """
+    _TransferState_
+
+    Per thread state of the transfer in progress, so that a FileManager
+    can stage several files at the same time.
+    """
+    firstException = None
+
 class FileManager:
     """
     _FileManager_
@@ -49,6 +60,8 @@ class FileManager:
         # set defaults
         self.failed = {}
         self.completedFiles = {}
+        self.cleanups = 0
+        self.cleanupLock = threading.Lock()
         self.override = False
         self.overrideConf = overrideParams
         self.substituteGUID = True
@@ -57,6 +70,7 @@ class FileManager:
         self.tfc = None
         self.numberOfRetries = numberOfRetries
         self.retryPauseTime = retryPauseTime
+        self.transferState = TransferState()
 
         if overrideParams != {}:
             log.critical("Override: %s" % overrideParams)
@@ -88,8 +102,9 @@ class FileManager:
 
         log.info("Working on file: %s" % fileToStage['LFN'])
         lfn =           fileToStage['LFN']
+        cleanups = self.cleanups
         localFileName = fileToStage['PFN']
-        self.firstException = None
+        self.transferState.firstException = None
 
         log.info("Beginning %s" % ('StageOut' if stageOut else 'StageIn'))
 
@@ -118,18 +133,37 @@ class FileManager:
                 fileToStage['PFN'] = newPfn
                 fileToStage['SEName'] = seName
                 fileToStage['StageOutCommand'] = command
-                self.completedFiles[fileToStage['LFN']] = fileToStage
+                self.recordStageOut(fileToStage, cleanups)
                 return fileToStage
             else:
                 # transfer method didn't work, go to next one
                 continue
         # if we're here, then nothing worked. transferfail.
         log.error("Error in stageout")
-        if self.firstException:
-            raise self.firstException
+        if self.transferState.firstException:
+            raise self.transferState.firstException
         else:
             raise StageOutError, "Error in stageout, this has been logged in the logs"
 
+    def stageFiles(self, filesToStage, stageOut = True, timeout = None, **limits):
+        """
+        _stageFiles_
+
+        Stage a list of files in or out, running as many transfers at the
+        same time as max-concurrent in the local-stage-out of the site
+        config allows, one at a time without it.  maxConcurrent and
+        maxBandwidth keyword arguments override the site config.
+
+        Returns the StageOutPool results, one per file.
+        """
+        poolLimits = {}
+        if not self.override:
+            poolLimits = siteLimits(self.siteCfg.localStageOut)
+        poolLimits.update(limits)
+        pool = StageOutPool(lambda x: self.stageFile(x, stageOut = stageOut),
+                            timeout = timeout, **poolLimits)
+        return pool(filesToStage)
+
     def deleteLFN(self, lfn):
         """
         attempts to delete a file. will raise if none of the methods work, returns details otherwise
@@ -171,8 +205,8 @@ class FileManager:
                 log.info("Delete failed in an expected manner. Exception is:")
                 log.info("%s" % str(ex))
                 log.info(traceback.format_exc())
-                if not self.firstException:
-                    self.firstException = ex
+                if not self.transferState.firstException:
+                    self.transferState.firstException = ex
                 continue
             # note to people who think it's cheeky to catch exception after ranting against it:
             # this makes sense because no matter what the exception, we want to keep going
@@ -182,16 +216,16 @@ class FileManager:
                 log.critical("Delete failed in an unexpected manner. Exception is:")
                 log.critical("%s" % str(ex))
                 log.info(traceback.format_exc())
-                if not self.firstException:
-                    self.firstException = ex
+                if not self.transferState.firstException:
+                    self.transferState.firstException = ex
                 continue
 
             # successful deletions make it here
             return retval
 
         # unseuccessful transfers make it here
-        if self.firstException:
-            raise self.firstException
+        if self.transferState.firstException:
+            raise self.transferState.firstException
         else:
             raise StageOutFailure("Could not delete", **retval)
 
@@ -298,6 +332,12 @@ class FileManager:
     def stageOut(self,fileToStage):
         return self.stageFile(fileToStage, stageOut=True)
 
+    def stageInFiles(self, filesToStage, timeout = None, **limits):
+        return self.stageFiles(filesToStage, stageOut = False, timeout = timeout, **limits)
+
+    def stageOutFiles(self, filesToStage, timeout = None, **limits):
+        return self.stageFiles(filesToStage, stageOut = True, timeout = timeout, **limits)
+
     def _doTransfer(self, currentMethod, methodCounter, localFileName, pfn, stageOut):
         """
         performs a transfer using a selected method and retries.
@@ -338,8 +378,8 @@ class FileManager:
                 log.info("Sleeping for %s seconds" % self.retryPauseTime)
                 log.info(traceback.format_exc())
                 time.sleep( self.retryPauseTime )
-                if not self.firstException:
-                    self.firstException = ex
+                if not self.transferState.firstException:
+                    self.transferState.firstException = ex
                 continue
             # note to people who think it's cheeky to catch exception after ranting against it:
             # this makes sense because no matter what the exception, we want to keep going
@@ -351,8 +391,8 @@ class FileManager:
                 log.critical("Since this is an unexpected error, we are continuing to the next method")
                 log.critical("and not retrying the same one")
                 log.critical(traceback.format_exc())
-                if not self.firstException:
-                    self.firstException = ex
+                if not self.transferState.firstException:
+                    self.transferState.firstException = ex
                 break
 
             # successful transfers make it here
@@ -372,14 +412,51 @@ class FileManager:
 
 
         """
-        for lfn in self.completedFiles.keys():
-            self.info("Cleaning out file: %s\n" % lfn)
-            try:
-                self.deleteLFN(lfn)
-            except StageOutFailure as ex:
-                log.info("Failed to cleanup staged out file after error:")
-                log.info(" %s\n%s" % (lfn, str(ex)))
-                log.info(traceback.format_exc())
+        self.cleanupLock.acquire()
+        try:
+            self.cleanups += 1
+            completedFiles = self.completedFiles
+            self.completedFiles = {}
+        finally:
+            self.cleanupLock.release()
+
+        for lfn in completedFiles.keys():
+            self.cleanStageOut(lfn)
+
+    def recordStageOut(self, fileToStage, cleanups):
+        """
+        _recordStageOut_
+
+        Remember a successful stage out for cleanSuccessfulStageOuts.  A
+        transfer that was still running during a clean up, like a hanging one
+        the StageOutPool gave up on, is cleaned out right away.  cleanups is
+        the number of clean ups done when the transfer started.
+        """
+        self.cleanupLock.acquire()
+        try:
+            if self.cleanups == cleanups:
+                self.completedFiles[fileToStage['LFN']] = fileToStage
+                return
+        finally:
+            self.cleanupLock.release()
+        log.info("Stage out of %s ended after a clean up" % fileToStage['LFN'])
+        self.cleanStageOut(fileToStage['LFN'])
+        return
+
+    def cleanStageOut(self, lfn):
+        """
+        _cleanStageOut_
+
+        Delete a staged out file, failures are only logged.
+        """
+        log.info("Cleaning out file: %s\n" % lfn)
+        try:
+            self.deleteLFN(lfn)
+        except StageOutFailure as ex:
+            log.info("Failed to cleanup staged out file after error:")
+            log.info(" %s\n%s" % (lfn, str(ex)))
+            log.info(traceback.format_exc())
+        return
 
 
 
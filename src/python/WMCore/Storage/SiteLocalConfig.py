@@ -274,6 +274,10 @@ def processLocalStageOut():
                 localReport['option'] = subnode.attrs.get('value', None)
             elif subnode.name == 'catalog':
                 localReport['catalog'] = subnode.attrs.get('url', None)
+            elif subnode.name == 'max-concurrent':
+                localReport['max-concurrent'] = subnode.attrs.get('value', None)
+            elif subnode.name == 'max-bandwidth':
+                localReport['max-bandwidth'] = subnode.attrs.get('value', None)
         report['localStageOut'] = localReport
 
 @coroutine
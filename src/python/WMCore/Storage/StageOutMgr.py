@@ -9,6 +9,7 @@ use this class as a basic API
 """
 
 import os
+import threading
 
 from WMCore.WMException import WMException
 
@@ -16,6 +17,7 @@ from WMCore.Storage.StageOutError import StageOutFailure
 from WMCore.Storage.StageOutError import StageOutInitError
 from WMCore.Storage.DeleteMgr import DeleteMgr
 from WMCore.Storage.Registry import retrieveStageOutImpl
+from WMCore.Storage.StageOutPool import StageOutPool, siteLimits
 
 import WMCore.Storage.Backends
 import WMCore.Storage.Plugins
@@ -73,6 +75,8 @@ class StageOutMgr:
 
         self.failed = {}
         self.completedFiles = {}
+        self.cleanups = 0
+        self.cleanupLock = threading.Lock()
         return
 
     def initialiseSiteConf(self):
@@ -176,6 +180,7 @@ class StageOutMgr:
 
         """
         lastException = None
+        cleanups = self.cleanups
 
         print "==>Working on file: %s" % fileToStage['LFN']
         lfn = fileToStage['LFN']
@@ -190,7 +195,7 @@ class StageOutMgr:
                 fileToStage['PFN'] = pfn
                 fileToStage['SEName'] = self.siteCfg.localStageOut['se-name']
                 fileToStage['StageOutCommand'] = self.siteCfg.localStageOut['command']
-                self.completedFiles[fileToStage['LFN']] = fileToStage
+                self.recordStageOut(fileToStage, cleanups)
 
                 print "===> Stage Out Successful: %s" % fileToStage
                 return fileToStage
@@ -216,7 +221,7 @@ class StageOutMgr:
                 fileToStage['SEName'] = fallback['se-name']
                 fileToStage['StageOutCommand'] = fallback['command']
                 print "attempting fallback"
-                self.completedFiles[fileToStage['LFN']] = fileToStage
+                self.recordStageOut(fileToStage, cleanups)
                 if lfn in self.failed:
                     del self.failed[lfn]
 
@@ -228,6 +233,25 @@ class StageOutMgr:
 
         raise lastException
 
+    def stageOutFiles(self, filesToStage, timeout = None, **limits):
+        """
+        _stageOutFiles_
+
+        Stage out a list of files, running as many transfers at the same
+        time as max-concurrent in the local-stage-out of the site config
+        allows, one at a time without it.  maxConcurrent and maxBandwidth
+        keyword arguments override the site config.
+
+        Returns the StageOutPool results, one per file.
+
+        """
+        poolLimits = {}
+        if not self.override:
+            poolLimits = siteLimits(self.siteCfg.localStageOut)
+        poolLimits.update(limits)
+        pool = StageOutPool(self, timeout = timeout, **poolLimits)
+        return pool(filesToStage)
+
     def fallbackStageOut(self, lfn, localPfn, fbParams, checksums):
         """
         _fallbackStageOut_
@@ -323,20 +347,60 @@ class StageOutMgr:
 
 
         """
-        for lfn, fileInfo in self.completedFiles.items():
-            pfn = fileInfo['PFN']
-            command = fileInfo['StageOutCommand']
-            msg = "Cleaning out file: %s\n" % lfn
-            msg +=  "Removing PFN: %s" % pfn
-            msg += "Using command implementation: %s\n" % command
+        self.cleanupLock.acquire()
+        try:
+            self.cleanups += 1
+            completedFiles = self.completedFiles
+            self.completedFiles = {}
+        finally:
+            self.cleanupLock.release()
+
+        for fileInfo in completedFiles.values():
+            self.cleanStageOut(fileInfo)
+
+    def recordStageOut(self, fileToStage, cleanups):
+        """
+        _recordStageOut_
+
+        Remember a successful stage out for cleanSuccessfulStageOuts.  A
+        transfer that was still running during a clean up, like a hanging one
+        the StageOutPool gave up on, is cleaned out right away.  cleanups is
+        the number of clean ups done when the transfer started.
+
+        """
+        self.cleanupLock.acquire()
+        try:
+            if self.cleanups == cleanups:
+                self.completedFiles[fileToStage['LFN']] = fileToStage
+                return
+        finally:
+            self.cleanupLock.release()
+        print "===> Stage Out of %s ended after a clean up" % fileToStage['LFN']
+        self.cleanStageOut(fileToStage)
+        return
+
+    def cleanStageOut(self, fileInfo):
+        """
+        _cleanStageOut_
+
+        Delete a staged out file, failures are only reported.
+
+        """
+        lfn = fileInfo['LFN']
+        pfn = fileInfo['PFN']
+        command = fileInfo['StageOutCommand']
+        msg = "Cleaning out file: %s\n" % lfn
+        msg +=  "Removing PFN: %s" % pfn
+        msg += "Using command implementation: %s\n" % command
+        print msg
+        delManager = DeleteMgr(**self.overrideConf)
+        try:
+            delManager.deletePFN(pfn, lfn, command)
+        except StageOutFailure as ex:
+            msg = "Failed to cleanup staged out file after error:"
+            msg += " %s\n%s" % (lfn, str(ex))
             print msg
-            delManager = DeleteMgr(**self.overrideConf)
-            try:
-                delManager.deletePFN(pfn, lfn, command)
-            except StageOutFailure as ex:
-                msg = "Failed to cleanup staged out file after error:"
-                msg += " %s\n%s" % (lfn, str(ex))
-                print msg
+        return
 
 
 
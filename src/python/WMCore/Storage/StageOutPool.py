@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+_StageOutPool_
+
+Stage out a list of files with a bounded number of concurrent transfers.
+
+Every file is handed to the stage out manager in a worker thread, so the
+retries and fallbacks of the manager are the same as for a serial stage
+out.  The copies are done by external commands, the threads only wait for
+them.
+
+The limits come from the local-stage-out section of the site config:
+
+  <local-stage-out>
+    ...
+    <max-concurrent value="4"/>
+    <max-bandwidth value="200"/>
+  </local-stage-out>
+
+max-concurrent is the number of transfers running at the same time,
+max-bandwidth the total rate in MB/s at which the pool starts sending
+bytes.  The first transfer always starts right away, the following ones
+are delayed so that on average no more than max-bandwidth MB/s are sent.
+"""
+
+import logging
+import os
+import Queue
+import threading
+import time
+
+from WMCore.Algorithms.Alarm import Alarm
+
+
+def siteLimits(localStageOut):
+    """
+    _siteLimits_
+
+    Return the max-concurrent and max-bandwidth settings of a
+    local-stage-out dictionary as keyword arguments for StageOutPool.
+    """
+    limits = {}
+    if localStageOut.get('max-concurrent', None) != None:
+        limits['maxConcurrent'] = int(localStageOut['max-concurrent'])
+    if localStageOut.get('max-bandwidth', None) != None:
+        limits['maxBandwidth'] = float(localStageOut['max-bandwidth'])
+    return limits
+
+
+def fileSize(fileToStage):
+    """
+    _fileSize_
+
+    Size of the local file of a transfer, zero if it can't be found.
+    """
+    try:
+        return os.path.getsize(fileToStage['PFN'])
+    except (OSError, TypeError):
+        return 0
+
+
+class StageOutPool(object):
+    """
+    _StageOutPool_
+
+    Call with a list of fileToStage dictionaries, returns one result per
+    file in the same order:
+
+      file    the fileToStage dictionary, updated by the manager
+      staged  True if the transfer succeeded
+      error   the exception of a failed transfer
+      time    seconds spent in the transfer, None if it never started
+
+    No new transfer is started once one has failed with an exception, like
+    the serial stage out stops at the first failure, the files that weren't
+    attempted come back with staged False and no error.  A transfer running
+    for longer than timeout seconds fails with an Alarm and the other files
+    are still staged out: the hanging transfer is left behind and another
+    worker takes its place.
+    """
+    def __init__(self, stageOut, maxConcurrent = 1, maxBandwidth = None, timeout = None):
+        self.stageOut = stageOut
+        self.maxConcurrent = max(int(maxConcurrent), 1)
+        self.maxBandwidth = maxBandwidth
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.nextStart = None
+        self.abort = threading.Event()
+        return
+
+    def throttle(self, fileToStage):
+        """
+        _throttle_
+
+        Wait until the bandwidth budget allows the transfer to start.
+        """
+        if not self.maxBandwidth:
+            return
+        duration = fileSize(fileToStage) / (self.maxBandwidth * 1000000.0)
+        self.lock.acquire()
+        try:
+            now = time.time()
+            start = max(now, self.nextStart or now)
+            self.nextStart = start + duration
+        finally:
+            self.lock.release()
+        if start > now:
+            logging.info("Delaying stage out of %s by %.1f seconds to stay below %s MB/s" \
+                         % (fileToStage['LFN'], start - now, self.maxBandwidth))
+            time.sleep(start - now)
+        return
+
+    def worker(self, filesToStage, pending, started, finished, abandoned):
+        """
+        _worker_
+
+        Stage out files from the pending queue until it's empty, a transfer
+        failed or the worker was abandoned because its transfer hung.  Puts
+        (worker, index, error, seconds) on the finished queue for every
+        transfer and (worker, None, None, None) when the worker exits.
+        """
+        worker = threading.currentThread()
+        try:
+            while not self.abort.isSet() and worker not in abandoned:
+                try:
+                    index = pending.get_nowait()
+                except Queue.Empty:
+                    break
+                self.throttle(filesToStage[index])
+                if self.abort.isSet():
+                    break
+                start = time.time()
+                started[index] = (start, worker)
+                error = None
+                try:
+                    self.stageOut(filesToStage[index])
+                except Exception as ex:
+                    error = ex
+                    self.abort.set()
+                started.pop(index, None)
+                finished.put((worker, index, error, time.time() - start))
+        finally:
+            finished.put((worker, None, None, None))
+        return
+
+    def startWorker(self, *args):
+        """
+        _startWorker_
+
+        Start a worker thread, returns it.
+        """
+        worker = threading.Thread(target = self.worker, args = args)
+        # a hanging transfer must not keep the job alive
+        worker.setDaemon(True)
+        worker.start()
+        return worker
+
+    def __call__(self, filesToStage):
+        """
+        _operator()_
+
+        Stage out the files, returns the list of results.
+        """
+        self.abort.clear()
+        self.nextStart = None
+
+        results = []
+        pending = Queue.Queue()
+        for index, fileToStage in enumerate(filesToStage):
+            results.append({"file": fileToStage, "staged": False,
+                            "error": None, "time": None})
+            pending.put(index)
+
+        started = {}
+        finished = Queue.Queue()
+        abandoned = set()
+        workerArgs = (filesToStage, pending, started, finished, abandoned)
+        running = set()
+        for i in range(min(self.maxConcurrent, len(filesToStage))):
+            running.add(self.startWorker(*workerArgs))
+        logging.info("Staging out %i files with %i concurrent transfers" \
+                     % (len(filesToStage), len(running)))
+
+        while running:
+            try:
+                (worker, index, error, elapsed) = finished.get(timeout = 1)
+            except Queue.Empty:
+                if self.timeout == None:
+                    continue
+                now = time.time()
+                for index, (start, worker) in started.items():
+                    if now - start <= self.timeout or worker in abandoned:
+                        continue
+                    msg = "Indefinite hang during stageOut of %s" % filesToStage[index]['LFN']
+                    logging.error(msg)
+                    results[index]["error"] = Alarm(msg)
+                    results[index]["time"] = now - start
+                    abandoned.add(worker)
+                    running.discard(worker)
+                    if not self.abort.isSet():
+                        running.add(self.startWorker(*workerArgs))
+                continue
+
+            if worker in abandoned:
+                # the late end of a transfer we gave up on
+                continue
+            if index == None:
+                running.discard(worker)
+                continue
+            results[index]["staged"] = error == None
+            results[index]["error"] = error
+            results[index]["time"] = elapsed
+        return results
@@ -22,11 +22,20 @@ Usage: Given a TFC constact string: trivialcatalog_file:/path?protocol=proto
 
     pfn = tfcInstance.matchLFN(protocol, lfn)
 
+or for many LFNs at once
+
+    pfns = tfcInstance.matchLFNs(protocol, lfns)
+
+The rules are compiled on first use: they're grouped by protocol and the
+literal prefix each path-match requires is indexed in a trie, so only the
+rules that can match a path are tried, in their original order.  Results
+are kept in an approximate LRU cache which also memoizes the chained rules.
 
 """
 
 import os
 import re
+import threading
 import urlparse
 from xml.dom.minidom import Element
 
@@ -34,6 +43,138 @@ from WMCore.Algorithms.ParseXMLFile import Node, xmlFileToNode
 
 _TFCArgSplit = re.compile("\?protocol=")
 
+_NotCached = object()
+
+_RegexpSpecials = ".^$*+?{}[]()|\\"
+
+
+def literalPrefix(pattern):
+    """
+    _literalPrefix_
+
+    Return (collapseSlashes, prefix) for a path-match: every path matched
+    by the pattern starts with prefix.  If collapseSlashes is set the
+    pattern starts with /+ and the prefix applies to the path with its
+    leading slashes collapsed to one, so the slashes following the /+ are
+    left out of the prefix.  The prefix is empty when nothing
+    can be said about the pattern.
+    """
+    if "|" in pattern:
+        return (False, "")
+
+    i = 0
+    if pattern.startswith("^"):
+        i = 1
+    collapseSlashes = False
+    prefix = ""
+    if pattern[i:i + 2] == "/+":
+        collapseSlashes = True
+        prefix = "/"
+        i += 2
+        # slashes right after /+ are collapsed into the first one as well,
+        # escaped or not
+        while pattern[i:i + 1] == "/" or pattern[i:i + 2] == "\\/":
+            i += 1 + (pattern[i] == "\\")
+            if pattern[i:i + 1] in ["+", "*", "?"]:
+                i += 1
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                break
+            literal = pattern[i + 1]
+            step = 2
+        elif char in _RegexpSpecials:
+            break
+        else:
+            literal = char
+            step = 1
+        quantifier = pattern[i + step:i + step + 1]
+        if quantifier in ["*", "?", "{"]:
+            break
+        prefix += literal
+        i += step
+        if quantifier == "+":
+            break
+    return (collapseSlashes, prefix)
+
+
+class CompiledRules(object):
+    """
+    _CompiledRules_
+
+    The rules of one mapping style and protocol.  Rules with a literal
+    prefix are indexed in a character trie, the others are always tried.
+    Every trie node holds the rules whose prefix ends at or above it, so a
+    lookup only has to find the deepest node on the path.
+    """
+    def __init__(self):
+        self.rules = []
+        self.tries = {False: {None: []}, True: {None: []}}
+        self.unindexed = []
+        self.candidateCache = {}
+        return
+
+    def addRule(self, mapping):
+        """
+        _addRule_
+
+        Add the next mapping of the protocol.
+        """
+        index = len(self.rules)
+        self.rules.append(mapping)
+        self.candidateCache = {}
+        (collapseSlashes, prefix) = literalPrefix(mapping['path-match'])
+        if mapping['chain'] != None or not prefix:
+            # chained rules don't have to match the original path
+            self.unindexed.append(index)
+            return
+
+        node = self.tries[collapseSlashes]
+        for char in prefix:
+            if char not in node:
+                node[char] = {None: list(node[None])}
+            node = node[char]
+        self._addToSubtree(node, index)
+        return
+
+    def _addToSubtree(self, node, index):
+        for (char, child) in node.items():
+            if char == None:
+                child.append(index)
+            else:
+                self._addToSubtree(child, index)
+        return
+
+    def _deepest(self, node, path):
+        for char in path:
+            child = node.get(char)
+            if child == None:
+                break
+            node = child
+        return node
+
+    def candidates(self, path):
+        """
+        _candidates_
+
+        Return the rules that may match the path, in their original order.
+        """
+        raw = self.tries[False]
+        if len(raw) > 1:
+            raw = self._deepest(raw, path)
+        collapsed = self.tries[True]
+        if len(collapsed) > 1 and path.startswith("/"):
+            collapsed = self._deepest(collapsed, "/" + path.lstrip("/"))
+        key = (id(raw), id(collapsed))
+        rules = self.candidateCache.get(key)
+        if rules == None:
+            indices = sorted(self.unindexed + raw[None] + collapsed[None])
+            rules = [self.rules[x] for x in indices]
+            self.candidateCache[key] = rules
+        return rules
+
 
 class TrivialFileCatalog(dict):
     """
@@ -48,6 +189,53 @@ class TrivialFileCatalog(dict):
         self['lfn-to-pfn'] = []
         self['pfn-to-lfn'] = []
         self.preferredProtocol = None # attribute for preferred protocol
+        self.cacheSize = 10000
+        self._resetMatcher()
+
+    def _resetMatcher(self):
+        """
+        _resetMatcher_
+
+        Drop the compiled rules and the cached results
+        """
+        self.compiled = None
+        self.compiledSizes = None
+        self.matchCache = {}
+        self.oldMatchCache = {}
+        self.matchLock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ['compiled', 'compiledSizes', 'matchCache', 'oldMatchCache', 'matchLock']:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._resetMatcher()
+
+    def _compile(self):
+        """
+        _compile_
+
+        Group the rules of each mapping style by protocol and return them.
+        Rules appended to the lists directly are picked up as well.
+        """
+        sizes = (len(self['lfn-to-pfn']), len(self['pfn-to-lfn']))
+        if self.compiled != None and self.compiledSizes == sizes:
+            return self.compiled
+        with self.matchLock:
+            if self.compiled == None or self.compiledSizes != sizes:
+                compiled = {}
+                for style in ['lfn-to-pfn', 'pfn-to-lfn']:
+                    for mapping in self[style]:
+                        key = (style, mapping['protocol'])
+                        compiled.setdefault(key, CompiledRules()).addRule(mapping)
+                self.matchCache = {}
+                self.oldMatchCache = {}
+                self.compiled = compiled
+                self.compiledSizes = sizes
+            return self.compiled
 
 
     def addMapping(self, protocol, match, result,
@@ -65,6 +253,7 @@ class TrivialFileCatalog(dict):
         entry.setdefault("result", result)
         entry.setdefault("chain", chain)
         self[mapping_type].append(entry)
+        self._resetMatcher()
 
 
     def _doMatch(self, protocol, path, style, caller):
@@ -76,24 +265,43 @@ class TrivialFileCatalog(dict):
         Return None if no match
 
         """
-        for mapping in self[style]:
-            if mapping['protocol'] != protocol:
-                continue
-            if mapping['path-match-expr'].match(path) or mapping["chain"] != None:
+        compiled = self._compile()
+        key = (style, protocol, path)
+        result = self.matchCache.get(key, _NotCached)
+        if result is _NotCached:
+            result = self.oldMatchCache.get(key, _NotCached)
+            if result is not _NotCached:
+                self.matchCache[key] = result
+        if result is not _NotCached:
+            return result
+
+        result = None
+        rules = compiled.get((style, protocol), None)
+        if rules != None:
+            for mapping in rules.candidates(path):
                 if mapping["chain"] != None:
-                    oldpath = path
-                    path = caller(mapping["chain"], path)
-                    if not path:
+                    chainedPath = caller(mapping["chain"], path)
+                    if not chainedPath:
                         continue
+                elif mapping['path-match-expr'].match(path):
+                    chainedPath = path
+                else:
+                    continue
                 try:
-                    splitPath = mapping['path-match-expr'].split(path, 1)[1]
+                    splitPath = mapping['path-match-expr'].split(chainedPath, 1)[1]
                 except IndexError:
-                    path = oldpath
                     continue
                 result = mapping['result'].replace("$1", splitPath)
-                return result
-
-        return None
+                break
+
+        # two generations approximate an LRU with plain dictionaries: once
+        # the recent results fill up they replace the old ones, and old
+        # results that are used again move back to the recent ones
+        if len(self.matchCache) >= self.cacheSize:
+            self.oldMatchCache = self.matchCache
+            self.matchCache = {}
+        self.matchCache[key] = result
+        return result
 
 
     def matchLFN(self, protocol, lfn):
@@ -124,6 +332,28 @@ class TrivialFileCatalog(dict):
         return result
 
 
+    def matchLFNs(self, protocol, lfns):
+        """
+        _matchLFNs_
+
+        Match many LFNs for a protocol, returns a dictionary of the results
+        keyed by LFN
+
+        """
+        return dict([(lfn, self.matchLFN(protocol, lfn)) for lfn in lfns])
+
+
+    def matchPFNs(self, protocol, pfns):
+        """
+        _matchPFNs_
+
+        Match many PFNs for a protocol, returns a dictionary of the results
+        keyed by PFN
+
+        """
+        return dict([(pfn, self.matchPFN(protocol, pfn)) for pfn in pfns])
+
+
     def getXML(self):
         """
         Converts TFC implementation (dict) into a XML string representation.
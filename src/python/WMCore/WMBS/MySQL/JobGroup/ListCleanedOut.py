@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+_ListCleanedOut_
+
+MySQL implementation of JobGroup.ListCleanedOut
+"""
+
+
+
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class ListCleanedOut(DBFormatter):
+    """
+    Out of a list of job groups, list the ones that have all their jobs in
+    the cleanout state.
+    """
+    sql = """SELECT wmbs_jobgroup.id FROM wmbs_jobgroup
+              WHERE wmbs_jobgroup.id = :jobgroup
+              AND NOT EXISTS (SELECT wmbs_job.id FROM wmbs_job
+                                INNER JOIN wmbs_job_state ON
+                                  wmbs_job.state = wmbs_job_state.id
+                               WHERE wmbs_job.jobgroup = wmbs_jobgroup.id
+                               AND wmbs_job_state.name != 'cleanout')"""
+
+    def format(self, results):
+        """
+        _format_
+
+        Format the jobgroup ids into a single list.
+        """
+        results = DBFormatter.format(self, results)
+
+        return [result[0] for result in results]
+
+    def execute(self, jobGroups, conn = None, transaction = False):
+        if len(jobGroups) == 0:
+            return []
+
+        binds = [{"jobgroup": jobGroup} for jobGroup in jobGroups]
+        result = self.dbi.processData(self.sql, binds,
+                                      conn = conn, transaction = transaction)
+        return self.format(result)
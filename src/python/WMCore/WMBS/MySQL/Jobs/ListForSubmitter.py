@@ -2,7 +2,8 @@
 """
 _ListForSubmitter_
 
-MySQL function to list jobs for submission
+MySQL function to list jobs for submission.  If minStateTime is given only
+the jobs that entered the created state at or after that time are listed.
 """
 
 
@@ -13,6 +14,8 @@ from WMCore.Database.DBFormatter import DBFormatter
 class ListForSubmitter(DBFormatter):
     sql = """SELECT wmbs_job.id AS id, wmbs_job.name AS name,
                     wmbs_job.cache_dir AS cache_dir,
+                    wmbs_job.state_time AS state_time,
+                    wmbs_job.jobgroup AS jobgroup,
                     wmbs_sub_types.name AS type, wmbs_job.retry_count AS retry_count,
                     wmbs_subscription.workflow as workflow,
                     wmbs_subscription.last_update as timestamp,
@@ -33,7 +36,13 @@ class ListForSubmitter(DBFormatter):
                  wmbs_subscription.workflow = wmbs_workflow.id
              WHERE wmbs_job_state.name = 'created'"""
 
-    def execute(self, conn = None, transaction = False):
-        result = self.dbi.processData(self.sql, conn = conn,
+    def execute(self, conn = None, transaction = False, minStateTime = None):
+        sql = self.sql
+        binds = {}
+        if minStateTime != None:
+            sql += " AND wmbs_job.state_time >= :state_time"
+            binds = {'state_time' : minStateTime}
+
+        result = self.dbi.processData(sql, binds, conn = conn,
                                       transaction = transaction)
         return self.formatDict(result)
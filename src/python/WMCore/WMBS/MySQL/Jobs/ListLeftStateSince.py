@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""
+_ListLeftStateSince_
+
+MySQL implementation of Jobs.ListLeftStateSince
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class ListLeftStateSince(DBFormatter):
+    """
+    _ListLeftStateSince_
+
+    List the IDs of the jobs that changed state at or after a given time and
+    that are not in the given state anymore.  Used by the JobSubmitter to
+    find out which of its cached jobs were submitted, killed or failed.
+    """
+    sql = """SELECT wmbs_job.id AS id FROM wmbs_job
+               INNER JOIN wmbs_job_state ON
+                 wmbs_job.state = wmbs_job_state.id
+             WHERE wmbs_job.state_time >= :state_time AND
+                   wmbs_job_state.name != :state"""
+
+    def execute(self, state, stateTime, conn = None, transaction = False):
+        result = self.dbi.processData(self.sql,
+                                      {'state' : state, 'state_time' : stateTime},
+                                      conn = conn, transaction = transaction)
+        return [x['id'] for x in self.formatDict(result)]
@@ -62,5 +62,6 @@ class LoadFromID(DBFormatter):
             binds = {"jobid": jobID}
 
         result = self.dbi.processData(self.sql, binds, conn = conn,
-                                      transaction = transaction)
+                                      transaction = transaction,
+                                      streaming = True, bulkSelect = True)
         return self.formatDict(result)
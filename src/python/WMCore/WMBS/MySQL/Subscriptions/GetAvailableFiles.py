@@ -61,5 +61,6 @@ class GetAvailableFiles(DBFormatter):
                                         returnCursor = returnCursor)
 
         results = self.dbi.processData(self.sql, {"subscription": subscription},
-                                       conn = conn, transaction = transaction)
+                                       conn = conn, transaction = transaction,
+                                       streaming = True)
         return self.formatDict(results)
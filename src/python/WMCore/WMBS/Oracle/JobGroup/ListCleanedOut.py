@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+"""
+_ListCleanedOut_
+
+Oracle implementation of JobGroup.ListCleanedOut
+"""
+
+
+
+
+from WMCore.WMBS.MySQL.JobGroup.ListCleanedOut import ListCleanedOut as MySQLListCleanedOut
+
+class ListCleanedOut(MySQLListCleanedOut):
+    pass
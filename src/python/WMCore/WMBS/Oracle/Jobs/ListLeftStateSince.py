@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+_ListLeftStateSince_
+
+Oracle implementation of Jobs.ListLeftStateSince
+"""
+
+from WMCore.WMBS.MySQL.Jobs.ListLeftStateSince import ListLeftStateSince as MySQLListLeftStateSince
+
+class ListLeftStateSince(MySQLListLeftStateSince):
+    pass
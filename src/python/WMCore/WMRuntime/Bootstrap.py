@@ -10,7 +10,6 @@ Frontend module for setting up TaskSpace & StepSpace areas within a job.
 
 
 import inspect
-import pickle
 import os
 import os.path
 import logging
@@ -26,6 +25,7 @@ from WMCore                    import WMLogging
 from WMCore.WMRuntime.Watchdog import Watchdog
 
 from WMCore.DataStructs.JobPackage import JobPackage
+from WMCore.DataStructs.JobPackageStore import JobPackageStore, isJobPackageStore
 from WMCore.WMSpec.WMWorkload      import WMWorkloadHelper
 
 from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig, SiteConfigError, SiteLocalConfig
@@ -124,10 +124,15 @@ def loadJobDefinition():
     it doesn't know the retry_count and will create the wrong file
     """
     sandboxLoc = locateWMSandbox()
-    package = JobPackage()
     packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
     try:
-        package.load(packageLoc)
+        if isJobPackageStore(packageLoc):
+            # Only the record for this job will be unpickled
+            package = JobPackageStore(packageLoc, writeIndex = False)
+            package.loadIndex()
+        else:
+            package = JobPackage()
+            package.load(packageLoc)
     except Exception as ex:
         msg = "Failed to load JobPackage:%s\n" % packageLoc
         msg += str(ex)
@@ -168,11 +173,10 @@ def loadWorkload():
     """
     sandboxLoc = locateWMSandbox()
     workloadPcl = "%s/WMWorkload.pkl" % sandboxLoc
-    handle = open(workloadPcl, 'r')
-    wmWorkload = pickle.load(handle)
-    handle.close()
+    wmWorkload = WMWorkloadHelper()
+    wmWorkload.load(workloadPcl)
 
-    return WMWorkloadHelper(wmWorkload)
+    return wmWorkload
 
 
 
@@ -15,10 +15,10 @@ import logging
 import traceback
 import time
 
-import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
 import WMCore.FwkJobReport.Report        as Report
 
 from WMCore.WMRuntime.Monitors.DashboardMonitor import getStepPID
+from WMCore.WMRuntime.Monitors.ProcessTreeSampler import ProcessTreeSampler
 from WMCore.WMRuntime.Monitors.WMRuntimeMonitor import WMRuntimeMonitor
 from WMCore.WMSpec.Steps.Executor               import getStepSpace
 from WMCore.WMSpec.WMStep                       import WMStepHelper
@@ -45,8 +45,8 @@ class PerformanceMonitor(WMRuntimeMonitor):
     """
     _PerformanceMonitor_
 
-    Monitors the performance by pinging ps and
-    recording data regarding the current step
+    Monitors the performance by sampling /proc for the process tree of the
+    current step and recording data regarding it
     """
 
     def __init__(self):
@@ -57,16 +57,11 @@ class PerformanceMonitor(WMRuntimeMonitor):
 
         self.pid              = None
         self.uid              = os.getuid()
-        self.monitorBase      = "ps -p %i -o pid,ppid,rss,vsize,pcpu,pmem,cmd -ww | grep %i"
-        self.monitorCommand   = None
+        self.sampler          = None
+        self.maxSamples       = None
         self.currentStepSpace = None
         self.currentStepName  = None
 
-        self.rss   = []
-        self.vsize = []
-        self.pcpu  = []
-        self.pmem  = []
-
         self.maxRSS      = None
         self.maxVSize    = None
         self.softTimeout = None
@@ -97,6 +92,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
         self.maxVSize    = args.get('maxVSize', None)
         self.softTimeout = args.get('softTimeout', None)
         self.hardTimeout = args.get('hardTimeout', None)
+        self.maxSamples  = args.get('maxSamples', 720)
 
         self.logPath = os.path.join(logPath)
 
@@ -122,6 +118,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
         self.stepHelper = WMStepHelper(step)
         self.currentStepName  = getStepName(step)
         self.currentStepSpace = None
+        self.sampler          = None
 
         if not self.stepHelper.stepType() in self.watchStepTypes:
             self.disableStep = True
@@ -141,11 +138,31 @@ class PerformanceMonitor(WMRuntimeMonitor):
         Package the information and send it off
         """
 
-        if not self.disableStep:
+        if self.disableStep:
             # No information to correlate
             return
 
+        if self.sampler != None and stepReport != None:
+            summary = self.sampler.summary()
+            stepName = self.currentStepName
+            for (metric, setter) in [("rss", stepReport.setStepRSS),
+                                     ("pss", stepReport.setStepPSS),
+                                     ("vsize", stepReport.setStepVSize),
+                                     ("pcpu", stepReport.setStepPCPU)]:
+                if metric not in summary:
+                    continue
+                stats = summary[metric]
+                percentiles = dict([(x, y) for (x, y) in stats.items()
+                                    if x not in ["min", "max", "average"]])
+                setter(stepName = stepName, min = stats["min"], max = stats["max"],
+                       average = stats["average"], percentiles = percentiles)
+            if "readBytes" in summary:
+                stepReport.setStepIO(stepName = stepName,
+                                     readBytes = summary["readBytes"]["max"],
+                                     writeBytes = summary["writeBytes"]["max"])
+
         self.currentStepName  = None
+        self.sampler          = None
         self.currentStepSpace = None
 
         return
@@ -183,23 +200,20 @@ class PerformanceMonitor(WMRuntimeMonitor):
             # Then we have no step PID, we can do nothing
             return
 
-        # Now we run the monitor command and collate the data
-        cmd = self.monitorBase % (stepPID, stepPID)
-        stdout, stderr, retcode = subprocessAlgos.runCommand(cmd)
-
-        output = stdout.split()
-        if not len(output) > 7:
-            # Then something went wrong in getting the ps data
-            msg =  "Error when grabbing output from process ps\n"
-            msg += "output = %s\n" % output
-            msg += "command = %s\n" % self.monitorCommand
-            logging.error(msg)
+        # Now we sample the step process tree and collate the data
+        if self.sampler == None or self.sampler.pid != stepPID:
+            self.sampler = ProcessTreeSampler(stepPID, maxSamples = self.maxSamples)
+        sample = self.sampler.sample()
+        if sample == None:
+            # Then the step process is gone
+            logging.debug("Step process %s is not running" % stepPID)
             return
-        rss   = float(output[2])
-        vsize = float(output[3])
-        logging.info("Retrieved following performance figures:")
-        logging.info("RSS: %s;  VSize: %s; PCPU: %s; PMEM: %s" % (output[2], output[3],
-                                                                  output[4], output[5]))
+        rss   = sample["rss"]
+        vsize = sample["vsize"]
+        logging.debug("Retrieved following performance figures:")
+        logging.debug("RSS: %s;  PSS: %s; VSize: %s; PCPU: %.1f; Processes: %s" % (rss, sample["pss"], vsize,
+                                                                                  sample["pcpu"],
+                                                                                  sample["processes"]))
 
         msg = 'Error in CMSSW step %s\n' % self.currentStepName
         if self.maxRSS != None and rss >= self.maxRSS:
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+_ProcessTreeSampler_
+
+Sample the memory, CPU and IO usage of a process and all its descendants
+straight from /proc, without forking ps.
+
+Every sample sums over the live processes of the tree:
+  rss        VmRSS from /proc/<pid>/status, KiB
+  pss        Pss from /proc/<pid>/smaps_rollup if the kernel has it, KiB
+  vsize      vsize from /proc/<pid>/stat, KiB
+  pcpu       CPU used since the previous sample in percent of one core
+  readBytes  read_bytes from /proc/<pid>/io
+  writeBytes write_bytes from /proc/<pid>/io
+
+The IO counters are running totals: the last values seen for a process
+that exited are kept, unless a parent in the tree is still there to reap
+it, the kernel then adds them to the counters of the parent.
+
+The last maxSamples samples are kept in a ring buffer for percentiles, the
+minimum, maximum and average of every metric cover all the samples.
+"""
+
+import collections
+import os
+import time
+
+from WMCore.Algorithms.MathAlgos import getPercentile
+
+METRICS = ["rss", "pss", "vsize", "pcpu", "readBytes", "writeBytes"]
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def readProcFile(pid, name, procDir = "/proc"):
+    """
+    _readProcFile_
+
+    Read /proc/<pid>/<name>, returns None if the process is gone or the
+    file can't be read.
+    """
+    try:
+        handle = open(os.path.join(procDir, str(pid), name), 'r')
+        try:
+            return handle.read()
+        finally:
+            handle.close()
+    except (IOError, OSError):
+        return None
+
+
+def parseStat(contents):
+    """
+    _parseStat_
+
+    Return the fields of /proc/<pid>/stat after the command name, which may
+    contain spaces.  The first returned field is the state.
+    """
+    return contents[contents.rindex(')') + 2:].split()
+
+
+def parseKeyValues(contents):
+    """
+    _parseKeyValues_
+
+    Parse the 'Key: value [kB]' lines of status, io or smaps_rollup into a
+    dictionary of integers.
+    """
+    values = {}
+    for line in contents.splitlines():
+        fields = line.split(':', 1)
+        if len(fields) != 2:
+            continue
+        value = fields[1].split()
+        if value and value[0].isdigit():
+            values[fields[0]] = int(value[0])
+    return values
+
+
+def listProcessTree(pid, procDir = "/proc"):
+    """
+    _listProcessTree_
+
+    Return the PIDs of a process and all its descendants.  The children
+    files of the kernel are used when available, otherwise the parent of
+    every process on the node is read.
+    """
+    if os.path.exists(os.path.join(procDir, str(pid), "task", str(pid), "children")):
+        tree = []
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            tree.append(current)
+            try:
+                tasks = os.listdir(os.path.join(procDir, str(current), "task"))
+            except OSError:
+                # exited while we looked at it
+                continue
+            for task in tasks:
+                children = readProcFile(current, os.path.join("task", task, "children"), procDir)
+                if children:
+                    pending.extend([int(x) for x in children.split()])
+        return tree
+
+    parents = {}
+    for entry in os.listdir(procDir):
+        if not entry.isdigit():
+            continue
+        contents = readProcFile(entry, "stat", procDir)
+        if contents:
+            parents.setdefault(int(parseStat(contents)[1]), []).append(int(entry))
+
+    tree = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(parents.get(current, []))
+    return tree
+
+
+class ProcessTreeSampler(object):
+    """
+    _ProcessTreeSampler_
+
+    Call sample() periodically while the process runs, then summary() for
+    the statistics of every metric.
+    """
+    def __init__(self, pid, maxSamples = 720, procDir = "/proc"):
+        self.pid = pid
+        self.procDir = procDir
+        self.samples = collections.deque(maxlen = maxSamples)
+        self.stats = {}
+        self.lastCPU = None
+        self.lastIO = {}
+        self.exitedIO = {"readBytes": 0, "writeBytes": 0}
+        return
+
+    def readTree(self):
+        """
+        _readTree_
+
+        Sum the usage of the live processes of the tree.  Returns None if
+        the process is gone.
+        """
+        totals = {"rss": 0, "vsize": 0, "cpuTicks": 0, "readBytes": 0,
+                  "writeBytes": 0, "processes": 0, "pss": None, "startTime": None}
+        currentIO = {}
+        for pid in listProcessTree(self.pid, self.procDir):
+            stat = readProcFile(pid, "stat", self.procDir)
+            status = readProcFile(pid, "status", self.procDir)
+            if stat == None or status == None:
+                # exited while we looked at it
+                continue
+            stat = parseStat(stat)
+            totals["processes"] += 1
+            # utime, stime, cutime and cstime so that children reaped by a
+            # process of the tree are still accounted for
+            totals["cpuTicks"] += sum([int(x) for x in stat[11:15]])
+            totals["vsize"] += int(stat[20]) / 1024
+            totals["rss"] += parseKeyValues(status).get("VmRSS", 0)
+            if pid == self.pid:
+                totals["startTime"] = float(stat[19]) / CLOCK_TICKS
+
+            io = readProcFile(pid, "io", self.procDir)
+            if io != None:
+                io = parseKeyValues(io)
+                # the start time tells a reused PID apart
+                currentIO[(pid, stat[19])] = (int(stat[1]), io.get("read_bytes", 0),
+                                              io.get("write_bytes", 0))
+            rollup = readProcFile(pid, "smaps_rollup", self.procDir)
+            if rollup != None:
+                totals["pss"] = (totals["pss"] or 0) + parseKeyValues(rollup).get("Pss", 0)
+
+        if totals["startTime"] == None:
+            return None
+
+        livePids = set([x[0] for x in currentIO.keys()])
+        for (key, (ppid, readBytes, writeBytes)) in self.lastIO.items():
+            if key in currentIO or ppid in livePids:
+                continue
+            self.exitedIO["readBytes"] += readBytes
+            self.exitedIO["writeBytes"] += writeBytes
+        self.lastIO = currentIO
+
+        totals["readBytes"] = self.exitedIO["readBytes"] + sum([x[1] for x in currentIO.values()])
+        totals["writeBytes"] = self.exitedIO["writeBytes"] + sum([x[2] for x in currentIO.values()])
+        return totals
+
+    def sample(self):
+        """
+        _sample_
+
+        Take a sample and add it to the time series.  Returns the sample, or
+        None if the process is gone.
+        """
+        totals = self.readTree()
+        if totals == None:
+            return None
+
+        now = time.time()
+        cpuSeconds = float(totals["cpuTicks"]) / CLOCK_TICKS
+        if self.lastCPU == None:
+            # average since the process started like ps does
+            uptime = float(readProcFile("", "uptime", self.procDir).split()[0])
+            elapsed = uptime - totals["startTime"]
+            cpuUsed = cpuSeconds
+        else:
+            elapsed = now - self.lastCPU[0]
+            cpuUsed = cpuSeconds - self.lastCPU[1]
+        self.lastCPU = (now, cpuSeconds)
+
+        sample = {"time": now, "processes": totals["processes"],
+                  "pcpu": max(cpuUsed, 0.0) * 100.0 / max(elapsed, 0.01)}
+        for metric in ["rss", "pss", "vsize", "readBytes", "writeBytes"]:
+            sample[metric] = totals[metric]
+        self.samples.append(sample)
+
+        for metric in METRICS:
+            value = sample[metric]
+            if value == None:
+                continue
+            if metric not in self.stats:
+                self.stats[metric] = {"min": value, "max": value, "sum": 0.0, "count": 0}
+            stats = self.stats[metric]
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            stats["sum"] += value
+            stats["count"] += 1
+        return sample
+
+    def summary(self, percentiles = (50, 90, 99)):
+        """
+        _summary_
+
+        Return min, max, average and the requested percentiles of every
+        metric that was sampled, keyed by metric name.
+        """
+        result = {}
+        for metric, stats in self.stats.items():
+            values = [x[metric] for x in self.samples if x[metric] != None]
+            result[metric] = {"min": stats["min"], "max": stats["max"],
+                              "average": stats["sum"] / stats["count"]}
+            for percent in percentiles:
+                result[metric]["p%i" % percent] = getPercentile(values, percent)
+        return result
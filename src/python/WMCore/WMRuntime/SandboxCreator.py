@@ -130,9 +130,10 @@ class SandboxCreator:
 
 
 
-        # pickle up the workload for storage in the sandbox
+        # pickle up the workload for storage in the sandbox, chunked so
+        # the components only unpickle the tasks they need
         workload.setSpecUrl(workloadFile)
-        workload.save(workloadFile)
+        workload.save(workloadFile, chunked = True)
 
         # now, tar everything up and put it somewhere special
         #(archiveHandle,archivePath) = tempfile.mkstemp('.tar.bz2','sbox',
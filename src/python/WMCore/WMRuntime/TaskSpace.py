@@ -11,7 +11,6 @@ Runtime utils for a Task
 import os
 import sys
 import inspect
-import pickle
 
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 
@@ -72,10 +71,8 @@ class TaskSpace:
         wmsandboxLoc = inspect.getsourcefile(WMSandbox)
         workloadPcl = wmsandboxLoc.replace("__init__.py","WMWorkload.pkl")
 
-        handle = open(workloadPcl, 'r')
-        wmWorkload = pickle.load(handle)
-        handle.close()
-        self.workload = WMWorkloadHelper(wmWorkload)
+        self.workload = WMWorkloadHelper()
+        self.workload.load(workloadPcl)
         return
 
     @preloadWorkload
@@ -11,6 +11,7 @@ import os.path
 import threading
 import logging
 import traceback
+import time
 
 from WMCore.WMFactory   import WMFactory
 from WMCore.WMException import WMException
@@ -45,6 +46,7 @@ class Watchdog(threading.Thread):
         self._RunUpdate   = threading.Event()
         self._Interval    = 120.0
         self._Monitors    = []
+        self._MonitorIntervals = {}
 
         # Right now we join this, because we don't know
         # Where we'll be when we need this.
@@ -82,6 +84,9 @@ class Watchdog(threading.Thread):
             mon.initMonitor(task = task, job = wmbsJob,
                             logPath = self.logPath, args = args)
             self._Monitors.append(mon)
+            # A monitor can ask for its own update interval
+            if args.get('interval', None) != None:
+                self._MonitorIntervals[mon] = args['interval']
 
         return
 
@@ -107,6 +112,14 @@ class Watchdog(threading.Thread):
         logging.info("Set Watchdog interval to %s" % interval)
         self._Interval = interval
 
+    def monitorInterval(self, monitor):
+        """
+        _monitorInterval_
+
+        Interval between the periodic updates of a monitor
+        """
+        return self._MonitorIntervals.get(monitor, self._Interval)
+
     def disableMonitoring(self):
         """
         _disableMonitoring_
@@ -257,6 +270,7 @@ class Watchdog(threading.Thread):
         Override Thread.run() to do the periodic update
         of the MonitorState object and dispatch it to the monitors
         """
+        nextUpdates = {}
         while 1:
             #  //
             # // shutdown signal
@@ -267,8 +281,14 @@ class Watchdog(threading.Thread):
             #  //
             # // Update State information only during a running task
             #//
-            if self._RunUpdate.isSet():
+            now = time.time()
+            if not self._RunUpdate.isSet():
+                nextUpdates = {}
+            else:
                 for monitor in self._Monitors:
+                    if nextUpdates.get(monitor, now) > now:
+                        continue
+                    nextUpdates[monitor] = now + self.monitorInterval(monitor)
                     try:
                         monitor.periodicUpdate()
                     except Exception as ex:
@@ -284,8 +304,12 @@ class Watchdog(threading.Thread):
                         os.abort()
                 #self._MonMgr.periodicUpdate()
 
-            #time.sleep(self._Interval)
-            self._Finished.wait(self._Interval)
+            # Wait for the next monitor that is due
+            wait = self._Interval
+            for monitor in self._Monitors:
+                due = nextUpdates.get(monitor, now + self.monitorInterval(monitor))
+                wait = min(wait, due - time.time())
+            self._Finished.wait(max(wait, 0))
 
 
     #  //
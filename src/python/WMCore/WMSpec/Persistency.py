@@ -5,19 +5,212 @@ _PersistencyHelper_
 Util class to provide a common persistency layer for ConfigSection derived
 objects, with options to save in different formats
 
-Placeholder for ideas at present....
-
-"""
+Specs are either a plain pickle of the whole ConfigSection tree or, when
+saved with chunked = True, a versioned chunked file:
 
+  magic, version and index length (CHUNKED_HEADER)
+  pickled index {"workload": (offset, length), "tasks": {name: (offset, length)}}
+  pickled workload without its top level tasks
+  one pickled chunk per top level task
 
+Offsets are relative to the end of the index.  Top level tasks of a chunked
+spec are only unpickled the first time they're accessed, see LazyTaskSection.
+The contents of local spec files are kept in a small process wide cache keyed
+by (path, mtime, size) so loading the same spec again doesn't hit the disk.
 
+"""
 
+import copy_reg
 import cPickle
+import os
+import struct
+import threading
 import urllib2
+from collections import OrderedDict
 from urllib2 import urlopen, Request
 from urlparse import urlparse
 import json
 
+from WMCore.Configuration import ConfigSection
+
+CHUNKED_MAGIC = "WMSPECCK"
+CHUNKED_VERSION = 1
+CHUNKED_HEADER = struct.Struct(">8sII")
+
+SPEC_CACHE_SIZE = 20
+_specCache = OrderedDict()
+_specCacheLock = threading.Lock()
+
+
+def readSpecFile(path):
+    """
+    _readSpecFile_
+
+    Return the contents of a local spec file, from the process cache if the
+    file hasn't changed since it was last read.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    with _specCacheLock:
+        if key in _specCache:
+            contents = _specCache.pop(key)
+            _specCache[key] = contents
+            return contents
+
+    handle = open(path, 'rb')
+    try:
+        contents = handle.read()
+    finally:
+        handle.close()
+
+    with _specCacheLock:
+        _specCache[key] = contents
+        while len(_specCache) > SPEC_CACHE_SIZE:
+            _specCache.popitem(last = False)
+    return contents
+
+
+def clearSpecCache():
+    """
+    _clearSpecCache_
+
+    Drop every spec file from the process cache.
+    """
+    with _specCacheLock:
+        _specCache.clear()
+    return
+
+
+def dumpChunked(data):
+    """
+    _dumpChunked_
+
+    Return the chunked representation of a workload.
+    """
+    tasks = data.tasks
+    if isinstance(tasks, LazyTaskSection):
+        tasks.loadAll_()
+    taskNames = [x for x in tasks.tasklist if x in tasks.__dict__]
+
+    # detach the top level tasks so each one is pickled on its own
+    detached = [(x, tasks.__dict__.pop(x)) for x in taskNames]
+    try:
+        chunks = []
+        for (taskName, task) in detached:
+            task._internal_parent_ref = None
+            chunks.append(cPickle.dumps(task, cPickle.HIGHEST_PROTOCOL))
+        workload = cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL)
+    finally:
+        for (taskName, task) in detached:
+            task._internal_parent_ref = tasks
+            tasks.__dict__[taskName] = task
+
+    index = {"workload": (0, len(workload)), "tasks": {}}
+    offset = len(workload)
+    for (taskName, chunk) in zip(taskNames, chunks):
+        index["tasks"][taskName] = (offset, len(chunk))
+        offset += len(chunk)
+    index = cPickle.dumps(index, cPickle.HIGHEST_PROTOCOL)
+
+    header = CHUNKED_HEADER.pack(CHUNKED_MAGIC, CHUNKED_VERSION, len(index))
+    return "".join([header, index, workload] + chunks)
+
+
+def isChunked(contents):
+    """
+    _isChunked_
+
+    Check whether a spec is in the chunked format.
+    """
+    return contents[:len(CHUNKED_MAGIC)] == CHUNKED_MAGIC
+
+
+def loadChunked(contents):
+    """
+    _loadChunked_
+
+    Unpickle the workload of a chunked spec, its top level tasks are loaded
+    on demand.
+    """
+    (magic, version, indexLength) = CHUNKED_HEADER.unpack_from(contents)
+    if version != CHUNKED_VERSION:
+        msg = "Unsupported spec format version %s" % version
+        raise RuntimeError, msg
+    start = CHUNKED_HEADER.size
+    index = cPickle.loads(contents[start:start + indexLength])
+    start += indexLength
+
+    (offset, length) = index["workload"]
+    data = cPickle.loads(contents[start + offset:start + offset + length])
+    object.__setattr__(data.tasks, "__class__", LazyTaskSection)
+    data.tasks._internal_chunks = {}
+    for (taskName, (offset, length)) in index["tasks"].items():
+        data.tasks._internal_chunks[taskName] = buffer(contents, start + offset, length)
+    return data
+
+
+class LazyTaskSection(ConfigSection):
+    """
+    _LazyTaskSection_
+
+    Tasks section of a chunked spec.  The names of the top level tasks are
+    known but each task is unpickled from its chunk the first time it's
+    accessed.  Pickled or copied sections are plain ConfigSections with all
+    their tasks loaded.
+    """
+    def __getattr__(self, name):
+        if name.startswith("_internal_"):
+            raise AttributeError(name)
+        chunk = self._internal_chunks.pop(name, None)
+        if chunk == None:
+            raise AttributeError(name)
+        task = cPickle.loads(str(chunk))
+        task._internal_parent_ref = self
+        object.__setattr__(self, name, task)
+        return task
+
+    def __delattr__(self, name):
+        if self._internal_chunks.pop(name, None) != None:
+            self._internal_children.discard(name)
+            self._internal_settings.discard(name)
+            return
+        ConfigSection.__delattr__(self, name)
+        return
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_internal_"):
+            self._internal_chunks.pop(name, None)
+        ConfigSection.__setattr__(self, name, value)
+        return
+
+    def section_(self, sectionName):
+        """
+        _section_
+
+        ConfigSection.section_() only looks for existing sections in the
+        instance dictionary, load the task first so that it isn't replaced
+        by an empty section.
+        """
+        if sectionName in self._internal_chunks:
+            return getattr(self, sectionName)
+        return ConfigSection.section_(self, sectionName)
+
+    def loadAll_(self):
+        """
+        _loadAll_
+
+        Unpickle every task that hasn't been loaded yet.
+        """
+        for taskName in list(self._internal_chunks):
+            getattr(self, taskName)
+        return
+
+    def __reduce_ex__(self, protocol):
+        self.loadAll_()
+        state = dict(self.__dict__)
+        del state["_internal_chunks"]
+        return (copy_reg._reconstructor, (ConfigSection, object, None), state)
+
 class PersistencyHelper:
     """
     _PersistencyHelper_
@@ -33,18 +226,33 @@ class PersistencyHelper:
 
     """
 
-    def save(self, filename):
+    def save(self, filename, chunked = False):
         """
         _save_
 
-        Save data to a file
-        Saved format is defined depending on the extension
+        Save data to a file, as a single pickle or in the chunked format if
+        chunked is True.  load() reads both.
         """
-        handle = open(filename, 'w')
-        #TODO: use different encoding scheme for different extension
-        #extension = filename.split(".")[-1].lower()
-        cPickle.dump(self.data, handle)
-        handle.close()
+        handle = open(filename, 'wb')
+        try:
+            if chunked:
+                handle.write(dumpChunked(self.data))
+            else:
+                cPickle.dump(self.data, handle)
+        finally:
+            handle.close()
+        return
+
+    def loads(self, contents):
+        """
+        _loads_
+
+        Load data from the contents of a spec in either format.
+        """
+        if isChunked(contents):
+            self.data = loadChunked(contents)
+        else:
+            self.data = cPickle.loads(contents)
         return
 
     def load(self, filename):
@@ -58,22 +266,19 @@ class PersistencyHelper:
         #TODO: currently support both loading from file path or url
         #if there are more things to filter may be separate the load function
 
-        # urllib2 needs a scheme - assume local file if none given
+        # local files go through the spec cache
         if not urlparse(filename)[0]:
-            filename = 'file:' + filename
-            handle = urlopen(Request(filename, headers = {"Accept" : "*/*"}))
-            self.data = cPickle.load(handle)
-            handle.close()
+            self.loads(readSpecFile(filename))
         elif filename.startswith('file:'):
             handle = urlopen(Request(filename, headers = {"Accept" : "*/*"}))
-            self.data = cPickle.load(handle)
+            self.loads(handle.read())
             handle.close()
         else:
             # use own request class so we get authentication if needed
             from WMCore.Services.Requests import Requests
             request = Requests(filename)
             data = request.makeRequest('', incoming_headers = {"Accept" : "*/*"})
-            self.data = cPickle.loads(data[0])
+            self.loads(data[0])
 
         #TODO: use different encoding scheme for different extension
         #extension = filename.split(".")[-1].lower()
@@ -152,6 +152,8 @@ class StdBase(object):
         monitoring.DashboardMonitor.destinationHost = self.dashboardHost
         monitoring.DashboardMonitor.destinationPort = self.dashboardPort
         monitoring.section_("PerformanceMonitor")
+        # Sampling /proc is cheap, the performance summaries need many points
+        monitoring.PerformanceMonitor.interval = 10
         monitoring.PerformanceMonitor.maxRSS = 2.3 * gb
         monitoring.PerformanceMonitor.maxVSize = 2.3 * gb
         monitoring.PerformanceMonitor.softTimeout = softTimeout
@@ -14,7 +14,6 @@ Implementation of an Executor for a StageOut step
 import os
 import os.path
 import logging
-import signal
 
 from WMCore.WMSpec.Steps.Executor           import Executor
 from WMCore.FwkJobReport.Report             import Report
@@ -26,7 +25,7 @@ import WMCore.Storage.DeleteMgr   as DeleteMgr
 from WMCore.Lexicon                  import lfn     as lfnRegEx
 from WMCore.Lexicon                  import userLfn as userLfnRegEx
 
-from WMCore.Algorithms.Alarm import Alarm, alarmHandler
+from WMCore.Algorithms.Alarm import Alarm
 
 class StageOut(Executor):
     """
@@ -113,6 +112,8 @@ class StageOut(Executor):
 
         # Search through steps for report files
         filesTransferred = []
+        transfers = []
+        stepReports = []
 
         for step in self.stepSpace.taskSpace.stepSpaces():
             if step == self.stepName:
@@ -202,40 +203,59 @@ class StageOut(Executor):
                                    'SEName' : None,
                                    'StageOutCommand': None,
                                    'Checksums' : getattr(file, 'checksums', None)}
-                signal.signal(signal.SIGALRM, alarmHandler)
-                signal.alarm(waitTime)
-                try:
-                    manager(fileForTransfer)
-                    #Afterwards, the file should have updated info.
-                    filesTransferred.append(fileForTransfer)
-                    file.StageOutCommand = fileForTransfer['StageOutCommand']
-                    file.location        = fileForTransfer['SEName']
-                    file.OutputPFN       = fileForTransfer['PFN']
-                except Alarm:
-                    msg = "Indefinite hang during stageOut of logArchive"
-                    logging.error(msg)
-                    manager.cleanSuccessfulStageOuts()
-                    stepReport.addError(self.stepName, 60403,
-                                        "StageOutTimeout", msg)
-                    stepReport.persist("Report.pkl")
-                except Exception as ex:
-                    manager.cleanSuccessfulStageOuts()
-                    stepReport.addError(self.stepName, 60307,
-                                        "StageOutFailure", str(ex))
-                    stepReport.setStepStatus(self.stepName, 1)
-                    stepReport.persist("Report.pkl")
-                    raise
-
-                signal.alarm(0)
-
-
-
-            # Am DONE with report
-            # Persist it
+                transfers.append((stepReport, file, fileForTransfer))
+
+            stepReports.append((stepReport, reportLocation))
+
+        # Stage out the files of all the steps at once, the manager runs as
+        # many transfers at the same time as the site config allows
+        results = manager.stageOutFiles([x[2] for x in transfers], timeout = waitTime)
+
+        failure = None
+        timeouts = []
+        staged = []
+        for (stepReport, file, fileForTransfer), result in zip(transfers, results):
+            if result['time'] != None:
+                file.StageOutTime = result['time']
+            if result['staged']:
+                staged.append((file, fileForTransfer))
+            elif isinstance(result['error'], Alarm):
+                timeouts.append((stepReport, result['error']))
+            elif result['error'] != None and failure == None:
+                failure = (stepReport, result['error'])
+
+        if timeouts or failure != None:
+            # The files that made it are deleted, the reports must not
+            # claim them.  Hanging transfers that end later clean up after
+            # themselves.
+            manager.cleanSuccessfulStageOuts()
+            staged = []
+
+        for file, fileForTransfer in staged:
+            #Afterwards, the file should have updated info.
+            filesTransferred.append(fileForTransfer)
+            file.StageOutCommand = fileForTransfer['StageOutCommand']
+            file.location        = fileForTransfer['SEName']
+            file.OutputPFN       = fileForTransfer['PFN']
+
+        for stepReport, ex in timeouts:
+            stepReport.addError(self.stepName, 60403,
+                                "StageOutTimeout", str(ex))
+            stepReport.persist("Report.pkl")
+
+        if failure != None:
+            stepReport, ex = failure
+            stepReport.addError(self.stepName, 60307,
+                                "StageOutFailure", str(ex))
+            stepReport.setStepStatus(self.stepName, 1)
+            stepReport.persist("Report.pkl")
+            raise ex
+
+        # Am DONE with reports
+        # Persist them
+        for stepReport, reportLocation in stepReports:
             stepReport.persist(reportLocation)
 
-
-
         #Done with all steps, and should have a list of
         #stagedOut files in fileForTransfer
         logging.info("Transferred %i files" %(len(filesTransferred)))
@@ -279,14 +279,10 @@ class WMWorkloadHelper(PersistencyHelper):
         """
         _getTask_
 
-        Get a task instance based on the path name
+        Get a task instance based on the path name, only the top level task
+        of the path is loaded.
 
         """
-        mapping = {}
-        for t in self.taskIterator():
-            [mapping.__setitem__(x.getPathName, x.name())
-             for x in t.taskIterator()]
-
         taskList = parseTaskPath(taskPath)
 
         if taskList[0] != self.name(): # should always be workload name first
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""
+_AvailableWorkIndex_
+
+In-memory index of the Available elements of a WorkQueue database.
+
+The index is loaded once from the availableByPriority view and then kept up
+to date from the _changes feed of the database.  Elements are kept in one
+list per (site, team) sorted in the order of the availableByPriority view as
+WorkQueueBackend reads it, by descending priority and then descending id.
+Elements that aren't restricted to any site are in the lists for site None.
+Finding work for a set of sites is then a merge of the lists for those sites
+instead of a pass over every Available element in the database.
+"""
+
+import bisect
+import copy
+import heapq
+
+from WMCore.WorkQueue.DataStructs.CouchWorkQueueElement import CouchWorkQueueElement
+
+ELEMENT_KEY = 'WMCore.WorkQueue.DataStructs.WorkQueueElement.WorkQueueElement'
+
+
+def queuePriority(doc):
+    """
+    _queuePriority_
+
+    Priority of an element document as used by the availableByPriority view,
+    one hour in the queue is worth +1 priority.
+    """
+    return doc[ELEMENT_KEY]['Priority'] - (doc['timestamp'] * (1. / 60 / 60))
+
+
+class Descending(object):
+    """
+    _Descending_
+
+    Wrap a value so that it sorts in descending order.
+    """
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __gt__(self, other):
+        return self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __ne__(self, other):
+        return self.value != other.value
+
+
+def elementSites(element):
+    """
+    _elementSites_
+
+    Return the set of sites an element may run at, or None if it isn't
+    restricted to any sites.  Like passesSiteRestriction() all the input,
+    parent and pileup data must be at the site.
+    """
+    restrictions = list(element['Inputs'].values())
+    if element['ParentFlag']:
+        restrictions.extend(element['ParentData'].values())
+    restrictions.extend(element['PileupData'].values())
+    if element['SiteWhitelist']:
+        restrictions.append(element['SiteWhitelist'])
+    if not restrictions:
+        return None
+
+    sites = set(restrictions[0])
+    for locations in restrictions[1:]:
+        sites.intersection_update(locations)
+    sites.difference_update(element['SiteBlacklist'])
+    return sites
+
+
+class AvailableWorkIndex(object):
+    """
+    _AvailableWorkIndex_
+
+    Call sync() to catch up with the database before looking up work with
+    availableElements().
+    """
+    def __init__(self, db, logger, chunkSize = 1000):
+        self.db = db
+        self.logger = logger
+        self.chunkSize = chunkSize
+        self.lastSeq = None
+        self.entries = {}
+        self.queues = {}
+        return
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        """
+        _load_
+
+        Rebuild the index from the availableByPriority view.  Changes made
+        while the view is read are applied again by the next sync().
+        """
+        lastSeq = self.db.info()['update_seq']
+        data = self.db.loadView('WorkQueue', 'availableByPriority', {'include_docs' : True})
+
+        self.entries = {}
+        self.queues = {}
+        for row in data.get('rows', []):
+            if row.get('doc'):
+                self.add(row['doc'])
+        self.lastSeq = lastSeq
+        self.logger.info("Loaded %s available elements from %s" % (len(self), self.db.name))
+        return
+
+    def sync(self):
+        """
+        _sync_
+
+        Apply the changes made to the database since the last sync.
+        """
+        if self.lastSeq == None:
+            self.load()
+            return
+
+        changes = self.db.changes(since = self.lastSeq)
+        updated = []
+        for change in changes.get('results', []):
+            self.remove(change['id'])
+            if not change.get('deleted', False):
+                updated.append(change['id'])
+
+        for i in range(0, len(updated), self.chunkSize):
+            data = self.db.allDocs({'include_docs' : True}, keys = updated[i:i + self.chunkSize])
+            for row in data.get('rows', []):
+                if row.get('doc'):
+                    self.add(row['doc'])
+        self.lastSeq = changes['last_seq']
+        return
+
+    def add(self, doc):
+        """
+        _add_
+
+        Index an element document, anything that isn't an Available element
+        is ignored.  The document is turned into the indexed element and
+        can't be used afterwards.
+        """
+        if doc.get(ELEMENT_KEY, {}).get('Status') != 'Available':
+            return
+
+        sortKey = (-queuePriority(doc), Descending(doc['_id']))
+        element = CouchWorkQueueElement.fromDocument(self.db, doc)
+        team = element.get('TeamName') or ''
+        sites = elementSites(element)
+        if sites == None:
+            keys = [(None, team)]
+        else:
+            keys = [(site, team) for site in sites]
+
+        for key in keys:
+            bisect.insort(self.queues.setdefault(key, []), sortKey)
+        self.entries[element.id] = (element, keys, sortKey)
+        return
+
+    def remove(self, docId):
+        """
+        _remove_
+
+        Drop an element from the index if it's there.
+        """
+        entry = self.entries.pop(docId, None)
+        if entry == None:
+            return
+
+        (element, keys, sortKey) = entry
+        for key in keys:
+            queue = self.queues[key]
+            i = bisect.bisect_left(queue, sortKey)
+            if i < len(queue) and queue[i] == sortKey:
+                del queue[i]
+            if not queue:
+                del self.queues[key]
+        return
+
+    def availableElements(self, sites, teams = None, wfs = None):
+        """
+        _availableElements_
+
+        Yield the elements that may run at any of the sites, in the order of
+        the availableByPriority view.  If teams is given elements assigned to
+        other teams are skipped, if wfs is given elements of other workflows
+        are skipped.  The elements are shared with the index and must not be
+        modified, use getElement() for a copy.
+        """
+        sites = set(sites)
+        queues = []
+        for (site, team), queue in self.queues.items():
+            if site != None and site not in sites:
+                continue
+            if teams and team and team not in teams:
+                continue
+            queues.append(queue)
+
+        seen = set()
+        for (priority, docId) in heapq.merge(*queues):
+            docId = docId.value
+            if docId in seen:
+                continue
+            seen.add(docId)
+            element = self.entries[docId][0]
+            if wfs and element['RequestName'] not in wfs:
+                continue
+            yield element
+        return
+
+    def getElement(self, docId):
+        """
+        _getElement_
+
+        Return a copy of an indexed element.
+        """
+        element = self.entries[docId][0]
+        newElement = CouchWorkQueueElement(self.db, id = docId,
+                                           elementParams = copy.deepcopy(dict(element)))
+        for key in ['_rev', 'timestamp', 'updatetime']:
+            newElement._document[key] = element._document[key]
+        return newElement
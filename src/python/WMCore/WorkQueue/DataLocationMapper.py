@@ -56,6 +56,9 @@ class DataLocationMapper():
         self.params.setdefault('requireBlocksSubscribed', True)
         self.params.setdefault('fullRefreshInterval', 7200)
         self.params.setdefault('updateIntervalCoarseness', UPDATE_INTERVAL_COARSENESS)
+        # blocks per phedex query and concurrent queries
+        self.params.setdefault('locationChunkSize', 100)
+        self.params.setdefault('locationMaxInFlight', 5)
 
         self.lastFullResync = 0
         self.lastLocationUpdate = 0
@@ -111,26 +114,35 @@ class DataLocationMapper():
                 args['subscribed'] = 'y'
             if not fullResync and self.lastLocationUpdate:
                 args['update_since'] = timeFloor(self.lastLocationUpdate, self.params['updateIntervalCoarseness'])
-            for dataItem in dataItems:
+            args['chunkSize'] = self.params['locationChunkSize']
+            args['maxInFlight'] = self.params['locationMaxInFlight']
+            if datasetSearch:
+                responses = self.phedex.getReplicaInfoForBlocksInChunks(dataset = list(dataItems), **args)
+            else:
+                responses = self.phedex.getReplicaInfoForBlocksInChunks(block = list(dataItems), **args)
+            for items, response in responses:
                 try:
-                    if datasetSearch:
-                        response = self.phedex.getReplicaInfoForBlocks(dataset = [dataItem], **args)['phedex']
-                    else:
-                        response = self.phedex.getReplicaInfoForBlocks(block = [dataItem], **args)['phedex']
-                    for block in response['block']:
+                    if isinstance(response, Exception):
+                        raise response
+                    for block in response['phedex']['block']:
                         nodes = [se['node'] for se in block['replica']]
                         if datasetSearch:
-                            result[dataItem].update(nodes)
+                            # block names are <dataset>#<uuid>
+                            result[block['name'].split('#')[0]].update(nodes)
                         else:
                             result[block['name']].update(nodes)
                 except Exception as ex:
-                    logging.error('Error getting block location from phedex for %s: %s' % (dataItem, str(ex)))
+                    logging.error('Error getting block location from phedex for %s: %s' % (', '.join(items), str(ex)))
         else:
             raise RuntimeError, "shouldn't get here"
 
         # convert from PhEDEx name to cms site name
+        siteNames = {}
         for name, nodes in result.items():
-            result[name] = list(set([self.sitedb.phEDExNodetocmsName(x) for x in nodes]))
+            for node in nodes:
+                if node not in siteNames:
+                    siteNames[node] = self.sitedb.phEDExNodetocmsName(node)
+            result[name] = list(set([siteNames[x] for x in nodes]))
 
         return result, fullResync
 
@@ -181,12 +193,12 @@ class WorkQueueDataLocationMapper(DataLocationMapper):
         # fullResync incorrect with multiple dbs's - fix!!!
         dataLocations, fullResync = DataLocationMapper.__call__(self, dataItems, fullResync)
 
-        # elements with multiple changed data items will fail fix this, or move to store data outside element
         for dbs, dataMapping in dataLocations.items():
-            modified = []
+            # elements with several data items are shared between the lists
+            elementsByData = self.backend.getElementsForDataItems(dataMapping.keys())
+            modified = {}
             for data, locations in dataMapping.items():
-                elements = self.backend.getElementsForData(dbs, data)
-                for element in elements:
+                for element in elementsByData.get(data, []):
                     if element.get('NoLocationUpdate', False):
                         continue
                     if sorted(locations) != sorted(element['Inputs'][data]):
@@ -196,8 +208,8 @@ class WorkQueueDataLocationMapper(DataLocationMapper):
                         else:
                             self.logger.info(data + ': Adding locations: ' + ', '.join(locations))
                             element['Inputs'][data] = list(set(element['Inputs'][data]) | set(locations))
-                        modified.append(element)
-            self.backend.saveElements(*modified)
+                        modified[element.id] = element
+            self.backend.saveElements(*modified.values())
 
         numOfParentLocations = self.updateParentLocation(fullResync)
         numOfPileupLocations = self.updatePileupLocation(fullResync)
@@ -93,6 +93,7 @@ class WorkQueue(WorkQueueBase):
         self.params.setdefault('DbName', 'workqueue')
         self.params.setdefault('InboxDbName', self.params['DbName'] + '_inbox')
         self.params.setdefault('ParentQueueCouchUrl', None) # We get work from here
+        self.params.setdefault('AvailableWorkIndex', False) # Match parent queue work from memory
 
         self.backend = WorkQueueBackend(self.params['CouchUrl'], self.params['DbName'],
                                         self.params['InboxDbName'],
@@ -103,10 +104,12 @@ class WorkQueue(WorkQueueBase):
                 if self.params.get('ParentQueueInboxCouchDBName'):
                     self.parent_queue = WorkQueueBackend(self.params['ParentQueueCouchUrl'].rsplit('/', 1)[0],
                                                          self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1],
-                                                         self.params['ParentQueueInboxCouchDBName'])
+                                                         self.params['ParentQueueInboxCouchDBName'],
+                                                         availableWorkIndex = self.params['AvailableWorkIndex'])
                 else:
                     self.parent_queue = WorkQueueBackend(self.params['ParentQueueCouchUrl'].rsplit('/', 1)[0],
-                                                         self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1])
+                                                         self.params['ParentQueueCouchUrl'].rsplit('/', 1)[1],
+                                                         availableWorkIndex = self.params['AvailableWorkIndex'])
             except IndexError as ex:
                 # Probable cause: Someone didn't put the global WorkQueue name in
                 # the ParentCouchUrl
@@ -8,10 +8,12 @@ Interface to WorkQueue persistent storage
 import random
 import time
 import urllib
+from collections import defaultdict
 
 from WMCore.Database.CMSCouch import CouchServer, CouchNotFoundError, Document, CouchMonitor
 from WMCore.WorkQueue.WorkQueueExceptions import WorkQueueNoMatchingElements
 from WMCore.WorkQueue.DataStructs.CouchWorkQueueElement import CouchWorkQueueElement, fixElementConflicts
+from WMCore.WorkQueue.AvailableWorkIndex import AvailableWorkIndex
 from WMCore.Wrappers import JsonWrapper as json
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 from WMCore.Lexicon import sanitizeURL
@@ -37,7 +39,7 @@ class WorkQueueBackend(object):
     """
     def __init__(self, db_url, db_name = 'workqueue',
                  inbox_name = None, parentQueue = None,
-                 queueUrl = None, logger = None):
+                 queueUrl = None, logger = None, availableWorkIndex = False):
         if logger:
             self.logger = logger
         else:
@@ -57,6 +59,11 @@ class WorkQueueBackend(object):
         self.hostWithAuth = db_url
         self.inbox = self.server.connectDatabase(inbox_name, create = False, size = 10000)
         self.queueUrl = sanitizeURL(queueUrl or (db_url + '/' + db_name))['url']
+        # Keep the Available elements in memory for availableWork
+        if availableWorkIndex:
+            self.availableWorkIndex = AvailableWorkIndex(self.db, self.logger)
+        else:
+            self.availableWorkIndex = None
 
     def forceQueueSync(self):
         """Force a blocking replication - used only in tests"""
@@ -347,7 +354,10 @@ class WorkQueueBackend(object):
         if teams:
             options['teams'] = teams
             self.logger.info("setting teams %s" % teams)
-        if wfs:
+        if self.availableWorkIndex:
+            self.availableWorkIndex.sync()
+            result = self.availableWorkIndex.availableElements(thresholds.keys(), teams, wfs)
+        elif wfs:
             result = []
             for i in xrange(0, len(wfs), 20):
                 options['wfs'] = wfs[i:i+20]
@@ -362,11 +372,12 @@ class WorkQueueBackend(object):
                 self.logger.info("""No available work in WQ or didn't pass workqueue restriction 
                                     - check Pileup, site white list, etc""")
             self.logger.debug("Available Work:\n %s \n for resources\n %s" % (result, thresholds))
+        if not self.availableWorkIndex:
+            result = (CouchWorkQueueElement.fromDocument(self.db, x) for x in result)
         # Iterate through the results; apply whitelist / blacklist / data
         # locality restrictions.  Only assign jobs if they are high enough
         # priority.
-        for i in result:
-            element = CouchWorkQueueElement.fromDocument(self.db, i)
+        for element in result:
             prio = element['Priority']
 
             possibleSite = None
@@ -383,6 +394,8 @@ class WorkQueueBackend(object):
                         break
 
             if possibleSite:
+                if self.availableWorkIndex:
+                    element = self.availableWorkIndex.getElement(element.id)
                 elements.append(element)
                 if site not in siteJobCounts:
                     siteJobCounts[site] = {}
@@ -420,6 +433,24 @@ class WorkQueueBackend(object):
                                                    x['doc'])
                 for x in elements.get('rows', [])]
 
+    def getElementsForDataItems(self, dataItems, chunkSize = 1000):
+        """Get active elements for several data items
+
+        Returns a dict of data item to elements, an element with more than one
+        of the data items is the same object in each list.
+        """
+        result = defaultdict(list)
+        elements = {}
+        dataItems = list(dataItems)
+        for i in range(0, len(dataItems), chunkSize):
+            rows = self.db.loadView('WorkQueue', 'elementsByData', {'include_docs' : True},
+                                    keys = dataItems[i:i + chunkSize])
+            for row in rows.get('rows', []):
+                if row['id'] not in elements:
+                    elements[row['id']] = CouchWorkQueueElement.fromDocument(self.db, row['doc'])
+                result[row['key']].append(elements[row['id']])
+        return result
+
     def getElementsForParentData(self, data):
         """Get active elements for this data """
         elements = self.db.loadView('WorkQueue', 'elementsByParentData', {'key' : data, 'include_docs' : True})
@@ -227,6 +227,27 @@ class PhEDEx(dict):
                            'replica' : [{'node' : x + '_MSS' } for x in locations]})
         return data
 
+    def getReplicaInfoForBlocksInChunks(self, chunkSize = 100, maxInFlight = 5, **args):
+        """
+        Where are blocks located, one query per chunk of blocks or datasets
+        """
+        if 'dataset' in args:
+            field = 'dataset'
+        else:
+            field = 'block'
+        items = args.pop(field)
+        if type(items) != type([]):
+            items = [items]
+        result = []
+        for i in range(0, len(items), chunkSize):
+            chunkArgs = dict(args)
+            chunkArgs[field] = items[i:i + chunkSize]
+            try:
+                result.append((chunkArgs[field], self.getReplicaInfoForBlocks(**chunkArgs)))
+            except Exception as ex:
+                result.append((chunkArgs[field], ex))
+        return result
+
     def subscriptions(self, **args):
         """
         Where is data subscribed - for now just replicate blockreplicas
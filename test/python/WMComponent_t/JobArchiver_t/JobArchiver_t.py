@@ -13,6 +13,7 @@ import threading
 import unittest
 import time
 import shutil
+import tarfile
 import cProfile, pstats
 import inspect
 
@@ -35,10 +36,13 @@ from WMCore.WMBS.JobGroup     import JobGroup
 from WMCore.WMBS.Job          import Job
 
 from WMCore.DataStructs.Run   import Run
+from WMCore.DataStructs.JobPackageStore import JobPackageStore, getJobStorePath
 
 from WMComponent.JobArchiver.JobArchiver       import JobArchiver
 from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPoller
 from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPollerException
+from WMComponent.JobArchiver.JobArchiverPoller import archiveJobCluster
+import WMComponent.JobArchiver.JobArchiverPoller as JobArchiverPollerModule
 
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMComponent_t.AlertGenerator_t.Pollers_t import utils
@@ -239,6 +243,11 @@ class JobArchiverTest(unittest.TestCase):
             f.close()
             job.setCache(path)
 
+        # The store the JobCreator wrote the jobs to
+        jobStore = JobPackageStore(getJobStorePath(path, testJobGroup.id))
+        jobStore.extend(testJobGroup.jobs)
+        jobStore.close()
+
         changer.propagate(testJobGroup.jobs, 'created', 'new')
         changer.propagate(testJobGroup.jobs, 'executing', 'created')
         changer.propagate(testJobGroup.jobs, 'complete', 'executing')
@@ -247,6 +256,9 @@ class JobArchiverTest(unittest.TestCase):
         testJobArchiver = JobArchiverPoller(config = config)
         testJobArchiver.algorithm()
 
+        self.assertFalse(os.path.exists(jobStore.fileName))
+        self.assertFalse(os.path.exists(jobStore.indexName))
+
 
         result = myThread.dbi.processData("SELECT wmbs_job_state.name FROM wmbs_job_state INNER JOIN wmbs_job ON wmbs_job.state = wmbs_job_state.id")[0].fetchall()
 
@@ -260,22 +272,111 @@ class JobArchiverTest(unittest.TestCase):
 
         logPath = os.path.join(config.JobArchiver.componentDir, 'logDir', 'w', 'wf001', 'JobCluster_0')
         logList = os.listdir(logPath)
+        jobIDs = sorted([job['id'] for job in testJobGroup.jobs])
+        tarName = 'Jobs_%i-%i.tar.bz2' % (jobIDs[0], jobIDs[-1])
+        self.assertEqual(logList, [tarName], 'Could not find the tarball for the job cluster')
+        self.assertEqual(testJobArchiver.archiveStats['jobs'], self.nJobs)
+        self.assertEqual(testJobArchiver.archiveStats['clusters'], 1)
+
+        tarball = tarfile.open(os.path.join(logPath, tarName))
         for job in testJobGroup.jobs:
-            self.assertEqual('Job_%i.tar.bz2' %(job['id']) in logList, True, 'Could not find transferred tarball for job %i' %(job['id']))
-            pipe = Popen(['tar', '-jxvf', os.path.join(logPath, 'Job_%i.tar.bz2' % (job['id']))],
-                         stdout = PIPE, stderr = PIPE, shell = False)
-            pipe.wait()
-            #filename = '%s/%s/%s.out' %(cacheDir[1:], job['name'], job['name'])
             filename = 'Job_%i/%s.out' %(job['id'], job['name'])
-            self.assertEqual(os.path.isfile(filename), True, 'Could not find file %s' %(filename))
-            f = open(filename, 'r')
-            fileContents = f.readlines()
-            f.close()
+            fileContents = tarball.extractfile(filename).readlines()
             self.assertEqual(fileContents[0].find(job['name']) > -1, True)
-            shutil.rmtree('Job_%i' %(job['id']))
-            if os.path.isfile('Job_%i.tar.bz2' %(job['id'])):
-                os.remove('Job_%i.tar.bz2' %(job['id']))
+        tarball.close()
+
+        return
+
+    def testCompression(self):
+        """
+        _testCompression_
+
+        Verify that the job caches are archived with every compression and
+        that the jobs are split by cluster.
+        """
+        config = self.getConfig()
+        config.JobArchiver.numberOfJobsToCluster = 5
+        testJobGroup = self.createTestJobGroup()
+        cacheDir = os.path.join(self.testDir, 'test')
+
+        for compression in ['none', 'gzip', 'bz2', 'xz']:
+            config.JobArchiver.archiveCompression = compression
+            config.JobArchiver.archiveCompressionLevel = 1
+            config.JobArchiver.logDir = os.path.join(self.testDir, 'logs_%s' % compression)
+            testJobArchiver = JobArchiverPoller(config = config)
+
+            for job in testJobGroup.jobs:
+                job['cache_dir'] = os.path.join(cacheDir, compression, job['name'])
+                job['workflow'] = 'wf001'
+                os.makedirs(job['cache_dir'])
+                f = open(os.path.join(job['cache_dir'], 'job.out'), 'w')
+                f.write(job['name'])
+                f.close()
+
+            testJobArchiver.cleanWorkArea(testJobGroup.jobs)
+            self.assertEqual(testJobArchiver.archiveStats['jobs'], self.nJobs)
+            self.assertEqual(os.listdir(os.path.join(cacheDir, compression)), [])
+
+            archived = []
+            workflowDir = os.path.join(config.JobArchiver.logDir, 'w', 'wf001')
+            for cluster in os.listdir(workflowDir):
+                for tarName in os.listdir(os.path.join(workflowDir, cluster)):
+                    tarPath = os.path.join(workflowDir, cluster, tarName)
+                    if compression == 'xz':
+                        pipe = Popen(['tar', '-tJf', tarPath], stdout = PIPE, stderr = PIPE)
+                        names = pipe.communicate()[0].split()
+                    else:
+                        tarball = tarfile.open(tarPath)
+                        names = tarball.getnames()
+                        tarball.close()
+                    archived.extend(names)
+
+            self.assertEqual(len(os.listdir(workflowDir)),
+                             len(set([job['id'] / 5 for job in testJobGroup.jobs])))
+            self.assertEqual(sorted(archived),
+                             sorted(['Job_%i/job.out' % job['id'] for job in testJobGroup.jobs]))
+
+        config.JobArchiver.archiveCompression = 'lzo'
+        self.assertRaises(JobArchiverPollerException, JobArchiverPoller, config = config)
+        return
 
+    def testClusterFailure(self):
+        """
+        _testClusterFailure_
+
+        Verify that the cache directories of a cluster that couldn't be
+        archived are kept while the other clusters are cleaned up.
+        """
+        config = self.getConfig()
+        config.JobArchiver.numberOfJobsToCluster = 5
+        testJobGroup = self.createTestJobGroup()
+        cacheDir = os.path.join(self.testDir, 'test')
+        testJobArchiver = JobArchiverPoller(config = config)
+
+        for job in testJobGroup.jobs:
+            job['cache_dir'] = os.path.join(cacheDir, job['name'])
+            job['workflow'] = 'wf001'
+            os.makedirs(job['cache_dir'])
+            f = open(os.path.join(job['cache_dir'], 'job.out'), 'w')
+            f.write(job['name'])
+            f.close()
+
+        failedCluster = 'JobCluster_%i' % (testJobGroup.jobs[0]['id'] / 5)
+        def failCluster(work):
+            if os.path.basename(work['logDir']) == failedCluster:
+                return {'error': 'Cannot write %s' % failedCluster}
+            return archiveJobCluster(work)
+
+        JobArchiverPollerModule.archiveJobCluster = failCluster
+        try:
+            self.assertRaises(JobArchiverPollerException,
+                              testJobArchiver.cleanWorkArea, testJobGroup.jobs)
+        finally:
+            JobArchiverPollerModule.archiveJobCluster = archiveJobCluster
+
+        for job in testJobGroup.jobs:
+            self.assertEqual(os.path.isdir(job['cache_dir']),
+                             'JobCluster_%i' % (job['id'] / 5) == failedCluster)
         return
 
     @attr('integration')
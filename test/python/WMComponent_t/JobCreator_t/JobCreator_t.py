@@ -15,7 +15,6 @@ import time
 import os
 import cProfile
 import pstats
-import cPickle
 
 from WMQuality.TestInitCouchApp import TestInitCouchApp as TestInit
 from WMQuality.Emulators import EmulatorSetup
@@ -27,6 +26,7 @@ from WMCore.WMBS.Fileset      import Fileset
 from WMCore.WMBS.Workflow     import Workflow
 from WMCore.WMBS.Subscription import Subscription
 from WMCore.DataStructs.Run   import Run
+from WMCore.DataStructs.JobPackageStore import JobPackageStore
 
 from WMCore.Agent.Configuration              import Configuration
 from WMComponent.JobCreator.JobCreatorPoller import JobCreatorPoller
@@ -291,23 +291,27 @@ class JobCreatorTest(unittest.TestCase):
         # It should have at least one jobGroup
         self.assertTrue('JobCollection_1_0' in os.listdir(testDirectory))
         # But no more then twenty
-        self.assertTrue(len(os.listdir(testDirectory)) <= 20)
+        collectionDirs = [x for x in os.listdir(testDirectory) if x.startswith('JobCollection_')]
+        self.assertTrue(len(collectionDirs) <= 20)
 
         groupDirectory = os.path.join(testDirectory, 'JobCollection_1_0')
 
         # First job should be in here
         listOfDirs = []
-        for tmpDirectory in os.listdir(testDirectory):
+        for tmpDirectory in collectionDirs:
             listOfDirs.extend(os.listdir(os.path.join(testDirectory, tmpDirectory)))
         self.assertTrue('job_1' in listOfDirs)
         self.assertTrue('job_2' in listOfDirs)
         self.assertTrue('job_3' in listOfDirs)
+
+        # The jobs are saved in the job store of their job group
         jobDir = os.listdir(groupDirectory)[0]
-        jobFile = os.path.join(groupDirectory, jobDir, 'job.pkl')
-        self.assertTrue(os.path.isfile(jobFile))
-        f = open(jobFile, 'r')
-        job = cPickle.load(f)
-        f.close()
+        self.assertFalse(os.path.exists(os.path.join(groupDirectory, jobDir, 'job.pkl')))
+        jobStore = JobPackageStore(os.path.join(testDirectory, 'JobGroup_1.jobs'))
+        jobID = int(jobDir.split('_')[1])
+        self.assertTrue(jobID in jobStore)
+        job = jobStore[jobID]
+        jobStore.close()
 
         self.assertEqual(job.baggage.PresetSeeder.generator.initialSeed, 1001)
         self.assertEqual(job.baggage.PresetSeeder.evtgenproducer.initialSeed, 1001)
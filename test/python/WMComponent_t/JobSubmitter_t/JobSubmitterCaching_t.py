@@ -196,5 +196,49 @@ class JobSubmitterCachingTest(unittest.TestCase):
                          "Error: The job cache should be empty.  Contains: %i" % len(mySubmitterPoller.cachedJobIDs))
         return
 
+    def testIncrementalCaching(self):
+        """
+        _testIncrementalCaching_
+
+        Verify that the incremental refresh picks up new jobs, evicts killed
+        jobs and that the periodic full refresh still happens.
+        """
+        config = self.createConfig()
+        config.JobSubmitter.incrementalRefresh = True
+        config.JobSubmitter.fullRefreshInterval = 3600
+        mySubmitterPoller = JobSubmitterPoller(config)
+        mySubmitterPoller.getThresholds()
+        mySubmitterPoller.refreshCache()
+
+        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 0)
+        fullRefreshTime = mySubmitterPoller.lastFullRefreshTime
+        self.assertNotEqual(fullRefreshTime, None)
+
+        self.injectJobs()
+        mySubmitterPoller.refreshCache()
+        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 20)
+        self.assertEqual(mySubmitterPoller.lastFullRefreshTime, fullRefreshTime,
+                         "Error: The refresh should have been incremental.")
+
+        killWorkflow("wf001", jobCouchConfig = config)
+        mySubmitterPoller.refreshCache()
+        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 10)
+        for siteName in mySubmitterPoller.cachedJobs.keys():
+            for workflow in mySubmitterPoller.cachedJobs[siteName]["Processing"].keys():
+                for jobID in mySubmitterPoller.cachedJobs[siteName]["Processing"][workflow]:
+                    self.assertTrue(jobID in mySubmitterPoller.cachedJobIDs)
+        self.assertEqual(sum([len(x) for x in mySubmitterPoller.jobDataCache.values()]), 10)
+
+        # Force a full refresh, nothing should change
+        mySubmitterPoller.lastFullRefreshTime -= 3600
+        mySubmitterPoller.refreshCache()
+        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 10)
+        self.assertTrue(mySubmitterPoller.lastFullRefreshTime > fullRefreshTime - 3600)
+
+        killWorkflow("wf002", jobCouchConfig = config)
+        mySubmitterPoller.refreshCache()
+        self.assertEqual(len(mySubmitterPoller.cachedJobIDs), 0)
+        return
+
 if __name__ == "__main__":
     unittest.main()
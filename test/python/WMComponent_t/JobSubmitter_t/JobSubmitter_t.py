@@ -15,7 +15,7 @@ import time
 import unittest
 
 from nose.plugins.attrib import attr
-from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller
+from WMComponent.JobSubmitter.JobSubmitterPoller import JobSubmitterPoller, WorkflowQueue
 from WMCore.Agent.Configuration import Configuration
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
 from WMCore.DAOFactory import DAOFactory
@@ -893,5 +893,111 @@ class JobSubmitterTest(unittest.TestCase):
 
         return
 
+    @attr('integration')
+    def testG_AssignJobLocationsBenchmark(self):
+        """
+        _testG_AssignJobLocationsBenchmark_
+
+        Fill the submitter cache with 100k jobs from 500 workflows with
+        different priorities and pick the jobs for a site.  Verify that the
+        workflows are drained in priority order, skipping the queue entries
+        of workflows that were purged or had their priority raised.
+        """
+        config = self.getConfig()
+        config.JobSubmitter.maxJobsPerPoll = 200000
+        site = 'T1_US_FNAL'
+        self.setResourceThresholds(site, pendingSlots = 200000, runningSlots = -1, tasks = ['Processing'],
+                                   Processing = {'pendingSlots' : 200000, 'runningSlots' : -1})
+
+        jobSubmitter = JobSubmitterPoller(config = config)
+        jobSubmitter.getThresholds()
+
+        nWorkflows = 500
+        nJobs = 200
+        jobID = 0
+        purgedJobs = set()
+        for i in range(nWorkflows):
+            workflowName = "workflow_%i" % i
+            for _ in range(nJobs):
+                jobID += 1
+                jobSubmitter.cacheJobForSite(site, 'Processing', workflowName,
+                                             jobID, i, i % 7)
+                jobSubmitter.cachedJobIDs.add(jobID)
+                jobSubmitter.jobDataCache[workflowName][jobID] = \
+                    (jobID, 0, "package", "sandbox", "cache_dir", None, '', '',
+                     frozenset([site]), None, None, "job_%i" % jobID, None, workflowName,
+                     None, None, None, "task", frozenset([site]), 1, i)
+                if i % 10 == 0:
+                    purgedJobs.add(jobID)
+
+        # Every tenth workflow leaves the cache and some get a higher
+        # priority, both leave stale entries in the queue
+        jobSubmitter.purgeJobs(purgedJobs)
+        workflowQueue = jobSubmitter.workflowQueues[site]['Processing']
+        priorities = {}
+        for i in range(nWorkflows):
+            if i % 10 != 0:
+                priorities[i] = i % 7
+            if i % 50 == 1:
+                workflowName = "workflow_%i" % i
+                priorities[i] = 10
+                jobSubmitter.workflowPrios[workflowName] = 10
+                workflowQueue.push(jobSubmitter.workflowQueueEntry(workflowName))
+        self.assertEqual(len(workflowQueue), 450)
+        self.assertEqual(len(workflowQueue.heap), 510)
+
+        jobsToSubmit = jobSubmitter.assignJobLocations()
+
+        expected = []
+        for i in sorted(priorities.keys(), key = lambda x: (-priorities[x], x)):
+            expected.extend([("workflow_%i" % i, priorities[i])] * nJobs)
+        self.assertEqual(jobsToSubmit.keys(), ["package"])
+        self.assertEqual([(x['requestName'], x['taskPriority']) for x in jobsToSubmit["package"]],
+                         expected)
+        self.assertEqual(len(workflowQueue), 0)
+        self.assertEqual(jobSubmitter.cachedJobs, {})
+        self.assertEqual(jobSubmitter.workflowQueues, {})
+        return
+
+class WorkflowQueueTest(unittest.TestCase):
+    """
+    _WorkflowQueueTest_
+
+    Test the site/task type workflow priority queue of the JobSubmitterPoller
+    """
+
+    def testQueueOrder(self):
+        """
+        _testQueueOrder_
+
+        Workflows come out by priority and then timestamp, entries that were
+        replaced or removed are skipped.
+        """
+        queue = WorkflowQueue([(-1, 10, "wfA"), (-5, 20, "wfB"), (-5, 15, "wfC")])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.top(), "wfC")
+
+        # wfC leaves the cache and comes back with a lower priority
+        queue.remove("wfC")
+        self.assertEqual(queue.top(), "wfB")
+        queue.push((-1, 5, "wfC"))
+        queue.remove("wfB")
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.top(), "wfC")
+        queue.remove("wfC")
+        self.assertEqual(queue.top(), "wfA")
+
+        # Raising the priority replaces the old entry
+        queue.push((-9, 10, "wfA"))
+        queue.push((-3, 30, "wfD"))
+        self.assertEqual(queue.top(), "wfA")
+        queue.remove("wfA")
+        self.assertEqual(queue.top(), "wfD")
+        queue.remove("wfD")
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.top(), None)
+        self.assertEqual(queue.heap, [])
+        return
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,8 +8,13 @@ Test class for Basic Algorithms
 import os
 import os.path
 import hashlib
+import subprocess
+import time
 import unittest
 import tempfile
+import zlib
+
+from nose.plugins.attrib import attr
 
 #from WMCore.Algorithms.BasicAlgos import *
 import WMCore.Algorithms.BasicAlgos as BasicAlgos
@@ -94,6 +99,86 @@ class testBasicAlgos(unittest.TestCase):
         self.assertEqual(info['Size'], 34)
         return
 
+    def cksum(self, filename):
+        """
+        Checksum of a file from the cksum command line tool.
+        """
+        output = subprocess.Popen(["cksum", filename], stdout = subprocess.PIPE).communicate()[0]
+        return output.split()[0]
+
+    def makeFile(self, name, size):
+        """
+        Write size random bytes to a file in the work directory.
+        """
+        filename = os.path.join(self.testDir, name)
+        f = open(filename, 'wb')
+        f.write(os.urandom(size))
+        f.close()
+        return filename
+
+    def test_calculateChecksums(self):
+        """
+        _calculateChecksums_
+
+        The checksums must be the ones of zlib.adler32 and the cksum tool
+        whatever the file and read buffer sizes.
+        """
+        for size in [0, 1, 3, 255, 256, 4096, 65537, 1000000]:
+            filename = self.makeFile('checksum%i.test' % size, size)
+            adler32 = "%x" % (zlib.adler32(open(filename, 'rb').read()) & 0xffffffff)
+            expected = (adler32, self.cksum(filename))
+
+            self.assertEqual(BasicAlgos.calculateChecksums(filename), expected)
+            self.assertEqual(BasicAlgos.calculateChecksums(filename, bufferSize = 7), expected)
+        return
+
+    def test_calculateChecksumsForFiles(self):
+        """
+        _calculateChecksumsForFiles_
+
+        Checksums of several files computed in parallel match the serial ones.
+        """
+        filenames = [self.makeFile('parallel%i.test' % i, 10000 * i) for i in range(5)]
+        serial = dict([(x, BasicAlgos.calculateChecksums(x)) for x in filenames])
+        self.assertEqual(BasicAlgos.calculateChecksumsForFiles(filenames, processes = 3), serial)
+        self.assertEqual(BasicAlgos.calculateChecksumsForFiles(filenames, processes = 1), serial)
+        self.assertEqual(BasicAlgos.calculateChecksumsForFiles([]), {})
+        return
+
+    @attr('integration')
+    def test_calculateChecksumsBenchmark(self):
+        """
+        _calculateChecksumsBenchmark_
+
+        Compare the checksums against adler32 plus the cksum tool fed through
+        a pipe on a large file and on many small ones.
+        """
+        def referenceChecksums(filename):
+            adler32 = 1
+            cksumProcess = subprocess.Popen("cksum", stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+            with open(filename, 'rb') as f:
+                for chunk in iter((lambda:f.read(4096)), ''):
+                    adler32 = zlib.adler32(chunk, adler32)
+                    cksumProcess.stdin.write(chunk)
+            cksum = cksumProcess.communicate()[0].split()[0]
+            return ("%x" % (adler32 & 0xffffffff), cksum)
+
+        largeFile = [self.makeFile('large.test', 256 * 1024 * 1024)]
+        smallFiles = [self.makeFile('small%i.test' % i, 1024 * 1024) for i in range(100)]
+        for (name, filenames) in [("large file", largeFile), ("small files", smallFiles)]:
+            timings = []
+            for function in [referenceChecksums, BasicAlgos.calculateChecksums]:
+                startTime = time.time()
+                results = [function(x) for x in filenames]
+                timings.append(time.time() - startTime)
+            startTime = time.time()
+            parallel = BasicAlgos.calculateChecksumsForFiles(filenames)
+            timings.append(time.time() - startTime)
+
+            self.assertEqual(results, [parallel[x] for x in filenames])
+            print "%s: cksum %.2fs, in process %.2fs, parallel %.2fs" % tuple([name] + timings)
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -162,6 +162,21 @@ class MathAlgoTest(unittest.TestCase):
                                   {'a': 100, 'b': 198, 'name': 'Three'}])
         return
 
+    def testGetPercentile(self):
+        """
+        _testGetPercentile_
+
+        Check nearest rank percentiles
+        """
+        numList = [15, 20, 35, 40, 50]
+        self.assertEqual(MathAlgos.getPercentile(numList, 5), 15)
+        self.assertEqual(MathAlgos.getPercentile(numList, 30), 20)
+        self.assertEqual(MathAlgos.getPercentile(numList, 40), 20)
+        self.assertEqual(MathAlgos.getPercentile(numList, 50), 35)
+        self.assertEqual(MathAlgos.getPercentile(list(reversed(numList)), 100), 50)
+        self.assertEqual(MathAlgos.getPercentile([], 50), None)
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+_DAOFactory_t_
+
+Unit tests for the DAOFactory class and its class cache.
+"""
+
+import unittest
+import threading
+
+from WMCore.DAOFactory import DAOFactory
+from WMQuality.TestInit import TestInit
+
+class DAOFactoryTest(unittest.TestCase):
+    def setUp(self):
+        self.testInit = TestInit(__file__)
+        self.testInit.setLogging()
+        self.testInit.setDatabaseConnection()
+        DAOFactory.clearCache()
+        return
+
+    def tearDown(self):
+        DAOFactory.clearCache()
+        self.testInit.clearDatabase()
+        return
+
+    def testClassCache(self):
+        """
+        _testClassCache_
+
+        Verify that DAO modules are only imported once and that the hit and
+        miss counters are updated.
+        """
+        myThread = threading.currentThread()
+        daoFactory = DAOFactory(package = "WMCore.WMBS",
+                                logger = myThread.logger,
+                                dbinterface = myThread.dbi)
+
+        firstDAO = daoFactory(classname = "Jobs.New")
+        self.assertEqual(DAOFactory.cacheStats()["misses"], 1)
+        self.assertEqual(DAOFactory.cacheStats()["hits"], 0)
+        self.assertEqual(DAOFactory.cacheStats()["engines"], 1)
+
+        otherFactory = DAOFactory(package = "WMCore.WMBS",
+                                  logger = myThread.logger,
+                                  dbinterface = myThread.dbi)
+        secondDAO = otherFactory(classname = "Jobs.New")
+        self.assertEqual(DAOFactory.cacheStats()["misses"], 1)
+        self.assertEqual(DAOFactory.cacheStats()["hits"], 1)
+        self.assertEqual(DAOFactory.cacheStats()["classes"], 1)
+
+        self.assertEqual(firstDAO.__class__, secondDAO.__class__)
+        self.assertNotEqual(id(firstDAO), id(secondDAO))
+        return
+
+    def testInstanceCache(self):
+        """
+        _testInstanceCache_
+
+        Verify that the same DAO object is returned when instances are cached.
+        """
+        myThread = threading.currentThread()
+        daoFactory = DAOFactory(package = "WMCore.WMBS",
+                                logger = myThread.logger,
+                                dbinterface = myThread.dbi,
+                                cacheInstances = True)
+
+        firstDAO = daoFactory(classname = "Jobs.GetState")
+        secondDAO = daoFactory(classname = "Jobs.GetState")
+        self.assertEqual(id(firstDAO), id(secondDAO))
+        self.assertEqual(DAOFactory.cacheStats()["instanceHits"], 1)
+        self.assertEqual(DAOFactory.cacheStats()["instances"], 1)
+        return
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+_JobPackageStore_t_
+
+Unittests for the JobPackageStore append-only job file
+"""
+
+import os
+import unittest
+
+from WMQuality.TestInit import TestInit
+
+from WMCore.DataStructs.JobPackageStore import JobPackageStore, isJobPackageStore
+from WMCore.DataStructs.JobPackageStore import getJobStorePath, deleteJobStore
+from WMCore.DataStructs.Job import Job
+
+class JobPackageStoreTest(unittest.TestCase):
+    def setUp(self):
+        """
+        _setUp_
+
+        Create a temporary directory for the store.
+        """
+        self.testInit = TestInit(__file__)
+        self.testDir = self.testInit.generateWorkDir()
+        self.storeFile = os.path.join(self.testDir, "JobGroup_1.jobs")
+        return
+
+    def tearDown(self):
+        self.testInit.delWorkDir()
+        return
+
+    def makeJobs(self, first, last):
+        """
+        _makeJobs_
+
+        Create jobs with IDs from first to last - 1.
+        """
+        jobs = []
+        for i in range(first, last):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            setattr(newJob.getBaggage(), "seed", i * 11)
+            jobs.append(newJob)
+        return jobs
+
+    def testAppendAndLoad(self):
+        """
+        _testAppendAndLoad_
+
+        Verify that jobs can be loaded back by ID, both from the store that
+        wrote them and from a new one using the index file.
+        """
+        jobStore = JobPackageStore(self.storeFile)
+        jobStore.extend(self.makeJobs(0, 100))
+        self.assertEqual(jobStore[42]["name"], "Job42")
+        jobStore.close()
+
+        self.assertTrue(isJobPackageStore(self.storeFile))
+        self.assertFalse(isJobPackageStore(self.storeFile + ".idx"))
+
+        jobStore = JobPackageStore(self.storeFile)
+        self.assertEqual(len(jobStore), 100)
+        self.assertEqual(sorted(jobStore.keys()), range(100))
+        for i in [0, 57, 99]:
+            job = jobStore[i]
+            self.assertEqual(job["name"], "Job%s" % i)
+            self.assertEqual(job.getBaggage().seed, i * 11)
+        self.assertFalse(100 in jobStore)
+        self.assertEqual(jobStore.get(100), None)
+        jobStore.close()
+        return
+
+    def testRecovery(self):
+        """
+        _testRecovery_
+
+        Verify that a missing index is rebuilt from the data file and that a
+        partially written record is dropped on the next append.
+        """
+        jobStore = JobPackageStore(self.storeFile)
+        jobStore.extend(self.makeJobs(0, 10))
+        jobStore.close()
+
+        os.remove(self.storeFile + ".idx")
+        dataHandle = open(self.storeFile, "ab")
+        dataHandle.write("\x00\x00\x00")
+        dataHandle.close()
+
+        jobStore = JobPackageStore(self.storeFile)
+        self.assertEqual(sorted(jobStore.keys()), range(10))
+        jobStore.extend(self.makeJobs(10, 20))
+        jobStore.close()
+
+        jobStore = JobPackageStore(self.storeFile)
+        self.assertEqual(sorted(jobStore.keys()), range(20))
+        self.assertEqual(jobStore[15]["name"], "Job15")
+        self.assertEqual(os.path.getsize(self.storeFile + ".idx"), 20 * 20)
+
+        # Without the index the headers are walked
+        jobStore = JobPackageStore(self.storeFile, writeIndex = False)
+        os.remove(self.storeFile + ".idx")
+        self.assertEqual(jobStore[19]["name"], "Job19")
+        self.assertEqual(len(jobStore), 20)
+        return
+
+    def testStorePath(self):
+        """
+        _testStorePath_
+
+        Verify that the store is put in the task directory.
+        """
+        cacheDir = "/work/Workload/Task/JobCollection_12_0/job_100"
+        self.assertEqual(getJobStorePath(cacheDir, 12),
+                         "/work/Workload/Task/JobGroup_12.jobs")
+        self.assertEqual(getJobStorePath(cacheDir + "/", "12"),
+                         "/work/Workload/Task/JobGroup_12.jobs")
+        return
+
+    def testDelete(self):
+        """
+        _testDelete_
+
+        Remove both the data and the index file of a store.
+        """
+        jobStore = JobPackageStore(self.storeFile)
+        jobStore.extend(self.makeJobs(0, 5))
+        jobStore.close()
+
+        self.assertTrue(deleteJobStore(self.storeFile))
+        self.assertFalse(os.path.exists(self.storeFile))
+        self.assertFalse(os.path.exists(self.storeFile + ".idx"))
+        self.assertFalse(deleteJobStore(self.storeFile))
+        return
+
+if __name__ == "__main__":
+    unittest.main()
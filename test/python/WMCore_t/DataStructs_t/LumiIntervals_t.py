@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+_LumiIntervals_t_
+
+Unittest for the WMCore.DataStructs.LumiIntervals module
+"""
+
+import random
+import unittest
+
+from WMCore.DataStructs.LumiIntervals import mergeRanges, toRangeList, rangesContain
+from WMCore.DataStructs.LumiIntervals import filterLumis, unionRanges, intersectRanges
+from WMCore.DataStructs.LumiIntervals import subtractRanges, RunLumiIntervals
+
+def expand(ranges):
+    """
+    Turn a list of ranges into the set of lumis they contain.
+    """
+    lumis = set()
+    for (first, last) in ranges:
+        lumis.update(range(first, last + 1))
+    return lumis
+
+def randomRanges(count):
+    """
+    Make a list of random, possibly overlapping, ranges.
+    """
+    ranges = []
+    for i in range(count):
+        first = random.randint(1, 200)
+        ranges.append([first, first + random.randint(0, 15)])
+    return ranges
+
+class LumiIntervalsTest(unittest.TestCase):
+    """
+    _LumiIntervalsTest_
+
+    """
+
+    def testMerge(self):
+        """
+        Test that overlapping, adjacent and unsorted ranges are merged
+        """
+        intervals = mergeRanges([[10, 12], [1, 3], [4, 5], [11, 20], [30, 30], [7, 6]])
+        self.assertEqual(toRangeList(intervals), [[1, 5], [10, 20], [30, 30]])
+
+        intervals = mergeRanges([[5, 0], [1, 2]], openEnded = True)
+        self.assertTrue(rangesContain(intervals, 1000000))
+        self.assertFalse(rangesContain(intervals, 3))
+        self.assertEqual(toRangeList(mergeRanges([])), [])
+
+    def testLookups(self):
+        """
+        Test contains and filterLumis against expanded sets
+        """
+        for i in range(20):
+            ranges = randomRanges(10)
+            intervals = mergeRanges(ranges)
+            lumis = expand(ranges)
+            candidates = range(0, 230)
+            for lumi in candidates:
+                self.assertEqual(rangesContain(intervals, lumi), lumi in lumis)
+            self.assertEqual(filterLumis(intervals, candidates),
+                             [x for x in candidates if x in lumis])
+
+    def testSetOperations(self):
+        """
+        Test union, intersection and difference against expanded sets
+        """
+        for i in range(50):
+            aRanges = randomRanges(random.randint(0, 10))
+            bRanges = randomRanges(random.randint(0, 10))
+            a = mergeRanges(aRanges)
+            b = mergeRanges(bRanges)
+            aLumis = expand(aRanges)
+            bLumis = expand(bRanges)
+
+            self.assertEqual(expand(toRangeList(unionRanges(a, b))), aLumis | bLumis)
+            self.assertEqual(expand(toRangeList(intersectRanges(a, b))), aLumis & bLumis)
+            self.assertEqual(expand(toRangeList(subtractRanges(a, b))), aLumis - bLumis)
+
+            # The results must be in canonical form
+            for result in [unionRanges(a, b), intersectRanges(a, b), subtractRanges(a, b)]:
+                rangeList = toRangeList(result)
+                self.assertEqual(toRangeList(mergeRanges(rangeList)), rangeList)
+
+    def testRunLumiIntervals(self):
+        """
+        Test the per run cache
+        """
+        runRanges = {1: [[1, 10], [20, 30]]}
+        intervals = RunLumiIntervals(runRanges)
+        self.assertTrue(intervals.contains(1, 5))
+        self.assertFalse(intervals.contains(1, 15))
+        self.assertFalse(intervals.contains(2, 5))
+        self.assertEqual(intervals.filterLumis(1, [30, 31, 2]), [30, 2])
+        self.assertEqual(intervals.filterLumis(2, [1]), [])
+
+        # Adding a range to the run must be noticed
+        runRanges[1].append([11, 19])
+        self.assertTrue(intervals.contains(1, 15))
+        runRanges[1] = [[100, 200]]
+        self.assertFalse(intervals.contains(1, 15))
+        self.assertTrue(intervals.contains(1, 150))
+
+
+if __name__ == '__main__':
+    unittest.main()
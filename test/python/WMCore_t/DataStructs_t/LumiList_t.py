@@ -282,6 +282,25 @@ class LumiListTest(unittest.TestCase):
         a = LumiList(runsAndLumis = alumis)
         a.writeJSON('newFile.json')
 
+    def testContains(self):
+        """
+        Test contains with overlapping, unsorted and open ended ranges
+        """
+        a = LumiList(compactList = {'1': [[20, 30], [1, 5], [4, 10]],
+                                    '2': [[5, 0]]})
+        self.assertTrue(a.contains(1, 1))
+        self.assertTrue(a.contains(1, 7))
+        self.assertFalse(a.contains(1, 11))
+        self.assertTrue((1, 25) in a)
+        self.assertFalse(a.contains(1, 31))
+        self.assertTrue(a.contains(2, 1000))
+        self.assertFalse(a.contains(2, 4))
+        self.assertFalse(a.contains(3, 1))
+        self.assertTrue(a.contains('1'))
+
+        a.removeRuns([1])
+        self.assertFalse(a.contains(1, 7))
+
 
 
 if __name__ == '__main__':
@@ -77,6 +77,38 @@ class CMSCouchTest(unittest.TestCase):
         all_docs = self.db.allDocs()
         self.assertEqual(0, len(all_docs['rows']))
 
+    def testIterView(self):
+        """
+        Views and all docs can be read in pages
+        """
+        for i in range(25):
+            self.db.queue({'_id': 'doc%02i' % i, 'foo': i % 4})
+        self.db.commit()
+        self.db.commitOne({'_id': '_design/test',
+                           'views': {'byFoo': {'map': "function(doc) {if (doc.foo !== undefined) {emit(doc.foo, null);}}",
+                                               'reduce': "_count"}}})
+
+        rows = self.db.loadView('test', 'byFoo', {'reduce': False})['rows']
+        self.assertEqual(len(rows), 25)
+        for pageSize in [1, 4, 100]:
+            pagedRows = list(self.db.iterView('test', 'byFoo', {'reduce': False}, pageSize = pageSize))
+            self.assertEqual(pagedRows, rows)
+            pagedRows = list(self.db.iterView('test', 'byFoo', {'reduce': False, 'key': 2},
+                                              pageSize = pageSize))
+            self.assertEqual([x['id'] for x in pagedRows], ['doc02', 'doc06', 'doc10', 'doc14', 'doc18', 'doc22'])
+            pagedRows = list(self.db.iterView('test', 'byFoo', {'reduce': False, 'limit': 10},
+                                              pageSize = pageSize))
+            self.assertEqual(pagedRows, rows[:10])
+            pagedRows = list(self.db.iterView('test', 'byFoo', {'group': True}, pageSize = pageSize))
+            self.assertEqual([(x['key'], x['value']) for x in pagedRows], [(0, 7), (1, 6), (2, 6), (3, 6)])
+            pagedRows = list(self.db.iterView('test', 'byFoo', {'reduce': False}, keys = [1, 3],
+                                              pageSize = pageSize))
+            self.assertEqual(len(pagedRows), 12)
+
+            allDocs = list(self.db.iterAllDocs(pageSize = pageSize))
+            self.assertEqual(allDocs, self.db.allDocs()['rows'])
+            self.assertEqual(len(allDocs), 26)
+
     def testDeleteQueuedDocs(self):
         doc1 = {'foo':123, 'bar':456}
         doc2 = {'foo':789, 'bar':101112}
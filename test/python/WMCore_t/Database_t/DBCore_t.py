@@ -284,6 +284,152 @@ class DBCoreTest(unittest.TestCase):
 
         return
 
+    def testBuildBulkSelect(self):
+        """
+        _testBuildBulkSelect_
+
+        Verify that selects are only merged into IN list queries when the
+        merged query returns the same rows as the individual ones.
+        """
+        myThread = threading.currentThread()
+
+        selectSQL = "SELECT column1 FROM test_tablea WHERE column2 = :two AND column3 = :three"
+        binds = [{"two": 1, "three": "a"}, {"two": 2, "three": "a"}]
+        (newSQL, newBinds) = myThread.dbi.buildbulkselect(selectSQL, binds)
+
+        self.assertEqual(newSQL, "SELECT column1 FROM test_tablea WHERE column2 IN (:two_0, :two_1) AND column3 = :three")
+        self.assertEqual(newBinds, {"two_0": 1, "two_1": 2, "three": "a"})
+
+        # Two varying binds
+        binds = [{"two": 1, "three": "a"}, {"two": 2, "three": "b"}]
+        self.assertEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+
+        # Duplicate values
+        binds = [{"two": 1, "three": "a"}, {"two": 1, "three": "a"}]
+        self.assertEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+
+        # Aggregates and subqueries
+        binds = [{"two": 1}, {"two": 2}]
+        self.assertEqual(myThread.dbi.buildbulkselect("SELECT COUNT(*) FROM test_tablea WHERE column2 = :two", binds), None)
+        self.assertEqual(myThread.dbi.buildbulkselect("""SELECT column1 FROM test_tablea WHERE column1 IN
+                                                         (SELECT column1 FROM test_tablea WHERE column2 = :two)""", binds), None)
+
+        # Comparisons other than equality
+        for operator in [">=", "<=", "!=", "<>", ">", "<"]:
+            selectSQL = "SELECT column1 FROM test_tablea WHERE column2 %s :two" % operator
+            self.assertEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+            selectSQL = "SELECT column1 FROM test_tablea WHERE column2 %s:two" % operator
+            self.assertEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+
+        # Conditions that aren't a top level col = :bind of the WHERE clause
+        for selectSQL in ["SELECT column1 FROM test_tablea WHERE column2 = :two ORDER BY column1",
+                          "SELECT column1 FROM test_tablea WHERE column1 = 1 OR column2 = :two",
+                          "SELECT column1 FROM test_tablea WHERE NOT (column2 = :two)",
+                          "SELECT column1 FROM test_tablea WHERE CASE WHEN column2 = :two THEN 1 ELSE 0 END = 1",
+                          """SELECT test_tablea.column1, test_tableb.column1 FROM test_tablea
+                               LEFT OUTER JOIN test_tableb ON
+                                 test_tableb.column2 = test_tablea.column2 AND test_tableb.column2 = :two""",
+                          """SELECT test_tablea.column1, test_tableb.column1 FROM test_tablea
+                               LEFT OUTER JOIN test_tableb ON
+                                 test_tableb.column2 = :two
+                             WHERE test_tablea.column3 = 'a'"""]:
+            self.assertEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+
+        selectSQL = """SELECT test_tablea.column1, test_tableb.column1 FROM test_tablea
+                         LEFT OUTER JOIN test_tableb ON
+                           test_tableb.column2 = test_tablea.column2
+                       WHERE (test_tablea.column2 = :two AND test_tablea.column3 = 'a')"""
+        self.assertNotEqual(myThread.dbi.buildbulkselect(selectSQL, binds), None)
+        return
+
+    def testProcessDataBulkSelect(self):
+        """
+        _testProcessDataBulkSelect_
+
+        Verify that selects that get merged into IN list queries return the
+        same rows as the individual selects.
+        """
+        binds = []
+        for i in range(1200):
+            binds.append({"one": i, "two": i % 3, "three": "three"})
+
+        insertSQL = "INSERT INTO test_tablea VALUES (:one, :two, :three)"
+        selectSQL = "SELECT column1, column2 FROM test_tablea WHERE column1 = :one AND column3 = :three"
+
+        myThread = threading.currentThread()
+        myThread.dbi.processData(insertSQL, binds = binds)
+
+        selectBinds = [{"one": i, "three": "three"} for i in range(1, 1200, 2)]
+        resultSets = myThread.dbi.processData(selectSQL, selectBinds, bulkSelect = True)
+        self.assertEqual(len(resultSets), 2)
+        bulkResults = []
+        for resultSet in resultSets:
+            bulkResults.extend([tuple(x) for x in resultSet.fetchall()])
+
+        resultSets = myThread.dbi.processData(selectSQL, selectBinds)
+        self.assertEqual(len(resultSets), 2)
+        results = []
+        for resultSet in resultSets:
+            results.extend([tuple(x) for x in resultSet.fetchall()])
+
+        self.assertEqual(len(bulkResults), 600)
+        self.assertEqual(sorted(bulkResults), sorted(results))
+
+        # Without the rewrite the rows come back in the order of the binds
+        self.assertEqual(results, [(i, i % 3) for i in range(1, 1200, 2)])
+        return
+
+    def testProcessDataBulkSelectOrder(self):
+        """
+        _testProcessDataBulkSelectOrder_
+
+        Verify that an ordered select is not merged and still returns the
+        rows of every bind in order, in the order of the binds.
+        """
+        myThread = threading.currentThread()
+        insertSQL = "INSERT INTO test_tablea VALUES (:one, :two, :three)"
+        myThread.dbi.processData(insertSQL, [{"one": i, "two": i % 3, "three": "three"}
+                                             for i in range(30)])
+
+        selectSQL = "SELECT column1 FROM test_tablea WHERE column2 = :two ORDER BY column1 DESC"
+        resultSets = myThread.dbi.processData(selectSQL, [{"two": 2}, {"two": 0}],
+                                              bulkSelect = True)
+        results = []
+        for resultSet in resultSets:
+            results.extend([x[0] for x in resultSet.fetchall()])
+
+        self.assertEqual(results, range(29, -1, -3) + range(27, -1, -3))
+        return
+
+    def testProcessDataBulkSelectOuterJoin(self):
+        """
+        _testProcessDataBulkSelectOuterJoin_
+
+        Verify that a bind in the ON condition of an outer join is not
+        merged, the unmatched rows come back once for every bind.
+        """
+        myThread = threading.currentThread()
+        myThread.dbi.processData("INSERT INTO test_tablea VALUES (:one, :two, :three)",
+                                 [{"one": i, "two": i, "three": "three"} for i in range(3)])
+        myThread.dbi.processData("INSERT INTO test_tableb VALUES (:one, :two, :three)",
+                                 [{"one": "b%i" % i, "two": i, "three": "three"} for i in range(3)])
+
+        selectSQL = """SELECT test_tablea.column1, test_tableb.column1 FROM test_tablea
+                         LEFT OUTER JOIN test_tableb ON
+                           test_tableb.column2 = test_tablea.column2 AND test_tableb.column2 = :two"""
+        results = []
+        for bulkSelect in [True, False]:
+            resultSets = myThread.dbi.processData(selectSQL, [{"two": 0}, {"two": 1}],
+                                                  bulkSelect = bulkSelect)
+            rows = []
+            for resultSet in resultSets:
+                rows.extend([tuple(x) for x in resultSet.fetchall()])
+            results.append(sorted(rows))
+
+        self.assertEqual(len(results[0]), 6)
+        self.assertEqual(results[0], results[1])
+        return
+
     def testInsertHugeNumber(self):
         """
         _testInsertHugeNumber_
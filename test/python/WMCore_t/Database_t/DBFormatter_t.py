@@ -100,6 +100,47 @@ insert into test (bind1, bind2) values (:bind1, :bind2) """
         output = dbformatter.formatOneDict(result)
         self.assertEqual( output,  {'bind2': 'value2a', 'bind1': 'value1a'} )
 
+    @attr("integration")
+    def testStreamingFormatting(self):
+        """
+        Test that the formats are the same for streaming result sets
+        """
+
+        myThread = threading.currentThread()
+        dbformatter = DBFormatter(myThread.logger, myThread.dbi)
+
+        result = myThread.dbi.processData(myThread.select, streaming = True)
+        output = dbformatter.format(result)
+        self.assertEqual(output ,  [['value1a', 'value2a'], \
+            ['value1b', 'value2b'], ['value1c', 'value2d']])
+        result = myThread.dbi.processData(myThread.select, streaming = True)
+        output = dbformatter.formatDict(result)
+        self.assertEqual( output , [{'bind2': 'value2a', 'bind1': 'value1a'}, \
+            {'bind2': 'value2b', 'bind1': 'value1b'},\
+            {'bind2': 'value2d', 'bind1': 'value1c'}] )
+        result = myThread.dbi.processData(myThread.select, streaming = True)
+        output = dbformatter.formatOneDict(result)
+        self.assertEqual( output,  {'bind2': 'value2a', 'bind1': 'value1a'} )
+
+    @attr("integration")
+    def testCursorFormatting(self):
+        """
+        Test that plain ResultProxies are formatted like ResultSets
+        """
+
+        myThread = threading.currentThread()
+        dbformatter = DBFormatter(myThread.logger, myThread.dbi)
+
+        result = myThread.dbi.processData(myThread.select, returnCursor = True)
+        output = dbformatter.format(result)
+        self.assertEqual(output ,  [['value1a', 'value2a'], \
+            ['value1b', 'value2b'], ['value1c', 'value2d']])
+        result = myThread.dbi.processData(myThread.select, returnCursor = True)
+        output = dbformatter.formatDict(result)
+        self.assertEqual( output , [{'bind2': 'value2a', 'bind1': 'value1a'}, \
+            {'bind2': 'value2b', 'bind1': 'value1b'},\
+            {'bind2': 'value2d', 'bind1': 'value1c'}] )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -16,7 +16,7 @@ import threading
 import os
 
 from WMCore.WMFactory import WMFactory
-from WMCore.Database.ResultSet import ResultSet
+from WMCore.Database.ResultSet import ResultSet, StreamingResultSet
 from WMQuality.TestInit import TestInit
 from sqlalchemy.engine.base import ResultProxy
 
@@ -120,6 +120,119 @@ class ResultSetTest(unittest.TestCase):
 
         return
 
+    def testStreamingResultSet(self):
+        """
+        _testStreamingResultSet_
+
+        Verify that the StreamingResultSet returns the same rows as the
+        ResultSet when reading the cursor in several batches.
+        """
+        binds = []
+        for i in range(25):
+            binds.append({'column1': 'value1%02d' % i, 'column2': 'value2%02d' % i})
+        self.myThread.dbi.processData("insert into test_tablec (column1, column2) values (:column1, :column2)", binds)
+
+        sql = "select column1, column2 from test_tablec order by column1"
+        testSet = ResultSet()
+        testSet.add(self.myThread.dbi.connection().execute(sql))
+        rows = [tuple(x) for x in testSet.fetchall()]
+
+        streamSet = StreamingResultSet(batchSize = 10)
+        streamSet.add(self.myThread.dbi.connection().execute(sql))
+        self.assertEqual([x.lower() for x in streamSet.keys],
+                         [x.lower() for x in testSet.keys])
+        self.assertEqual(list(streamSet.iterrows()), rows)
+        self.assertEqual(streamSet.resultproxies, [])
+
+        streamSet = StreamingResultSet(batchSize = 10)
+        streamSet.add(self.myThread.dbi.connection().execute(sql))
+        self.assertEqual(streamSet.fetchone(), rows[0])
+        self.assertEqual(streamSet.fetchall(), rows[1:])
+
+        emptySet = StreamingResultSet()
+        emptySet.add(self.myThread.dbi.connection().execute("select column1 from test_tablec where column1 = 'none'"))
+        self.assertEqual(emptySet.fetchall(), [])
+        self.assertEqual(emptySet.fetchone(), [])
+        return
+
+class FakeResultProxy(object):
+    """
+    _FakeResultProxy_
+
+    Hands out rows like a ResultProxy and counts how many were fetched.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+        self.closed = False
+
+    def keys(self):
+        return ["column1", "column2"]
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        if rows:
+            return rows[0]
+        return None
+
+    def fetchmany(self, size):
+        rows = self.rows[self.fetched:self.fetched + size]
+        self.fetched += len(rows)
+        return rows
+
+    def close(self):
+        self.closed = True
+
+class StreamingResultSetTest(unittest.TestCase):
+    """
+    _StreamingResultSetTest_
+
+    Test the StreamingResultSet without a database.
+    """
+    def testLazyRows(self):
+        """
+        _testLazyRows_
+
+        Rows are only fetched from the result proxies a batch at a time while
+        they are iterated over, and come out as tuples.
+        """
+        proxies = [FakeResultProxy([["a%i" % i, i] for i in range(25)]),
+                   FakeResultProxy([["b%i" % i, i] for i in range(5)])]
+        released = []
+        streamSet = StreamingResultSet(batchSize = 10)
+        for proxy in proxies:
+            streamSet.add(proxy)
+        streamSet.release = lambda: released.append(True)
+        self.assertEqual(streamSet.keys, ["column1", "column2"])
+        self.assertEqual([x.fetched for x in proxies], [0, 0])
+
+        rows = streamSet.iterrows()
+        self.assertEqual(rows.next(), ("a0", 0))
+        self.assertEqual([x.fetched for x in proxies], [10, 0])
+        for i in range(10):
+            row = rows.next()
+        self.assertEqual(row, ("a10", 10))
+        self.assertEqual([x.fetched for x in proxies], [20, 0])
+
+        rest = list(rows)
+        self.assertEqual(len(rest), 19)
+        self.assertEqual(rest[-1], ("b4", 4))
+        self.assertEqual([x.closed for x in proxies], [True, True])
+        self.assertEqual(released, [True])
+
+        # closing early closes the proxies and releases the connection
+        proxy = FakeResultProxy([["c%i" % i, i] for i in range(25)])
+        streamSet = StreamingResultSet(batchSize = 10)
+        streamSet.add(proxy)
+        streamSet.release = lambda: released.append(True)
+        self.assertEqual(streamSet.fetchone(), ("c0", 0))
+        self.assertEqual(proxy.fetched, 1)
+        streamSet.close()
+        streamSet.close()
+        self.assertTrue(proxy.closed)
+        self.assertEqual(released, [True, True])
+        self.assertEqual(streamSet.fetchall(), [])
+        return
 
 
 if __name__ == "__main__":
@@ -9,10 +9,14 @@ import unittest
 import os
 import time
 
+from nose.plugins.attrib import attr
+
 from WMCore.Algorithms import BasicAlgos
 from WMCore.Configuration import ConfigSection
 from WMCore.Database.CMSCouch import CouchServer
 from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport import XMLParser
+from WMCore.FwkJobReport import StreamingParser
 from WMCore.WMBase import getTestBase
 from WMQuality.TestInitCouchApp import TestInitCouchApp
 
@@ -839,5 +843,96 @@ cms::Exception caught in EventProcessor and rethrown
         self.assertEqual(badReport.getExitCode(), 60450)
         return
 
+    def testStreamingParser(self):
+        """
+        _testStreamingParser_
+
+        Verify that the streaming parser fills the report exactly like the
+        expat based parser does.
+        """
+        reportDir = os.path.join(getTestBase(), "WMCore_t/FwkJobReport_t")
+        for xmlName in ["CMSSWProcessingReport.xml", "CMSSWFailReport.xml",
+                        "CMSSWMergeReport.xml", "CMSSWMultipleInput.xml",
+                        "CMSSWInputFallback.xml", "CMSSWSkippedAll.xml",
+                        "CMSSWSkippedNonExistentFile.xml", "PerformanceReport.xml"]:
+            xmlPath = os.path.join(reportDir, xmlName)
+            expatReport = Report("cmsRun1")
+            XMLParser.xmlToJobReport(expatReport, xmlPath)
+            streamingReport = Report("cmsRun1")
+            StreamingParser.xmlToJobReport(streamingReport, xmlPath)
+            self.assertEqual(expatReport.data.dictionary_whole_tree_(),
+                             streamingReport.data.dictionary_whole_tree_(),
+                             "Error: Reports differ for %s" % xmlName)
+
+        record = StreamingParser.parseReport(self.xmlPath)
+        self.assertEqual(len(record.inputFiles), 1)
+        self.assertEqual(record.inputFiles[0].runs[0][0], "122023")
+        self.assertEqual(list(record.inputFiles[0].runs[0][1]), [215])
+        self.assertEqual(len(record.outputFiles), 2)
+        return
+
+    def writeLargeReport(self, xmlPath, nModules, nRuns, nLumis):
+        """
+        _writeLargeReport_
+
+        Write a framework job report with an input file and nModules output
+        files, each with nLumis lumis spread over nRuns runs.
+        """
+        runs = []
+        for run in range(nRuns):
+            runs.append('<Run ID="%i">\n' % (run + 1))
+            for lumi in range(nLumis / nRuns):
+                runs.append('  <LumiSection ID="%i"/>\n' % (lumi + 1))
+            runs.append('</Run>\n')
+        runs = "<Runs>\n%s</Runs>\n" % "".join(runs)
+
+        xmlFile = open(xmlPath, "w")
+        xmlFile.write("<FrameworkJobReport>\n")
+        xmlFile.write("<InputFile>\n<State Value=\"closed\"/>\n<LFN>/store/input.root</LFN>\n"
+                      "<PFN>input.root</PFN>\n<Catalog></Catalog>\n<ModuleLabel>source</ModuleLabel>\n"
+                      "<GUID>GUID</GUID>\n<InputType>primaryFiles</InputType>\n"
+                      "<InputSourceClass>PoolSource</InputSourceClass>\n<EventsRead>1000</EventsRead>\n"
+                      "%s</InputFile>\n" % runs)
+        for module in range(nModules):
+            xmlFile.write("<File>\n<State Value=\"closed\"/>\n<LFN></LFN>\n<PFN>output%i.root</PFN>\n"
+                          "<Catalog></Catalog>\n<ModuleLabel>output%i</ModuleLabel>\n<GUID>GUID%i</GUID>\n"
+                          "<OutputModuleClass>PoolOutputModule</OutputModuleClass>\n"
+                          "<TotalEvents>1000</TotalEvents>\n<BranchHash>hash</BranchHash>\n"
+                          "<Branches>\n<Branch>branch</Branch>\n</Branches>\n"
+                          "<Inputs>\n<Input>\n<LFN>/store/input.root</LFN>\n<PFN>input.root</PFN>\n"
+                          "</Input>\n</Inputs>\n%s</File>\n" % (module, module, module, runs))
+        xmlFile.write("</FrameworkJobReport>\n")
+        xmlFile.close()
+        return
+
+    @attr('integration')
+    def testStreamingParserBenchmark(self):
+        """
+        _testStreamingParserBenchmark_
+
+        Time both parsers on a report with 5000 lumis in the input file and in
+        each of 20 output files.  The streaming parser must fill the same
+        report in less time.
+        """
+        xmlPath = os.path.join(self.testDir, "LargeReport.xml")
+        self.writeLargeReport(xmlPath, nModules = 20, nRuns = 5, nLumis = 5000)
+
+        timings = {}
+        reports = {}
+        for (name, parser) in [("expat", XMLParser), ("streaming", StreamingParser)]:
+            startTime = time.time()
+            for i in range(5):
+                reports[name] = Report("cmsRun1")
+                parser.xmlToJobReport(reports[name], xmlPath)
+            timings[name] = (time.time() - startTime) / 5
+
+        self.assertEqual(reports["expat"].data.dictionary_whole_tree_(),
+                         reports["streaming"].data.dictionary_whole_tree_())
+        self.assertEqual(len(reports["streaming"].getAllFiles()), 20)
+        self.assertTrue(timings["streaming"] < timings["expat"],
+                        "Streaming parser took %.3f s per report, expat parser %.3f s" % \
+                        (timings["streaming"], timings["expat"]))
+        return
+
 if __name__ == "__main__":
     unittest.main()
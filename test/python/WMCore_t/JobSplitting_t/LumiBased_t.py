@@ -277,5 +277,28 @@ class LumiBasedTest(unittest.TestCase):
         self.assertEqual(jobs[1]['mask'].getRunAndLumis(), {2: [[200L, 200L]]})
         self.assertEqual(jobs[2]['mask'].getRunAndLumis(), {3: [[300L, 300L]]})
 
+    def testD_LumiMask(self):
+        """
+        _LumiMask_
+
+        Test that only the lumis in the runs/lumis mask end up in jobs.
+        """
+        splitter = SplitterFactory()
+        testSubscription = self.createSubscription(nFiles = 5, lumisPerFile = 5)
+        jobFactory = splitter(package = "WMCore.DataStructs",
+                              subscription = testSubscription)
+
+        jobGroups = jobFactory(lumis_per_job = 10,
+                               halt_job_on_file_boundaries = False,
+                               performance = self.performanceParams,
+                               runs = ['1', '3', '10'],
+                               lumis = ['101,102,104,110', '300,300,302,303', '1,5'])
+
+        self.assertEqual(len(jobGroups), 1)
+        jobs = jobGroups[0].jobs
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]['mask'].getRunAndLumis(), {1: [[101L, 102L], [104L, 104L]]})
+        self.assertEqual(jobs[1]['mask'].getRunAndLumis(), {3: [[300L, 300L], [302L, 303L]]})
+
 if __name__ == '__main__':
     unittest.main()
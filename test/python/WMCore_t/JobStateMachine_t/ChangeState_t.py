@@ -228,6 +228,86 @@ class TestChangeState(unittest.TestCase):
 
         return
 
+    def testBulkRecordInCouch(self):
+        """
+        _testBulkRecordInCouch_
+
+        Verify that state transitions recorded with _bulk_docs end up in the
+        job documents and job summaries and that conflicts are retried.
+        """
+        self.config.JobStateMachine.bulkTransitions = True
+        change = ChangeState(self.config, "changestate_t")
+
+        locationAction = self.daoFactory(classname = "Locations.New")
+        locationAction.execute("site1", seName = "somese.cern.ch")
+
+        testWorkflow = Workflow(spec = "spec.xml", owner = "Steve",
+                                name = "wf001", task = self.taskName)
+        testWorkflow.create()
+        testFileset = Fileset(name = "TestFileset")
+        testFileset.create()
+        testSubscription = Subscription(fileset = testFileset,
+                                        workflow = testWorkflow,
+                                        split_algo = "FileBased")
+        testSubscription.create()
+
+        for lfn in ["SomeLFNA", "SomeLFNB"]:
+            testFile = File(lfn = lfn, events = 1024, size = 2048,
+                            locations = set(["somese.cern.ch"]))
+            testFile.create()
+            testFileset.addFile(testFile)
+        testFileset.commit()
+
+        splitter = SplitterFactory()
+        jobFactory = splitter(package = "WMCore.WMBS",
+                              subscription = testSubscription)
+        jobGroup = jobFactory(files_per_job = 1)[0]
+        testJobs = jobGroup.jobs
+        for testJob in testJobs:
+            testJob["site_cms_name"] = "T2_XX_SiteA"
+            testJob["location"] = "site1"
+
+        change.propagate(testJobs, "new", "none")
+        change.propagate(testJobs, "created", "new")
+        change.propagate(testJobs, "executing", "created")
+
+        for testJob in testJobs:
+            testJobDoc = change.jobsdatabase.document(testJob["couch_record"])
+            self.assertEqual(len(testJobDoc["states"]), 3)
+            self.assertEqual(testJobDoc["states"]["1"]["newstate"], "created")
+            self.assertEqual(testJobDoc["states"]["1"]["location"], "Agent")
+            self.assertEqual(testJobDoc["states"]["2"]["oldstate"], "created")
+            self.assertEqual(testJobDoc["states"]["2"]["newstate"], "executing")
+            self.assertEqual(testJobDoc["states"]["2"]["location"], "T2_XX_SiteA")
+
+        # Only existing job summaries are updated
+        change.jsumdatabase.commitOne({"_id": testJobs[0]["name"], "type": "jobsummary",
+                                       "state": "executing"})
+        change.propagate(testJobs, "complete", "executing", updatesummary = True)
+
+        jobSummary = change.jsumdatabase.document(testJobs[0]["name"])
+        self.assertEqual(jobSummary["state"], "complete")
+        self.assertEqual(len(jobSummary["state_history"]), 1)
+        self.assertEqual(jobSummary["state_history"][0]["oldstate"], "executing")
+        self.assertFalse(change.jsumdatabase.documentExists(testJobs[1]["name"]))
+
+        # Modify the document behind the back of the first attempt
+        conflicts = []
+        def conflictingUpdate(docID, doc, update):
+            if len(conflicts) == 0:
+                conflicts.append(docID)
+                change.jobsdatabase.commitOne(dict(doc))
+            doc["states"]["99"] = update
+            return doc
+
+        couchID = testJobs[0]["couch_record"]
+        change.bulkUpdateDocuments(change.jobsdatabase, {couchID: {"newstate": "dummy"}},
+                                   conflictingUpdate)
+        testJobDoc = change.jobsdatabase.document(couchID)
+        self.assertEqual(conflicts, [couchID])
+        self.assertEqual(testJobDoc["states"]["99"], {"newstate": "dummy"})
+        return
+
     def testUpdateFailedDoc(self):
         """
         _testUpdateFailedDoc_
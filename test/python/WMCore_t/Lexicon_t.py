@@ -7,8 +7,11 @@ General test of Lexicon
 """
 
 import logging
+import time
 import unittest
 
+from nose.plugins.attrib import attr
+
 from WMCore.Lexicon import *
 
 class LexiconTest(unittest.TestCase):
@@ -779,5 +782,46 @@ class LexiconTest(unittest.TestCase):
         self.assertTrue(primaryDatasetType("cosmic"), "data should be allowed")
         self.assertTrue(primaryDatasetType("test"), "test should be allowed")
 
+    def testValidateMany(self):
+        """
+        _testValidateMany_
+
+        Validate a list of candidates at once and get all the failures back.
+        """
+        good = ['/store/mc/JobRobot/RelValProdTTbar/GEN-SIM-DIGI-RECO/MC_3XY_V24_JobRobot-v1/0000/0C7B5E2F-F75C-DF11-9E92-0030487C6A66.root',
+                '/store/data/Run2010A/Cosmics/RECO/v4/000/143/316/0000/F65F4AFE-14AC-DF11-B3BE-00215E21F32E.root',
+                '/store/user/ewv/Wjets/ewv_Wjets/9b9a4e94e2bdc8dd56f0d4f34e5ad2bb/Wjets_1_1_Dd1.root']
+        bad = ['/store/mc/JobRobot/RelValProdTTbar/GEN-SIM-DIGI-RECO/MC_3XY_V24_JobRobot-v1/0000/some.file',
+               'store/data/Run2010A/Cosmics/RECO/v4/000/143/316/0000/F65F4AFE-14AC-DF11-B3BE-00215E21F32E.root']
+
+        self.assertEqual(validateMany("lfn", good), {})
+        failures = validateMany("lfn", good + bad)
+        self.assertEqual(sorted(failures.keys()), sorted(bad))
+        for candidate in bad:
+            self.assertRaises(AssertionError, lfn, candidate)
+            try:
+                lfn(candidate)
+            except AssertionError as ex:
+                self.assertEqual(failures[candidate], str(ex))
+
+        failures = validateMany("dataset", ['/a/b/RECO', '/a/b/c', 'a'])
+        self.assertEqual(sorted(failures.keys()), ['/a/b/c', 'a'])
+        self.assertRaises(KeyError, validateMany, "parseLFN", good)
+        return
+
+    @attr('integration')
+    def testValidateManyPerformance(self):
+        """
+        _testValidateManyPerformance_
+
+        Time the validation of 100k LFNs.
+        """
+        lfns = ['/store/data/Run2012A/MinimumBias/RECO/PromptReco-v1/000/190/%03i/0000/%08i.root' % (x % 1000, x)
+                for x in range(100000)]
+        start = time.time()
+        self.assertEqual(validateMany("lfn", lfns), {})
+        print "Validated %i LFNs in %.2f seconds" % (len(lfns), time.time() - start)
+        return
+
 if __name__ == "__main__":
     unittest.main()
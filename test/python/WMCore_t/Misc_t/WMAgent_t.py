@@ -8,7 +8,6 @@ import random
 import os.path
 import logging
 import getpass
-import cPickle
 import unittest
 import threading
 
@@ -48,6 +47,7 @@ from WMCore.Agent.Configuration             import Configuration
 # WMCore library imports
 from WMCore.ResourceControl.ResourceControl  import ResourceControl
 from WMCore.FwkJobReport.Report              import Report
+from WMCore.DataStructs.JobPackageStore      import JobPackageStore
 
 # WMSpec stuff
 from WMCore.WMSpec.Makers.TaskMaker import TaskMaker
@@ -436,17 +436,16 @@ class WMAgentTest(unittest.TestCase):
         # Find the test directory
         testDirectory = os.path.join(self.testDir, 'TestWorkload', 'ReReco')
         self.assertTrue('JobCollection_1_0' in os.listdir(testDirectory))
-        self.assertTrue(len(os.listdir(testDirectory)) <= 20)
+        self.assertTrue(len([x for x in os.listdir(testDirectory) if x.startswith('JobCollection_')]) <= 20)
 
         groupDirectory = os.path.join(testDirectory, 'JobCollection_1_0')
 
         # First job should be in here
         self.assertTrue('job_1' in os.listdir(groupDirectory))
-        jobFile = os.path.join(groupDirectory, 'job_1', 'job.pkl')
-        self.assertTrue(os.path.isfile(jobFile))
-        f = open(jobFile, 'r')
-        job = cPickle.load(f)
-        f.close()
+        jobStore = JobPackageStore(os.path.join(testDirectory, 'JobGroup_1.jobs'))
+        self.assertTrue(1 in jobStore)
+        job = jobStore[1]
+        jobStore.close()
 
 
         self.assertEqual(job['workflow'], name)
@@ -3,6 +3,8 @@ _ProcessPoolTestWorker_
 
 """
 
+import time
+
 from WMCore.ProcessPool.ProcessPool import ProcessPoolWorker
 
 class ProcessPoolTestWorker(ProcessPoolWorker):
@@ -11,6 +13,9 @@ class ProcessPoolTestWorker(ProcessPoolWorker):
         """
         __call__
 
+        Work of the form SLEEP<seconds> sleeps before it's returned.
         """
+        if isinstance(input, basestring) and input.startswith("SLEEP"):
+            time.sleep(float(input[5:]))
 
         return input
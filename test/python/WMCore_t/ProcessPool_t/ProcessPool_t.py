@@ -4,10 +4,17 @@ _ProcessPool_t
 Unit tests for the ProcessPool class.
 """
 
+import os
+import shutil
+import tempfile
+import time
 import unittest
 import nose
+import zmq
 
-from WMCore.ProcessPool.ProcessPool import ProcessPool
+from WMCore.ProcessPool.ProcessPool import ProcessPool, ProcessPoolException
+from WMCore.ProcessPool.ProcessPool import getSerializer, packMessage, unpackMessage
+from WMCore.Configuration import Configuration
 from WMQuality.TestInit import TestInit
 
 class ProcessPoolTest(unittest.TestCase):
@@ -123,8 +130,311 @@ class ProcessPoolTest(unittest.TestCase):
                              "Error: Wrong number of results returned.")
 
 
+    def testD_MessageFraming(self):
+        """
+        _testMessageFraming_
 
+        Verify that batches of items survive encoding with both serializers
+        and that large items are passed through files.
+        """
+        config = self.testInit.getConfiguration()
+        self.testInit.generateWorkDir(config)
+        workDir = config.General.workDir
+
+        items = ["One", {"two": [2, 2]}, "X" * 5000]
+        for name in ["json", "pickle"]:
+            serializer = getSerializer(name)
+            frames = packMessage(serializer, items)
+            self.assertEqual(len(frames), 4)
+            (result, sentTime, size) = unpackMessage(serializer, frames)
+            self.assertEqual(result, items)
+            self.assertTrue(size > 5000)
+
+            frames = packMessage(serializer, items, workDir, fileThreshold = 1000)
+            self.assertEqual(len(os.listdir(workDir)), 1)
+            self.assertTrue(sum([len(x) for x in frames]) < 1000)
+            (result, sentTime, size) = unpackMessage(serializer, frames)
+            self.assertEqual(result, items)
+            self.assertEqual(os.listdir(workDir), [])
+
+        self.assertRaises(ProcessPoolException, getSerializer, "xml")
+        self.assertRaises(ProcessPoolException, unpackMessage,
+                          getSerializer("json"), frames[:-1])
+        return
 
+    def testE_BatchedPool(self):
+        """
+        _testBatchedPool_
+
+        Run the pool with the pickle serializer and batched messages.
+        """
+        raise nose.SkipTest
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
+
+        processPool = ProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                  totalSlaves = 2,
+                                  componentDir = config.General.workDir,
+                                  namespace = "WMCore_t",
+                                  config = config,
+                                  serializer = "pickle",
+                                  batchSize = 10,
+                                  fileThreshold = 100)
+
+        input = ["COMMAND%s" % i for i in range(95)]
+        processPool.enqueue(input)
+        result = processPool.dequeue(len(input))
+        self.assertEqual(sorted(result), sorted(input))
+
+        metrics = processPool.getMetrics()
+        self.assertEqual(metrics["messagesSent"], 10)
+        self.assertTrue(metrics["messagesReceived"] >= 10)
+        return
+    def testF_SlowSlave(self):
+        """
+        _testSlowSlave_
+
+        Verify that a slow slave doesn't hold up the work queued behind it
+        and that slaves over the wall time budget are replaced.
+        """
+        raise nose.SkipTest
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
+
+        processPool = ProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                  totalSlaves = 2,
+                                  componentDir = config.General.workDir,
+                                  namespace = "WMCore_t",
+                                  config = config,
+                                  maxWallTime = 4)
+
+        input = ["COMMAND%s" % i for i in range(20)]
+        processPool.enqueue(["SLEEP3"] + input)
+        result = processPool.dequeue(len(input))
+        self.assertEqual(sorted(result), sorted(input))
+        self.assertEqual(processPool.dequeue(1), ["SLEEP3"])
+
+        # The batch is retried once and then given up on
+        processPool.enqueue(["SLEEP10"])
+        self.assertRaises(ProcessPoolException, processPool.dequeue, 1)
+        self.assertEqual(processPool.runningWork, 0)
+        self.assertEqual(processPool.getMetrics()["slaveRestarts"], 2)
+        self.assertEqual(len(processPool.slaves), 2)
+        processPool.close()
+        return
+
+    def testG_Autoscaling(self):
+        """
+        _testAutoscaling_
+
+        Verify that slaves are started while work is waiting and stopped once
+        they are idle.
+        """
+        raise nose.SkipTest
+        config = self.testInit.getConfiguration()
+        config.Agent.useHeartbeat = False
+        self.testInit.generateWorkDir(config)
+
+        processPool = ProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                  totalSlaves = 1,
+                                  componentDir = config.General.workDir,
+                                  namespace = "WMCore_t",
+                                  config = config,
+                                  maxSlaves = 3,
+                                  idleTime = 0)
+
+        processPool.enqueue(["SLEEP1", "SLEEP1", "SLEEP1"])
+        self.assertEqual(len(processPool.slaves), 3)
+        self.assertEqual(processPool.dequeue(3), ["SLEEP1", "SLEEP1", "SLEEP1"])
+
+        time.sleep(1)
+        processPool.enqueue(["COMMAND1"])
+        self.assertEqual(processPool.dequeue(1), ["COMMAND1"])
+        self.assertEqual(len(processPool.slaves), 1)
+        processPool.close()
+        return
+
+
+class FakeSlaveProcess:
+    """
+    _FakeSlaveProcess_
+
+    Stands in for the process of a slave that never asks for work.
+    """
+    lastPid = 1000000
+
+    def __init__(self, returncode = None):
+        FakeSlaveProcess.lastPid += 1
+        self.pid = FakeSlaveProcess.lastPid
+        self.returncode = returncode
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        return self.returncode
+
+    def kill(self):
+        if self.returncode == None:
+            self.returncode = -9
+
+    terminate = kill
+
+class FakeSlaveProcessPool(ProcessPool):
+    """
+    _FakeSlaveProcessPool_
+
+    ProcessPool with fake slaves that exit with slaveExitCode right away,
+    or keep running if it's None.
+    """
+    slaveExitCode = None
+
+    def startSlaveProcess(self):
+        return FakeSlaveProcess(self.slaveExitCode)
+
+class ProcessPoolSlaveTest(unittest.TestCase):
+    """
+    _ProcessPoolSlaveTest_
+
+    Test the replacement of slaves without a database or real slaves.
+    """
+    def setUp(self):
+        self.componentDir = tempfile.mkdtemp()
+        self.config = Configuration()
+        self.config.section_("Agent")
+        self.config.Agent.useHeartbeat = False
+        self.processPool = None
+        return
+
+    def tearDown(self):
+        if self.processPool != None:
+            self.processPool.close()
+        shutil.rmtree(self.componentDir)
+        return
+
+    def makePool(self, **args):
+        self.processPool = FakeSlaveProcessPool("ProcessPool_t.ProcessPoolTestWorker",
+                                                totalSlaves = 1,
+                                                componentDir = self.componentDir,
+                                                config = self.config,
+                                                namespace = "WMCore_t",
+                                                inPort = "5655", outPort = "5658",
+                                                **args)
+        return self.processPool
+
+    def killSlaves(self, processPool):
+        for slave in processPool.slaves.values():
+            slave["process"].returncode = 1
+        return
+
+    def testRetryAndGiveUp(self):
+        """
+        _testRetryAndGiveUp_
+
+        The batch of a slave that died is retried maxRetries times, then it
+        is dropped and the failure raised by dequeue.
+        """
+        processPool = self.makePool()
+        processPool.enqueue(["One", "Two"])
+        self.assertEqual(processPool.runningWork, 2)
+        self.assertEqual(len(processPool.backlog), 2)
+
+        # hand the first batch to the slave and kill it
+        batch = processPool.backlog.popleft()
+        slave = processPool.slaves.values()[0]
+        slave["work"] = batch
+        slave["dispatchTime"] = time.time()
+        self.killSlaves(processPool)
+        processPool.checkSlaves()
+        self.assertEqual(len(processPool.slaves), 1)
+        self.assertEqual(processPool.backlog[0], batch)
+        self.assertEqual(batch["retries"], 1)
+        self.assertEqual(processPool.runningWork, 2)
+
+        batch = processPool.backlog.popleft()
+        slave = processPool.slaves.values()[0]
+        slave["work"] = batch
+        slave["dispatchTime"] = time.time()
+        self.killSlaves(processPool)
+        processPool.lastCheck = 0
+        self.assertRaises(ProcessPoolException, processPool.dequeue, 1)
+        self.assertEqual(processPool.runningWork, 1)
+        self.assertEqual(processPool.getMetrics()["slaveRestarts"], 2)
+        self.assertEqual(len(processPool.slaves), 1)
+        return
+
+    def testDiesAfterReply(self):
+        """
+        _testDiesAfterReply_
+
+        A slave that dies after sending the results of its batch doesn't get
+        the batch retried, and results for a batch that is done are dropped.
+        """
+        processPool = self.makePool()
+        processPool.enqueue(["One"])
+        batch = processPool.backlog.popleft()
+        (identity, slave) = processPool.slaves.items()[0]
+        slave["work"] = batch
+        slave["dispatchTime"] = time.time()
+
+        context = zmq.Context()
+        sender = context.socket(zmq.PUSH)
+        sender.connect("tcp://localhost:5658")
+        results = [identity, str(batch["id"])] + packMessage(processPool.serializer, ["One"])
+        sender.send_multipart(results)
+        sender.send_multipart(results)
+        # wait for the results to come in before the slave dies
+        processPool.poller.poll(5000)
+        self.killSlaves(processPool)
+
+        self.assertEqual(processPool.dequeue(1), ["One"])
+        self.assertEqual(processPool.getMetrics()["slaveRestarts"], 1)
+        self.assertEqual(len(processPool.backlog), 0)
+        self.assertEqual(processPool.outstanding, {})
+        self.assertEqual(processPool.runningWork, 0)
+
+        # the duplicate is dropped
+        processPool.lastCheck = 0
+        processPool.checkSlaves()
+        self.assertEqual(processPool.completed, [])
+        self.assertEqual(processPool.runningWork, 0)
+        sender.close()
+        context.term()
+        return
+
+    def testRestartLimit(self):
+        """
+        _testRestartLimit_
+
+        Slaves that die on startup are only replaced maxRestarts times, then
+        the pool is shut down.
+        """
+        processPool = self.makePool(maxRestarts = 3)
+        processPool.slaveExitCode = 1
+        self.killSlaves(processPool)
+        for i in range(3):
+            processPool.lastCheck = 0
+            processPool.checkSlaves()
+            self.assertEqual(len(processPool.slaves), 1)
+        self.assertEqual(processPool.getMetrics()["slaveRestarts"], 3)
+
+        processPool.lastCheck = 0
+        self.assertRaises(ProcessPoolException, processPool.checkSlaves)
+        self.assertEqual(processPool.slaves, {})
+        self.assertRaises(ProcessPoolException, processPool.enqueue, ["One"])
+
+        # restarts outside of the window don't count
+        processPool = self.makePool(maxRestarts = 1, restartWindow = 0)
+        processPool.slaveExitCode = 1
+        self.killSlaves(processPool)
+        for i in range(3):
+            processPool.lastCheck = 0
+            processPool.checkSlaves()
+            time.sleep(0.01)
+        self.assertEqual(processPool.getMetrics()["slaveRestarts"], 3)
+        return
 
 if __name__ == "__main__":
     unittest.main()
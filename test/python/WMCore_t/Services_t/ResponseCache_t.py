@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+_ResponseCache_t_
+
+Unittests for the in-memory cache of service responses
+"""
+
+import threading
+import unittest
+
+from WMCore.Services.ResponseCache import ResponseCache, HIT, STALE, MISS
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def age(self, cache, key, seconds):
+        """
+        Move the time an entry was stored back by some seconds.
+        """
+        (value, storedTime) = cache.entries[key]
+        cache.entries[key] = (value, storedTime - seconds)
+
+    def testExpiry(self):
+        """
+        _testExpiry_
+
+        Verify entries are fresh, stale and then missing as they get older.
+        """
+        cache = ResponseCache()
+        self.assertEqual(cache.get("a", 10), (None, MISS))
+        cache.put("a", [1, 2])
+        self.assertEqual(cache.get("a", 10, 10), ([1, 2], HIT))
+        self.age(cache, "a", 15)
+        self.assertEqual(cache.get("a", 10, 10), ([1, 2], STALE))
+        self.assertEqual(cache.get("a", 10), (None, MISS))
+        self.age(cache, "a", 10)
+        self.assertEqual(cache.get("a", 10, 10), (None, MISS))
+
+        cache.put("a", [3])
+        self.assertEqual(cache.get("a", 10), ([3], HIT))
+        cache.invalidate("a")
+        self.assertEqual(cache.get("a", 10), (None, MISS))
+
+        stats = cache.getStats()
+        self.assertEqual((stats["hits"], stats["staleHits"], stats["misses"]), (2, 1, 4))
+        self.assertEqual(stats["size"], 0)
+        cache.resetStats()
+        self.assertEqual(cache.getStats()["misses"], 0)
+        return
+
+    def testEviction(self):
+        """
+        _testEviction_
+
+        Verify the least recently used entries are evicted.
+        """
+        cache = ResponseCache(maxSize = 3)
+        for key in ["a", "b", "c"]:
+            cache.put(key, key)
+        cache.get("a", 10)
+        cache.put("d", "d")
+        self.assertEqual(cache.get("b", 10), (None, MISS))
+        for key in ["a", "c", "d"]:
+            self.assertEqual(cache.get(key, 10), (key, HIT))
+        self.assertEqual(cache.getStats()["evictions"], 1)
+
+        cache.clear()
+        self.assertEqual(cache.getStats()["size"], 0)
+        return
+
+    def testRefresh(self):
+        """
+        _testRefresh_
+
+        Verify only one thread at a time can claim the refresh of an entry.
+        """
+        cache = ResponseCache()
+        claims = []
+        def claim():
+            claims.append(cache.startRefresh("a"))
+
+        threads = [threading.Thread(target = claim) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(claims.count(True), 1)
+
+        self.assertFalse(cache.startRefresh("a"))
+        self.assertTrue(cache.startRefresh("b"))
+        cache.finishRefresh("a")
+        self.assertTrue(cache.startRefresh("a"))
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ import stat
 from httplib import HTTPException
 from httplib import BadStatusLine, IncompleteRead
 from WMCore.Services.Service import Service
+from WMCore.Services.ResponseCache import responseCache
 from WMCore.Services.Requests import Requests
 from WMCore.Algorithms import Permissions
 
@@ -38,6 +39,22 @@ class CrappyRequest(Requests):
         # METAL \m/
         raise BadStatusLine(666)
 
+class CountingRequest(Requests):
+    """
+    Return the number of requests made so far as a json document.
+    """
+    def __init__(self, url = 'http://localhost', idict = None):
+        Requests.__init__(self, url, idict)
+        self.count = 0
+
+    def makeRequest(self, uri=None, data={}, verb='GET', incoming_headers={},
+                     encoder=True, decoder=True, contentType=None):
+        self.count += 1
+        return ('{"count": %i}' % self.count, 200, 'OK', False)
+
+    def makeRequests(self, requests, maxInFlight = 5, timeout = None):
+        return [self.makeRequest(**x) for x in requests]
+
 class RegularServer(object):
     def regular(self):
         return "This is silly."
@@ -48,6 +65,15 @@ class BackupServer(object):
         return "This is nuts."
     regular.exposed = True
 
+class CountingServer(object):
+    def __init__(self):
+        self.hits = 0
+    def echo(self, value, delay = 0):
+        self.hits += 1
+        time.sleep(float(delay))
+        return "Value %s" % value
+    echo.exposed = True
+
 class ServiceTest(unittest.TestCase):
     def setUp(self):
         """
@@ -60,7 +86,7 @@ class ServiceTest(unittest.TestCase):
         logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
                     datefmt='%m-%d %H:%M',
-                    filename='service_unittests.log',
+                    filename=os.path.join(self.testDir, 'service_unittests.log'),
                     filemode='w')
 
         logger_name = 'Service%s' % testname.replace('test', '', 1)
@@ -345,6 +371,41 @@ class ServiceTest(unittest.TestCase):
         myService['requests'] = CrappyRequest('http://bad.com', {})
         self.assertRaises(BadStatusLine, myService.getData, 'foo', '')
 
+    def testCachedData(self):
+        """
+        _testCachedData_
+
+        Decoded responses are kept in memory until they expire, stale ones are
+        returned while they are refreshed in the background.
+        """
+        test_dict = {'logger': self.logger, 'endpoint': 'http://127.0.0.1:%i/' % self.port,
+                     'memorycachettl': 60, 'memorycachestale': 60,
+                     'requests': CountingRequest}
+        myService = Service(test_dict)
+        responseCache.clear()
+
+        self.assertEqual(myService.getCachedData('count', 'count'), {'count': 1})
+        self.assertEqual(myService.getCachedData('count', 'count'), {'count': 1})
+        self.assertEqual(myService.getCachedData('count', 'count', {'other': 1}), {'count': 2})
+        self.assertEqual(myService.getCachedData('count', 'count', clearCache = True), {'count': 3})
+        self.assertEqual(myService['requests'].count, 3)
+
+        # Make the entries stale, the refresh goes through the file cache
+        # which treats files from a previous second as expired
+        time.sleep(1.1)
+        for key in responseCache.entries.keys():
+            (value, storedTime) = responseCache.entries[key]
+            responseCache.entries[key] = (value, storedTime - 90)
+        self.assertEqual(myService.getCachedData('count', 'count'), {'count': 3})
+        for i in range(50):
+            if myService['requests'].count == 4 and not responseCache.refreshing:
+                break
+            time.sleep(0.1)
+        self.assertEqual(myService.getCachedData('count', 'count'), {'count': 4})
+        self.assertEqual(myService['requests'].count, 4)
+        responseCache.clear()
+        return
+
     @attr("integration")
     def testZ_InterruptedConnection(self):
         """
@@ -409,6 +470,49 @@ class ServiceTest(unittest.TestCase):
 
         return
 
+    @attr("integration")
+    def testConcurrentRequests(self):
+        """
+        _ConcurrentRequests_
+
+        Refresh several caches at once and check that the cache files are
+        written like refreshCache() writes them.
+        """
+        server = CountingServer()
+        cherrypy.tree.mount(server, "/counting")
+        cherrypy.engine.start()
+        test_dict = {'logger': self.logger, 'endpoint': 'http://127.0.0.1:%i/counting' % self.port,
+                     'cacheduration': 1}
+        myService = Service(test_dict)
+
+        queries = []
+        for i in range(10):
+            queries.append({'cachefile': 'echo', 'url': 'echo',
+                            'inputdata': {'value': i, 'delay': 1}})
+        startTime = time.time()
+        results = myService.refreshCaches(queries, maxInFlight = 5)
+        self.assertTrue(time.time() - startTime < 5)
+        self.assertEqual([x.read() for x in results], ["Value %i" % i for i in range(10)])
+        self.assertEqual(server.hits, 10)
+
+        # Errors are raised after the other caches are written
+        for query in queries:
+            myService.clearCache('echo', inputdata = query['inputdata'])
+        queries.insert(0, {'cachefile': 'bad', 'url': 'THISISABADURL'})
+        self.assertRaises(HTTPException, myService.refreshCaches, queries)
+        for i in range(10):
+            cacheFile = open(myService.cacheFileName('echo', inputdata = queries[i + 1]['inputdata']))
+            self.assertEqual(cacheFile.read(), "Value %i" % i)
+            cacheFile.close()
+
+        results = myService['requests'].makeRequests([{'uri': 'echo', 'data': {'value': 1, 'delay': 3}}],
+                                                     timeout = 1)
+        self.assertTrue(isinstance(results[0], socket.timeout))
+
+        cherrypy.engine.exit()
+        cherrypy.engine.stop()
+        return
+
 
 if __name__ == '__main__':
     unittest.main()
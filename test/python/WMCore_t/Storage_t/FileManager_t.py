@@ -56,7 +56,39 @@ class FileManagerTest(unittest.TestCase):
 
 
     def testCleanSuccessfulStageOuts(self):
-        pass
+        self.testDir = tempfile.mkdtemp()
+        filesForTransfer = []
+        for i in range(3):
+            shutil.copy('/etc/hosts', os.path.join(self.testDir, 'INPUT%i' % i))
+            filesForTransfer.append({'LFN': '/OUTPUT%i' % i,
+                                     'PFN': os.path.join(self.testDir, 'INPUT%i' % i),
+                                     'SEName' : None,
+                                     'StageOutCommand': None})
+        wrapper = StageOutMgr(  **{
+                                'command'    : 'cp',
+                                'option'    : '',
+                                'se-name'  : 'test-win',
+                                'lfn-prefix': self.testDir})
+        wrapper(filesForTransfer[0])
+        self.assertTrue(os.path.exists(os.path.join(self.testDir, 'OUTPUT0')))
+
+        # a transfer still running during the clean up, like a hanging one,
+        # cleans up after itself
+        doTransfer = wrapper._doTransfer
+        def cleanDuringTransfer(*args):
+            wrapper.cleanSuccessfulStageOuts()
+            return doTransfer(*args)
+        wrapper._doTransfer = cleanDuringTransfer
+        wrapper(filesForTransfer[1])
+        self.assertFalse(os.path.exists(os.path.join(self.testDir, 'OUTPUT0')))
+        self.assertFalse(os.path.exists(os.path.join(self.testDir, 'OUTPUT1')))
+        self.assertEqual(wrapper.completedFiles, {})
+
+        # transfers started after the clean up are kept
+        wrapper._doTransfer = doTransfer
+        wrapper(filesForTransfer[2])
+        self.assertTrue(os.path.exists(os.path.join(self.testDir, 'OUTPUT2')))
+        self.assertEqual(wrapper.completedFiles.keys(), ['/OUTPUT2'])
     #def cleanSuccessfulStageOuts(self):
     def testSearchTFC(self):
         pass
@@ -116,6 +148,36 @@ class FileManagerTest(unittest.TestCase):
         wrapper(fileForTransfer)
         self.assertTrue( os.path.exists(os.path.join(self.testDir, '/etc/hosts')))
 
+    def testStageOutFiles(self):
+        self.testDir = tempfile.mkdtemp()
+        filesForTransfer = []
+        for i in range(4):
+            shutil.copy('/etc/hosts', os.path.join(self.testDir, 'INPUT%i' % i))
+            filesForTransfer.append({'LFN': '/OUTPUT%i' % i,
+                                     'PFN': os.path.join(self.testDir, 'INPUT%i' % i),
+                                     'SEName' : None,
+                                     'StageOutCommand': None})
+        wrapper = StageOutMgr(  **{
+                                'command'    : 'cp',
+                                'option'    : '',
+                                'se-name'  : 'test-win',
+                                'lfn-prefix': self.testDir})
+        results = wrapper.stageOutFiles(filesForTransfer, maxConcurrent = 2)
+        for i in range(4):
+            self.assertTrue(results[i]['staged'])
+            self.assertEqual(results[i]['file']['SEName'], 'test-win')
+            self.assertTrue(os.path.exists(os.path.join(self.testDir, 'OUTPUT%i' % i)))
+
+        wrapper = StageOutMgr( numberOfRetries= 1,
+                               retryPauseTime=0, **{
+                                'command'    : 'test-fail',
+                                'option'    : '',
+                                'se-name'  : 'test-win',
+                                'lfn-prefix':''})
+        results = wrapper.stageOutFiles(filesForTransfer[:1], maxConcurrent = 2)
+        self.assertFalse(results[0]['staged'])
+        self.assertTrue(isinstance(results[0]['error'], WMCore.Storage.StageOutError.StageOutError))
+
     def testStageInMgrWrapperWin(self):
         fileForTransfer = {'LFN': '/etc/hosts', \
                            'PFN': '/etc/hosts', \
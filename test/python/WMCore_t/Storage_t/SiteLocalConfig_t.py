@@ -13,6 +13,7 @@ from WMCore.WMBase import getTestBase
 
 from WMCore.Storage.SiteLocalConfig import SiteLocalConfig
 from WMCore.Storage.SiteLocalConfig import loadSiteLocalConfig
+from WMCore.Storage.StageOutPool import siteLimits
 
 class SiteLocalConfigTest(unittest.TestCase):
     def setUp(self):
@@ -127,6 +128,8 @@ class SiteLocalConfigTest(unittest.TestCase):
                "Error: Wrong stage out command."
         assert mySiteConfig.localStageOut["catalog"] == "trivialcatalog_file://gpfs1/grid/grid-app/cmssoft/cms/SITECONF/local/PhEDEx/storage.xml?protocol=srmv2", \
                "Error: TFC catalog is not correct."
+        self.assertEqual(siteLimits(mySiteConfig.localStageOut),
+                         {"maxConcurrent": 4, "maxBandwidth": 200.0})
 
         assert len(mySiteConfig.fallbackStageOut) == 1, \
                "Error: Incorrect number of fallback stageout methods"
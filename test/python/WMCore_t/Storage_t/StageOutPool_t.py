@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+_StageOutPool_t_
+
+Unittests for the concurrent stage out of a list of files
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from WMCore.Algorithms.Alarm import Alarm
+from WMCore.Storage.StageOutError import StageOutFailure
+from WMCore.Storage.StageOutPool import StageOutPool, siteLimits
+
+class FakeStageOut(object):
+    """
+    Stage out that sleeps instead of copying and keeps track of how many
+    transfers run at the same time.
+    """
+    def __init__(self, duration = 0.2, fail = None, hang = None):
+        self.duration = duration
+        self.fail = fail
+        self.hang = hang
+        self.lock = threading.Lock()
+        self.running = 0
+        self.maxRunning = 0
+        self.starts = []
+
+    def __call__(self, fileToStage):
+        with self.lock:
+            self.running += 1
+            self.maxRunning = max(self.maxRunning, self.running)
+            self.starts.append(time.time())
+        try:
+            if fileToStage['LFN'] == self.hang:
+                time.sleep(30)
+            time.sleep(self.duration)
+            if fileToStage['LFN'] == self.fail:
+                raise StageOutFailure("Failure for %s" % fileToStage['LFN'])
+            fileToStage['SEName'] = 'test-win'
+        finally:
+            with self.lock:
+                self.running -= 1
+        return fileToStage
+
+def makeFiles(count):
+    return [{'LFN': '/store/file%i.root' % i, 'PFN': 'file%i.root' % i,
+             'SEName': None, 'StageOutCommand': None} for i in range(count)]
+
+class StageOutPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.testDir = None
+
+    def tearDown(self):
+        if self.testDir != None:
+            shutil.rmtree(self.testDir)
+
+    def testSiteLimits(self):
+        """
+        _testSiteLimits_
+
+        Convert the local-stage-out settings into pool arguments.
+        """
+        self.assertEqual(siteLimits({'command': 'cp'}), {})
+        self.assertEqual(siteLimits({'max-concurrent': '4', 'max-bandwidth': '12.5'}),
+                         {'maxConcurrent': 4, 'maxBandwidth': 12.5})
+        return
+
+    def testConcurrency(self):
+        """
+        _testConcurrency_
+
+        Run at most maxConcurrent transfers at a time and return the results
+        in the order of the files.
+        """
+        stageOut = FakeStageOut()
+        files = makeFiles(9)
+        start = time.time()
+        results = StageOutPool(stageOut, maxConcurrent = 3)(files)
+        elapsed = time.time() - start
+
+        self.assertEqual(stageOut.maxRunning, 3)
+        self.assertTrue(elapsed < 9 * 0.2)
+        self.assertEqual([x['file'] for x in results], files)
+        for result in results:
+            self.assertTrue(result['staged'])
+            self.assertEqual(result['error'], None)
+            self.assertEqual(result['file']['SEName'], 'test-win')
+            self.assertTrue(result['time'] >= 0.2)
+
+        stageOut = FakeStageOut(duration = 0)
+        StageOutPool(stageOut)(makeFiles(5))
+        self.assertEqual(stageOut.maxRunning, 1)
+        self.assertEqual(StageOutPool(stageOut, maxConcurrent = 4)([]), [])
+        return
+
+    def testFailure(self):
+        """
+        _testFailure_
+
+        Stop starting transfers after the first failure.
+        """
+        stageOut = FakeStageOut(duration = 0.1, fail = '/store/file1.root')
+        results = StageOutPool(stageOut, maxConcurrent = 2)(makeFiles(10))
+
+        self.assertTrue(results[0]['staged'])
+        self.assertFalse(results[1]['staged'])
+        self.assertTrue(isinstance(results[1]['error'], StageOutFailure))
+        self.assertTrue(len(stageOut.starts) < 10)
+        for result in results[len(stageOut.starts):]:
+            self.assertFalse(result['staged'])
+            self.assertEqual(result['error'], None)
+            self.assertEqual(result['time'], None)
+        return
+
+    def testTimeout(self):
+        """
+        _testTimeout_
+
+        Give up on a transfer that hangs and stage out the other files.
+        """
+        for maxConcurrent in [1, 2]:
+            stageOut = FakeStageOut(duration = 0, hang = '/store/file0.root')
+            start = time.time()
+            results = StageOutPool(stageOut, maxConcurrent = maxConcurrent, timeout = 1)(makeFiles(3))
+
+            self.assertTrue(time.time() - start < 5)
+            self.assertFalse(results[0]['staged'])
+            self.assertTrue(isinstance(results[0]['error'], Alarm))
+            self.assertTrue(results[0]['time'] > 1)
+            for result in results[1:]:
+                self.assertTrue(result['staged'])
+                self.assertEqual(result['error'], None)
+        return
+
+    def testBandwidth(self):
+        """
+        _testBandwidth_
+
+        Space the start of the transfers according to the size of the files.
+        """
+        self.testDir = tempfile.mkdtemp()
+        files = makeFiles(3)
+        for fileToStage in files:
+            fileToStage['PFN'] = os.path.join(self.testDir, fileToStage['PFN'])
+            with open(fileToStage['PFN'], 'w') as handle:
+                handle.write('x' * 500000)
+
+        stageOut = FakeStageOut(duration = 0)
+        StageOutPool(stageOut, maxConcurrent = 3, maxBandwidth = 1)(files)
+        starts = sorted(stageOut.starts)
+        # 0.5 MB at 1 MB/s
+        self.assertTrue(starts[1] - starts[0] > 0.4)
+        self.assertTrue(starts[2] - starts[0] > 0.9)
+        return
+
+if __name__ == '__main__':
+    unittest.main()
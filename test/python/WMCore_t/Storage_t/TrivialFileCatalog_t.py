@@ -6,20 +6,65 @@ Test the parsing of the TFC.
 """
 
 import os
+import pickle
+import random
+import time
 import unittest
 import nose
 import tempfile
 
+from nose.plugins.attrib import attr
+
 from xml.dom.minidom import parseString
 from WMCore.WMBase import getTestBase
 
 from WMQuality.TestInit import TestInit
 
-from WMCore.Storage.TrivialFileCatalog import tfcFilename, tfcProtocol, readTFC, TrivialFileCatalog
+from WMCore.Storage.TrivialFileCatalog import tfcFilename, tfcProtocol, readTFC, TrivialFileCatalog, \
+                                             literalPrefix
 
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 
 
+def linearMatch(tfc, protocol, path, style):
+    """
+    Match a path trying every rule in turn like the catalog used to.
+    """
+    for mapping in tfc[style]:
+        if mapping['protocol'] != protocol:
+            continue
+        if mapping['chain'] != None:
+            chainedPath = linearMatch(tfc, mapping['chain'], path, style)
+            if not chainedPath:
+                continue
+        elif mapping['path-match-expr'].match(path):
+            chainedPath = path
+        else:
+            continue
+        try:
+            splitPath = mapping['path-match-expr'].split(chainedPath, 1)[1]
+        except IndexError:
+            continue
+        return mapping['result'].replace("$1", splitPath)
+    return None
+
+def makeLFNs(count):
+    """
+    Make LFNs and PFNs hitting the different rules of the FNAL catalog.
+    """
+    paths = []
+    for i in range(count):
+        name = "%x.root" % random.getrandbits(64)
+        paths.extend(["/store/data/Run%i/RAW/%s" % (i % 10, name),
+                      "//store/mc/Summer12/%s" % name,
+                      "/store/PhEDEx_LoadTest_SingleSource/%s.LTgenerated.T1_US_FNAL_%i" % (name, i),
+                      "/store/PhEDEx_LoadTest07/LoadTest07_FNAL_%i_%i_%i" % (i, i, i),
+                      "/MTCC/data/%s" % name,
+                      "/pnfs/fs/usr/cms/WAX/11/store/data/%s" % name,
+                      "srm://cmssrm.fnal.gov:8443/srm/managerv2?SFN=/11/store/data/%s" % name,
+                      "/other/%s" % name])
+    return paths
+
 class TrivialFileCatalogTest(unittest.TestCase):
     def setUp(self):
         pass
@@ -170,6 +215,134 @@ class TrivialFileCatalogTest(unittest.TestCase):
         self.assertEqual(pfn, out_pfn, "Error: incorrect matching")
         f.close()
 
+    def testLiteralPrefix(self):
+        """
+        Check the prefixes the rules are indexed with
+
+        """
+        self.assertEqual(literalPrefix("^/+store/(.*1.root)"), (True, "/store/"))
+        self.assertEqual(literalPrefix("/+/store/(.*)"), (True, "/store/"))
+        self.assertEqual(literalPrefix("/+/+/*store/(.*)"), (True, "/store/"))
+        self.assertEqual(literalPrefix("/+/{2}store/(.*)"), (True, "/"))
+        self.assertEqual(literalPrefix("/+\\/store/(.*)"), (True, "/store/"))
+        self.assertEqual(literalPrefix("^/+\\/+/\\/*store/(.*)"), (True, "/store/"))
+        self.assertEqual(literalPrefix("/store/a\\.b/(.*)"), (False, "/store/a.b/"))
+        self.assertEqual(literalPrefix(".*/LoadTest07_FNAL_(.*)_.*_.*"), (False, ""))
+        self.assertEqual(literalPrefix("abc*d"), (False, "ab"))
+        self.assertEqual(literalPrefix("ab+c"), (False, "ab"))
+        self.assertEqual(literalPrefix("/store|/user"), (False, ""))
+        self.assertEqual(literalPrefix("\\d+"), (False, ""))
+
+
+    def testCompiledMatching(self):
+        """
+        Compiled matching must give the results of trying every rule in turn
+
+        """
+        tfc_file = os.path.join(getTestBase(),
+                                "WMCore_t/Storage_t",
+                                "T1_US_FNAL_TrivialFileCatalog.xml")
+        tfc = readTFC(tfc_file)
+        tfc.addMapping("stageout", "(.*)", "$1", chain = "direct",
+                       mapping_type = "lfn-to-pfn")
+        tfc.addMapping("stageout", "/+store/(.*)", "/fallback/$1",
+                       mapping_type = "lfn-to-pfn")
+        tfc.addMapping("slash", "/+/store/(.*)", "/doubleslash/$1",
+                       mapping_type = "lfn-to-pfn")
+
+        paths = makeLFNs(10)
+        paths.extend(["//store/x", "///store/data/y", "/+/store/z"])
+        for style in ['lfn-to-pfn', 'pfn-to-lfn']:
+            for protocol in ['direct', 'dcap', 'srm', 'srmv2', 'stageout', 'slash', 'bogus']:
+                expected = dict([(x, linearMatch(tfc, protocol, x, style)) for x in paths])
+                if style == 'lfn-to-pfn':
+                    results = tfc.matchLFNs(protocol, paths)
+                    cachedResults = tfc.matchLFNs(protocol, paths)
+                else:
+                    results = tfc.matchPFNs(protocol, paths)
+                    cachedResults = tfc.matchPFNs(protocol, paths)
+                self.assertEqual(results, expected)
+                self.assertEqual(cachedResults, expected)
+
+        self.assertEqual(tfc.matchLFN("stageout", "/store/data/file1.root"),
+                         "/pnfs/fs/usr/cms/WAX/11/store/data/file1.root")
+        self.assertEqual(tfc.matchLFN("stageout", "/other/file"), None)
+        self.assertEqual(tfc.matchLFN("slash", "//store/x"), "/doubleslash/x")
+        self.assertEqual(tfc.matchLFN("slash", "/store/x"), None)
+
+        # new rules invalidate the cached results
+        tfc.addMapping("stageout", "/other/(.*)", "/elsewhere/$1",
+                       mapping_type = "lfn-to-pfn")
+        self.assertEqual(tfc.matchLFN("stageout", "/other/file"), "/elsewhere/file")
+
+        # the cache isn't pickled
+        tfc.cacheSize = 5
+        copy = pickle.loads(pickle.dumps(tfc))
+        self.assertEqual(copy.matchLFN("stageout", "/other/file"), "/elsewhere/file")
+        tfc.matchLFNs("direct", paths)
+        self.assertTrue(len(tfc.matchCache) <= 5)
+        self.assertEqual(len(tfc.oldMatchCache), 5)
+
+
+    def testCollapsedSlashRules(self):
+        """
+        Rules starting with /+ and more slashes, escaped or not, must give
+        the results of trying every rule in turn
+
+        """
+        tfc = TrivialFileCatalog()
+        for (protocol, match) in [("plain", "/+/store/(.*)"),
+                                  ("escaped", "/+\\/store/(.*)"),
+                                  ("repeated", "^/+\\/+\\/*store/data/(.*)"),
+                                  ("mixed", "/+\\//store/(.*)")]:
+            tfc.addMapping(protocol, match, "/%s/$1" % protocol,
+                           mapping_type = "lfn-to-pfn")
+            tfc.addMapping(protocol, "/+store/(.*)", "/single/$1",
+                           mapping_type = "lfn-to-pfn")
+
+        paths = []
+        for slashes in range(1, 5):
+            for rest in ["store/data/f.root", "store/mc/f.root", "stor/f.root", "other/f.root"]:
+                paths.append("/" * slashes + rest)
+
+        for protocol in ["plain", "escaped", "repeated", "mixed"]:
+            expected = dict([(x, linearMatch(tfc, protocol, x, 'lfn-to-pfn')) for x in paths])
+            self.assertEqual(tfc.matchLFNs(protocol, paths), expected)
+
+        self.assertEqual(tfc.matchLFN("escaped", "//store/data/f.root"), "/escaped/data/f.root")
+        self.assertEqual(tfc.matchLFN("escaped", "/store/data/f.root"), "/single/data/f.root")
+        return
+
+
+    @attr('integration')
+    def testMatchingBenchmark(self):
+        """
+        Compare matching LFNs against every rule with the compiled rules of
+        the FNAL catalog
+
+        """
+        tfc_file = os.path.join(getTestBase(),
+                                "WMCore_t/Storage_t",
+                                "T1_US_FNAL_TrivialFileCatalog.xml")
+        tfc = readTFC(tfc_file)
+        lfns = makeLFNs(2500)
+
+        startTime = time.time()
+        expected = dict([(x, linearMatch(tfc, "srmv2", x, "lfn-to-pfn")) for x in lfns])
+        linearTime = time.time() - startTime
+
+        startTime = time.time()
+        results = tfc.matchLFNs("srmv2", lfns)
+        compiledTime = time.time() - startTime
+
+        startTime = time.time()
+        tfc.matchLFNs("srmv2", lfns)
+        cachedTime = time.time() - startTime
+
+        self.assertEqual(results, expected)
+        print "%i LFNs: every rule %.3fs, compiled %.3fs, cached %.3fs" % (len(lfns), linearTime,
+                                                                          compiledTime, cachedTime)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+_ProcessTreeSampler_t_
+
+Unittests for the /proc sampler of the PerformanceMonitor
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMRuntime.Monitors.ProcessTreeSampler import ProcessTreeSampler, listProcessTree
+
+class ProcessTreeSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.procDir = tempfile.mkdtemp()
+        return
+
+    def tearDown(self):
+        shutil.rmtree(self.procDir)
+        return
+
+    def makeProcess(self, pid, ppid, rss, vsize, ticks, readBytes = 0):
+        """
+        Write the stat, status and io files of a process in the fake /proc.
+        """
+        os.mkdir(os.path.join(self.procDir, str(pid)))
+        stat = "%i (cms Run) S %i 1 1 0 -1 0 0 0 0 0 %i %i 0 0 20 0 1 0 100 %i 0\n"
+        with open(os.path.join(self.procDir, str(pid), "stat"), "w") as handle:
+            handle.write(stat % (pid, ppid, ticks, ticks, vsize * 1024))
+        with open(os.path.join(self.procDir, str(pid), "status"), "w") as handle:
+            handle.write("Name:\tcmsRun\nVmSize:\t%i kB\nVmRSS:\t%i kB\n" % (vsize, rss))
+        with open(os.path.join(self.procDir, str(pid), "io"), "w") as handle:
+            handle.write("rchar: 10\nread_bytes: %i\nwrite_bytes: 0\n" % readBytes)
+        return
+
+    def testFakeProcessTree(self):
+        """
+        _testFakeProcessTree_
+
+        Sum a process tree found from the parent of every process.
+        """
+        with open(os.path.join(self.procDir, "uptime"), "w") as handle:
+            handle.write("11.00 5.00\n")
+        self.makeProcess(10, 1, 1000, 2000, 100, readBytes = 4096)
+        self.makeProcess(11, 10, 500, 1000, 50)
+        self.makeProcess(12, 11, 250, 500, 50)
+        self.makeProcess(20, 1, 7000, 7000, 100)
+
+        self.assertEqual(sorted(listProcessTree(10, self.procDir)), [10, 11, 12])
+        self.assertEqual(listProcessTree(12, self.procDir), [12])
+
+        sampler = ProcessTreeSampler(10, maxSamples = 2, procDir = self.procDir)
+        sample = sampler.sample()
+        self.assertEqual(sample["processes"], 3)
+        self.assertEqual(sample["rss"], 1750)
+        self.assertEqual(sample["vsize"], 3500)
+        self.assertEqual(sample["pss"], None)
+        self.assertEqual(sample["readBytes"], 4096)
+        # 4 seconds of CPU during the 10 seconds since the process started
+        self.assertAlmostEqual(sample["pcpu"], 40.0)
+
+        shutil.rmtree(os.path.join(self.procDir, "12"))
+        for i in range(3):
+            sample = sampler.sample()
+        self.assertEqual(sample["rss"], 1500)
+        self.assertEqual(len(sampler.samples), 2)
+
+        summary = sampler.summary()
+        self.assertEqual(summary["rss"]["max"], 1750)
+        self.assertEqual(summary["rss"]["min"], 1500)
+        self.assertEqual(summary["rss"]["average"], 1562.5)
+        self.assertEqual(summary["rss"]["p50"], 1500)
+        self.assertFalse("pss" in summary)
+
+        shutil.rmtree(os.path.join(self.procDir, "10"))
+        self.assertEqual(sampler.sample(), None)
+        return
+
+    def testExitedProcessIO(self):
+        """
+        _testExitedProcessIO_
+
+        The IO of processes that exited stays in the totals, unless it was
+        added to a parent that is still in the tree.
+        """
+        with open(os.path.join(self.procDir, "uptime"), "w") as handle:
+            handle.write("11.00 5.00\n")
+        self.makeProcess(10, 1, 1000, 2000, 100, readBytes = 1000)
+        self.makeProcess(11, 10, 500, 1000, 50, readBytes = 200)
+        self.makeProcess(12, 11, 250, 500, 50, readBytes = 30)
+
+        sampler = ProcessTreeSampler(10, procDir = self.procDir)
+        self.assertEqual(sampler.sample()["readBytes"], 1230)
+
+        # 11 exits and is reaped by 10, which gets its IO, 12 is reparented
+        # to init and leaves the tree
+        shutil.rmtree(os.path.join(self.procDir, "10"))
+        shutil.rmtree(os.path.join(self.procDir, "11"))
+        shutil.rmtree(os.path.join(self.procDir, "12"))
+        self.makeProcess(10, 1, 1000, 2000, 100, readBytes = 1200)
+        self.makeProcess(12, 1, 250, 500, 50, readBytes = 40)
+        self.assertEqual(sampler.sample()["readBytes"], 1230)
+
+        self.makeProcess(13, 10, 500, 1000, 50, readBytes = 100)
+        self.assertEqual(sampler.sample()["readBytes"], 1330)
+        shutil.rmtree(os.path.join(self.procDir, "10"))
+        shutil.rmtree(os.path.join(self.procDir, "13"))
+        self.makeProcess(10, 1, 1000, 2000, 100, readBytes = 1300)
+        self.assertEqual(sampler.sample()["readBytes"], 1330)
+        self.assertEqual(sampler.summary()["readBytes"]["max"], 1330)
+        return
+
+    def testRealProcessTree(self):
+        """
+        _testRealProcessTree_
+
+        Sample a shell and its children and put the summary in a report.
+        """
+        process = subprocess.Popen(["/bin/sh", "-c", "sleep 5 & sleep 5 & wait"])
+        try:
+            sampler = ProcessTreeSampler(process.pid)
+            for i in range(20):
+                sample = sampler.sample()
+                if sample["processes"] == 3:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(sample["processes"], 3)
+            self.assertTrue(sample["rss"] > 0)
+            self.assertTrue(sample["vsize"] > sample["rss"])
+        finally:
+            process.kill()
+            process.wait()
+        self.assertEqual(sampler.sample(), None)
+
+        summary = sampler.summary()
+        report = Report("cmsRun1")
+        report.setStepRSS(stepName = "cmsRun1", min = summary["rss"]["min"],
+                          max = summary["rss"]["max"], average = summary["rss"]["average"],
+                          percentiles = {"p90": summary["rss"]["p90"]})
+        rss = report.retrieveStep("cmsRun1").performance.RSSMemory
+        self.assertEqual(rss.max, summary["rss"]["max"])
+        self.assertEqual(rss.p90, summary["rss"]["p90"])
+        return
+
+if __name__ == '__main__':
+    unittest.main()
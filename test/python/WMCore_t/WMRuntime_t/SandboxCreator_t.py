@@ -10,7 +10,6 @@ import unittest
 import tempfile
 import os.path
 import tarfile
-import pickle
 import shutil
 import sys
 import copy
@@ -20,6 +19,7 @@ import os
 import WMCore_t.WMSpec_t.TestWorkloads as TestWorkloads
 import WMCore.WMRuntime.SandboxCreator as SandboxCreator
 import WMCore.WMSpec.WMTask as WMTask
+from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 
 class SandboxCreator_t(unittest.TestCase):
 
@@ -69,8 +69,9 @@ class SandboxCreator_t(unittest.TestCase):
         self.assertTrue( 'WMCore.zip' in WMCore.ZipImportTestModule.__file__ )
 
         # make sure the pickled file is the same
-        pickleHandle = open( extractDir + "/WMSandbox/WMWorkload.pkl")
-        pickledWorkload = pickle.load( pickleHandle )
+        pickledWorkload = WMWorkloadHelper()
+        pickledWorkload.load( extractDir + "/WMSandbox/WMWorkload.pkl" )
+        pickledWorkload = pickledWorkload.data
         self.assertEqual( workload.data, pickledWorkload )
         self.assertEqual( pickledWorkload.sandbox, boxpath )
 
@@ -80,8 +81,6 @@ class SandboxCreator_t(unittest.TestCase):
                 t = WMTask.WMTaskHelper(t)
                 self.assertEqual(t.data.input.sandbox, boxpath)
 
-        pickleHandle.close()
-
         pickledWorkload.section_("test_section")
         self.assertNotEqual( workload.data, pickledWorkload )
         shutil.rmtree( extractDir )
@@ -193,6 +193,38 @@ class StageOutTest(unittest.TestCase):
         return
     
     
+    def testStageOutTimes(self):
+        """
+        _testStageOutTimes_
+
+        Stage out the files of a successful step and record how long every
+        transfer took in the report.
+        """
+        reportLocation = os.path.join(self.testDir, 'UnitTests', 'WMTaskSpace', 'cmsRun1', 'Report.pkl')
+        myReport = Report()
+        myReport.unpersist(reportLocation)
+        myReport.data.cmsRun1.status = 0
+        for i, file in enumerate(myReport.getAllFileRefsFromStep(step = 'cmsRun1')):
+            file.lfn = '/store/mc/JobRobot/RelValProdTTbar/GEN-SIM-RECO/MC_3XY_V24-v1/0000/file%i.root' % i
+        myReport.persist(reportLocation)
+
+        executor = StageOutExecutor.StageOut()
+        executor.initialise( self.stepdata, self.job)
+        self.setLocalOverride(self.stepdata)
+        self.stepdata.override.command = 'test-win'
+        executor.step = self.stepdata
+        executor.execute( )
+
+        myReport = Report()
+        myReport.unpersist(reportLocation, 'cmsRun1')
+        files = myReport.getAllFileRefsFromStep(step = 'cmsRun1')
+        self.assertTrue(len(files) > 0)
+        for file in files:
+            self.assertEqual(file.location, 'DUMMYSE')
+            self.assertEqual(file.StageOutCommand, 'test-win')
+            self.assertTrue(file.StageOutTime >= 0)
+        return
+
     def testUnitTestBackend(self):
         myReport = Report()
         myReport.unpersist(os.path.join( self.testDir,'UnitTests', 'WMTaskSpace', 'cmsRun1' , 'Report.pkl'))
@@ -10,6 +10,7 @@ import unittest
 
 from WMCore.WMSpec.WMWorkload import WMWorkload, WMWorkloadHelper, WMWorkloadException
 from WMCore.WMSpec.WMTask import WMTask, WMTaskHelper
+from WMCore.WMSpec.ConfigSectionTree import findTop
 from WMCore.WMSpec.WMSpecErrors import WMSpecFactoryException
 
 class WMWorkloadTest(unittest.TestCase):
@@ -208,6 +209,56 @@ class WMWorkloadTest(unittest.TestCase):
             )
         # probably need to flesh this out a bit more
 
+    def testChunkedPersistency(self):
+        """
+        _testChunkedPersistency_
+
+        Verify a workload saved in the chunked format only loads the top level
+        tasks that are used and is saved back unchanged.
+        """
+        workload = self.makeTestWorkload()[0]
+        workload.newTask("OtherTask").addTask("OtherChildTask")
+        workload.save(self.persistFile, chunked = True)
+
+        workload2 = WMWorkloadHelper()
+        workload2.load(self.persistFile)
+        self.assertEqual(workload2.name(), "TestWorkload")
+        self.assertEqual(workload2.data.tasks.tasklist, ["ProcessingTask", "OtherTask"])
+        self.assertFalse("ProcessingTask" in workload2.data.tasks.__dict__)
+
+        task = workload2.getTaskByPath("/TestWorkload/OtherTask/OtherChildTask")
+        self.assertEqual(task.name(), "OtherChildTask")
+        self.assertFalse("ProcessingTask" in workload2.data.tasks.__dict__)
+        self.assertTrue(findTop(task.data) is workload2.data)
+
+        self.assertEqual(workload2.listAllTaskPathNames(), workload.listAllTaskPathNames())
+        mergeTask = workload2.getTaskByPath("/TestWorkload/ProcessingTask/MergeTask")
+        self.assertEqual(mergeTask.getPathName(), "/TestWorkload/ProcessingTask/MergeTask")
+
+        # section_ returns the tasks that haven't been loaded yet
+        workload5 = WMWorkloadHelper()
+        workload5.load(self.persistFile)
+        self.assertFalse("OtherTask" in workload5.data.tasks.__dict__)
+        otherTask = workload5.data.tasks.section_("OtherTask")
+        self.assertEqual(otherTask.pathName, "/TestWorkload/OtherTask")
+        self.assertTrue(otherTask is workload5.data.tasks.OtherTask)
+        self.assertEqual(workload5.listAllTaskPathNames(), workload.listAllTaskPathNames())
+        newTask = workload5.data.tasks.section_("NewSection")
+        self.assertEqual(newTask.__class__.__name__, "ConfigSection")
+
+        # reloading the unchanged file hits the spec cache, saving a lazily
+        # loaded workload writes all the tasks
+        workload3 = WMWorkloadHelper()
+        workload3.load(self.persistFile)
+        workload3.removeTask("ProcessingTask")
+        workload3.save(self.persistFile)
+        workload4 = WMWorkloadHelper()
+        workload4.load(self.persistFile)
+        self.assertEqual(workload4.listAllTaskPathNames(),
+                         ["/TestWorkload/OtherTask", "/TestWorkload/OtherTask/OtherChildTask"])
+        self.assertEqual(workload4.data.tasks.__class__.__name__, "ConfigSection")
+        return
+
     def testD_Owner(self):
         """Test setOwner/getOwner function. """
 
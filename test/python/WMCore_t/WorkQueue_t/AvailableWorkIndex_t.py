@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+    AvailableWorkIndex unit tests
+"""
+
+import copy
+import logging
+import unittest
+
+from WMCore.WorkQueue.AvailableWorkIndex import AvailableWorkIndex, ELEMENT_KEY
+
+def elementDoc(docId, priority, timestamp, siteWhitelist = None, status = 'Available'):
+    """Couch document of a work queue element"""
+    return {'_id' : docId, '_rev' : '1-%s' % docId, 'timestamp' : timestamp,
+            'updatetime' : timestamp,
+            ELEMENT_KEY : {'Status' : status, 'Priority' : priority,
+                           'RequestName' : 'request_%s' % docId, 'TeamName' : 'team',
+                           'Inputs' : {}, 'ParentFlag' : False, 'ParentData' : {},
+                           'PileupData' : {}, 'SiteWhitelist' : siteWhitelist or [],
+                           'SiteBlacklist' : []}}
+
+class FakeDatabase(object):
+    """Just enough of a couch database for the index"""
+    name = 'fake'
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.changed = []
+
+    def info(self):
+        return {'update_seq' : 1}
+
+    def loadView(self, design, view, options):
+        return {'rows' : [{'doc' : copy.deepcopy(x)} for x in self.docs.values()]}
+
+    def changes(self, since):
+        return {'results' : [{'id' : x} for x in self.changed], 'last_seq' : since + 1}
+
+    def allDocs(self, options, keys):
+        return {'rows' : [{'doc' : copy.deepcopy(self.docs[x])} for x in keys]}
+
+class AvailableWorkIndexTest(unittest.TestCase):
+
+    def testOrder(self):
+        """Elements come in the order of the descending availableByPriority view"""
+        docs = {}
+        for docId, priority, sites in [('a', 1, ['T2_XX_SiteA']), ('b', 1, []),
+                                       ('c', 1, ['T2_XX_SiteA']), ('d', 5, ['T2_XX_SiteB']),
+                                       ('e', 3, ['T2_XX_SiteA', 'T2_XX_SiteB'])]:
+            docs[docId] = elementDoc(docId, priority, 0, sites)
+        db = FakeDatabase(docs)
+        index = AvailableWorkIndex(db, logging)
+        index.sync()
+        self.assertEqual(len(index), 5)
+        self.assertEqual([x.id for x in index.availableElements(['T2_XX_SiteA', 'T2_XX_SiteB'])],
+                         ['d', 'e', 'c', 'b', 'a'])
+        self.assertEqual([x.id for x in index.availableElements(['T2_XX_SiteA'])],
+                         ['e', 'c', 'b', 'a'])
+
+        # an element leaves, another one gets a higher priority
+        db.docs['c'] = elementDoc('c', 1, 0, ['T2_XX_SiteA'], status = 'Acquired')
+        db.docs['a'] = elementDoc('a', 9, 0, ['T2_XX_SiteA'])
+        db.changed = ['a', 'c']
+        index.sync()
+        self.assertEqual(len(index), 4)
+        self.assertEqual([x.id for x in index.availableElements(['T2_XX_SiteA'])],
+                         ['a', 'e', 'b'])
+
+    def testGetElement(self):
+        """getElement returns copies of the indexed elements"""
+        index = AvailableWorkIndex(FakeDatabase({'a' : elementDoc('a', 1, 10)}), logging)
+        index.sync()
+        element = index.getElement('a')
+        self.assertEqual(element.id, 'a')
+        self.assertEqual(element.rev, '1-a')
+        self.assertEqual(element['Priority'], 1)
+        self.assertEqual(element['CreationTime'], 10)
+
+        element['Status'] = 'Acquired'
+        element['SiteWhitelist'].append('T2_XX_SiteA')
+        indexed = list(index.availableElements([]))[0]
+        self.assertEqual(indexed['Status'], 'Available')
+        self.assertEqual(indexed['SiteWhitelist'], [])
+
+if __name__ == '__main__':
+    unittest.main()
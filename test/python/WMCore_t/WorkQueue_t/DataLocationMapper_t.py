@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+_DataLocationMapper_t_
+
+Unittests for the WorkQueue DataLocationMapper
+"""
+
+import logging
+import time
+import unittest
+
+import cherrypy
+from nose.plugins.attrib import attr
+
+from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
+from WMCore.WorkQueue.DataLocationMapper import DataLocationMapper
+from WMCore.Wrappers import JsonWrapper
+from WMQuality.Emulators.PhEDExClient.PhEDEx import PhEDEx as PhEDExEmulator
+from WMQuality.Emulators.SiteDBClient.SiteDB import SiteDBJSON as SiteDBEmulator
+
+class SlowPhEDExServer(object):
+    """
+    Answer blockreplicas queries from the emulator after some latency.
+    """
+    def __init__(self, latency):
+        self.latency = latency
+        self.queries = 0
+        self.emulator = PhEDExEmulator()
+
+    def blockreplicas(self, **kwargs):
+        self.queries += 1
+        time.sleep(self.latency)
+        blocks = kwargs['block']
+        if type(blocks) != list:
+            blocks = [blocks]
+        return JsonWrapper.dumps(self.emulator.getReplicaInfoForBlocks(block = blocks))
+    blockreplicas.exposed = True
+
+class DataLocationMapperTest(unittest.TestCase):
+
+    def makeBlocks(self, count):
+        """
+        Make block names for count blocks in several datasets.
+        """
+        return ["/MinimumBias/Run%i/RAW#%i" % (i % 7, i) for i in range(count)]
+
+    def testLocationsFromPhEDEx(self):
+        """
+        _testLocationsFromPhEDEx_
+
+        Verify block and dataset locations don't depend on how the items are
+        split between the queries.
+        """
+        phedex = PhEDExEmulator()
+        sitedb = SiteDBEmulator()
+        blocks = self.makeBlocks(50)
+        datasets = sorted(set([x.split('#')[0] for x in blocks]))
+
+        results = []
+        for chunkSize in [1, 7, 100]:
+            mapper = DataLocationMapper(phedex = phedex, sitedb = sitedb,
+                                        locationFrom = 'location',
+                                        locationChunkSize = chunkSize)
+            blockLocations, fullResync = mapper.locationsFromPhEDEx(blocks, True)
+            datasetLocations, fullResync = mapper.locationsFromPhEDEx(datasets, True,
+                                                                      datasetSearch = True)
+            results.append((blockLocations, datasetLocations))
+
+        (blockLocations, datasetLocations) = results[0]
+        self.assertEqual(sorted(blockLocations.keys()), sorted(blocks))
+        self.assertEqual(sorted(datasetLocations.keys()), datasets)
+        self.assertEqual(sorted(blockLocations["/MinimumBias/Run2/RAW#2"]),
+                         ['T2_XX_SiteA', 'T2_XX_SiteB'])
+        for (otherBlocks, otherDatasets) in results[1:]:
+            for block in blocks:
+                self.assertEqual(sorted(otherBlocks[block]), sorted(blockLocations[block]))
+            for dataset in datasets:
+                self.assertEqual(sorted(otherDatasets[dataset]), sorted(datasetLocations[dataset]))
+        return
+
+    @attr('integration')
+    def testLocationsFromPhEDExBenchmark(self):
+        """
+        _testLocationsFromPhEDExBenchmark_
+
+        Compare one query per block against chunked concurrent queries to a
+        local PhEDEx server with 50ms of latency per query.
+        """
+        port = 8888
+        server = SlowPhEDExServer(0.05)
+        cherrypy.config.update({'server.socket_port': port})
+        cherrypy.tree.mount(server, "/phedex")
+        cherrypy.engine.start()
+        try:
+            phedex = PhEDEx({'endpoint': 'http://127.0.0.1:%i/phedex/' % port,
+                             'logger': logging.getLogger()})
+            sitedb = SiteDBEmulator()
+            blocks = self.makeBlocks(500)
+
+            timings = []
+            results = []
+            for (chunkSize, maxInFlight) in [(1, 1), (100, 1), (100, 5)]:
+                mapper = DataLocationMapper(phedex = phedex, sitedb = sitedb,
+                                            locationFrom = 'location',
+                                            locationChunkSize = chunkSize,
+                                            locationMaxInFlight = maxInFlight)
+                server.queries = 0
+                startTime = time.time()
+                locations, fullResync = mapper.locationsFromPhEDEx(blocks, True)
+                timings.append(time.time() - startTime)
+                results.append(locations)
+                print "chunk size %i, %i in flight: %i queries in %.2fs" % (chunkSize, maxInFlight,
+                                                                          server.queries,
+                                                                          timings[-1])
+        finally:
+            cherrypy.engine.exit()
+            cherrypy.engine.stop()
+
+        for locations in results[1:]:
+            self.assertEqual(len(locations), len(blocks))
+            for block in blocks:
+                self.assertEqual(sorted(locations[block]), sorted(results[0][block]))
+        self.assertTrue(timings[2] < timings[0])
+        return
+
+if __name__ == '__main__':
+    unittest.main()
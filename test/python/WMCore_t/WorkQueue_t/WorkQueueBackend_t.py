@@ -103,5 +103,61 @@ class WorkQueueBackendTest(unittest.TestCase):
         self.assertEqual(len(self.backend.db.allDocs()['rows']), 4) # design doc + workflow + 2 elements
         self.assertEqual(self.backend.db.loadView('WorkQueue', 'conflicts')['total_rows'], 0)
 
+    def testElementsForDataItems(self):
+        """Elements are looked up for several data items at once"""
+        dataset = self.processingSpec.listInputDatasets()[0]
+        element1 = CouchWorkQueueElement(self.couch_db,
+                                         elementParams = {'RequestName' : 'backend_test',
+                                                          'WMSpec' : self.processingSpec,
+                                                          'Status' : 'Available',
+                                                          'Jobs' : 10,
+                                                          'Inputs' : {dataset + '#1' : [],
+                                                                      dataset + '#2' : []}})
+        element2 = CouchWorkQueueElement(self.couch_db,
+                                         elementParams = {'RequestName' : 'backend_test',
+                                                          'WMSpec' : self.processingSpec,
+                                                          'Status' : 'Available',
+                                                          'Jobs' : 20,
+                                                          'Inputs' : {dataset + '#2' : []}})
+        self.backend.insertElements([element1, element2])
+        elements = self.backend.getElementsForDataItems([dataset + '#1', dataset + '#2',
+                                                         dataset + '#3'], chunkSize = 2)
+        self.assertEqual(sorted(elements.keys()), [dataset + '#1', dataset + '#2'])
+        self.assertEqual(len(elements[dataset + '#1']), 1)
+        self.assertEqual(len(elements[dataset + '#2']), 2)
+        # the element with both blocks is shared
+        self.assertTrue(elements[dataset + '#1'][0] in elements[dataset + '#2'])
+
+    def testAvailableWorkIndex(self):
+        """Work matched from the in-memory index is the same as from couch"""
+        indexBackend = WorkQueueBackend(db_url = self.testInit.couchUrl,
+                                        db_name = 'wq_backend_test',
+                                        inbox_name = 'wq_backend_test_inbox',
+                                        availableWorkIndex = True)
+        elements = []
+        for i in range(10):
+            elements.append(WorkQueueElement(RequestName = 'backend_test_%s' % i,
+                                             WMSpec = self.processingSpec,
+                                             Status = 'Available', Jobs = 10,
+                                             Priority = i % 3,
+                                             SiteWhitelist = [['T2_XX_SiteA'], ['T2_XX_SiteB'], []][i % 3]))
+        self.backend.insertElements(elements[:5])
+        indexBackend.availableWork({'T2_XX_SiteA' : 1000}, {})
+        self.backend.insertElements(elements[5:])
+
+        for thresholds in [{'T2_XX_SiteA' : 1000}, {'T2_XX_SiteB' : 1000},
+                           {'T2_XX_SiteA' : 1000, 'T2_XX_SiteB' : 1000}]:
+            work = self.backend.availableWork(thresholds, {})[0]
+            indexWork = indexBackend.availableWork(thresholds, {})[0]
+            self.assertEqual(sorted([x['RequestName'] for x in indexWork]),
+                             sorted([x['RequestName'] for x in work]))
+        self.assertEqual(len(indexBackend.availableWorkIndex), 10)
+
+        # Acquired elements are dropped from the index
+        work = indexBackend.availableWork({'T2_XX_SiteB' : 1000}, {})[0]
+        self.backend.updateElements(*[x.id for x in work], Status = 'Acquired')
+        self.assertEqual(indexBackend.availableWork({'T2_XX_SiteB' : 1000}, {})[0], [])
+        self.assertEqual(len(indexBackend.availableWorkIndex), 10 - len(work))
+
 if __name__ == '__main__':
     unittest.main()